@@ -5,6 +5,10 @@ Configuración del Checkpointer para Memoria Episódica
 Implementa PostgresSaver para persistencia de estado del grafo LangGraph.
 Permite que las conversaciones multi-turno mantengan contexto entre invocaciones.
 
+Hay dos variantes:
+- get_checkpointer(): PostgresSaver síncrono (LangGraph CLI, scripts)
+- get_async_checkpointer(): AsyncPostgresSaver para graph.ainvoke en la API
+
 Autor: Sistema
 Fecha: 11 de Diciembre, 2025
 """
@@ -12,8 +16,10 @@ Fecha: 11 de Diciembre, 2025
 import logging
 from typing import Optional
 from langgraph.checkpoint.postgres import PostgresSaver
+from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
 from psycopg import Connection
-from psycopg_pool import ConnectionPool
+from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool, AsyncConnectionPool
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +29,7 @@ logger = logging.getLogger(__name__)
 # =============================================================================
 
 _checkpointer_instance: Optional[PostgresSaver] = None
+_async_checkpointer_instance: Optional[AsyncPostgresSaver] = None
 
 
 def get_checkpointer() -> PostgresSaver:
@@ -83,6 +90,52 @@ def get_checkpointer() -> PostgresSaver:
     return _checkpointer_instance
 
 
+async def get_async_checkpointer() -> AsyncPostgresSaver:
+    """
+    Obtiene o crea el checkpointer asíncrono (mismas tablas que get_checkpointer).
+    
+    Debe llamarse desde el event loop de la app: AsyncPostgresSaver y su
+    pool quedan ligados al loop en el que se crean.
+    """
+    global _async_checkpointer_instance
+    
+    if _async_checkpointer_instance is None:
+        from backend.api.core.config import get_settings
+        
+        settings = get_settings()
+        
+        try:
+            pool = AsyncConnectionPool(
+                settings.AUTH_DB_URL,
+                min_size=1,
+                max_size=5,
+                open=False,
+                # Requeridos por AsyncPostgresSaver
+                kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+            )
+            await pool.open()
+            # setup() omitido por la misma razón que en get_checkpointer()
+            _async_checkpointer_instance = AsyncPostgresSaver(pool)
+            logger.info("✅ Checkpointer PostgreSQL asíncrono creado (BD: clinica_auth_db)")
+            
+        except Exception as e:
+            logger.error(f"❌ Error al inicializar checkpointer asíncrono: {e}")
+            raise RuntimeError(
+                f"No se pudo inicializar el checkpointer PostgreSQL: {e}"
+            ) from e
+    
+    return _async_checkpointer_instance
+
+
+async def close_async_checkpointer() -> None:
+    """Cierra el pool del checkpointer asíncrono (apagado de la app)."""
+    global _async_checkpointer_instance
+    
+    if _async_checkpointer_instance is not None:
+        saver, _async_checkpointer_instance = _async_checkpointer_instance, None
+        await saver.conn.close()
+
+
 def create_thread_id(user_id: int, origin: str, conversation_uuid: str) -> str:
     """
     Genera un thread_id único para identificar hilos de conversación.
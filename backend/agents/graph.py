@@ -30,6 +30,7 @@ response scope  perms    sql
                    END
 """
 
+import asyncio
 import logging
 from datetime import datetime, timezone
 from typing import Dict, Any, Literal
@@ -43,7 +44,7 @@ from backend.agents.state import (
     create_initial_state,
 )
 from backend.agents.nodes import (
-    classify_intent,
+    intent_node,
     check_permissions,
     generate_sql,
     execute_sql,
@@ -128,28 +129,28 @@ def route_after_execution(state: AgentState) -> Literal["generate_response", "re
 # NODOS ESPECIALES (para respuestas rápidas sin SQL)
 # =============================================================================
 
-def greeting_response_node(state: AgentState) -> AgentState:
+async def greeting_response_node(state: AgentState) -> AgentState:
     """Nodo para respuestas de saludo."""
     state["node_path"] = state.get("node_path", []) + ["greeting_response"]
-    return generate_response(state)
+    return await generate_response(state)
 
 
-def out_of_scope_response_node(state: AgentState) -> AgentState:
+async def out_of_scope_response_node(state: AgentState) -> AgentState:
     """Nodo para consultas fuera de alcance."""
     state["node_path"] = state.get("node_path", []) + ["out_of_scope_response"]
-    return generate_response(state)
+    return await generate_response(state)
 
 
-def clarification_response_node(state: AgentState) -> AgentState:
+async def clarification_response_node(state: AgentState) -> AgentState:
     """Nodo para pedir clarificación."""
     state["node_path"] = state.get("node_path", []) + ["clarification_response"]
-    return generate_response(state)
+    return await generate_response(state)
 
 
-def error_response_node(state: AgentState) -> AgentState:
+async def error_response_node(state: AgentState) -> AgentState:
     """Nodo para mostrar errores."""
     state["node_path"] = state.get("node_path", []) + ["error_response"]
-    return generate_response(state)
+    return await generate_response(state)
 
 
 # =============================================================================
@@ -183,7 +184,7 @@ def build_agent_graph() -> StateGraph:  # type: ignore
     workflow = StateGraph(AgentState)  # type: ignore
     
     # --- Agregar nodos ---
-    workflow.add_node("classify_intent", classify_intent)  # type: ignore
+    workflow.add_node("classify_intent", intent_node())  # type: ignore
     workflow.add_node("check_permissions", check_permissions)  # type: ignore
     workflow.add_node("generate_sql", generate_sql)  # type: ignore
     workflow.add_node("execute_sql", execute_sql)  # type: ignore
@@ -291,6 +292,48 @@ def get_compiled_graph():
     return _compiled_graph
 
 
+# Grafo para ainvoke (checkpointer asíncrono, creado en el event loop de la app)
+_async_graph = None
+_async_graph_lock = asyncio.Lock()
+
+
+async def get_async_graph():
+    """
+    Obtiene el grafo compilado con AsyncPostgresSaver para graph.ainvoke.
+    
+    Mismo grafo que get_compiled_graph(); solo cambia el checkpointer,
+    porque el síncrono no implementa los métodos async que usa ainvoke.
+    """
+    global _async_graph
+    if _async_graph is None:
+        async with _async_graph_lock:
+            if _async_graph is None:
+                from backend.agents.checkpoint_config import get_async_checkpointer
+                
+                workflow = build_agent_graph()
+                try:
+                    checkpointer = await get_async_checkpointer()
+                    _async_graph = workflow.compile(checkpointer=checkpointer)
+                    logger.info("✅ Grafo async compilado con checkpointer PostgreSQL")
+                except Exception as e:
+                    logger.error(f"⚠️ Error al compilar con checkpointer: {e}")
+                    logger.warning("⚠️ Compilando sin checkpointer (modo stateless)")
+                    _async_graph = workflow.compile()
+    
+    return _async_graph
+
+
+async def shutdown_agent() -> None:
+    """Libera el cliente LLM y el pool del checkpointer (apagado de la app)."""
+    global _async_graph
+    from backend.agents.checkpoint_config import close_async_checkpointer
+    from backend.agents.llm_client import close_llm_client
+    
+    _async_graph = None
+    await close_llm_client()
+    await close_async_checkpointer()
+
+
 async def run_agent(
     user_query: str,
     user_id: int,
@@ -298,6 +341,7 @@ async def run_agent(
     session_id: str | None = None,
     thread_id: str | None = None,
     origin: str = "webapp",
+    clinica_id: int | None = None,
 ) -> Dict[str, Any]:
     """
     Ejecuta el agente con una consulta del usuario.
@@ -306,6 +350,9 @@ async def run_agent(
     - Usa thread_id para mantener contexto entre turnos
     - Configura checkpointing para persistencia de estado
     
+    El grafo corre con ainvoke: mientras un chat espera al LLM o a la BD,
+    el worker sigue atendiendo otras peticiones.
+    
     Args:
         user_query: Consulta en lenguaje natural
         user_id: ID del usuario autenticado
@@ -313,6 +360,7 @@ async def run_agent(
         session_id: ID de sesión opcional (legacy)
         thread_id: ID de hilo para checkpointing (NUEVO)
         origin: Origen de la conversación ('webapp', 'whatsapp_paciente', 'whatsapp_user')
+        clinica_id: Clínica del usuario (ámbito de la caché de consultas)
         
     Returns:
         Dict con response_text, response_data, y metadata
@@ -340,6 +388,7 @@ async def run_agent(
         session_id=session_id,
         thread_id=thread_id,
         origin=origin,
+        clinica_id=clinica_id,
     )
     
     logger.info(
@@ -349,7 +398,7 @@ async def run_agent(
     
     try:
         # Obtener grafo y ejecutar
-        graph = get_compiled_graph()
+        graph = await get_async_graph()
         
         # ✅ NUEVO: Configurar checkpointing con thread_id
         config = {
@@ -358,7 +407,7 @@ async def run_agent(
             }
         }
         
-        final_state = graph.invoke(initial_state, config=config)
+        final_state = await graph.ainvoke(initial_state, config=config)
         
         # Agregar timestamp de finalización
         final_state["completed_at"] = datetime.now(timezone.utc)
@@ -402,7 +451,8 @@ class Graph:
         self._graph = get_compiled_graph()  # type: ignore
     
     def invoke(self, state: AgentState) -> AgentState:
-        return self._graph.invoke(state)  # type: ignore
+        # Los nodos LLM son async: fuera de un event loop se corren con asyncio.run
+        return asyncio.run(self._graph.ainvoke(state))  # type: ignore
     
     async def ainvoke(self, state: AgentState) -> AgentState:
         return await self._graph.ainvoke(state)  # type: ignore
@@ -0,0 +1,83 @@
+"""
+Cliente LLM compartido
+======================
+
+Un solo AsyncAnthropic por proceso para todos los nodos del agente.
+
+Crear `Anthropic(api_key=...)` en cada llamada abría una conexión TLS
+nueva por mensaje y bloqueaba el event loop mientras el modelo respondía.
+El cliente compartido reutiliza las conexiones HTTP (keep-alive) y sus
+llamadas son awaitables, así que un worker atiende varios chats a la vez
+mientras esperan al LLM.
+
+Timeout por llamada: AGENT_TIMEOUT_SECONDS.
+
+cached_system() arma el system prompt con marcadores de prompt caching:
+las partes estáticas (reglas, esquema) quedan en caché del lado de la API
+y las llamadas siguientes solo pagan (en tiempo y tokens) lo que cambia.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+import httpx
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+from anthropic.types import TextBlock
+
+from backend.api.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_client: Optional[AsyncAnthropic] = None
+
+
+def get_llm_client() -> AsyncAnthropic:
+    """Obtiene el cliente compartido (se crea en la primera llamada)."""
+    global _client
+    if _client is None:
+        timeout = float(settings.AGENT_TIMEOUT_SECONDS)
+        _client = AsyncAnthropic(
+            api_key=settings.ANTHROPIC_API_KEY,
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 5.0)),
+            max_retries=settings.AGENT_LLM_MAX_RETRIES,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=settings.AGENT_LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.AGENT_LLM_MAX_CONNECTIONS,
+                    keepalive_expiry=60.0,
+                ),
+            ),
+        )
+        logger.info("Cliente LLM compartido creado")
+    return _client
+
+
+async def close_llm_client() -> None:
+    """Cierra las conexiones del cliente (apagado de la app)."""
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.close()
+
+
+def cached_system(*parts: str) -> List[Dict[str, Any]]:
+    """
+    System prompt como bloques de texto, cada uno con cache_control.
+    
+    Cada bloque es un punto de caché: la API reutiliza el prefijo hasta el
+    último bloque que coincida (máximo 4 por petición). Poner primero lo
+    que nunca cambia.
+    """
+    return [
+        {"type": "text", "text": part, "cache_control": {"type": "ephemeral"}}
+        for part in parts if part
+    ]
+
+
+def response_text(response: Any) -> str:
+    """Texto del primer TextBlock de una respuesta de messages.create."""
+    for block in response.content:
+        if isinstance(block, TextBlock):
+            return block.text
+    return ""
@@ -3,25 +3,19 @@ Módulo de Memoria para Agentes LangGraph
 ========================================
 
 Contiene implementaciones de diferentes tipos de memoria:
-- Memoria Semántica (semantic_memory.py)
 - Utilidades de embeddings (embeddings.py)
+- Caché semántica de consultas (query_cache.py)
 
 Autor: Sistema
 Fecha: 11 de Diciembre, 2025
 Fase: 3 - Memoria Semántica
 """
 
-from .semantic_memory import (
-    save_to_semantic_memory,
-    retrieve_semantic_context,
-    search_similar_conversations,
-)
 from .embeddings import generate_embedding, generate_embeddings_batch
+from .query_cache import QueryCache
 
 __all__ = [
-    "save_to_semantic_memory",
-    "retrieve_semantic_context",
-    "search_similar_conversations",
     "generate_embedding",
     "generate_embeddings_batch",
+    "QueryCache",
 ]
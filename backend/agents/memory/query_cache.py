@@ -0,0 +1,284 @@
+"""
+Caché Semántica de Consultas del Agente
+=======================================
+
+Guarda el SQLQuery generado para una pregunta (NO los datos), así que una
+pregunta repetida ("citas de hoy", "¿cuántos pacientes hay?") se salta la
+clasificación y la generación de SQL y solo vuelve a ejecutar el SQL:
+los resultados siempre están al día.
+
+Búsqueda en dos pasos, siempre dentro del mismo ámbito (rol, clínica, día):
+1. Exacta por pregunta normalizada (minúsculas, sin acentos ni signos)
+2. Semántica por similitud coseno de embeddings (generate_embedding), solo
+   contra entradas cuyo SQL no tiene parámetros. Un SQL con parámetros
+   lleva valores concretos (nombres, fechas) y "citas de Juan" y "citas de
+   Juana" son casi idénticas para el modelo, así que esas solo se reutilizan
+   con la misma pregunta exacta.
+
+El día forma parte del ámbito para que un SQL generado con "mañana" ya
+resuelto a una fecha no se reutilice al día siguiente.
+
+Las entradas expiran (TTL), el tamaño está acotado con desalojo LRU y se
+llevan métricas de aciertos (query_cache.stats()).
+
+Configuración: AGENT_QUERY_CACHE_*
+"""
+
+import asyncio
+import logging
+import math
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.api.core.config import get_settings
+from backend.agents.state import AgentState, IntentType, SQLQuery
+from backend.agents.memory.embeddings import generate_embedding
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+Scope = Tuple[str, Optional[int], str]  # (rol, clinica_id, fecha ISO)
+
+
+# =============================================================================
+# NORMALIZACIÓN Y VECTORES
+# =============================================================================
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """'¿Cuántos  pacientes hay?' → 'cuantos pacientes hay'"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = _PUNCTUATION.sub(" ", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+def _unit(vector: List[float]) -> Optional[List[float]]:
+    """Vector normalizado (None si es cero: el modelo no está disponible)."""
+    norm = math.sqrt(sum(x * x for x in vector))
+    if norm == 0:
+        return None
+    return [x / norm for x in vector]
+
+
+def _dot(a: List[float], b: List[float]) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+# =============================================================================
+# ENTRADAS Y MÉTRICAS
+# =============================================================================
+
+@dataclass
+class CachedQuery:
+    """Resultado de entender una pregunta (lo que se reutiliza en un acierto)."""
+    sql_query: SQLQuery
+    intent: IntentType
+    entities: Dict[str, Any] = field(default_factory=dict)
+    embedding: Optional[List[float]] = None
+    expires_at: float = 0.0
+
+    def copy(self) -> "CachedQuery":
+        """Copia para el estado del agente (los nodos pueden modificarla)."""
+        sql = replace(self.sql_query, params=dict(self.sql_query.params),
+                      tables_involved=list(self.sql_query.tables_involved))
+        return replace(self, sql_query=sql, entities=dict(self.entities))
+
+
+@dataclass
+class CacheStats:
+    """Contadores de la caché."""
+    exact_hits: int = 0
+    semantic_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0
+
+
+# =============================================================================
+# CACHÉ
+# =============================================================================
+
+class QueryCache:
+    """
+    Caché LRU con TTL de SQL generado por pregunta.
+
+    Args:
+        ttl_seconds: Vida de cada entrada
+        maxsize: Máximo de entradas (se desaloja la menos usada)
+        similarity: Similitud coseno mínima para un acierto semántico
+        embed: Función texto → embedding (inyectable en tests)
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        maxsize: int,
+        similarity: float,
+        embed: Callable[[str], List[float]] = generate_embedding,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self.similarity = similarity
+        self._embed = embed
+        self._entries: "OrderedDict[Tuple[Scope, str], CachedQuery]" = OrderedDict()
+        self._semantic_enabled = True
+        self.counters = CacheStats()
+
+    @staticmethod
+    def scope(role: str, clinica_id: Optional[int]) -> Scope:
+        return (role, clinica_id, date.today().isoformat())
+
+    async def _embedding(self, text: str) -> Optional[List[float]]:
+        if not self._semantic_enabled:
+            return None
+        # El modelo corre en CPU: fuera del event loop
+        vector = _unit(await asyncio.to_thread(self._embed, text))
+        if vector is None:
+            # generate_embedding devuelve ceros si el modelo no cargó
+            logger.warning("Embeddings no disponibles: caché de consultas solo con coincidencia exacta")
+            self._semantic_enabled = False
+        return vector
+
+    def _alive(self, key: Tuple[Scope, str], entry: CachedQuery, now: float) -> bool:
+        if entry.expires_at > now:
+            return True
+        self._entries.pop(key, None)
+        self.counters.expirations += 1
+        return False
+
+    async def lookup(self, role: str, clinica_id: Optional[int], query: str) -> Optional[CachedQuery]:
+        """Busca la pregunta (exacta y luego semántica). Retorna una copia o None."""
+        scope = self.scope(role, clinica_id)
+        key = (scope, normalize_query(query))
+        now = time.monotonic()
+
+        entry = self._entries.get(key)
+        if entry is not None and self._alive(key, entry, now):
+            self._entries.move_to_end(key)
+            self.counters.exact_hits += 1
+            return entry.copy()
+
+        candidates = [
+            (k, e) for k, e in list(self._entries.items())
+            if k[0] == scope and e.embedding is not None and self._alive(k, e, now)
+        ]
+        if candidates:
+            vector = await self._embedding(key[1])
+            if vector is not None:
+                best_key, best = max(candidates, key=lambda item: _dot(vector, item[1].embedding))
+                if _dot(vector, best.embedding) >= self.similarity and best_key in self._entries:
+                    self._entries.move_to_end(best_key)
+                    self.counters.semantic_hits += 1
+                    return best.copy()
+
+        self.counters.misses += 1
+        return None
+
+    async def store(
+        self,
+        role: str,
+        clinica_id: Optional[int],
+        query: str,
+        sql_query: SQLQuery,
+        intent: IntentType,
+        entities: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Guarda el SQL generado para una pregunta."""
+        normalized = normalize_query(query)
+        if not normalized:
+            return
+        # Solo SQL sin parámetros participa en la búsqueda semántica
+        embedding = None if sql_query.params else await self._embedding(normalized)
+        key = (self.scope(role, clinica_id), normalized)
+        self._entries[key] = CachedQuery(
+            sql_query=sql_query,
+            intent=intent,
+            entities=dict(entities or {}),
+            embedding=embedding,
+            expires_at=time.monotonic() + self.ttl_seconds,
+        ).copy()
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.counters.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas para /chat/health."""
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.counters.exact_hits,
+            "semantic_hits": self.counters.semantic_hits,
+            "misses": self.counters.misses,
+            "evictions": self.counters.evictions,
+            "expirations": self.counters.expirations,
+            "hit_rate": round(self.counters.hit_rate, 4),
+            "semantic_enabled": self._semantic_enabled,
+        }
+
+    def clear(self) -> None:
+        """Vacía la caché y reinicia las métricas."""
+        self._entries.clear()
+        self.counters = CacheStats()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Instancia del proceso
+query_cache = QueryCache(
+    ttl_seconds=settings.AGENT_QUERY_CACHE_TTL_SECONDS,
+    maxsize=settings.AGENT_QUERY_CACHE_MAXSIZE,
+    similarity=settings.AGENT_QUERY_CACHE_SIMILARITY,
+)
+
+# Solo lecturas; el resto de intenciones no genera SQL reutilizable
+CACHEABLE_INTENTS = (IntentType.QUERY_READ, IntentType.QUERY_AGGREGATE)
+
+
+def is_cacheable(state: AgentState) -> bool:
+    """Los pacientes (WhatsApp) consultan sus propios datos: nunca compartir su SQL."""
+    return settings.AGENT_QUERY_CACHE_ENABLED and state.get("origin") != "whatsapp_paciente"
+
+
+async def lookup_query(state: AgentState) -> Optional[CachedQuery]:
+    """Busca en la caché la pregunta del estado."""
+    if not is_cacheable(state):
+        return None
+    return await query_cache.lookup(
+        state.get("user_role", ""), state.get("clinica_id"), state.get("user_query", "")
+    )
+
+
+async def remember_query(state: AgentState) -> None:
+    """Guarda el SQL del estado tras ejecutarse con éxito (no si vino de la caché o de una plantilla)."""
+    sql_query = state.get("sql_query")
+    if (
+        sql_query is None
+        or state.get("query_cache_hit")
+        or state.get("query_template")
+        or state.get("intent") not in CACHEABLE_INTENTS
+        or not is_cacheable(state)
+    ):
+        return
+    await query_cache.store(
+        state.get("user_role", ""),
+        state.get("clinica_id"),
+        state.get("user_query", ""),
+        sql_query,
+        state["intent"],
+        state.get("entities_extracted"),
+    )
@@ -8,6 +8,7 @@ El grafo conecta estos nodos con edges condicionales.
 
 Flujo principal:
 1. classify_intent → Determina qué quiere el usuario
+   (o understand_query: intención + SQL en una sola llamada al LLM)
 2. check_permissions → Verifica permisos RBAC
 3. generate_sql → Convierte a SQL (si aplica)
 4. execute_sql → Ejecuta la query
@@ -20,6 +21,7 @@ from .check_permissions_node import CheckPermissionsNode, check_permissions
 from .nl_to_sql_node import NLToSQLNode, generate_sql
 from .sql_exec_node import SQLExecNode, execute_sql
 from .llm_response_node import LlmResponseNode, generate_response
+from .understand_query_node import UnderstandQueryNode, understand_query, intent_node
 
 # Nodos opcionales (deshabilitados por defecto)
 from .vector_context_node import VectorContextNode
@@ -32,6 +34,7 @@ __all__ = [
     "NLToSQLNode",
     "SQLExecNode", 
     "LlmResponseNode",
+    "UnderstandQueryNode",
     "VectorContextNode",
     "CombineContextNode",
     # Funciones de nodos (para uso directo en grafo)
@@ -40,5 +43,7 @@ __all__ = [
     "generate_sql",
     "execute_sql",
     "generate_response",
+    "understand_query",
+    "intent_node",
     "combine_context",
 ]
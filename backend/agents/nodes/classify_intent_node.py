@@ -14,10 +14,8 @@ import json
 import logging
 from typing import Dict, Any, Tuple
 
-from anthropic import Anthropic
-from anthropic.types import TextBlock
-
 from backend.api.core.config import get_settings
+from backend.agents.llm_client import get_llm_client, response_text
 from backend.agents.state import (
     AgentState,
     IntentType,
@@ -34,7 +32,7 @@ settings = get_settings()
 # PROMPTS PARA CLASIFICACIÓN
 # =============================================================================
 
-CLASSIFICATION_SYSTEM_PROMPT = """Eres un clasificador de intenciones para un sistema de gestión clínica podológica (PodoSkin).
+CLASSIFICATION_TASK_PROMPT = """Eres un clasificador de intenciones para un sistema de gestión clínica podológica (PodoSkin).
 
 Tu tarea es analizar la consulta del usuario y determinar:
 1. El tipo de intención
@@ -60,7 +58,10 @@ Tu tarea es analizar la consulta del usuario y determinar:
 - servicio/servicios: Catálogo de servicios
 - prospecto/prospectos: Leads/contactos potenciales
 - pago/pagos: Pagos recibidos
-- gasto/gastos: Gastos operativos
+- gasto/gastos: Gastos operativos"""
+
+# Con formato de salida JSON (understand_query usa solo la tarea + tool use)
+CLASSIFICATION_SYSTEM_PROMPT = CLASSIFICATION_TASK_PROMPT + """
 
 ## Responde SIEMPRE en formato JSON:
 {
@@ -88,7 +89,7 @@ Clasifica esta consulta y extrae las entidades relevantes."""
 # FUNCIÓN DE CLASIFICACIÓN
 # =============================================================================
 
-def classify_intent(state: AgentState) -> AgentState:
+async def classify_intent(state: AgentState) -> AgentState:
     """
     Nodo que clasifica la intención del usuario.
     
@@ -117,12 +118,10 @@ def classify_intent(state: AgentState) -> AgentState:
     
     # Llamar a Claude para clasificación inteligente
     try:
-        client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-        
         from datetime import datetime
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M")
         
-        response = client.messages.create(
+        response = await get_llm_client().messages.create(
             model=settings.CLAUDE_MODEL,
             max_tokens=500,
             temperature=0.0,  # Determinístico para clasificación
@@ -137,26 +136,9 @@ def classify_intent(state: AgentState) -> AgentState:
             }]
         )
         
-        # Parsear respuesta JSON - filtrar solo TextBlock
-        text_blocks = [block for block in response.content if isinstance(block, TextBlock)]
-        result_text = text_blocks[0].text if text_blocks else ""
-        
-        result = _parse_classification_response(result_text)
-        
-        # Verificar que el resultado tenga las claves necesarias
-        if "intent" not in result:
-            raise KeyError(f"Resultado de clasificación inválido: {result}")
-        
-        state["intent"] = IntentType(result["intent"])
-        state["intent_confidence"] = result["confidence"]
-        state["entities_extracted"] = result.get("extracted_values", {})
-        
-        # Mapear entidades a tablas
-        entities = result.get("entities", [])
-        state["entities_extracted"]["_entities"] = entities
-        state["entities_extracted"]["_tables"] = [
-            ENTITY_TO_TABLE.get(e, e) for e in entities if e in ENTITY_TO_TABLE
-        ]
+        # Parsear respuesta JSON
+        result = _parse_classification_response(response_text(response))
+        apply_classification(state, result)
         
         add_log_entry(
             state, "classify_intent", 
@@ -181,6 +163,28 @@ def classify_intent(state: AgentState) -> AgentState:
 # FUNCIONES AUXILIARES
 # =============================================================================
 
+def apply_classification(state: AgentState, result: Dict[str, Any]) -> None:
+    """
+    Copia al estado una clasificación del LLM (intent, confianza, entidades).
+    
+    Compartida con understand_query, que recibe los mismos campos por tool use.
+    """
+    # Verificar que el resultado tenga las claves necesarias
+    if "intent" not in result:
+        raise KeyError(f"Resultado de clasificación inválido: {result}")
+    
+    state["intent"] = IntentType(result["intent"])
+    state["intent_confidence"] = result.get("confidence", 0.5)
+    state["entities_extracted"] = dict(result.get("extracted_values") or {})
+    
+    # Mapear entidades a tablas
+    entities = result.get("entities", [])
+    state["entities_extracted"]["_entities"] = entities
+    state["entities_extracted"]["_tables"] = [
+        ENTITY_TO_TABLE.get(e, e) for e in entities if e in ENTITY_TO_TABLE
+    ]
+
+
 def _quick_classify(query: str) -> Tuple[IntentType, float] | None:
     """
     Clasificación rápida para casos obvios sin usar LLM.
@@ -272,5 +276,5 @@ class ClassifyIntentNode:
     def __init__(self):
         self.name = "classify_intent"
     
-    def __call__(self, state: AgentState) -> AgentState:
-        return classify_intent(state)
+    async def __call__(self, state: AgentState) -> AgentState:
+        return await classify_intent(state)
@@ -17,9 +17,8 @@ import json
 import logging
 from typing import Dict, List
 
-from anthropic import Anthropic
-
 from backend.api.core.config import get_settings
+from backend.agents.llm_client import get_llm_client, response_text
 from backend.agents.state import (
     AgentState,
     IntentType,
@@ -93,7 +92,7 @@ Genera una respuesta amigable y clara para el usuario."""
 # FUNCIÓN DE GENERACIÓN DE RESPUESTA
 # =============================================================================
 
-def generate_response(state: AgentState) -> AgentState:
+async def generate_response(state: AgentState) -> AgentState:
     """
     Nodo que genera la respuesta final para el usuario.
     
@@ -110,17 +109,17 @@ def generate_response(state: AgentState) -> AgentState:
     
     # 1. Manejar intenciones especiales primero
     if intent == IntentType.GREETING:
-        state["response_text"] = _get_greeting_response(state.get("user_query", ""))
+        state["response_text"] = await _get_greeting_response(state.get("user_query", ""))
         state["node_path"] = state.get("node_path", []) + ["generate_response"]
         return state
     
     if intent == IntentType.OUT_OF_SCOPE:
-        state["response_text"] = _get_out_of_scope_response()
+        state["response_text"] = await _get_out_of_scope_response()
         state["node_path"] = state.get("node_path", []) + ["generate_response"]
         return state
 
     if intent == IntentType.CLARIFICATION:
-        state["response_text"] = _get_clarification_response(state)
+        state["response_text"] = await _get_clarification_response(state)
         state["node_path"] = state.get("node_path", []) + ["generate_response"]
         return state
 
@@ -142,7 +141,7 @@ def generate_response(state: AgentState) -> AgentState:
         state["response_text"] = _format_simple_results(state, result)
     else:
         # Usar LLM para formatear resultados más complejos
-        state["response_text"] = _format_with_llm(state, result)
+        state["response_text"] = await _format_with_llm(state, result)
 
     # Guardar datos estructurados para UI
     state["response_data"] = {
@@ -161,12 +160,10 @@ def generate_response(state: AgentState) -> AgentState:
 # FUNCIONES DE FORMATEO
 # =============================================================================
 
-def _get_greeting_response(query: str) -> str:
+async def _get_greeting_response(query: str) -> str:
     """Genera respuesta de saludo usando LLM."""
-    client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-    
     try:
-        response = client.messages.create(
+        response = await get_llm_client().messages.create(
             model=settings.CLAUDE_MODEL,
             max_tokens=300,
             temperature=0.3,
@@ -176,19 +173,16 @@ def _get_greeting_response(query: str) -> str:
                 "content": f"El usuario me dijo: '{query}'. Responde el saludo y explica brevemente qué puedes hacer."
             }]
         )
-        first_content = response.content[0]
-        return getattr(first_content, 'text', str(first_content))
+        return response_text(response)
     except Exception:
         # Fallback mínimo sin ejemplos específicos
         return "¡Hola! Soy tu asistente de la clínica. ¿Qué información necesitas consultar?"
 
 
-def _get_out_of_scope_response() -> str:
+async def _get_out_of_scope_response() -> str:
     """Genera respuesta para consultas fuera del alcance usando LLM."""
-    client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-    
     try:
-        response = client.messages.create(
+        response = await get_llm_client().messages.create(
             model=settings.CLAUDE_MODEL,
             max_tokens=300,
             temperature=0.3,
@@ -198,23 +192,22 @@ def _get_out_of_scope_response() -> str:
                 "content": "Explica qué tipo de consultas SÍ puedes responder sobre la base de datos de la clínica."
             }]
         )
-        first_content = response.content[0]
-        return getattr(first_content, 'text', str(first_content))
+        return response_text(response)
     except Exception:
         return "Esa consulta está fuera de mi especialidad. Puedo ayudarte con información de la base de datos de la clínica."
-def _get_clarification_response(state: AgentState) -> str:
+
+
+async def _get_clarification_response(state: AgentState) -> str:
     """Genera respuesta pidiendo clarificación usando LLM."""
     entities = state.get("entities_extracted", {})
     user_query = state.get("user_query", "")
     
-    client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-    
     try:
         context = f"Usuario preguntó: '{user_query}'"
         if entities.get("_entities"):
             context += f"\nEntidades detectadas: {entities['_entities']}"
         
-        response = client.messages.create(
+        response = await get_llm_client().messages.create(
             model=settings.CLAUDE_MODEL,
             max_tokens=400,
             temperature=0.3,
@@ -224,8 +217,7 @@ def _get_clarification_response(state: AgentState) -> str:
                 "content": context + "\n\nGenera una respuesta que pida clarificación y dé ejemplos específicos de cómo reformular la pregunta."
             }]
         )
-        first_content = response.content[0]
-        return getattr(first_content, 'text', str(first_content))
+        return response_text(response)
     except Exception:
         return "🤔 No estoy seguro de qué información necesitas. ¿Podrías ser más específico?"
 
@@ -371,15 +363,13 @@ def _format_generic_results(data: List[Dict[str, str]], columns: List[str]) -> s
     return "\n".join(lines)
 
 
-def _format_with_llm(state: AgentState, result: ExecutionResult) -> str:
+async def _format_with_llm(state: AgentState, result: ExecutionResult) -> str:
     """Usa LLM para formatear resultados complejos."""
     try:
-        client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-        
         # Limitar datos para el prompt
         data_sample = result.data[:20]
         
-        response = client.messages.create(
+        response = await get_llm_client().messages.create(
             model=settings.CLAUDE_MODEL,
             max_tokens=1000,
             temperature=0.3,
@@ -395,9 +385,7 @@ def _format_with_llm(state: AgentState, result: ExecutionResult) -> str:
             }]
         )
         
-        # Manejar respuesta de Anthropic con type safety
-        first_content = response.content[0]
-        return getattr(first_content, 'text', str(first_content))
+        return response_text(response)
         
     except Exception as e:
         logger.error(f"Error en formateo con LLM: {e}")
@@ -415,9 +403,9 @@ class LlmResponseNode:
     def __init__(self):
         self.name = "generate_response"
     
-    def __call__(self, state: AgentState) -> AgentState:
-        return generate_response(state)
+    async def __call__(self, state: AgentState) -> AgentState:
+        return await generate_response(state)
     
-    def run(self, state: AgentState, context: str) -> AgentState:
+    async def run(self, state: AgentState, context: str) -> AgentState:
         """Método legacy para compatibilidad."""
-        return generate_response(state)
+        return await generate_response(state)
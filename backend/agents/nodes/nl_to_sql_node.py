@@ -10,9 +10,8 @@ import json
 import logging
 from typing import Dict, Any
 
-from anthropic import Anthropic
-
 from backend.api.core.config import get_settings
+from backend.agents.llm_client import cached_system, get_llm_client, response_text
 from backend.agents.state import (
     AgentState,
     IntentType,
@@ -23,7 +22,7 @@ from backend.agents.state import (
 )
 from backend.tools.schema_info import (
     get_schema_context_for_prompt,
-    build_query_context,
+    get_schema_context_for_entities,
 )
 
 logger = logging.getLogger(__name__)
@@ -53,56 +52,53 @@ SQL_GENERATION_SYSTEM_PROMPT = """Eres un experto en SQL para PostgreSQL que gen
 - Solo puedes hacer JOIN entre tablas del MISMO esquema/base
 - Si necesitas datos de múltiples bases, usa consultas separadas
 
-## Esquema de Base de Datos:
-{schema_context}
-
 ## Formato de Respuesta:
 Responde SIEMPRE con JSON válido:
-{{
+{
   "sql": "SELECT ... FROM ...",
-  "params": {{}},
+  "params": {},
   "target_db": "core",
   "tables_involved": ["clinic.pacientes"],
   "explanation": "Esta consulta busca..."
-}}
+}
 
 ## Ejemplos CORRECTOS:
 
 Usuario: "Lista los pacientes"
-{{
+{
   "sql": "SELECT id_paciente, nombres, apellidos, telefono, email, fecha_nacimiento FROM clinic.pacientes WHERE deleted_at IS NULL ORDER BY apellidos, nombres LIMIT 100",
-  "params": {{}},
+  "params": {},
   "target_db": "core",
   "tables_involved": ["clinic.pacientes"],
   "explanation": "Lista todos los pacientes activos ordenados por apellido"
-}}
+}
 
 Usuario: "Muestra las citas de hoy"
-{{
+{
   "sql": "SELECT id_cita, paciente_id, fecha_cita, hora_inicio, hora_fin, status FROM ops.citas WHERE DATE(fecha_cita) = CURRENT_DATE AND deleted_at IS NULL ORDER BY hora_inicio",
-  "params": {{}},
+  "params": {},
   "target_db": "ops", 
   "tables_involved": ["ops.citas"],
   "explanation": "Muestra citas programadas para hoy (solo IDs de paciente, no nombres)"
-}}
+}
 
 Usuario: "¿Cuántos tratamientos en curso tenemos?"
-{{
+{
   "sql": "SELECT COUNT(*) as total_en_curso FROM clinic.tratamientos WHERE estado_tratamiento = 'En Curso' AND deleted_at IS NULL",
-  "params": {{}},
+  "params": {},
   "target_db": "core",
   "tables_involved": ["clinic.tratamientos"],
   "explanation": "Cuenta tratamientos activos en estado 'En Curso'"
-}}
+}
 
 Usuario: "Busca al paciente Juan Pérez"
-{{
+{
   "sql": "SELECT id_paciente, nombres, apellidos, telefono, email, fecha_nacimiento FROM clinic.pacientes WHERE (nombres ILIKE :nombre OR apellidos ILIKE :nombre) AND deleted_at IS NULL LIMIT 10",
-  "params": {{"nombre": "%Juan Pérez%"}},
+  "params": {"nombre": "%Juan Pérez%"},
   "target_db": "core",
   "tables_involved": ["clinic.pacientes"],
   "explanation": "Busca pacientes cuyo nombre o apellido contenga 'Juan Pérez'"
-}}"""
+}"""
 
 
 SQL_GENERATION_USER_TEMPLATE = """Consulta del usuario: "{query}"
@@ -115,11 +111,22 @@ Contexto detectado:
 Genera la consulta SQL correspondiente."""
 
 
+# Se agrega al mensaje cuando execute_sql devuelve la consulta (reintento)
+SQL_RETRY_TEMPLATE = """
+
+El SQL anterior no se pudo usar:
+{sql}
+
+Motivo: {error}
+
+Genera una versión corregida."""
+
+
 # =============================================================================
 # FUNCIÓN DE GENERACIÓN SQL
 # =============================================================================
 
-def generate_sql(state: AgentState) -> AgentState:
+async def generate_sql(state: AgentState) -> AgentState:
     """
     Nodo que genera SQL a partir de la consulta del usuario.
     
@@ -152,27 +159,40 @@ def generate_sql(state: AgentState) -> AgentState:
         state["node_path"] = state.get("node_path", []) + ["generate_sql"]
         return state
     
+    # Reintento desde execute_sql: el LLM ve el SQL fallido y el motivo
+    # (error de ejecución o queja del planner por costo)
+    retry_feedback = ""
+    if state.get("sql_query") is not None and state.get("error_type") == ErrorType.SQL_ERROR:
+        retry_feedback = SQL_RETRY_TEMPLATE.format(
+            sql=state["sql_query"].query,
+            error=state.get("error_internal_message") or "error desconocido",
+        )
+        state["error_type"] = ErrorType.NONE
+        state["error_internal_message"] = ""
+        # El SQL corregido reemplaza en la caché al que falló
+        state["query_cache_hit"] = False
+        add_log_entry(state, "generate_sql", f"Reintento {state.get('retry_count', 0)} con el error anterior")
+    
+    # Ya generado en la misma llamada que la clasificación (understand_query)
+    elif state.get("sql_query") is not None and state.get("error_type", ErrorType.NONE) == ErrorType.NONE:
+        add_log_entry(state, "generate_sql", "SQL ya generado junto con la clasificación")
+        state["node_path"] = state.get("node_path", []) + ["generate_sql"]
+        return state
+    
     try:
-        # Construir contexto de esquema
-        schema_context = get_schema_context_for_prompt()
-        
-        # Obtener contexto adicional de las tablas detectadas
-        tables_detected = entities.get("_tables", [])
-        if tables_detected:
-            query_context = build_query_context(entities.get("_entities", []))
-            # Agregar JOINs sugeridos al contexto
-            if query_context.get("suggested_joins"):
-                schema_context += "\n\n## JOINs Sugeridos:\n"
-                for join in query_context["suggested_joins"]:
-                    schema_context += f"- {join['from_table']}.{join['from_column']} -> {join['to_table']}.{join['to_column']}\n"
+        # Esquema: solo las tablas detectadas (+ relacionadas y JOINs sugeridos);
+        # sin tablas detectadas, el completo. Ambos memoizados.
+        if entities.get("_tables"):
+            schema_context = get_schema_context_for_entities(entities.get("_entities", []))
+        else:
+            schema_context = get_schema_context_for_prompt()
         
-        client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-        
-        response = client.messages.create(
+        response = await get_llm_client().messages.create(
             model=settings.CLAUDE_MODEL,
             max_tokens=1000,
             temperature=0.0,  # Determinístico para SQL
-            system=SQL_GENERATION_SYSTEM_PROMPT.format(schema_context=schema_context),
+            # Reglas y ejemplos (fijos) primero; el esquema de este subconjunto después
+            system=cached_system(SQL_GENERATION_SYSTEM_PROMPT, schema_context),
             messages=[{
                 "role": "user",
                 "content": SQL_GENERATION_USER_TEMPLATE.format(
@@ -180,28 +200,14 @@ def generate_sql(state: AgentState) -> AgentState:
                     intent=intent.value,
                     entities=entities.get("_entities", []),
                     values={k: v for k, v in entities.items() if not k.startswith("_")},
-                )
+                ) + retry_feedback
             }]
         )
         
         # Parsear respuesta
-        # Manejar respuesta de Anthropic con type safety
-        first_content = response.content[0]
-        result_text: str = getattr(first_content, 'text', str(first_content))
-        result = _parse_sql_response(result_text)
-        
-        # Crear SQLQuery
-        target_db = _map_target_db(result.get("target_db", "core"))
+        result = _parse_sql_response(response_text(response))
         
-        state["sql_query"] = SQLQuery(
-            query=result["sql"],
-            params=result.get("params", {}),
-            target_db=target_db,
-            is_mutation=False,
-            tables_involved=result.get("tables_involved", []),
-        )
-        
-        state["target_database"] = target_db
+        apply_sql_result(state, result)
         
         add_log_entry(
             state, "generate_sql",
@@ -227,6 +233,20 @@ def generate_sql(state: AgentState) -> AgentState:
 # FUNCIONES AUXILIARES
 # =============================================================================
 
+def apply_sql_result(state: AgentState, result: Dict[str, Any]) -> None:
+    """Guarda en el estado el SQL generado por el LLM (siempre como lectura)."""
+    target_db = _map_target_db(result.get("target_db") or "core")
+    
+    state["sql_query"] = SQLQuery(
+        query=result["sql"],
+        params=result.get("params") or {},
+        target_db=target_db,
+        is_mutation=False,
+        tables_involved=result.get("tables_involved") or [],
+    )
+    state["target_database"] = target_db
+
+
 def _parse_sql_response(response_text: str) -> Dict[str, Any]:
     """Parsea la respuesta JSON del LLM."""
     try:
@@ -278,10 +298,10 @@ class NLToSQLNode:
     def __init__(self):
         self.name = "generate_sql"
     
-    def __call__(self, state: AgentState) -> AgentState:
-        return generate_sql(state)
+    async def __call__(self, state: AgentState) -> AgentState:
+        return await generate_sql(state)
     
-    def run(self, state: AgentState, question: str) -> AgentState:
+    async def run(self, state: AgentState, question: str) -> AgentState:
         """Método legacy para compatibilidad."""
         state["user_query"] = question
-        return generate_sql(state)
+        return await generate_sql(state)
@@ -6,6 +6,7 @@ Ejecuta la consulta SQL generada de forma segura.
 Maneja errores, reintentos y búsqueda difusa para sugerencias.
 """
 
+import asyncio
 import logging
 
 from backend.api.core.config import get_settings
@@ -14,7 +15,8 @@ from backend.agents.state import (
     ErrorType,
     add_log_entry,
 )
-from backend.tools.sql_executor import execute_safe_query
+from backend.tools.sql_executor import QueryHandle, execute_safe_query
+from backend.agents.memory.query_cache import remember_query
 from backend.tools.fuzzy_search import (
     fuzzy_search_patient,
 )
@@ -27,15 +29,24 @@ settings = get_settings()
 # FUNCIÓN DE EJECUCIÓN SQL
 # =============================================================================
 
-def execute_sql(state: AgentState) -> AgentState:
+async def execute_sql(state: AgentState) -> AgentState:
     """
     Nodo que ejecuta la consulta SQL generada.
     
     Maneja:
     - Ejecución segura de queries
-    - Reintentos en caso de error
+    - Guarda de costo (EXPLAIN) para el SQL generado por el LLM
+    - Reintentos en caso de error o de plan demasiado costoso
     - Búsqueda difusa para sugerencias cuando no hay resultados
     
+    La ejecución y la búsqueda difusa usan conexiones síncronas, así que
+    corren en un hilo para no bloquear el event loop (LangGraph ejecuta
+    los nodos síncronos dentro del loop aun con ainvoke).
+    
+    Si el nodo se cancela (p. ej. el cliente HTTP se desconectó), la
+    consulta también se cancela en PostgreSQL; cancelar la tarea no
+    detiene el hilo por sí solo.
+    
     Args:
         state: Estado con sql_query generada
         
@@ -61,13 +72,25 @@ def execute_sql(state: AgentState) -> AgentState:
     retry_count = state.get("retry_count", 0)
     max_retries = state.get("max_retries", settings.AGENT_MAX_RETRIES)
     
+    # El SQL de plantilla ya está revisado; el del LLM pasa por EXPLAIN
+    cost_guard = settings.AGENT_COST_GUARD_ENABLED and not state.get("query_template")
+    
     # Ejecutar query
-    result = execute_safe_query(
-        sql_query=sql_query,
-        user_role=user_role,
-        max_results=settings.AGENT_MAX_RESULTS,
-        timeout_seconds=settings.AGENT_TIMEOUT_SECONDS,
-    )
+    handle = QueryHandle()
+    try:
+        result = await asyncio.to_thread(
+            execute_safe_query,
+            sql_query=sql_query,
+            user_role=user_role,
+            max_results=settings.AGENT_MAX_RESULTS,
+            timeout_seconds=settings.AGENT_TIMEOUT_SECONDS,
+            handle=handle,
+            cost_guard=cost_guard,
+        )
+    except asyncio.CancelledError:
+        handle.cancel()
+        logger.info("Ejecución SQL cancelada; consulta cancelada en el servidor")
+        raise
     
     state["execution_result"] = result
     
@@ -76,10 +99,27 @@ def execute_sql(state: AgentState) -> AgentState:
             state, "execute_sql",
             f"Ejecución exitosa: {result.row_count} filas en {result.execution_time_ms:.2f}ms"
         )
+        # SQL válido: la próxima vez que se pregunte lo mismo no hace falta el LLM
+        await remember_query(state)
         
         # Si no hay resultados, intentar sugerir alternativas
         if result.row_count == 0:
-            state = _handle_no_results(state)
+            state = await asyncio.to_thread(_handle_no_results, state)
+    elif result.error_type == ErrorType.TIMEOUT:
+        # Reintentar repetiría la misma espera: se informa al usuario
+        add_log_entry(state, "execute_sql", f"Timeout: {result.error_message}", level="error")
+        state["error_type"] = ErrorType.TIMEOUT
+        state["error_internal_message"] = result.error_message or "Timeout"
+    elif result.error_type == ErrorType.QUERY_TOO_COSTLY:
+        add_log_entry(state, "execute_sql", f"Plan rechazado: {result.error_message}", level="warning")
+        state["error_internal_message"] = result.error_message
+        if retry_count < max_retries:
+            # De vuelta a generate_sql con la queja del planner
+            state["retry_count"] = retry_count + 1
+            add_log_entry(state, "execute_sql", f"Reintento {retry_count + 1}/{max_retries}")
+            state["error_type"] = ErrorType.SQL_ERROR
+        else:
+            state["error_type"] = ErrorType.QUERY_TOO_COSTLY
     else:
         add_log_entry(
             state, "execute_sql",
@@ -170,10 +210,10 @@ class SQLExecNode:
         self.name = "execute_sql"
         self.db_config = db_config  # Legacy, no usado
     
-    def __call__(self, state: AgentState) -> AgentState:
-        return execute_sql(state)
+    async def __call__(self, state: AgentState) -> AgentState:
+        return await execute_sql(state)
     
-    def run(self, state: AgentState, sql: str, params: Optional[dict[str, Any]] = None):
+    async def run(self, state: AgentState, sql: str, params: Optional[dict[str, Any]] = None):
         """Método legacy para compatibilidad."""
         from backend.agents.state import SQLQuery, DatabaseTarget
         state["sql_query"] = SQLQuery(
@@ -181,4 +221,4 @@ class SQLExecNode:
             params=params or {},
             target_db=DatabaseTarget.CORE,
         )
-        return execute_sql(state)
+        return await execute_sql(state)
@@ -0,0 +1,269 @@
+"""
+Nodo Combinado: Intención + SQL en una sola llamada
+===================================================
+
+Alternativa a classify_intent → generate_sql: una sola llamada al LLM con
+tool use forzado devuelve intención, entidades y SQL parametrizado ya
+estructurados (sin parsear texto libre).
+
+Las consultas de lectura, las más comunes, pasan de dos round trips al LLM
+a uno. Si la llamada falla o no trae SQL, el flujo cae al camino separado:
+se clasifica con classify_intent y generate_sql genera el SQL como antes.
+
+Se habilita con AGENT_COMBINED_UNDERSTANDING. Antes de ambos caminos se
+prueban, sin LLM, las plantillas de consultas frecuentes
+(tools/query_templates.py) y la caché de consultas (memory/query_cache.py).
+"""
+
+import logging
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from anthropic.types import ToolUseBlock
+
+from backend.api.core.config import get_settings
+from backend.agents.llm_client import cached_system, get_llm_client
+from backend.agents.state import (
+    AgentState,
+    IntentType,
+    add_log_entry,
+)
+from backend.agents.nodes.classify_intent_node import (
+    CLASSIFICATION_TASK_PROMPT,
+    apply_classification,
+    classify_intent,
+    _quick_classify,
+)
+from backend.agents.nodes.nl_to_sql_node import apply_sql_result
+from backend.agents.memory.query_cache import lookup_query
+from backend.tools.schema_info import get_schema_context_for_prompt
+from backend.tools.query_templates import match_template
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+# Intenciones que llevan SQL
+READ_INTENTS = (IntentType.QUERY_READ, IntentType.QUERY_AGGREGATE)
+
+
+# =============================================================================
+# TOOL Y PROMPT
+# =============================================================================
+
+UNDERSTAND_TOOL_NAME = "interpretar_consulta"
+
+UNDERSTAND_TOOL: Dict[str, Any] = {
+    "name": UNDERSTAND_TOOL_NAME,
+    "description": (
+        "Registra la intención de la consulta, sus entidades y, si es de "
+        "lectura, la consulta SQL SELECT parametrizada que la responde."
+    ),
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "intent": {"type": "string", "enum": [i.value for i in IntentType]},
+            "confidence": {"type": "number", "minimum": 0, "maximum": 1},
+            "entities": {"type": "array", "items": {"type": "string"}},
+            "extracted_values": {"type": "object"},
+            "sql": {
+                "type": "string",
+                "description": "SELECT con parámetros :nombre. Vacío si la intención no es query_read/query_aggregate",
+            },
+            "params": {"type": "object"},
+            "target_db": {"type": "string", "enum": ["core", "ops", "auth"]},
+            "tables_involved": {"type": "array", "items": {"type": "string"}},
+        },
+        "required": ["intent", "confidence", "entities"],
+    },
+}
+
+UNDERSTAND_SYSTEM_PROMPT = """{classification}
+
+## Si la intención es query_read o query_aggregate, genera también el SQL:
+1. SOLO consultas SELECT para PostgreSQL, con parámetros :nombre (nunca valores literales del usuario)
+2. USA los esquemas correctos: auth., clinic., ops., finance.
+3. SIEMPRE usa `deleted_at IS NULL` en tablas con soft delete
+4. USA ILIKE para búsquedas de texto y LIMIT 100 como máximo
+5. NO hagas JOINs entre bases distintas: clinic.* está en core; ops.* y finance.* en ops; auth.* en auth
+
+## Esquema de Base de Datos:
+{schema_context}
+
+Registra SIEMPRE el resultado con la herramienta `{tool}`."""
+
+UNDERSTAND_USER_TEMPLATE = """Consulta del usuario: "{query}"
+
+Contexto adicional:
+- Rol del usuario: {role}
+- Hora actual: {current_time}"""
+
+
+@lru_cache(maxsize=1)
+def _understand_system_prompt() -> str:
+    """
+    System prompt completo (fijo: aún no se conocen las entidades, va el
+    esquema entero). Se arma una vez y se envía con prompt caching.
+    """
+    return UNDERSTAND_SYSTEM_PROMPT.format(
+        classification=CLASSIFICATION_TASK_PROMPT,
+        schema_context=get_schema_context_for_prompt(),
+        tool=UNDERSTAND_TOOL_NAME,
+    )
+
+
+def _tool_input(response: Any) -> Optional[Dict[str, Any]]:
+    """Argumentos de la llamada a la herramienta, o None si no la usó."""
+    for block in response.content:
+        if isinstance(block, ToolUseBlock) and block.name == UNDERSTAND_TOOL_NAME:
+            return dict(block.input) if isinstance(block.input, dict) else None
+    return None
+
+
+# =============================================================================
+# FUNCIÓN DEL NODO
+# =============================================================================
+
+async def understand_query(state: AgentState) -> AgentState:
+    """
+    Nodo que clasifica la consulta y genera su SQL en una sola llamada.
+
+    Deja el estado igual que classify_intent (+ sql_query para lecturas),
+    así que el resto del grafo no cambia: generate_sql detecta el SQL ya
+    generado y no vuelve a llamar al LLM.
+
+    Args:
+        state: Estado actual del agente
+
+    Returns:
+        Estado con intent, entities y, si aplica, sql_query
+    """
+    add_log_entry(state, "understand_query", "Clasificando y generando SQL en una llamada")
+
+    user_query = state.get("user_query", "")
+
+    # Saludos y temas ajenos no necesitan LLM ni SQL
+    quick_result = _quick_classify(user_query)
+    if quick_result and quick_result[0] in (IntentType.GREETING, IntentType.OUT_OF_SCOPE):
+        intent, confidence = quick_result
+        state["intent"] = intent
+        state["intent_confidence"] = confidence
+        state["entities_extracted"] = {}
+        add_log_entry(state, "understand_query", f"Clasificación rápida: {intent.value}")
+        state["node_path"] = state.get("node_path", []) + ["understand_query"]
+        return state
+
+    try:
+        response = await get_llm_client().messages.create(
+            model=settings.CLAUDE_MODEL,
+            max_tokens=1000,
+            temperature=0.0,
+            system=cached_system(_understand_system_prompt()),
+            tools=[UNDERSTAND_TOOL],
+            tool_choice={"type": "tool", "name": UNDERSTAND_TOOL_NAME},
+            messages=[{
+                "role": "user",
+                "content": UNDERSTAND_USER_TEMPLATE.format(
+                    query=user_query,
+                    role=state.get("user_role", "Recepcion"),
+                    current_time=datetime.now().strftime("%Y-%m-%d %H:%M"),
+                ),
+            }],
+        )
+
+        result = _tool_input(response)
+        if result is None:
+            raise ValueError("La respuesta no usó la herramienta de interpretación")
+
+        apply_classification(state, result)
+
+        if state["intent"] in READ_INTENTS and (result.get("sql") or "").strip():
+            apply_sql_result(state, result)
+            add_log_entry(
+                state, "understand_query",
+                f"{result['intent']} + SQL: {result['sql'][:100]}..."
+            )
+        else:
+            add_log_entry(state, "understand_query", f"Clasificación: {result['intent']} (sin SQL)")
+
+    except Exception as e:
+        # Camino separado: clasificar ahora; generate_sql hará su propia llamada
+        logger.warning(f"Llamada combinada falló, usando clasificación separada: {e}")
+        add_log_entry(state, "understand_query", f"Fallback a classify_intent: {e}", level="warning")
+        state["sql_query"] = None
+        state["node_path"] = state.get("node_path", []) + ["understand_query"]
+        return await classify_intent(state)
+
+    state["node_path"] = state.get("node_path", []) + ["understand_query"]
+    return state
+
+
+def _apply_template(state: AgentState) -> bool:
+    """Llena el estado con una plantilla de consulta frecuente, si la hay."""
+    # Los pacientes (WhatsApp) solo consultan sus propios datos
+    if not settings.AGENT_QUERY_TEMPLATES_ENABLED or state.get("origin") == "whatsapp_paciente":
+        return False
+    match = match_template(state.get("user_query", ""))
+    if match is None:
+        return False
+    
+    template = match.template
+    state["intent"] = template.intent
+    state["intent_confidence"] = 1.0
+    state["entities_extracted"] = {
+        **match.values,
+        "_entities": list(template.entities),
+        "_tables": list(template.tables),
+    }
+    state["sql_query"] = match.sql_query
+    state["target_database"] = template.target_db
+    state["query_template"] = template.name
+    add_log_entry(state, "query_template", f"Plantilla {template.name}: {match.values}")
+    state["node_path"] = state.get("node_path", []) + ["query_template"]
+    return True
+
+
+async def entry_understanding(state: AgentState) -> AgentState:
+    """
+    Nodo de entrada sin LLM cuando se puede: plantilla de consulta frecuente,
+    luego SQL de la caché; si no, clasifica y genera SQL normalmente.
+    """
+    if _apply_template(state):
+        return state
+    
+    hit = await lookup_query(state)
+    if hit is not None:
+        state["intent"] = hit.intent
+        state["intent_confidence"] = 1.0
+        state["entities_extracted"] = hit.entities
+        state["sql_query"] = hit.sql_query
+        state["target_database"] = hit.sql_query.target_db
+        state["query_cache_hit"] = True
+        add_log_entry(state, "query_cache", f"SQL reutilizado de la caché: {hit.sql_query.query[:100]}...")
+        state["node_path"] = state.get("node_path", []) + ["query_cache"]
+        return state
+    
+    node = understand_query if settings.AGENT_COMBINED_UNDERSTANDING else classify_intent
+    return await node(state)
+
+
+def intent_node():
+    """Nodo de entrada de los flujos según config (plantillas/caché → combinado o clasificación sola)."""
+    if settings.AGENT_QUERY_TEMPLATES_ENABLED or settings.AGENT_QUERY_CACHE_ENABLED:
+        return entry_understanding
+    return understand_query if settings.AGENT_COMBINED_UNDERSTANDING else classify_intent
+
+
+# =============================================================================
+# NODE WRAPPER PARA LANGGRAPH
+# =============================================================================
+
+class UnderstandQueryNode:
+    """Wrapper de nodo para compatibilidad con LangGraph."""
+
+    def __init__(self):
+        self.name = "understand_query"
+
+    async def __call__(self, state: AgentState) -> AgentState:
+        return await understand_query(state)
@@ -41,6 +41,7 @@ class ErrorType(str, Enum):
     SQL_ERROR = "sql_error"                   # Error de ejecución SQL
     VALIDATION_ERROR = "validation_error"     # Validación falló
     TIMEOUT = "timeout"                       # Tiempo agotado
+    QUERY_TOO_COSTLY = "query_too_costly"     # Plan estimado excede el presupuesto del rol
     RATE_LIMIT = "rate_limit"                 # Límite de solicitudes
     INTERNAL = "internal"                     # Error interno
 
@@ -93,6 +94,11 @@ FRIENDLY_MESSAGES: Dict[ErrorType, Dict[str, str]] = {
         "message": "La búsqueda tardó demasiado tiempo.",
         "suggestion": "Intenta con una consulta más específica o en un momento con menos actividad.",
     },
+    ErrorType.QUERY_TOO_COSTLY: {
+        "title": "🏋️ Consulta demasiado amplia",
+        "message": "Esa búsqueda recorrería demasiados registros.",
+        "suggestion": "Acótala por fecha, paciente o podólogo.",
+    },
     ErrorType.RATE_LIMIT: {
         "title": "🚦 Demasiadas solicitudes",
         "message": "Has realizado muchas consultas en poco tiempo.",
@@ -140,6 +146,7 @@ class ExecutionResult:
     columns: List[str] = field(default_factory=list)
     execution_time_ms: float = 0.0
     error_message: Optional[str] = None
+    error_type: ErrorType = ErrorType.NONE  # TIMEOUT (tiempo/cancelación) o QUERY_TOO_COSTLY (plan)
 
 
 # =============================================================================
@@ -163,6 +170,7 @@ class AgentState(TypedDict, total=False):
     user_query: str                      # Consulta en lenguaje natural
     user_id: int                         # ID del usuario autenticado
     user_role: str                       # Rol: Admin, Podologo, Recepcion
+    clinica_id: Optional[int]            # Clínica del usuario (ámbito de la caché de consultas)
     session_id: str                      # ID de sesión para logging (legacy)
     
     # --- Threading y Persistencia (NUEVO - Fase 1) ---
@@ -180,6 +188,8 @@ class AgentState(TypedDict, total=False):
     sql_query: SQLQuery                  # Query generada
     sql_is_valid: bool                   # ¿Pasó validación?
     sql_validation_errors: List[str]     # Errores de validación
+    query_cache_hit: bool                # SQL tomado de la caché de consultas
+    query_template: Optional[str]        # Plantilla de consulta frecuente usada (si hubo)
     
     # --- Ejecución ---
     execution_result: ExecutionResult    # Resultado de la query
@@ -217,7 +227,8 @@ def create_initial_state(
     user_role: str,
     session_id: str,
     thread_id: Optional[str] = None,
-    origin: str = "webapp"
+    origin: str = "webapp",
+    clinica_id: Optional[int] = None,
 ) -> AgentState:
     """
     Crea el estado inicial para una nueva consulta.
@@ -229,6 +240,7 @@ def create_initial_state(
         session_id: ID único de la sesión (legacy, usar thread_id)
         thread_id: ID único para checkpointing (NUEVO - Fase 1)
         origin: Origen de la conversación: 'webapp', 'whatsapp_paciente', 'whatsapp_user'
+        clinica_id: Clínica del usuario
         
     Returns:
         AgentState inicializado con valores por defecto
@@ -238,6 +250,7 @@ def create_initial_state(
         user_query=user_query,
         user_id=user_id,
         user_role=user_role,
+        clinica_id=clinica_id,
         session_id=session_id,
         
         # Threading (NUEVO - Fase 1)
@@ -251,7 +264,11 @@ def create_initial_state(
         entities_extracted={},
         
         target_database=DatabaseTarget.CORE,
+        # Explícito: con checkpointer el SQL del turno anterior seguiría en el estado
+        sql_query=None,
         sql_is_valid=False,
+        query_cache_hit=False,
+        query_template=None,
         sql_validation_errors=[],
         
         retry_count=0,
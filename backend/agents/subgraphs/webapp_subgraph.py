@@ -21,7 +21,7 @@ from langgraph.graph import StateGraph, END
 
 from backend.agents.state import AgentState
 from backend.agents.nodes import (
-    classify_intent,
+    intent_node,
     check_permissions,
     generate_sql,
     execute_sql,
@@ -56,7 +56,7 @@ def build_webapp_subgraph() -> StateGraph:
     combine_context_node = CombineContextNode()
     
     # Agregar nodos del flujo principal
-    subgraph.add_node("classify_intent", classify_intent)
+    subgraph.add_node("classify_intent", intent_node())
     subgraph.add_node("check_permissions", check_permissions)
     subgraph.add_node("combine_context", combine_context_node)
     subgraph.add_node("generate_sql", generate_sql)
@@ -97,7 +97,7 @@ def check_patient_permissions(state: AgentState) -> AgentState:
     return state
 
 
-def generate_patient_safe_response(state: AgentState) -> AgentState:
+async def generate_patient_safe_response(state: AgentState) -> AgentState:
     """
     Genera respuesta apropiada para pacientes.
     
@@ -122,7 +122,7 @@ def generate_patient_safe_response(state: AgentState) -> AgentState:
     state["response_tone"] = "friendly_non_technical"
     
     # Generar respuesta usando el nodo estándar
-    state = generate_response(state)
+    state = await generate_response(state)
     
     # Post-procesar para asegurar tono amigable
     if state.get("response_text"):
@@ -159,7 +159,7 @@ def build_whatsapp_paciente_subgraph() -> StateGraph:
     
     # Importar nodos comunes
     from backend.agents.nodes import (
-        classify_intent,
+        intent_node,
         combine_context,
         generate_sql,
         execute_sql,
@@ -167,7 +167,7 @@ def build_whatsapp_paciente_subgraph() -> StateGraph:
     )
     
     # Agregar nodos del flujo (algunos específicos de paciente)
-    subgraph.add_node("classify_intent", classify_intent)
+    subgraph.add_node("classify_intent", intent_node())
     subgraph.add_node("validate_patient_consent", validate_patient_consent)
     subgraph.add_node("check_patient_permissions", check_patient_permissions)
     subgraph.add_node("combine_context", combine_context)
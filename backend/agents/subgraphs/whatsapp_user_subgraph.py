@@ -35,7 +35,7 @@ from backend.agents.state import AgentState
 logger = logging.getLogger(__name__)
 
 
-def format_whatsapp_response(state: AgentState) -> AgentState:
+async def format_whatsapp_response(state: AgentState) -> AgentState:
     """
     Formatea la respuesta para WhatsApp (más concisa).
     
@@ -57,7 +57,7 @@ def format_whatsapp_response(state: AgentState) -> AgentState:
     logger.info(f"📱 Formateando respuesta para WhatsApp")
     
     # Importar solo cuando se necesita
-    from backend.agents.nodes.llm_response_node import llm_response
+    from backend.agents.nodes.llm_response_node import generate_response
     
     # Agregar contexto de que la respuesta es para WhatsApp
     state["response_context"] = "whatsapp_user"
@@ -65,7 +65,7 @@ def format_whatsapp_response(state: AgentState) -> AgentState:
     state["max_response_length"] = 500  # Limitar longitud
     
     # Generar respuesta usando el nodo estándar
-    state = llm_response(state)
+    state = await generate_response(state)
     
     # Post-procesar para optimizar para WhatsApp
     if state.get("response_text"):
@@ -118,7 +118,7 @@ def build_whatsapp_user_subgraph() -> StateGraph:
     
     # Importar nodos comunes
     from backend.agents.nodes import (
-        classify_intent,
+        intent_node,
         check_permissions,
         combine_context,
         generate_sql,
@@ -127,7 +127,7 @@ def build_whatsapp_user_subgraph() -> StateGraph:
     )
     
     # Agregar nodos del flujo
-    subgraph.add_node("classify_intent", classify_intent)
+    subgraph.add_node("classify_intent", intent_node())
     subgraph.add_node("check_permissions", check_permissions)
     subgraph.add_node("combine_context", combine_context)
     subgraph.add_node("generate_sql", generate_sql)
@@ -15,6 +15,9 @@
 # uvicorn api.app:app --reload --host 0.0.0.0 --port 8000 --log-config backend/config/logging_config.py
 # =============================================================================
 
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import Limiter, _rate_limit_exceeded_handler
@@ -22,6 +25,12 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
 from backend.api.core.config import get_settings
+from backend.api.core.hashing import password_hasher
+from backend.api.deps.database import dispose_engines
+from backend.api.utils.audit_writer import audit_writer
+from backend.api.utils.reminder_queue import reminder_worker
+from backend.agents.graph import shutdown_agent
+from backend.tools.audit_partitions import maintain_on_startup
 from backend.config.logging_config import setup_logging
 
 # Configurar logging mejorado
@@ -60,6 +69,31 @@ settings = get_settings()
 limiter = Limiter(key_func=get_remote_address, default_limits=["200/minute"])
 
 
+# =============================================================================
+# CICLO DE VIDA
+# =============================================================================
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Inicio y apagado de la aplicación (cierra los pools de BD al salir)."""
+    audit_writer.start()
+    # Particiones de auditoría en segundo plano: no retrasa el arranque
+    partition_task = None
+    if settings.AUDIT_PARTITION_MAINTENANCE_ON_STARTUP:
+        partition_task = asyncio.create_task(maintain_on_startup())
+    # Recordatorios de citas (cola persistente en ops.recordatorio_jobs)
+    if settings.REMINDER_WORKER_ENABLED:
+        reminder_worker.start()
+    yield
+    if partition_task is not None and not partition_task.done():
+        partition_task.cancel()
+    await reminder_worker.stop()
+    # Cliente LLM compartido y pool del checkpointer del agente
+    await shutdown_agent()
+    # Vaciar la cola de auditoría antes de cerrar los pools
+    await audit_writer.stop()
+    await dispose_engines()
+
+
 # =============================================================================
 # APLICACIÓN FASTAPI
 # =============================================================================
@@ -96,6 +130,7 @@ app = FastAPI(
     """,
     docs_url="/docs",      # Swagger UI en /docs
     redoc_url="/redoc",    # ReDoc en /redoc
+    lifespan=lifespan,
 )
 
 # Add rate limiter to app state
@@ -204,10 +239,12 @@ async def health_check():
     Verifica:
     - Estado de la aplicación
     - Versión
+    - Pool de hash de contraseñas (hilos ocupados y tiempo en cola)
     """
     return {
         "status": "healthy",
         "app": settings.APP_NAME,
         "version": settings.APP_VERSION,
-        "environment": "development" if settings.DEBUG else "production"
+        "environment": "development" if settings.DEBUG else "production",
+        "password_hashing": password_hasher.stats(),
     }
@@ -8,9 +8,10 @@ from typing import Any, Dict
 import jwt
 from jwt import InvalidTokenError, ExpiredSignatureError
 from langgraph_sdk import Auth
+from sqlalchemy import select
 
 from backend.api.core.config import get_settings
-from backend.api.deps.database import get_auth_db
+from backend.api.deps.database import AsyncAuthSessionLocal
 from backend.schemas.auth.models import SysUsuario
 
 logger = logging.getLogger(__name__)
@@ -20,18 +21,6 @@ settings = get_settings()
 auth = Auth()
 
 
-def _get_auth_session():
-    db_gen = get_auth_db()
-    db = next(db_gen)
-    try:
-        yield db
-    finally:
-        try:
-            db_gen.close()
-        except Exception:
-            pass
-
-
 def _decode_token(token: str) -> Dict[str, Any]:
     try:
         payload = jwt.decode(
@@ -47,23 +36,16 @@ def _decode_token(token: str) -> Dict[str, Any]:
         raise Auth.exceptions.HTTPException(status_code=401, detail="Token inválido")
 
 
-def _get_user(user_id: int) -> SysUsuario:
-    session_ctx = _get_auth_session()
-    db = next(session_ctx)
-    try:
-        user = (
-            db.query(SysUsuario)
-            .filter(SysUsuario.id_usuario == user_id, SysUsuario.activo == True)
-            .first()
+async def _get_user(user_id: int) -> SysUsuario:
+    async with AsyncAuthSessionLocal() as db:
+        user = await db.scalar(
+            select(SysUsuario).where(
+                SysUsuario.id_usuario == user_id, SysUsuario.activo == True
+            )
         )
-        if not user:
-            raise Auth.exceptions.HTTPException(status_code=401, detail="Usuario no encontrado o inactivo")
-        return user
-    finally:
-        try:
-            session_ctx.close()
-        except Exception:
-            pass
+    if not user:
+        raise Auth.exceptions.HTTPException(status_code=401, detail="Usuario no encontrado o inactivo")
+    return user
 
 
 @auth.authenticate
@@ -79,7 +61,7 @@ async def authenticate(authorization: str | None = None) -> Dict[str, Any]:
     if not user_id:
         raise Auth.exceptions.HTTPException(status_code=401, detail="Token sin user_id")
 
-    user = _get_user(int(user_id))
+    user = await _get_user(int(user_id))
 
     # Respuesta mínima esperada por LangGraph
     return {
@@ -0,0 +1,114 @@
+# =============================================================================
+# backend/api/core/hashing.py
+# Hash de contraseñas fuera del event loop
+# =============================================================================
+# Argon2id (schemas/auth/auth_utils.py) tarda decenas de milisegundos y
+# reserva 64 MB por llamada. Ejecutarlo directo en un endpoint async
+# congela TODOS los requests de ese worker mientras dura.
+#
+# Aquí se ejecuta en un pool de hilos dedicado y acotado:
+#   - argon2-cffi libera el GIL, así que los hilos sí corren en paralelo
+#   - PASSWORD_HASH_MAX_CONCURRENCY limita CPU y memoria (N × 64 MB)
+#   - Los demás intentos esperan en la cola; el tiempo de espera se mide
+#     y se expone en GET /health
+# =============================================================================
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, TypeVar
+
+from backend.api.core.config import get_settings
+from backend.schemas.auth.auth_utils import hash_password, verify_password
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+T = TypeVar("T")
+
+
+class BoundedHashExecutor:
+    """
+    Pool de hilos con concurrencia máxima y métrica de tiempo en cola.
+
+    Args:
+        max_workers: Hashes simultáneos como máximo
+        queue_warn_ms: Loguea un warning si un trabajo esperó más que esto
+    """
+
+    def __init__(self, max_workers: int, queue_warn_ms: int):
+        self.max_workers = max_workers
+        self.queue_warn_seconds = queue_warn_ms / 1000
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._running = 0
+        self._completed = 0
+        self._queue_seconds_total = 0.0
+        self._queue_seconds_max = 0.0
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Ejecuta fn(*args) en el pool y espera el resultado sin bloquear el loop."""
+        submitted = time.perf_counter()
+        started = threading.Event()
+        with self._lock:
+            self._waiting += 1
+
+        def job() -> T:
+            queued = time.perf_counter() - submitted
+            with self._lock:
+                if not started.is_set():
+                    started.set()
+                    self._waiting -= 1
+                self._running += 1
+                self._queue_seconds_total += queued
+                self._queue_seconds_max = max(self._queue_seconds_max, queued)
+            if queued > self.queue_warn_seconds:
+                logger.warning(f"Password hash waited {queued * 1000:.0f} ms in queue")
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, job)
+        except asyncio.CancelledError:
+            # Request cancelado antes de que el trabajo empezara: ya no está en cola
+            with self._lock:
+                if not started.is_set():
+                    started.set()
+                    self._waiting -= 1
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado actual y tiempo en cola (promedio y máximo, en ms)."""
+        with self._lock:
+            avg = self._queue_seconds_total / self._completed if self._completed else 0.0
+            return {
+                "max_concurrency": self.max_workers,
+                "running": self._running,
+                "waiting": self._waiting,
+                "completed": self._completed,
+                "queue_ms_avg": round(avg * 1000, 1),
+                "queue_ms_max": round(self._queue_seconds_max * 1000, 1),
+            }
+
+
+password_hasher = BoundedHashExecutor(
+    max_workers=settings.PASSWORD_HASH_MAX_CONCURRENCY,
+    queue_warn_ms=settings.PASSWORD_HASH_QUEUE_WARN_MS,
+)
+
+
+async def hash_password_async(password: str) -> str:
+    """hash_password en el pool acotado (usar desde endpoints async)."""
+    return await password_hasher.run(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password en el pool acotado (usar desde endpoints async)."""
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
@@ -17,6 +17,7 @@
 # - signature: firma para verificar que nadie lo modificó
 # =============================================================================
 
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Any
 from jose import jwt, JWTError
@@ -24,6 +25,7 @@ from pydantic import BaseModel
 
 from backend.api.core.config import get_settings
 from backend.schemas.auth.auth_utils import hash_password, verify_password
+from backend.api.utils.cache import token_cache
 
 # Alias para mantener compatibilidad con código existente
 get_password_hash = hash_password
@@ -123,7 +125,16 @@ def verify_token(token: str) -> Optional[TokenData]:
     
     ANALOGÍA: Es como el escáner de seguridad del edificio.
     Verifica que tu gafete sea auténtico y no esté vencido.
+    
+    Con JWT_DECODE_CACHE_ENABLED, los tokens válidos se recuerdan hasta
+    JWT_DECODE_CACHE_TTL_SECONDS (nunca más allá de su "exp") para no
+    verificar la firma en cada request.
     """
+    if settings.JWT_DECODE_CACHE_ENABLED:
+        cached = token_cache.get(token)
+        if cached is not None:
+            return cached
+    
     try:
         # Decodificamos el token usando la misma clave secreta
         payload = jwt.decode(
@@ -142,13 +153,23 @@ def verify_token(token: str) -> Optional[TokenData]:
         if not isinstance(user_id, int) or not isinstance(username, str) or not isinstance(rol, str):
             return None
         
-        return TokenData(
+        token_data = TokenData(
             user_id=user_id,
             username=username,
             rol=rol,
             clinica_id=clinica_id
         )
         
+        if settings.JWT_DECODE_CACHE_ENABLED:
+            ttl = settings.JWT_DECODE_CACHE_TTL_SECONDS
+            exp = payload.get("exp")
+            if isinstance(exp, (int, float)):
+                ttl = min(ttl, exp - time.time())
+            if ttl > 0:
+                token_cache.set(token, token_data, ttl_seconds=ttl)
+        
+        return token_data
+        
     except JWTError:
         # Cualquier error de JWT (expirado, inválido, etc.)
         return None
@@ -13,15 +13,22 @@
 #
 # ANALOGÍA: Es el "guardia de seguridad" que verifica tu gafete
 # en la entrada de cada oficina (endpoint).
+#
+# CACHÉ: El usuario se guarda unos segundos por (id_usuario, token)
+# (AUTH_PRINCIPAL_CACHE_TTL_SECONDS), así la mayoría de los requests no
+# consultan auth DB. usuarios.py y auth.py lo invalidan al cambiar un usuario.
 # =============================================================================
 
-from typing import Optional
+from typing import Any, Dict, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
 from backend.api.core.security import verify_token, TokenData
 from backend.api.deps.database import get_auth_db
+from backend.api.utils.cache import principal_cache
 from backend.schemas.auth.models import SysUsuario
 
 
@@ -35,13 +42,31 @@ from backend.schemas.auth.models import SysUsuario
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
+# =============================================================================
+# CACHÉ DEL USUARIO AUTENTICADO
+# =============================================================================
+# Se guardan solo las columnas (no el objeto ORM) y cada request recibe su
+# propia instancia "detached": ningún request comparte ni modifica la de
+# otro. Para ESCRIBIR sobre el usuario actual, cargarlo en la sesión del
+# endpoint (db.get(SysUsuario, current_user.id_usuario)).
+
+def _user_snapshot(user: SysUsuario) -> Dict[str, Any]:
+    return {attr.key: getattr(user, attr.key) for attr in inspect(SysUsuario).column_attrs}
+
+
+def _user_from_snapshot(snapshot: Dict[str, Any]) -> SysUsuario:
+    user = SysUsuario(**snapshot)
+    make_transient_to_detached(user)
+    return user
+
+
 # =============================================================================
 # DEPENDENCIA: get_current_user
 # =============================================================================
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_auth_db)
+    db: AsyncSession = Depends(get_auth_db)
 ) -> SysUsuario:
     """
     Obtiene el usuario actual a partir del token JWT.
@@ -77,16 +102,22 @@ async def get_current_user(
     if token_data is None:
         raise credentials_exception
     
-    # 2. Buscar el usuario en la base de datos
+    # 2. Buscar el usuario (caché o base de datos)
     # Usamos el user_id del token para encontrar al usuario
-    user = db.query(SysUsuario).filter(
-        SysUsuario.id_usuario == token_data.user_id
-    ).first()
-    
-    if user is None:
-        raise credentials_exception
+    cache_key = (token_data.user_id, token)
+    snapshot = principal_cache.get(cache_key)
+    if snapshot is None:
+        user = await db.scalar(
+            select(SysUsuario).where(SysUsuario.id_usuario == token_data.user_id)
+        )
+        
+        if user is None:
+            raise credentials_exception
+        
+        snapshot = _user_snapshot(user)
+        principal_cache.set(cache_key, snapshot)
     
-    return user
+    return _user_from_snapshot(snapshot)
 
 
 # =============================================================================
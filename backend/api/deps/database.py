@@ -10,15 +10,29 @@
 # correctamente después de cada request, incluso si hay errores.
 # Esto evita "connection leaks" (conexiones que se quedan abiertas).
 #
+# ¿POR QUÉ SESIONES ASÍNCRONAS?
+# Todos los endpoints son `async def`. Una sesión síncrona (psycopg2)
+# bloquea el event loop de uvicorn mientras espera a PostgreSQL, así que
+# una consulta lenta detiene TODOS los requests del worker. Con asyncpg
+# + AsyncSession el worker atiende otros requests mientras espera.
+#
+# Los engines síncronos se conservan SOLO para scripts (get_*_db_sync).
+# El agente IA tiene sus propios pools síncronos de solo lectura y con
+# tope duro (agent_session), separados de los de la API.
+#
 # ANALOGÍA: Cada función es como un bibliotecario que:
 # 1. Te abre la puerta del archivo (yield session)
 # 2. Espera a que termines de leer
 # 3. Cierra la puerta cuando sales (finally: session.close())
 # =============================================================================
 
+from contextlib import contextmanager
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import AsyncGenerator, Dict, Generator, Iterator
 
 from backend.api.core.config import get_settings
 
@@ -27,27 +41,82 @@ from backend.api.core.config import get_settings
 settings = get_settings()
 
 
+def to_async_url(url: str) -> str:
+    """
+    Convierte una URL `postgresql://` (psycopg2) a `postgresql+asyncpg://`.
+
+    Así el .env sigue teniendo una sola URL por base de datos.
+    """
+    return make_url(url).set(drivername="postgresql+asyncpg").render_as_string(
+        hide_password=False
+    )
+
+
 # =============================================================================
-# ENGINES: Conexiones a las bases de datos
+# ENGINES ASÍNCRONOS: usados por los endpoints de la API
+# =============================================================================
+
+def _create_async_engine(url: str):
+    return create_async_engine(
+        to_async_url(url),
+        pool_pre_ping=True,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        echo=settings.DEBUG,
+    )
+
+
+# clinica_auth_db: Usuarios, permisos, auditoría
+async_auth_engine = _create_async_engine(settings.AUTH_DB_URL)
+
+# clinica_core_db: Pacientes, tratamientos, evoluciones
+async_core_engine = _create_async_engine(settings.CORE_DB_URL)
+
+# clinica_ops_db: Citas, servicios, pagos, gastos
+async_ops_engine = _create_async_engine(settings.OPS_DB_URL)
+
+
+# expire_on_commit=False: después de commit() los objetos conservan sus
+# valores. Con AsyncSession no se puede recargar un atributo de forma
+# implícita (lazy load) fuera de un `await`.
+AsyncAuthSessionLocal = async_sessionmaker(
+    bind=async_auth_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+AsyncCoreSessionLocal = async_sessionmaker(
+    bind=async_core_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+AsyncOpsSessionLocal = async_sessionmaker(
+    bind=async_ops_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+# =============================================================================
+# ENGINES SÍNCRONOS: solo para scripts
 # =============================================================================
 # Un "engine" es la conexión de bajo nivel a la BD.
 # Creamos uno por cada base de datos.
 
-# clinica_auth_db: Usuarios, permisos, auditoría
 auth_engine = create_engine(
     settings.AUTH_DB_URL,
     pool_pre_ping=True,  # Verifica que la conexión esté viva antes de usarla
     echo=settings.DEBUG,  # Si DEBUG=True, imprime las queries SQL
 )
 
-# clinica_core_db: Pacientes, tratamientos, evoluciones
 core_engine = create_engine(
     settings.CORE_DB_URL,
     pool_pre_ping=True,
     echo=settings.DEBUG,
 )
 
-# clinica_ops_db: Citas, servicios, pagos, gastos
 ops_engine = create_engine(
     settings.OPS_DB_URL,
     pool_pre_ping=True,
@@ -84,54 +153,168 @@ OpsSessionLocal = sessionmaker(
 # DEPENDENCIAS: Generadores de sesiones para FastAPI
 # =============================================================================
 
-def get_auth_db() -> Generator[Session, None, None]:
+async def get_auth_db() -> AsyncGenerator[AsyncSession, None]:
     """
-    Obtiene una sesión de clinica_auth_db.
-    
+    Obtiene una sesión asíncrona de clinica_auth_db.
+
     Uso en endpoints:
         @router.get("/usuarios")
-        def get_usuarios(db: Session = Depends(get_auth_db)):
-            return db.query(SysUsuario).all()
-    
+        async def get_usuarios(db: AsyncSession = Depends(get_auth_db)):
+            result = await db.scalars(select(SysUsuario))
+            return result.all()
+
     La sesión se cierra automáticamente al terminar el request.
     """
-    db = AuthSessionLocal()
-    try:
+    async with AsyncAuthSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-def get_core_db() -> Generator[Session, None, None]:
+async def get_core_db() -> AsyncGenerator[AsyncSession, None]:
     """
-    Obtiene una sesión de clinica_core_db.
-    
+    Obtiene una sesión asíncrona de clinica_core_db.
+
     Uso en endpoints:
         @router.get("/pacientes")
-        def get_pacientes(db: Session = Depends(get_core_db)):
-            return db.query(Paciente).all()
+        async def get_pacientes(db: AsyncSession = Depends(get_core_db)):
+            result = await db.scalars(select(Paciente))
+            return result.all()
     """
-    db = CoreSessionLocal()
-    try:
+    async with AsyncCoreSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-def get_ops_db() -> Generator[Session, None, None]:
+async def get_ops_db() -> AsyncGenerator[AsyncSession, None]:
     """
-    Obtiene una sesión de clinica_ops_db.
-    
+    Obtiene una sesión asíncrona de clinica_ops_db.
+
     Nota: Esta BD contiene AMBOS schemas: ops y finance.
     Los modelos de ops/ y finance/ usan la misma conexión.
-    
+
     Uso en endpoints:
         @router.get("/citas")
-        def get_citas(db: Session = Depends(get_ops_db)):
-            return db.query(Cita).all()
+        async def get_citas(db: AsyncSession = Depends(get_ops_db)):
+            result = await db.scalars(select(Cita))
+            return result.all()
     """
+    async with AsyncOpsSessionLocal() as db:
+        yield db
+
+
+# =============================================================================
+# GENERADORES SÍNCRONOS: scripts (no usar en endpoints ni en el agente)
+# =============================================================================
+
+def get_auth_db_sync() -> Generator[Session, None, None]:
+    """Sesión síncrona de clinica_auth_db (scripts / herramientas)."""
+    db = AuthSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_core_db_sync() -> Generator[Session, None, None]:
+    """Sesión síncrona de clinica_core_db (scripts / herramientas)."""
+    db = CoreSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_ops_db_sync() -> Generator[Session, None, None]:
+    """Sesión síncrona de clinica_ops_db (scripts / herramientas)."""
     db = OpsSessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+# =============================================================================
+# ENGINES DEL AGENTE IA: pools aislados (bulkhead) y de solo lectura
+# =============================================================================
+# El agente corre sus consultas en hilos (asyncio.to_thread) con sesiones
+# síncronas. Si compartiera pool con la API, una ráfaga de chats dejaría
+# sin conexiones a los endpoints de citas. Por eso:
+# - Pool propio por BD con tope duro (max_overflow=0)
+# - Espera corta por conexión: si el pool está lleno el chat falla rápido
+#   en lugar de encolarse
+# - default_transaction_read_only en el servidor: aunque una consulta
+#   pasara la validación, PostgreSQL rechaza cualquier escritura
+# - URL propia opcional (AGENT_*_DB_URL) para usar una réplica de lectura
+
+def _create_agent_engine(url: str):
+    return create_engine(
+        url,
+        pool_pre_ping=True,
+        pool_size=settings.AGENT_DB_POOL_SIZE,
+        max_overflow=0,
+        pool_timeout=settings.AGENT_DB_POOL_TIMEOUT_SECONDS,
+        connect_args={"options": "-c default_transaction_read_only=on"},
+        echo=settings.DEBUG,
+    )
+
+
+# Llave: valor de DatabaseTarget ("auth", "core", "ops")
+agent_engines = {
+    "auth": _create_agent_engine(settings.AGENT_AUTH_DB_URL or settings.AUTH_DB_URL),
+    "core": _create_agent_engine(settings.AGENT_CORE_DB_URL or settings.CORE_DB_URL),
+    "ops": _create_agent_engine(settings.AGENT_OPS_DB_URL or settings.OPS_DB_URL),
+}
+
+AgentSessionLocal = {
+    name: sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    for name, engine in agent_engines.items()
+}
+
+# Veces que el agente se quedó sin conexión libre (por BD)
+_agent_pool_timeouts: Dict[str, int] = {name: 0 for name in agent_engines}
+
+
+@contextmanager
+def agent_session(database: str) -> Iterator[Session]:
+    """
+    Sesión de solo lectura del pool del agente.
+
+    Uso en herramientas del agente:
+        with agent_session(DatabaseTarget.OPS) as db:
+            rows = db.execute(text("SELECT ...")).fetchall()
+
+    Args:
+        database: "auth", "core" u "ops" (un DatabaseTarget sirve)
+
+    Raises:
+        sqlalchemy.exc.TimeoutError: si el pool del agente está lleno
+    """
+    name = getattr(database, "value", database)
+    db = AgentSessionLocal[name]()
+    try:
+        yield db
+    except PoolTimeoutError:
+        _agent_pool_timeouts[name] += 1
+        raise
+    finally:
+        db.close()
+
+
+def agent_pool_stats() -> Dict[str, Dict[str, int]]:
+    """Uso de los pools del agente (para /chat/health)."""
+    stats = {}
+    for name, engine in agent_engines.items():
+        pool = engine.pool
+        stats[name] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "available": pool.checkedin(),
+            "timeouts": _agent_pool_timeouts[name],
+        }
+    return stats
+
+
+async def dispose_engines() -> None:
+    """Cierra los pools asíncronos y los del agente (al apagar la aplicación)."""
+    for engine in (async_auth_engine, async_core_engine, async_ops_engine):
+        await engine.dispose()
+    for engine in agent_engines.values():
+        engine.dispose()
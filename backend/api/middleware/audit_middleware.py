@@ -10,30 +10,39 @@
 #   - PII/PHI masking in request bodies
 #   - Response hashing for non-repudiation
 #   - Configurable sensitive endpoints
+#   - Non-blocking writes: rows are queued and inserted in batches
+#     (see backend/api/utils/audit_writer.py)
+#   - Pure ASGI: bodies are streamed, never buffered; only JSON bodies up
+#     to AUDIT_BODY_CAPTURE_MAX_BYTES are copied for masking
 # =============================================================================
 
-from typing import Callable
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from sqlalchemy.orm import Session
 import json
 import logging
 
+from fastapi import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.api.core.config import get_settings
 from backend.api.utils.security_utils import (
     mask_request_body,
     compute_response_hash,
     create_source_refs
 )
-from backend.schemas.auth.models import AuditLog
-from backend.api.deps.database import get_auth_db
+from backend.api.utils.audit_writer import audit_writer
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 
-class AuditMiddleware(BaseHTTPMiddleware):
+class AuditMiddleware:
     """
     Middleware that automatically logs sensitive operations to audit trail.
     
+    Pure ASGI: the request body is streamed through to the endpoint as it
+    arrives. Only JSON bodies are captured (up to max_body_bytes) so they
+    can be masked; multipart uploads and other binary content are never
+    copied.
+    
     Configuration:
     - SENSITIVE_PATHS: Paths that should be audited
     - SENSITIVE_METHODS: HTTP methods to audit (default: POST, PUT, DELETE, PATCH)
@@ -52,42 +61,81 @@ class AuditMiddleware(BaseHTTPMiddleware):
     # Methods that represent data modification
     SENSITIVE_METHODS = ["POST", "PUT", "DELETE", "PATCH"]
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    def __init__(self, app: ASGIApp, max_body_bytes: int = settings.AUDIT_BODY_CAPTURE_MAX_BYTES):
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """
         Process the request and log if it's sensitive.
         """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        request = Request(scope)
+        
         # Check if this endpoint should be audited
-        should_audit = self._should_audit(request)
+        if not self._should_audit(request):
+            await self.app(scope, receive, send)
+            return
         
-        # Store request info for audit
-        request_body = None
-        if should_audit and request.method in self.SENSITIVE_METHODS:
-            try:
-                # Read request body (we need to cache it for audit)
-                body_bytes = await request.body()
-                if body_bytes:
-                    request_body = body_bytes.decode('utf-8')
-                    
-                # We need to make body readable again for the endpoint
-                # This is a workaround since body can only be read once
-                async def receive():
-                    return {"type": "http.request", "body": body_bytes}
-                request._receive = receive
-            except Exception as e:
-                logger.error(f"Error reading request body for audit: {e}")
+        capture = (
+            request.method in self.SENSITIVE_METHODS
+            and self._is_json(request.headers.get("content-type"))
+        )
+        captured = bytearray()
+        total_bytes = 0
+        truncated = False
+        status_code = None
+        
+        async def receive_wrapper() -> Message:
+            # Pass each chunk through untouched; keep a bounded copy of JSON
+            nonlocal total_bytes, truncated
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                total_bytes += len(chunk)
+                if capture and not truncated:
+                    if len(captured) + len(chunk) <= self.max_body_bytes:
+                        captured.extend(chunk)
+                    else:
+                        truncated = True
+                        captured.clear()
+            return message
         
-        # Process the request
-        response = await call_next(request)
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        await self.app(scope, receive_wrapper, send_wrapper)
         
         # Log the audit entry after successful response (don't block on failure)
-        if should_audit and response.status_code < 400:
+        if status_code is not None and status_code < 400:
+            if truncated:
+                # A JSON prefix can't be parsed (and so can't be masked): keep only the size
+                request_body = json.dumps({"_truncated": True, "size": total_bytes})
+            elif captured:
+                request_body = captured.decode("utf-8", errors="replace")
+            else:
+                request_body = None
             try:
-                self._create_audit_log(request, response, request_body)
+                self._create_audit_log(request, request_body)
             except Exception as e:
                 # Don't interrupt the request if audit logging fails
                 logger.error(f"Failed to create audit log: {e}")
-        
-        return response
+    
+    @staticmethod
+    def _is_json(content_type: str) -> bool:
+        """
+        Only JSON bodies are captured (multipart, forms and binary are skipped).
+        """
+        if not content_type:
+            return False
+        media_type = content_type.split(";", 1)[0].strip().lower()
+        return media_type == "application/json" or media_type.endswith("+json")
     
     def _should_audit(self, request: Request) -> bool:
         """
@@ -108,18 +156,14 @@ class AuditMiddleware(BaseHTTPMiddleware):
         
         return False
     
-    def _create_audit_log(self, request: Request, response: Response, request_body: str = None):
+    def _create_audit_log(self, request: Request, request_body: str = None):
         """
-        Create an audit log entry (runs asynchronously, doesn't block request).
+        Queue an audit log entry.
         
-        Note: This is a simplified version. In production, this should be
-        done asynchronously using a background task or message queue.
+        The row is written later by the background audit writer in a
+        multi-row INSERT, so the request never waits on the audit commit.
         """
         try:
-            # Get database session
-            db_gen = get_auth_db()
-            db = next(db_gen)
-            
             # Extract user info from request state (set by auth dependency)
             user_id = getattr(request.state, "user_id", None)
             username = getattr(request.state, "username", None)
@@ -137,8 +181,8 @@ class AuditMiddleware(BaseHTTPMiddleware):
             # Determine affected table from path
             tabla_afectada = self._extract_table_from_path(request.url.path)
             
-            # Create audit log entry
-            audit_log = AuditLog(
+            # Queue audit log entry
+            audit_writer.enqueue(dict(
                 usuario_id=user_id,
                 username=username,
                 session_id=session_id,
@@ -150,16 +194,10 @@ class AuditMiddleware(BaseHTTPMiddleware):
                 request_body=masked_body,
                 # response_hash and source_refs should be added by endpoints
                 # when they have the actual response data
-            )
-            
-            db.add(audit_log)
-            db.commit()
+            ))
             
         except Exception as e:
             logger.error(f"Error creating audit log: {e}")
-        finally:
-            if db:
-                db.close()
     
     def _determine_action(self, method: str, path: str) -> str:
         """
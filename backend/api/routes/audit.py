@@ -16,7 +16,8 @@ from typing import Optional
 from datetime import date, datetime
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from pydantic import BaseModel
 import csv
 import io
@@ -24,6 +25,7 @@ import io
 from backend.api.deps.database import get_auth_db
 from backend.api.deps.permissions import require_role, CLINICAL_ROLES, ROLE_ADMIN
 from backend.schemas.auth.models import SysUsuario, AuditLog
+from backend.api.utils.pagination import TotalMode, keyset_paginate, resolve_total
 
 
 # =============================================================================
@@ -65,8 +67,10 @@ async def list_audit_logs(
     fecha_fin: Optional[date] = Query(None, description="Hasta fecha"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior (paginación por cursor)"),
+    total_mode: TotalMode = Query(TotalMode.exact, alias="total", description="exact | estimated | none"),
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    db: Session = Depends(get_auth_db)
+    db: AsyncSession = Depends(get_auth_db)
 ):
     """
     Lista los logs de auditoría.
@@ -78,30 +82,37 @@ async def list_audit_logs(
     - accion: INSERT, UPDATE, DELETE
     - usuario_id: ID del usuario que hizo la acción
     - fecha_inicio, fecha_fin: Rango de fechas
+    
+    **Paginación:** usar `cursor` (= `next_cursor` de la página anterior)
+    en lugar de `skip` para páginas profundas; `total=estimated|none`
+    evita el COUNT exacto.
     """
-    query = db.query(AuditLog)
+    query = select(AuditLog)
     
     # Aplicar filtros
     if tabla:
-        query = query.filter(AuditLog.tabla_afectada == tabla)
+        query = query.where(AuditLog.tabla_afectada == tabla)
     if accion:
-        query = query.filter(AuditLog.accion == accion)
+        query = query.where(AuditLog.accion == accion)
     if usuario_id:
-        query = query.filter(AuditLog.usuario_id == usuario_id)
+        query = query.where(AuditLog.usuario_id == usuario_id)
     if fecha_inicio:
-        query = query.filter(AuditLog.timestamp_accion >= datetime.combine(fecha_inicio, datetime.min.time()))
+        query = query.where(AuditLog.timestamp_accion >= datetime.combine(fecha_inicio, datetime.min.time()))
     if fecha_fin:
-        query = query.filter(AuditLog.timestamp_accion <= datetime.combine(fecha_fin, datetime.max.time()))
+        query = query.where(AuditLog.timestamp_accion <= datetime.combine(fecha_fin, datetime.max.time()))
     
-    # Ordenar por más reciente
-    query = query.order_by(AuditLog.timestamp_accion.desc())
+    total = await resolve_total(db, query, total_mode)
     
-    total = query.count()
-    logs = query.offset(skip).limit(limit).all()
+    # Ordenar por más reciente
+    logs, next_cursor = await keyset_paginate(
+        db, query, (AuditLog.timestamp_accion, AuditLog.id_log), limit,
+        cursor=cursor, offset=skip, descending=True,
+    )
     
     return {
         "total": total,
-        "logs": [AuditLogResponse.model_validate(log) for log in logs]
+        "logs": [AuditLogResponse.model_validate(log) for log in logs],
+        "next_cursor": next_cursor
     }
 
 
@@ -114,7 +125,7 @@ async def get_registro_history(
     tabla: str,
     registro_id: int,
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    db: Session = Depends(get_auth_db)
+    db: AsyncSession = Depends(get_auth_db)
 ):
     """
     Obtiene el historial de cambios de un registro específico.
@@ -124,10 +135,10 @@ async def get_registro_history(
     **Ejemplo:**
     - GET /audit/pacientes/123 → Historial de cambios del paciente 123
     """
-    logs = db.query(AuditLog).filter(
+    logs = (await db.scalars(select(AuditLog).where(
         AuditLog.tabla_afectada == tabla,
         AuditLog.registro_id == registro_id
-    ).order_by(AuditLog.timestamp_accion.desc()).all()
+    ).order_by(AuditLog.timestamp_accion.desc()))).all()
     
     if not logs:
         return {
@@ -154,7 +165,7 @@ async def export_audit_logs(
     fecha_inicio: Optional[date] = Query(None, description="Desde fecha"),
     fecha_fin: Optional[date] = Query(None, description="Hasta fecha"),
     current_user: SysUsuario = Depends(require_role([ROLE_ADMIN])),  # Solo Admin
-    db: Session = Depends(get_auth_db)
+    db: AsyncSession = Depends(get_auth_db)
 ):
     """
     Exporta los logs de auditoría a CSV.
@@ -163,15 +174,15 @@ async def export_audit_logs(
     
     **Retorna:** Archivo CSV para descargar
     """
-    query = db.query(AuditLog)
+    query = select(AuditLog)
     
     # Aplicar filtros de fecha
     if fecha_inicio:
-        query = query.filter(AuditLog.timestamp_accion >= datetime.combine(fecha_inicio, datetime.min.time()))
+        query = query.where(AuditLog.timestamp_accion >= datetime.combine(fecha_inicio, datetime.min.time()))
     if fecha_fin:
-        query = query.filter(AuditLog.timestamp_accion <= datetime.combine(fecha_fin, datetime.max.time()))
+        query = query.where(AuditLog.timestamp_accion <= datetime.combine(fecha_fin, datetime.max.time()))
     
-    logs = query.order_by(AuditLog.timestamp_accion.desc()).all()
+    logs = (await db.scalars(query.order_by(AuditLog.timestamp_accion.desc()))).all()
     
     # Crear CSV en memoria
     output = io.StringIO()
@@ -21,7 +21,8 @@
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from pydantic import BaseModel, Field, field_validator
 from slowapi import Limiter
 from slowapi.util import get_remote_address
@@ -31,8 +32,10 @@ from backend.api.deps.database import get_auth_db
 from backend.api.deps.auth import get_current_active_user
 from backend.api.core.security import create_access_token, Token
 from backend.api.core.config import get_settings
+from backend.api.utils.cache import invalidate_principal
 from backend.schemas.auth.models import SysUsuario, AuditLog
-from backend.schemas.auth.auth_utils import verify_password, hash_password, needs_rehash
+from backend.schemas.auth.auth_utils import needs_rehash
+from backend.api.core.hashing import hash_password_async, verify_password_async
 
 # Rate limiter for auth endpoints
 limiter = Limiter(key_func=get_remote_address)
@@ -124,7 +127,7 @@ class ChangePasswordResponse(BaseModel):
 async def login(
     credentials: LoginRequest,
     request: Request,
-    db: Session = Depends(get_auth_db)
+    db: AsyncSession = Depends(get_auth_db)
 ):
     """
     Inicia sesión y obtiene un token JWT.
@@ -161,9 +164,9 @@ async def login(
     settings = get_settings()
     
     # 1. Buscar usuario por nombre de usuario
-    user = db.query(SysUsuario).filter(
+    user = await db.scalar(select(SysUsuario).where(
         SysUsuario.nombre_usuario == credentials.username
-    ).first()
+    ))
     
     # 2. Verificar que el usuario existe
     if not user:
@@ -187,20 +190,20 @@ async def login(
         user.failed_login_attempts = 0
     
     # 5. Verificar contraseña
-    if not verify_password(credentials.password, user.password_hash):
+    if not await verify_password_async(credentials.password, user.password_hash):
         # Incrementar contador de intentos fallidos
         user.failed_login_attempts = (user.failed_login_attempts or 0) + 1
         
         # Bloquear cuenta si se alcanzó el máximo de intentos
         if user.failed_login_attempts >= settings.MAX_FAILED_LOGIN_ATTEMPTS:
             user.locked_until = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCOUNT_LOCKOUT_MINUTES)
-            db.commit()
+            await db.commit()
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Cuenta bloqueada por {settings.ACCOUNT_LOCKOUT_MINUTES} minutos debido a múltiples intentos fallidos."
             )
         
-        db.commit()
+        await db.commit()
         
         attempts_remaining = settings.MAX_FAILED_LOGIN_ATTEMPTS - user.failed_login_attempts
         raise HTTPException(
@@ -218,14 +221,14 @@ async def login(
     
     # 7. Migrate password from bcrypt to Argon2 if needed (transparent upgrade)
     if needs_rehash(user.password_hash):
-        user.password_hash = hash_password(credentials.password)
+        user.password_hash = await hash_password_async(credentials.password)
     
     # 8. Actualizar último login y resetear contador de intentos fallidos
     user.last_login = datetime.now(timezone.utc)
     user.failed_login_attempts = 0
     user.locked_until = None
     
-    db.commit()
+    await db.commit()
     
     # 9. Crear token JWT con datos del usuario
     access_token = create_access_token(
@@ -281,7 +284,7 @@ async def change_password(
     password_data: ChangePasswordRequest,
     request: Request,
     current_user: SysUsuario = Depends(get_current_active_user),
-    db: Session = Depends(get_auth_db)
+    db: AsyncSession = Depends(get_auth_db)
 ):
     """
     Cambia la contraseña del usuario autenticado.
@@ -309,7 +312,7 @@ async def change_password(
     ```
     """
     # 1. Verificar que la contraseña actual es correcta
-    if not verify_password(password_data.current_password, current_user.password_hash):
+    if not await verify_password_async(password_data.current_password, current_user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="La contraseña actual es incorrecta"
@@ -323,8 +326,11 @@ async def change_password(
         )
     
     # 3. Actualizar la contraseña (usando Argon2)
-    current_user.password_hash = hash_password(password_data.new_password)
-    db.commit()
+    # current_user puede venir de la caché: cargar el registro en esta sesión
+    user = await db.get(SysUsuario, current_user.id_usuario)
+    user.password_hash = await hash_password_async(password_data.new_password)
+    await db.commit()
+    invalidate_principal(user.id_usuario)
     
     return ChangePasswordResponse(
         message="Contraseña actualizada exitosamente",
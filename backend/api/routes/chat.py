@@ -4,13 +4,18 @@ Chat Endpoint - API para el agente conversacional
 
 Expone el agente LangGraph como endpoint REST.
 Requiere autenticación JWT.
+
+Si el cliente se desconecta a mitad de la consulta, el agente se cancela
+(incluida la consulta SQL en curso, ver execute_sql).
 """
 
+import asyncio
 import logging
-from typing import Optional
+from contextlib import suppress
+from typing import Any, Awaitable, Dict, Optional
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from pydantic import BaseModel, Field
 from slowapi import Limiter
 from slowapi.util import get_remote_address
@@ -25,6 +30,43 @@ router = APIRouter(prefix="/chat", tags=["Chat - Agente IA"])
 # Rate limiter for chat endpoint to protect Anthropic API costs
 limiter = Limiter(key_func=get_remote_address)
 
+# Cada cuánto se revisa si el cliente sigue conectado mientras corre el agente
+DISCONNECT_POLL_SECONDS = 0.5
+
+# Respuesta a un cliente que ya cerró la conexión (convención de nginx)
+CLIENT_CLOSED_REQUEST = 499
+
+
+async def run_until_disconnect(
+    request: Request,
+    agent_call: Awaitable[Dict[str, Any]],
+    poll_seconds: float = DISCONNECT_POLL_SECONDS,
+) -> Optional[Dict[str, Any]]:
+    """
+    Corre el agente y lo cancela si el cliente HTTP se desconecta.
+    
+    Sin nadie esperando la respuesta no tiene sentido seguir pagando el
+    LLM ni ocupando una conexión de BD.
+    
+    Returns:
+        Resultado del agente, o None si el cliente se fue
+    """
+    task = asyncio.ensure_future(agent_call)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_seconds)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+                return None
+    finally:
+        # El propio request se canceló (apagado del servidor)
+        if not task.done():
+            task.cancel()
+
 
 # =============================================================================
 # SCHEMAS DE REQUEST/RESPONSE
@@ -115,14 +157,19 @@ async def chat(
     )
     
     try:
-        result = await run_agent(
+        result = await run_until_disconnect(request, run_agent(
             user_query=chat_request.message,
             user_id=current_user.id_usuario,
             user_role=current_user.rol,
             session_id=chat_request.session_id,
             thread_id=chat_request.thread_id,  # ✅ NUEVO: Pasar thread_id para checkpointing
             origin="webapp",
-        )
+            clinica_id=current_user.clinica_id,
+        ))
+        
+        if result is None:
+            logger.info(f"Cliente desconectado; agente cancelado (user {current_user.id_usuario})")
+            return Response(status_code=CLIENT_CLOSED_REQUEST)
         
         processing_time = (time.time() - start_time) * 1000
         
@@ -156,7 +203,10 @@ async def chat_health():
     """Health check del agente."""
     try:
         from backend.agents.graph import get_compiled_graph
+        from backend.agents.memory.query_cache import query_cache
         from backend.api.core.config import get_settings
+        from backend.api.deps.database import agent_pool_stats
+        from backend.tools.query_cost import plan_cache
         
         settings = get_settings()
         graph = get_compiled_graph()
@@ -166,6 +216,9 @@ async def chat_health():
             "agent_ready": graph is not None,
             "llm_configured": bool(settings.ANTHROPIC_API_KEY),
             "model": settings.CLAUDE_MODEL,
+            "query_cache": query_cache.stats(),
+            "agent_db_pools": agent_pool_stats(),
+            "plan_cache": plan_cache.stats(),
             "timestamp": datetime.utcnow().isoformat(),
         }
     except Exception as e:
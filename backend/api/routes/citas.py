@@ -6,8 +6,11 @@
 #   - GET /citas → Listar citas con filtros
 #   - GET /citas/agenda/{fecha} → Agenda de un día
 #   - GET /citas/disponibilidad → Horarios disponibles
+#   - GET /citas/disponibilidad/rango → Slots libres de varios podólogos/días
+#   - GET /citas/disponibilidad/primera → Primer horario libre
 #   - GET /citas/{id} → Detalle de cita
 #   - POST /citas → Crear cita
+#   - POST /citas/serie → Crear serie de citas recurrentes
 #   - PUT /citas/{id} → Editar cita
 #   - PATCH /citas/{id}/status → Cambiar estado
 #   - DELETE /citas/{id} → Cancelar cita
@@ -15,17 +18,21 @@
 # PERMISOS: Todos los roles pueden gestionar citas
 # =============================================================================
 
-from typing import List, Optional
+from typing import List, Optional, Sequence
 from datetime import date, time, datetime, timedelta, timezone
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
 from pydantic import BaseModel, Field
 
 from backend.api.deps.database import get_ops_db
 from backend.api.deps.permissions import require_role, ALL_ROLES
 from backend.schemas.auth.models import SysUsuario
 from backend.schemas.ops.models import Cita, Podologo, CatalogoServicio, SolicitudProspecto
+from backend.api.utils.pagination import TotalMode, keyset_paginate, resolve_total
+from backend.api.utils.cache import invalidate_dashboard_cache
+from backend.api.utils.availability import Agenda, Slot, load_agenda, recurrence_dates
 
 
 # =============================================================================
@@ -55,6 +62,27 @@ class CitaCreate(CitaBase):
     pass
 
 
+# Tope de citas por serie (un año de visitas semanales)
+MAX_OCURRENCIAS_SERIE = 52
+
+
+class ReglaRecurrencia(BaseModel):
+    """Regla de repetición de una serie de citas"""
+    frecuencia: str = Field("semanal", pattern="^(diaria|semanal|mensual)$")
+    intervalo: int = Field(1, ge=1, le=12, description="Cada cuántos días/semanas/meses")
+    ocurrencias: Optional[int] = Field(None, ge=1, le=MAX_OCURRENCIAS_SERIE)
+    hasta: Optional[date] = Field(None, description="Última fecha posible (inclusive)")
+
+
+class CitaSerieCreate(CitaBase):
+    """Request para crear una serie de citas (fecha_cita = primera ocurrencia)"""
+    recurrencia: ReglaRecurrencia
+    omitir_conflictos: bool = Field(
+        False,
+        description="True: agenda las fechas libres y reporta el resto. False: todo o nada"
+    )
+
+
 class CitaUpdate(BaseModel):
     """Request para actualizar cita"""
     podologo_id: Optional[int] = None
@@ -96,6 +124,19 @@ class CitaResponse(BaseModel):
         from_attributes = True
 
 
+class ConflictoSerie(BaseModel):
+    """Ocurrencia de una serie que no se pudo agendar"""
+    fecha_cita: date
+    motivo: str  # "solapamiento" | "fuera_de_horario"
+
+
+class CitaSerieResponse(BaseModel):
+    """Response de creación de serie"""
+    total_solicitadas: int
+    creadas: List[CitaResponse]
+    conflictos: List[ConflictoSerie]
+
+
 class DisponibilidadSlot(BaseModel):
     """Un slot de disponibilidad"""
     hora_inicio: time
@@ -111,29 +152,160 @@ class DisponibilidadResponse(BaseModel):
     slots: List[DisponibilidadSlot]
 
 
+class SlotLibre(BaseModel):
+    """Slot libre de un podólogo en un día"""
+    fecha: date
+    hora_inicio: time
+    hora_fin: time
+    podologo_id: int
+    podologo_nombre: str
+
+
+class DisponibilidadRangoResponse(BaseModel):
+    """Response de disponibilidad en un rango de días"""
+    desde: date
+    hasta: date
+    duracion_minutos: int
+    total: int
+    slots: List[SlotLibre]
+
+
+class PrimeraDisponibilidadResponse(BaseModel):
+    """Response del primer horario libre"""
+    duracion_minutos: int
+    primera: Optional[SlotLibre] = None
+    por_podologo: List[SlotLibre]
+
+
 # =============================================================================
 # HELPERS
 # =============================================================================
 
-def enrich_cita_response(cita: Cita, db: Session) -> dict:
-    """Agrega nombres de podólogo y servicio a la respuesta"""
-    response = CitaResponse.model_validate(cita).model_dump()
+# EXCLUDE constraint de ops.citas que impide solapamientos (04_init_ops_db.sql)
+SOLAPAMIENTO_CONSTRAINT = "exclude_solapamiento_citas"
+
+
+def es_solapamiento(error: IntegrityError) -> bool:
+    """True si el IntegrityError lo lanzó el EXCLUDE anti-solapamiento."""
+    orig = error.orig
+    # asyncpg: la excepción original (con constraint_name) queda en __cause__
+    constraint = getattr(getattr(orig, "__cause__", None), "constraint_name", None)
+    if constraint is not None:
+        return constraint == SOLAPAMIENTO_CONSTRAINT
+    return SOLAPAMIENTO_CONSTRAINT in str(orig)
+
+
+async def guardar_cita(db: AsyncSession, cita: Cita) -> None:
+    """
+    Hace commit de una cita nueva o modificada.
+    
+    La BD decide si hay solapamiento (EXCLUDE constraint), así que dos
+    recepcionistas agendando el mismo horario al mismo tiempo no pueden
+    ganar las dos, y no hace falta bloquear la tabla: la segunda recibe 409.
+    """
+    # Capturar antes del commit: tras un rollback los atributos expiran
+    cita_id = cita.id_cita
+    podologo_id, fecha = cita.podologo_id, cita.fecha_cita
+    hora_inicio, hora_fin = cita.hora_inicio, cita.hora_fin
+    
+    try:
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        if not es_solapamiento(e):
+            raise
+        # Solo en el camino de error: buscar la cita con la que choca
+        query = select(Cita.hora_inicio, Cita.hora_fin).where(
+            Cita.podologo_id == podologo_id,
+            Cita.fecha_cita == fecha,
+            Cita.deleted_at.is_(None),
+            Cita.status.notin_(["Cancelada", "No Asistió"]),
+            Cita.hora_inicio < hora_fin,
+            Cita.hora_fin > hora_inicio
+        )
+        if cita_id is not None:
+            query = query.where(Cita.id_cita != cita_id)
+        conflicto = (await db.execute(query.limit(1))).first()
+        detail = (
+            f"El podólogo ya tiene una cita de {conflicto.hora_inicio} a {conflicto.hora_fin}"
+            if conflicto else "El podólogo ya tiene una cita en ese horario"
+        )
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detail)
+
+
+def validar_datos_cita(data: CitaBase) -> None:
+    """Valida destinatario (paciente O prospecto) y horario de una cita nueva."""
+    if data.paciente_id and data.solicitud_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Una cita es para un paciente O un prospecto, no ambos"
+        )
     
-    # Agregar nombre del podólogo
-    podologo = db.query(Podologo).filter(
-        Podologo.id_podologo == cita.podologo_id
-    ).first()
-    if podologo:
-        response["podologo_nombre"] = podologo.nombre_completo
+    if not data.paciente_id and not data.solicitud_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Debe especificar paciente_id o solicitud_id"
+        )
+    
+    if data.hora_fin <= data.hora_inicio:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="hora_fin debe ser después de hora_inicio"
+        )
+
+
+def _slot_libre(slot: Slot, agenda: Agenda) -> SlotLibre:
+    return SlotLibre(
+        fecha=slot.fecha,
+        hora_inicio=slot.hora_inicio,
+        hora_fin=slot.hora_fin,
+        podologo_id=slot.podologo_id,
+        podologo_nombre=agenda.podologos[slot.podologo_id]
+    )
+
+
+async def enrich_citas_response(citas: Sequence[Cita], db: AsyncSession) -> List[dict]:
+    """
+    Agrega nombres de podólogo y servicio a una página de citas.
+    
+    Resuelve los nombres de TODA la página con dos consultas `IN (...)`
+    (una por tabla) en lugar de dos consultas por cita, así que el
+    número de round trips no crece con el tamaño de la página.
+    """
+    podologo_ids = {c.podologo_id for c in citas if c.podologo_id is not None}
+    servicio_ids = {c.servicio_id for c in citas if c.servicio_id is not None}
+    
+    podologos = {}
+    if podologo_ids:
+        rows = await db.execute(
+            select(Podologo.id_podologo, Podologo.nombre_completo)
+            .where(Podologo.id_podologo.in_(podologo_ids))
+        )
+        podologos = dict(rows.all())
     
-    # Agregar nombre del servicio
-    servicio = db.query(CatalogoServicio).filter(
-        CatalogoServicio.id_servicio == cita.servicio_id
-    ).first()
-    if servicio:
-        response["servicio_nombre"] = servicio.nombre_servicio
+    servicios = {}
+    if servicio_ids:
+        rows = await db.execute(
+            select(CatalogoServicio.id_servicio, CatalogoServicio.nombre_servicio)
+            .where(CatalogoServicio.id_servicio.in_(servicio_ids))
+        )
+        servicios = dict(rows.all())
+    
+    responses = []
+    for cita in citas:
+        response = CitaResponse.model_validate(cita).model_dump()
+        if cita.podologo_id in podologos:
+            response["podologo_nombre"] = podologos[cita.podologo_id]
+        if cita.servicio_id in servicios:
+            response["servicio_nombre"] = servicios[cita.servicio_id]
+        responses.append(response)
     
-    return response
+    return responses
+
+
+async def enrich_cita_response(cita: Cita, db: AsyncSession) -> dict:
+    """Agrega nombres de podólogo y servicio a la respuesta"""
+    return (await enrich_citas_response([cita], db))[0]
 
 
 # =============================================================================
@@ -148,8 +320,10 @@ async def list_citas(
     status: Optional[str] = Query(None, description="Filtrar por estado"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior (paginación por cursor)"),
+    total_mode: TotalMode = Query(TotalMode.exact, alias="total", description="exact | estimated | none"),
     current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
-    db: Session = Depends(get_ops_db)
+    db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Lista citas con filtros opcionales.
@@ -160,32 +334,38 @@ async def list_citas(
     - fecha_inicio, fecha_fin: Rango de fechas
     - podologo_id: Filtrar por podólogo
     - status: Filtrar por estado
+    
+    **Paginación:** `cursor` (usar `next_cursor` de la respuesta) o `skip`;
+    `total=estimated|none` evita el COUNT exacto.
     """
-    query = db.query(Cita).filter(Cita.deleted_at.is_(None))
+    query = select(Cita).where(Cita.deleted_at.is_(None))
     
     # Filtrar por clínica
     if current_user.clinica_id:
-        query = query.filter(Cita.id_clinica == current_user.clinica_id)
+        query = query.where(Cita.id_clinica == current_user.clinica_id)
     
     # Aplicar filtros
     if fecha_inicio:
-        query = query.filter(Cita.fecha_cita >= fecha_inicio)
+        query = query.where(Cita.fecha_cita >= fecha_inicio)
     if fecha_fin:
-        query = query.filter(Cita.fecha_cita <= fecha_fin)
+        query = query.where(Cita.fecha_cita <= fecha_fin)
     if podologo_id:
-        query = query.filter(Cita.podologo_id == podologo_id)
+        query = query.where(Cita.podologo_id == podologo_id)
     if status:
-        query = query.filter(Cita.status == status)
+        query = query.where(Cita.status == status)
     
-    # Ordenar por fecha y hora
-    query = query.order_by(Cita.fecha_cita, Cita.hora_inicio)
+    total = await resolve_total(db, query, total_mode)
     
-    total = query.count()
-    citas = query.offset(skip).limit(limit).all()
+    # Ordenar por fecha y hora (id_cita desempata para el cursor)
+    citas, next_cursor = await keyset_paginate(
+        db, query, (Cita.fecha_cita, Cita.hora_inicio, Cita.id_cita), limit,
+        cursor=cursor, offset=skip,
+    )
     
     return {
         "total": total,
-        "citas": [enrich_cita_response(c, db) for c in citas]
+        "citas": await enrich_citas_response(citas, db),
+        "next_cursor": next_cursor
     }
 
 
@@ -198,7 +378,7 @@ async def get_agenda_dia(
     fecha: date,
     podologo_id: Optional[int] = Query(None, description="Filtrar por podólogo"),
     current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
-    db: Session = Depends(get_ops_db)
+    db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Obtiene la agenda de un día específico.
@@ -207,24 +387,24 @@ async def get_agenda_dia(
     
     **Retorna:** Lista de citas ordenadas por hora
     """
-    query = db.query(Cita).filter(
+    query = select(Cita).where(
         Cita.fecha_cita == fecha,
         Cita.deleted_at.is_(None),
         Cita.status.notin_(["Cancelada", "No Asistió"])
     )
     
     if current_user.clinica_id:
-        query = query.filter(Cita.id_clinica == current_user.clinica_id)
+        query = query.where(Cita.id_clinica == current_user.clinica_id)
     
     if podologo_id:
-        query = query.filter(Cita.podologo_id == podologo_id)
+        query = query.where(Cita.podologo_id == podologo_id)
     
-    citas = query.order_by(Cita.hora_inicio).all()
+    citas = (await db.scalars(query.order_by(Cita.hora_inicio))).all()
     
     return {
         "fecha": fecha,
         "total_citas": len(citas),
-        "citas": [enrich_cita_response(c, db) for c in citas]
+        "citas": await enrich_citas_response(citas, db)
     }
 
 
@@ -235,10 +415,10 @@ async def get_agenda_dia(
 @router.get("/disponibilidad")
 async def get_disponibilidad(
     fecha: date = Query(..., description="Fecha a consultar"),
-    podologo_id: int = Query(..., description="ID del podólogo"),
-    duracion_minutos: int = Query(30, description="Duración del servicio"),
+    podologo_id: Optional[int] = Query(None, description="ID del podólogo (vacío = todos)"),
+    duracion_minutos: int = Query(30, ge=5, le=480, description="Duración del servicio"),
     current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
-    db: Session = Depends(get_ops_db)
+    db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Consulta horarios disponibles para un podólogo en una fecha.
@@ -247,65 +427,117 @@ async def get_disponibilidad(
     
     **Parámetros:**
     - fecha: Fecha a consultar
-    - podologo_id: ID del podólogo
+    - podologo_id: ID del podólogo (sin él se consultan todos los activos)
     - duracion_minutos: Duración del servicio a agendar
     
-    **Retorna:** Lista de slots con disponibilidad
+    **Retorna:** Lista de slots con disponibilidad (según la jornada de cada
+    podólogo). Sin podologo_id, una lista con la disponibilidad de cada uno.
     """
-    # Verificar que el podólogo existe
-    podologo = db.query(Podologo).filter(
-        Podologo.id_podologo == podologo_id,
-        Podologo.activo == True
-    ).first()
+    agenda = await load_agenda(
+        db, fecha, fecha,
+        podologo_ids=[podologo_id] if podologo_id is not None else None,
+        clinica_id=current_user.clinica_id,
+    )
     
-    if not podologo:
+    if podologo_id is not None and podologo_id not in agenda.podologos:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Podólogo no encontrado o inactivo"
         )
     
-    # Obtener citas existentes del día
-    citas_dia = db.query(Cita).filter(
-        Cita.podologo_id == podologo_id,
-        Cita.fecha_cita == fecha,
-        Cita.deleted_at.is_(None),
-        Cita.status.notin_(["Cancelada", "No Asistió"])
-    ).all()
-    
-    # Definir horario de trabajo (9:00 AM - 7:00 PM)
-    hora_inicio_dia = time(9, 0)
-    hora_fin_dia = time(19, 0)
-    
-    # Generar slots de 30 minutos
-    slots = []
-    current_time = datetime.combine(fecha, hora_inicio_dia)
-    end_time = datetime.combine(fecha, hora_fin_dia)
-    
-    while current_time + timedelta(minutes=duracion_minutos) <= end_time:
-        slot_inicio = current_time.time()
-        slot_fin = (current_time + timedelta(minutes=duracion_minutos)).time()
-        
-        # Verificar si el slot está disponible
-        disponible = True
-        for cita in citas_dia:
-            # Verificar solapamiento
-            if not (slot_fin <= cita.hora_inicio or slot_inicio >= cita.hora_fin):
-                disponible = False
-                break
-        
-        slots.append(DisponibilidadSlot(
-            hora_inicio=slot_inicio,
-            hora_fin=slot_fin,
-            disponible=disponible
-        ))
-        
-        current_time += timedelta(minutes=30)
-    
-    return DisponibilidadResponse(
-        fecha=fecha,
-        podologo_id=podologo_id,
-        podologo_nombre=podologo.nombre_completo,
-        slots=slots
+    respuestas = [
+        DisponibilidadResponse(
+            fecha=fecha,
+            podologo_id=pid,
+            podologo_nombre=nombre,
+            slots=[
+                DisponibilidadSlot(
+                    hora_inicio=slot.hora_inicio,
+                    hora_fin=slot.hora_fin,
+                    disponible=slot.disponible
+                )
+                for slot in agenda.day_slots(pid, fecha, duracion_minutos)
+            ]
+        )
+        for pid, nombre in agenda.podologos.items()
+    ]
+    
+    return respuestas[0] if podologo_id is not None else respuestas
+
+
+# =============================================================================
+# ENDPOINT: GET /citas/disponibilidad/rango
+# =============================================================================
+
+@router.get("/disponibilidad/rango", response_model=DisponibilidadRangoResponse)
+async def get_disponibilidad_rango(
+    desde: Optional[date] = Query(None, description="Primer día (default: hoy)"),
+    dias: int = Query(7, ge=1, le=31, description="Número de días"),
+    podologo_ids: Optional[List[int]] = Query(None, description="Podólogos (vacío = todos)"),
+    duracion_minutos: int = Query(30, ge=5, le=480, description="Duración del servicio"),
+    current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
+    db: AsyncSession = Depends(get_ops_db)
+):
+    """
+    Slots libres de varios podólogos en varios días.
+    
+    **Permisos:** Todos los roles
+    
+    Ideal para recepción: "¿quién tiene espacio esta semana?". Se resuelve
+    con tres consultas sin importar cuántos podólogos o días se pidan.
+    Los slots de hoy que ya pasaron no se incluyen.
+    """
+    desde = desde or date.today()
+    hasta = desde + timedelta(days=dias - 1)
+    agenda = await load_agenda(db, desde, hasta, podologo_ids, current_user.clinica_id)
+    
+    slots = agenda.free_slots(desde, dias, duracion_minutos, not_before=datetime.now())
+    
+    return DisponibilidadRangoResponse(
+        desde=desde,
+        hasta=hasta,
+        duracion_minutos=duracion_minutos,
+        total=len(slots),
+        slots=[_slot_libre(slot, agenda) for slot in slots]
+    )
+
+
+# =============================================================================
+# ENDPOINT: GET /citas/disponibilidad/primera
+# =============================================================================
+
+@router.get("/disponibilidad/primera", response_model=PrimeraDisponibilidadResponse)
+async def get_primera_disponibilidad(
+    dias: int = Query(7, ge=1, le=60, description="Días hacia adelante a buscar"),
+    podologo_ids: Optional[List[int]] = Query(None, description="Podólogos (vacío = todos)"),
+    duracion_minutos: int = Query(30, ge=5, le=480, description="Duración del servicio"),
+    current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
+    db: AsyncSession = Depends(get_ops_db)
+):
+    """
+    Primer horario libre en los próximos N días.
+    
+    **Permisos:** Todos los roles
+    
+    **Retorna:**
+    - primera: El slot libre más próximo entre todos los podólogos
+    - por_podologo: El primer slot libre de cada podólogo (ordenados por hora)
+    """
+    desde = date.today()
+    agenda = await load_agenda(
+        db, desde, desde + timedelta(days=dias - 1), podologo_ids, current_user.clinica_id
+    )
+    
+    primeros = sorted(
+        agenda.first_available(desde, dias, duracion_minutos, not_before=datetime.now()).values(),
+        key=lambda s: (s.fecha, s.hora_inicio, s.podologo_id)
+    )
+    por_podologo = [_slot_libre(slot, agenda) for slot in primeros]
+    
+    return PrimeraDisponibilidadResponse(
+        duracion_minutos=duracion_minutos,
+        primera=por_podologo[0] if por_podologo else None,
+        por_podologo=por_podologo
     )
 
 
@@ -317,17 +549,19 @@ async def get_disponibilidad(
 async def get_cita(
     cita_id: int,
     current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
-    db: Session = Depends(get_ops_db)
+    db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Obtiene detalle de una cita.
     
     **Permisos:** Todos los roles
     """
-    cita = db.query(Cita).filter(
-        Cita.id_cita == cita_id,
-        Cita.deleted_at.is_(None)
-    ).first()
+    cita = await db.scalar(
+        select(Cita).where(
+            Cita.id_cita == cita_id,
+            Cita.deleted_at.is_(None)
+        )
+    )
     
     if not cita:
         raise HTTPException(
@@ -342,7 +576,7 @@ async def get_cita(
             detail="No tienes acceso a esta cita"
         )
     
-    return enrich_cita_response(cita, db)
+    return await enrich_cita_response(cita, db)
 
 
 # =============================================================================
@@ -353,7 +587,7 @@ async def get_cita(
 async def create_cita(
     data: CitaCreate,
     current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
-    db: Session = Depends(get_ops_db)
+    db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Crea una nueva cita.
@@ -363,60 +597,136 @@ async def create_cita(
     **Validaciones:**
     - Debe tener paciente_id O solicitud_id (no ambos)
     - hora_fin debe ser después de hora_inicio
-    - No puede haber solapamiento con otras citas del podólogo
+    - No puede haber solapamiento con otras citas del podólogo (409).
+      Lo garantiza el EXCLUDE constraint de ops.citas, también con
+      solicitudes simultáneas.
     """
-    # Validar que tiene paciente O prospecto
-    if data.paciente_id and data.solicitud_id:
+    validar_datos_cita(data)
+    
+    # Crear cita (el solapamiento lo rechaza la BD → 409)
+    cita = Cita(
+        **data.model_dump(),
+        id_clinica=current_user.clinica_id or 1,
+        status="Confirmada",
+        created_by=current_user.id_usuario
+    )
+    
+    db.add(cita)
+    await guardar_cita(db, cita)
+    invalidate_dashboard_cache(cita.id_clinica)
+    await db.refresh(cita)
+    
+    return await enrich_cita_response(cita, db)
+
+
+# =============================================================================
+# ENDPOINT: POST /citas/serie
+# =============================================================================
+
+@router.post("/serie", status_code=status.HTTP_201_CREATED, response_model=CitaSerieResponse)
+async def create_serie_citas(
+    data: CitaSerieCreate,
+    current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
+    db: AsyncSession = Depends(get_ops_db)
+):
+    """
+    Crea una serie de citas recurrentes (p. ej. 10 visitas semanales de un
+    plan de tratamiento) en una sola transacción.
+    
+    **Permisos:** Todos los roles
+    
+    **Recurrencia:** cada `intervalo` días/semanas/meses desde fecha_cita,
+    hasta `ocurrencias` citas o la fecha `hasta` (máximo 52).
+    
+    **Conflictos:** todas las fechas se revisan contra la agenda del podólogo
+    con una sola carga del rango completo. Con omitir_conflictos=false
+    cualquier conflicto rechaza la serie (409 con la lista); con true se
+    agendan las fechas libres y las demás se reportan en `conflictos`.
+    Las citas se insertan con un único INSERT multi-fila; si otra cita
+    ocupa un horario entre la revisión y el INSERT, el EXCLUDE constraint
+    rechaza la serie completa (409).
+    """
+    validar_datos_cita(data)
+    regla = data.recurrencia
+    if regla.ocurrencias is None and regla.hasta is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Una cita es para un paciente O un prospecto, no ambos"
+            detail="La recurrencia requiere ocurrencias o hasta"
         )
     
-    if not data.paciente_id and not data.solicitud_id:
+    fechas = recurrence_dates(
+        data.fecha_cita, regla.frecuencia, regla.intervalo,
+        ocurrencias=regla.ocurrencias, hasta=regla.hasta,
+        max_ocurrencias=MAX_OCURRENCIAS_SERIE,
+    )
+    if not fechas:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Debe especificar paciente_id o solicitud_id"
+            detail="hasta debe ser igual o posterior a fecha_cita"
         )
     
-    # Validar horarios
-    if data.hora_fin <= data.hora_inicio:
+    agenda = await load_agenda(
+        db, fechas[0], fechas[-1],
+        podologo_ids=[data.podologo_id],
+        clinica_id=current_user.clinica_id,
+    )
+    if data.podologo_id not in agenda.podologos:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="hora_fin debe ser después de hora_inicio"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Podólogo no encontrado o inactivo"
         )
     
-    # Verificar disponibilidad (no solapamiento)
-    conflicto = db.query(Cita).filter(
-        Cita.podologo_id == data.podologo_id,
-        Cita.fecha_cita == data.fecha_cita,
-        Cita.deleted_at.is_(None),
-        Cita.status.notin_(["Cancelada", "No Asistió"]),
-        # Verificar solapamiento de horarios
-        and_(
-            Cita.hora_inicio < data.hora_fin,
-            Cita.hora_fin > data.hora_inicio
-        )
-    ).first()
+    libres: List[date] = []
+    conflictos: List[ConflictoSerie] = []
+    for fecha in fechas:
+        motivo = agenda.conflict(data.podologo_id, fecha, data.hora_inicio, data.hora_fin)
+        if motivo:
+            conflictos.append(ConflictoSerie(fecha_cita=fecha, motivo=motivo))
+        else:
+            libres.append(fecha)
     
-    if conflicto:
+    if conflictos and not data.omitir_conflictos:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
-            detail=f"El podólogo ya tiene una cita de {conflicto.hora_inicio} a {conflicto.hora_fin}"
+            detail={
+                "mensaje": "Hay fechas de la serie que no se pueden agendar",
+                "conflictos": [c.model_dump(mode="json") for c in conflictos],
+            }
         )
     
-    # Crear cita
-    cita = Cita(
-        **data.model_dump(),
-        id_clinica=current_user.clinica_id or 1,
-        status="Confirmada",
-        created_by=current_user.id_usuario
+    creadas: List[Cita] = []
+    if libres:
+        base = data.model_dump(exclude={"recurrencia", "omitir_conflictos", "fecha_cita"})
+        rows = [
+            {
+                **base,
+                "fecha_cita": fecha,
+                "id_clinica": current_user.clinica_id or 1,
+                "status": "Confirmada",
+                "created_by": current_user.id_usuario,
+            }
+            for fecha in libres
+        ]
+        try:
+            creadas = list((await db.scalars(
+                insert(Cita).returning(Cita, sort_by_parameter_order=True), rows
+            )).all())
+            await db.commit()
+        except IntegrityError as e:
+            await db.rollback()
+            if not es_solapamiento(e):
+                raise
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Otra cita ocupó uno de los horarios de la serie; intente de nuevo"
+            )
+        invalidate_dashboard_cache(current_user.clinica_id or 1)
+    
+    return CitaSerieResponse(
+        total_solicitadas=len(fechas),
+        creadas=await enrich_citas_response(creadas, db),
+        conflictos=conflictos,
     )
-    
-    db.add(cita)
-    db.commit()
-    db.refresh(cita)
-    
-    return enrich_cita_response(cita, db)
 
 
 # =============================================================================
@@ -428,17 +738,19 @@ async def update_cita(
     cita_id: int,
     data: CitaUpdate,
     current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
-    db: Session = Depends(get_ops_db)
+    db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Actualiza una cita existente.
     
     **Permisos:** Todos los roles
     """
-    cita = db.query(Cita).filter(
-        Cita.id_cita == cita_id,
-        Cita.deleted_at.is_(None)
-    ).first()
+    cita = await db.scalar(
+        select(Cita).where(
+            Cita.id_cita == cita_id,
+            Cita.deleted_at.is_(None)
+        )
+    )
     
     if not cita:
         raise HTTPException(
@@ -456,13 +768,22 @@ async def update_cita(
     # Actualizar campos
     update_data = data.model_dump(exclude_unset=True)
     
+    hora_inicio = update_data.get("hora_inicio", cita.hora_inicio)
+    hora_fin = update_data.get("hora_fin", cita.hora_fin)
+    if hora_fin <= hora_inicio:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="hora_fin debe ser después de hora_inicio"
+        )
+    
     for field, value in update_data.items():
         setattr(cita, field, value)
     
-    db.commit()
-    db.refresh(cita)
+    await guardar_cita(db, cita)
+    invalidate_dashboard_cache(cita.id_clinica)
+    await db.refresh(cita)
     
-    return enrich_cita_response(cita, db)
+    return await enrich_cita_response(cita, db)
 
 
 # =============================================================================
@@ -474,7 +795,7 @@ async def update_cita_status(
     cita_id: int,
     data: CitaStatusUpdate,
     current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
-    db: Session = Depends(get_ops_db)
+    db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Cambia el estado de una cita.
@@ -485,10 +806,12 @@ async def update_cita_status(
     - Pendiente → Confirmada → En Sala → Realizada
     - Cancelada, No Asistió (finales)
     """
-    cita = db.query(Cita).filter(
-        Cita.id_cita == cita_id,
-        Cita.deleted_at.is_(None)
-    ).first()
+    cita = await db.scalar(
+        select(Cita).where(
+            Cita.id_cita == cita_id,
+            Cita.deleted_at.is_(None)
+        )
+    )
     
     if not cita:
         raise HTTPException(
@@ -504,12 +827,14 @@ async def update_cita_status(
         )
     
     cita.status = data.status
-    db.commit()
-    db.refresh(cita)
+    # Reactivar una cita cancelada puede chocar con otra → 409
+    await guardar_cita(db, cita)
+    invalidate_dashboard_cache(cita.id_clinica)
+    await db.refresh(cita)
     
     return {
         "message": f"Estado actualizado a '{data.status}'",
-        "cita": enrich_cita_response(cita, db)
+        "cita": await enrich_cita_response(cita, db)
     }
 
 
@@ -521,7 +846,7 @@ async def update_cita_status(
 async def cancel_cita(
     cita_id: int,
     current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
-    db: Session = Depends(get_ops_db)
+    db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Cancela una cita.
@@ -530,10 +855,12 @@ async def cancel_cita(
     
     La cita no se elimina, solo cambia su estado a "Cancelada".
     """
-    cita = db.query(Cita).filter(
-        Cita.id_cita == cita_id,
-        Cita.deleted_at.is_(None)
-    ).first()
+    cita = await db.scalar(
+        select(Cita).where(
+            Cita.id_cita == cita_id,
+            Cita.deleted_at.is_(None)
+        )
+    )
     
     if not cita:
         raise HTTPException(
@@ -551,6 +878,7 @@ async def cancel_cita(
     # Cambiar a cancelada
     cita.status = "Cancelada"
     cita.deleted_at = datetime.now(timezone.utc)
-    db.commit()
+    await db.commit()
+    invalidate_dashboard_cache(cita.id_clinica)
     
     return {"message": "Cita cancelada", "id": cita_id}
@@ -13,8 +13,9 @@
 
 from typing import Optional
 from datetime import datetime, timezone
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status, File, UploadFile, Form
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from pydantic import BaseModel, Field
 import base64
 import os
@@ -24,6 +25,7 @@ from backend.api.deps.database import get_core_db
 from backend.api.deps.permissions import require_role, CLINICAL_ROLES
 from backend.schemas.auth.models import SysUsuario
 from backend.schemas.core.models import EvidenciaFotografica, EvolucionClinica
+from backend.api.utils.pagination import TotalMode, keyset_paginate, resolve_total
 
 
 # =============================================================================
@@ -70,26 +72,32 @@ class EvidenciaResponse(BaseModel):
 async def list_all_evidencias(
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior (paginación por cursor)"),
+    total_mode: TotalMode = Query(TotalMode.exact, alias="total", description="exact | estimated | none"),
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Lista todas las evidencias fotográficas.
     
     **Permisos:** Solo Admin y Podologo
     """
-    query = db.query(EvidenciaFotografica)
+    query = select(EvidenciaFotografica)
     
     # Filtrar por clínica si el usuario está asignado a una
     if current_user.clinica_id:
-        query = query.filter(EvidenciaFotografica.id_clinica == current_user.clinica_id)
+        query = query.where(EvidenciaFotografica.id_clinica == current_user.clinica_id)
     
-    total = query.count()
-    evidencias = query.order_by(EvidenciaFotografica.fecha_captura.desc()).offset(skip).limit(limit).all()
+    total = await resolve_total(db, query, total_mode)
+    evidencias, next_cursor = await keyset_paginate(
+        db, query, (EvidenciaFotografica.fecha_captura, EvidenciaFotografica.id_evidencia), limit,
+        cursor=cursor, offset=skip, descending=True,
+    )
     
     return {
         "total": total,
-        "evidencias": [EvidenciaResponse.model_validate(e) for e in evidencias]
+        "evidencias": [EvidenciaResponse.model_validate(e) for e in evidencias],
+        "next_cursor": next_cursor
     }
 
 
@@ -101,7 +109,7 @@ async def list_all_evidencias(
 async def list_evidencias_by_evolucion(
     evolucion_id: int,
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Lista todas las evidencias fotográficas de una evolución.
@@ -109,9 +117,9 @@ async def list_evidencias_by_evolucion(
     **Permisos:** Solo Admin y Podologo
     """
     # Verificar que la evolución existe
-    evolucion = db.query(EvolucionClinica).filter(
+    evolucion = await db.scalar(select(EvolucionClinica).where(
         EvolucionClinica.id_evolucion == evolucion_id
-    ).first()
+    ))
     
     if not evolucion:
         raise HTTPException(
@@ -126,9 +134,9 @@ async def list_evidencias_by_evolucion(
             detail="No tienes acceso a esta evolución"
         )
     
-    evidencias = db.query(EvidenciaFotografica).filter(
+    evidencias = (await db.scalars(select(EvidenciaFotografica).where(
         EvidenciaFotografica.evolucion_id == evolucion_id
-    ).order_by(EvidenciaFotografica.fecha_captura).all()
+    ).order_by(EvidenciaFotografica.fecha_captura))).all()
     
     return {
         "evolucion_id": evolucion_id,
@@ -145,16 +153,16 @@ async def list_evidencias_by_evolucion(
 async def get_evidencia(
     evidencia_id: int,
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Obtiene detalle de una evidencia fotográfica.
     
     **Permisos:** Solo Admin y Podologo
     """
-    evidencia = db.query(EvidenciaFotografica).filter(
+    evidencia = await db.scalar(select(EvidenciaFotografica).where(
         EvidenciaFotografica.id_evidencia == evidencia_id
-    ).first()
+    ))
     
     if not evidencia:
         raise HTTPException(
@@ -163,9 +171,9 @@ async def get_evidencia(
         )
     
     # Verificar acceso via evolución
-    evolucion = db.query(EvolucionClinica).filter(
+    evolucion = await db.scalar(select(EvolucionClinica).where(
         EvolucionClinica.id_evolucion == evidencia.evolucion_id
-    ).first()
+    ))
     
     if evolucion and current_user.clinica_id and evolucion.id_clinica != current_user.clinica_id:
         raise HTTPException(
@@ -184,7 +192,7 @@ async def get_evidencia(
 async def list_evidencias_by_tratamiento(
     tratamiento_id: int,
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Lista todas las evidencias de un tratamiento (todas sus evoluciones).
@@ -194,9 +202,9 @@ async def list_evidencias_by_tratamiento(
     from backend.schemas.core.models import Tratamiento
     
     # Verificar que el tratamiento existe
-    tratamiento = db.query(Tratamiento).filter(
+    tratamiento = await db.scalar(select(Tratamiento).where(
         Tratamiento.id_tratamiento == tratamiento_id
-    ).first()
+    ))
     
     if not tratamiento:
         raise HTTPException(
@@ -212,16 +220,16 @@ async def list_evidencias_by_tratamiento(
         )
     
     # Obtener todas las evoluciones del tratamiento
-    evoluciones = db.query(EvolucionClinica).filter(
+    evoluciones = (await db.scalars(select(EvolucionClinica).where(
         EvolucionClinica.tratamiento_id == tratamiento_id
-    ).all()
+    ))).all()
     
     evolucion_ids = [e.id_evolucion for e in evoluciones]
     
     # Obtener todas las evidencias de esas evoluciones
-    evidencias = db.query(EvidenciaFotografica).filter(
+    evidencias = (await db.scalars(select(EvidenciaFotografica).where(
         EvidenciaFotografica.evolucion_id.in_(evolucion_ids)
-    ).order_by(EvidenciaFotografica.fecha_captura).all()
+    ).order_by(EvidenciaFotografica.fecha_captura))).all()
     
     return {
         "tratamiento_id": tratamiento_id,
@@ -239,7 +247,7 @@ async def list_evidencias_by_tratamiento(
 async def create_evidencia(
     data: EvidenciaCreate,
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Registra una nueva evidencia fotográfica.
@@ -256,9 +264,9 @@ async def create_evidencia(
     Para subir archivos binarios, usar el endpoint /evidencias/upload.
     """
     # Verificar que la evolución existe
-    evolucion = db.query(EvolucionClinica).filter(
+    evolucion = await db.scalar(select(EvolucionClinica).where(
         EvolucionClinica.id_evolucion == data.evolucion_id
-    ).first()
+    ))
     
     if not evolucion:
         raise HTTPException(
@@ -284,8 +292,8 @@ async def create_evidencia(
     )
     
     db.add(evidencia)
-    db.commit()
-    db.refresh(evidencia)
+    await db.commit()
+    await db.refresh(evidencia)
     
     return EvidenciaResponse.model_validate(evidencia)
 
@@ -299,16 +307,16 @@ async def update_evidencia(
     evidencia_id: int,
     observaciones: Optional[str] = None,
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Actualiza las observaciones de una evidencia.
     
     **Permisos:** Solo Admin y Podologo
     """
-    evidencia = db.query(EvidenciaFotografica).filter(
+    evidencia = await db.scalar(select(EvidenciaFotografica).where(
         EvidenciaFotografica.id_evidencia == evidencia_id
-    ).first()
+    ))
     
     if not evidencia:
         raise HTTPException(
@@ -317,9 +325,9 @@ async def update_evidencia(
         )
     
     # Verificar acceso via evolución
-    evolucion = db.query(EvolucionClinica).filter(
+    evolucion = await db.scalar(select(EvolucionClinica).where(
         EvolucionClinica.id_evolucion == evidencia.evolucion_id
-    ).first()
+    ))
     
     if evolucion and current_user.clinica_id and evolucion.id_clinica != current_user.clinica_id:
         raise HTTPException(
@@ -331,8 +339,8 @@ async def update_evidencia(
     if observaciones is not None:
         evidencia.observaciones = observaciones
     
-    db.commit()
-    db.refresh(evidencia)
+    await db.commit()
+    await db.refresh(evidencia)
     
     return {
         "message": "Evidencia actualizada",
@@ -351,7 +359,7 @@ async def upload_evidencia(
     observaciones: Optional[str] = Form(None),
     file: UploadFile = File(...),
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Sube una foto de evidencia clínica.
@@ -373,9 +381,9 @@ async def upload_evidencia(
     En producción, considera usar S3 o similar.
     """
     # Verificar que la evolución existe
-    evolucion = db.query(EvolucionClinica).filter(
+    evolucion = await db.scalar(select(EvolucionClinica).where(
         EvolucionClinica.id_evolucion == evolucion_id
-    ).first()
+    ))
     
     if not evolucion:
         raise HTTPException(
@@ -465,8 +473,8 @@ async def upload_evidencia(
     )
     
     db.add(evidencia)
-    db.commit()
-    db.refresh(evidencia)
+    await db.commit()
+    await db.refresh(evidencia)
     
     return {
         "message": "Evidencia subida exitosamente",
@@ -482,7 +490,7 @@ async def upload_evidencia(
 async def delete_evidencia(
     evidencia_id: int,
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Elimina una evidencia fotográfica.
@@ -491,9 +499,9 @@ async def delete_evidencia(
     
     **Nota:** También intenta eliminar el archivo físico si existe.
     """
-    evidencia = db.query(EvidenciaFotografica).filter(
+    evidencia = await db.scalar(select(EvidenciaFotografica).where(
         EvidenciaFotografica.id_evidencia == evidencia_id
-    ).first()
+    ))
     
     if not evidencia:
         raise HTTPException(
@@ -502,9 +510,9 @@ async def delete_evidencia(
         )
     
     # Verificar acceso via evolución
-    evolucion = db.query(EvolucionClinica).filter(
+    evolucion = await db.scalar(select(EvolucionClinica).where(
         EvolucionClinica.id_evolucion == evidencia.evolucion_id
-    ).first()
+    ))
     
     if evolucion and current_user.clinica_id and evolucion.id_clinica != current_user.clinica_id:
         raise HTTPException(
@@ -520,7 +528,7 @@ async def delete_evidencia(
             pass  # Ignorar errores al eliminar archivo
     
     # Eliminar registro
-    db.delete(evidencia)
-    db.commit()
+    await db.delete(evidencia)
+    await db.commit()
     
     return {"message": "Evidencia eliminada", "id": evidencia_id}
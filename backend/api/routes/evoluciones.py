@@ -13,16 +13,18 @@
 # PERMISOS: Solo Admin y Podologo (datos clínicos)
 # =============================================================================
 
-from typing import List, Optional, Any
+from typing import List, Optional, Any, Sequence
 from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
 from pydantic import BaseModel, Field
 
 from backend.api.deps.database import get_core_db
 from backend.api.deps.permissions import require_role, CLINICAL_ROLES, ROLE_ADMIN
 from backend.schemas.auth.models import SysUsuario
 from backend.schemas.core.models import EvolucionClinica, Tratamiento, EvidenciaFotografica
+from backend.api.utils.pagination import count_total
 
 
 # =============================================================================
@@ -95,17 +97,39 @@ class EvolucionResponse(BaseModel):
 # HELPERS
 # =============================================================================
 
-def enrich_evolucion_response(evolucion: EvolucionClinica, db: Session) -> dict:
-    """Agrega conteo de evidencias fotográficas"""
-    response = EvolucionResponse.model_validate(evolucion).model_dump()
+async def enrich_evoluciones_response(
+    evoluciones: Sequence[EvolucionClinica], db: AsyncSession
+) -> List[dict]:
+    """
+    Agrega conteo de evidencias fotográficas a una página de evoluciones.
+    
+    Un solo COUNT agrupado por evolución sobre los ids de la página.
+    """
+    ids = [e.id_evolucion for e in evoluciones]
+    conteos = {}
+    if ids:
+        rows = await db.execute(
+            select(
+                EvidenciaFotografica.evolucion_id,
+                func.count(EvidenciaFotografica.id_evidencia),
+            )
+            .where(EvidenciaFotografica.evolucion_id.in_(ids))
+            .group_by(EvidenciaFotografica.evolucion_id)
+        )
+        conteos = dict(rows.all())
     
-    # Contar evidencias
-    total_evidencias = db.query(EvidenciaFotografica).filter(
-        EvidenciaFotografica.evolucion_id == evolucion.id_evolucion
-    ).count()
-    response["total_evidencias"] = total_evidencias
+    responses = []
+    for evolucion in evoluciones:
+        response = EvolucionResponse.model_validate(evolucion).model_dump()
+        response["total_evidencias"] = conteos.get(evolucion.id_evolucion, 0)
+        responses.append(response)
     
-    return response
+    return responses
+
+
+async def enrich_evolucion_response(evolucion: EvolucionClinica, db: AsyncSession) -> dict:
+    """Agrega conteo de evidencias fotográficas"""
+    return (await enrich_evoluciones_response([evolucion], db))[0]
 
 
 # =============================================================================
@@ -119,7 +143,7 @@ async def list_evoluciones(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Lista evoluciones clínicas.
@@ -130,27 +154,27 @@ async def list_evoluciones(
     - tratamiento_id: Filtrar por tratamiento
     - podologo_id: Filtrar por podólogo que atendió
     """
-    query = db.query(EvolucionClinica)
+    query = select(EvolucionClinica)
     
     # Filtrar por clínica
     if current_user.clinica_id:
-        query = query.filter(EvolucionClinica.id_clinica == current_user.clinica_id)
+        query = query.where(EvolucionClinica.id_clinica == current_user.clinica_id)
     
     # Aplicar filtros
     if tratamiento_id:
-        query = query.filter(EvolucionClinica.tratamiento_id == tratamiento_id)
+        query = query.where(EvolucionClinica.tratamiento_id == tratamiento_id)
     if podologo_id:
-        query = query.filter(EvolucionClinica.podologo_id == podologo_id)
+        query = query.where(EvolucionClinica.podologo_id == podologo_id)
     
     # Ordenar por más reciente
     query = query.order_by(EvolucionClinica.fecha_visita.desc())
     
-    total = query.count()
-    evoluciones = query.offset(skip).limit(limit).all()
+    total = await count_total(db, query)
+    evoluciones = (await db.scalars(query.offset(skip).limit(limit))).all()
     
     return {
         "total": total,
-        "evoluciones": [enrich_evolucion_response(e, db) for e in evoluciones]
+        "evoluciones": await enrich_evoluciones_response(evoluciones, db)
     }
 
 
@@ -162,16 +186,16 @@ async def list_evoluciones(
 async def get_evolucion(
     evolucion_id: int,
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Obtiene detalle de una evolución clínica.
     
     **Permisos:** Solo Admin y Podologo
     """
-    evolucion = db.query(EvolucionClinica).filter(
-        EvolucionClinica.id_evolucion == evolucion_id
-    ).first()
+    evolucion = await db.scalar(
+        select(EvolucionClinica).where(EvolucionClinica.id_evolucion == evolucion_id)
+    )
     
     if not evolucion:
         raise HTTPException(
@@ -186,12 +210,14 @@ async def get_evolucion(
             detail="No tienes acceso a esta evolución"
         )
     
-    response = enrich_evolucion_response(evolucion, db)
+    response = await enrich_evolucion_response(evolucion, db)
     
     # Agregar lista de evidencias
-    evidencias = db.query(EvidenciaFotografica).filter(
-        EvidenciaFotografica.evolucion_id == evolucion_id
-    ).all()
+    evidencias = (await db.scalars(
+        select(EvidenciaFotografica).where(
+            EvidenciaFotografica.evolucion_id == evolucion_id
+        )
+    )).all()
     
     response["evidencias"] = [
         {
@@ -214,7 +240,7 @@ async def get_evolucion(
 async def create_evolucion(
     data: EvolucionCreate,
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Crea una nueva evolución clínica (nota SOAP).
@@ -228,10 +254,12 @@ async def create_evolucion(
     - plan_texto: Plan de tratamiento
     """
     # Verificar que el tratamiento existe
-    tratamiento = db.query(Tratamiento).filter(
-        Tratamiento.id_tratamiento == data.tratamiento_id,
-        Tratamiento.deleted_at.is_(None)
-    ).first()
+    tratamiento = await db.scalar(
+        select(Tratamiento).where(
+            Tratamiento.id_tratamiento == data.tratamiento_id,
+            Tratamiento.deleted_at.is_(None)
+        )
+    )
     
     if not tratamiento:
         raise HTTPException(
@@ -255,10 +283,10 @@ async def create_evolucion(
     )
     
     db.add(evolucion)
-    db.commit()
-    db.refresh(evolucion)
+    await db.commit()
+    await db.refresh(evolucion)
     
-    return enrich_evolucion_response(evolucion, db)
+    return await enrich_evolucion_response(evolucion, db)
 
 
 # =============================================================================
@@ -270,7 +298,7 @@ async def update_evolucion(
     evolucion_id: int,
     data: EvolucionUpdate,
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Actualiza una evolución clínica.
@@ -280,9 +308,9 @@ async def update_evolucion(
     **Nota:** Tanto Santiago como Ibeth pueden editar notas del otro
     (trabajo colaborativo según los requerimientos).
     """
-    evolucion = db.query(EvolucionClinica).filter(
-        EvolucionClinica.id_evolucion == evolucion_id
-    ).first()
+    evolucion = await db.scalar(
+        select(EvolucionClinica).where(EvolucionClinica.id_evolucion == evolucion_id)
+    )
     
     if not evolucion:
         raise HTTPException(
@@ -303,10 +331,10 @@ async def update_evolucion(
     for field, value in update_data.items():
         setattr(evolucion, field, value)
     
-    db.commit()
-    db.refresh(evolucion)
+    await db.commit()
+    await db.refresh(evolucion)
     
-    return enrich_evolucion_response(evolucion, db)
+    return await enrich_evolucion_response(evolucion, db)
 
 
 # =============================================================================
@@ -317,7 +345,7 @@ async def update_evolucion(
 async def delete_evolucion(
     evolucion_id: int,
     current_user: SysUsuario = Depends(require_role([ROLE_ADMIN])),  # Solo Admin
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Elimina una evolución clínica.
@@ -326,9 +354,9 @@ async def delete_evolucion(
     
     ⚠️ Esta acción elimina también las evidencias fotográficas asociadas.
     """
-    evolucion = db.query(EvolucionClinica).filter(
-        EvolucionClinica.id_evolucion == evolucion_id
-    ).first()
+    evolucion = await db.scalar(
+        select(EvolucionClinica).where(EvolucionClinica.id_evolucion == evolucion_id)
+    )
     
     if not evolucion:
         raise HTTPException(
@@ -344,7 +372,7 @@ async def delete_evolucion(
         )
     
     # Eliminar (CASCADE eliminará evidencias)
-    db.delete(evolucion)
-    db.commit()
+    await db.delete(evolucion)
+    await db.commit()
     
     return {"message": "Evolución eliminada", "id": evolucion_id}
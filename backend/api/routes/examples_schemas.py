@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from typing import Any
 
 from backend.api.deps.database import get_core_db
@@ -14,9 +15,9 @@ router = APIRouter(prefix="/examples", tags=["Examples"])
 
 
 @router.post("/pacientes", response_model=PacienteResponse, status_code=status.HTTP_201_CREATED)
-def create_paciente(
+async def create_paciente(
     paciente_in: PacienteCreate,
-    db: Session = Depends(get_core_db),
+    db: AsyncSession = Depends(get_core_db),
     current_user: SysUsuario = Depends(get_current_active_user)
 ):
     """Crear paciente de ejemplo usando `PacienteCreate` y validaciones Pydantic."""
@@ -29,19 +30,19 @@ def create_paciente(
         email=paciente_in.email
     )
     db.add(paciente)
-    db.commit()
-    db.refresh(paciente)
+    await db.commit()
+    await db.refresh(paciente)
     return paciente
 
 
 @router.put("/pacientes/{id}", response_model=PacienteResponse)
-def update_paciente(
+async def update_paciente(
     id: int,
     paciente_in: PacienteUpdate,
-    db: Session = Depends(get_core_db),
+    db: AsyncSession = Depends(get_core_db),
     current_user: SysUsuario = Depends(get_current_active_user)
 ):
-    paciente = db.query(Paciente).filter(Paciente.id_paciente == id).first()
+    paciente = await db.scalar(select(Paciente).where(Paciente.id_paciente == id))
     if paciente is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Paciente no encontrado")
 
@@ -50,19 +51,19 @@ def update_paciente(
         setattr(paciente, field, value)
 
     db.add(paciente)
-    db.commit()
-    db.refresh(paciente)
+    await db.commit()
+    await db.refresh(paciente)
     return paciente
 
 
 @router.post("/tratamientos", status_code=status.HTTP_201_CREATED)
-def create_tratamiento(
+async def create_tratamiento(
     tr_in: TratamientoCreate,
-    db: Session = Depends(get_core_db),
+    db: AsyncSession = Depends(get_core_db),
     current_user: SysUsuario = Depends(get_current_active_user)
 ):
     # Validar existencia de paciente (FK virtual dentro de la misma BD)
-    paciente = db.query(Paciente).filter(Paciente.id_paciente == tr_in.paciente_id).first()
+    paciente = await db.scalar(select(Paciente).where(Paciente.id_paciente == tr_in.paciente_id))
     if paciente is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="paciente_id inválido")
 
@@ -72,6 +73,6 @@ def create_tratamiento(
         fecha_inicio=tr_in.fecha_inicio
     )
     db.add(tr)
-    db.commit()
-    db.refresh(tr)
+    await db.commit()
+    await db.refresh(tr)
     return {"id_tratamiento": tr.id_tratamiento, "paciente_id": tr.paciente_id}
@@ -1,5 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from decimal import Decimal
 
 from backend.api.deps.database import get_ops_db, get_core_db
@@ -12,39 +15,56 @@ from backend.schemas.finance.schemas import (
 )
 from backend.schemas.auth.models import SysUsuario
 from backend.schemas.core.models import Paciente
+from backend.api.utils.cache import invalidate_dashboard_cache
+from backend.api.utils.pagination import keyset_paginate
 
 router = APIRouter(prefix="/finance", tags=["Finance"])
 
 
 @router.get("/metodos", response_model=list[MetodoPagoResponse])
-def list_metodos(db: Session = Depends(get_ops_db)):
-    ms = db.query(fin_models.MetodoPago).filter(fin_models.MetodoPago.activo == True).all()
+async def list_metodos(db: AsyncSession = Depends(get_ops_db)):
+    ms = (await db.scalars(select(fin_models.MetodoPago).where(fin_models.MetodoPago.activo == True))).all()
     return ms
 
 
 @router.post("/metodos", response_model=MetodoPagoResponse, status_code=status.HTTP_201_CREATED)
-def create_metodo(m_in: MetodoPagoCreate, db: Session = Depends(get_ops_db), user: SysUsuario = Depends(get_current_active_user)):
+async def create_metodo(m_in: MetodoPagoCreate, db: AsyncSession = Depends(get_ops_db), user: SysUsuario = Depends(get_current_active_user)):
     metodo = fin_models.MetodoPago(nombre=m_in.nombre)
     db.add(metodo)
-    db.commit()
-    db.refresh(metodo)
+    await db.commit()
+    await db.refresh(metodo)
     return metodo
 
 
 @router.get("/pagos", response_model=list[PagoResponse])
-def list_pagos(skip: int = 0, limit: int = 100, db: Session = Depends(get_ops_db), user: SysUsuario = Depends(get_current_active_user)):
+async def list_pagos(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Valor del header X-Next-Cursor de la página anterior"),
+    db: AsyncSession = Depends(get_ops_db),
+    user: SysUsuario = Depends(get_current_active_user),
+):
     """
     Lista todos los pagos.
+    
+    El cuerpo sigue siendo una lista; el cursor de la página siguiente se
+    devuelve en el header `X-Next-Cursor` (ausente en la última página).
     """
-    pagos = db.query(fin_models.Pago).order_by(fin_models.Pago.fecha_emision.desc()).offset(skip).limit(limit).all()
+    pagos, next_cursor = await keyset_paginate(
+        db, select(fin_models.Pago), (fin_models.Pago.fecha_emision, fin_models.Pago.id_pago), limit,
+        cursor=cursor, offset=skip, descending=True,
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return pagos
 
 
 @router.post("/pagos", response_model=PagoResponse, status_code=status.HTTP_201_CREATED)
-def create_pago(p_in: PagoCreate, db_ops: Session = Depends(get_ops_db), db_core: Session = Depends(get_core_db), user: SysUsuario = Depends(get_current_active_user)):
+async def create_pago(p_in: PagoCreate, db_ops: AsyncSession = Depends(get_ops_db), db_core: AsyncSession = Depends(get_core_db), user: SysUsuario = Depends(get_current_active_user)):
     # Validar que paciente existe en core DB usando ORM (compatible con test y prod)
     try:
-        paciente_obj = db_core.query(Paciente).filter(Paciente.id_paciente == p_in.paciente_id).first()
+        paciente_obj = await db_core.scalar(select(Paciente).where(Paciente.id_paciente == p_in.paciente_id))
     except Exception as e:
         # En test, si la tabla no existe o hay otro error, fallar
         paciente_obj = None
@@ -61,28 +81,29 @@ def create_pago(p_in: PagoCreate, db_ops: Session = Depends(get_ops_db), db_core
         notas=p_in.notas
     )
     db_ops.add(pago)
-    db_ops.commit()
-    db_ops.refresh(pago)
+    await db_ops.commit()
+    invalidate_dashboard_cache(pago.id_clinica)
+    await db_ops.refresh(pago)
     return pago
 
 
 @router.get("/pagos/{id}", response_model=PagoResponse)
-def get_pago(id: int, db: Session = Depends(get_ops_db)):
-    pago = db.query(fin_models.Pago).filter(fin_models.Pago.id_pago == id).first()
+async def get_pago(id: int, db: AsyncSession = Depends(get_ops_db)):
+    pago = await db.scalar(select(fin_models.Pago).where(fin_models.Pago.id_pago == id))
     if not pago:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Pago no encontrado")
     return pago
 
 
 @router.post("/pagos/{id}/transacciones", response_model=TransaccionResponse, status_code=status.HTTP_201_CREATED)
-def add_transaccion(id: int, t_in: TransaccionCreate, db_ops: Session = Depends(get_ops_db), user: SysUsuario = Depends(get_current_active_user)):
+async def add_transaccion(id: int, t_in: TransaccionCreate, db_ops: AsyncSession = Depends(get_ops_db), user: SysUsuario = Depends(get_current_active_user)):
     # Validate pago
-    pago = db_ops.query(fin_models.Pago).filter(fin_models.Pago.id_pago == id).first()
+    pago = await db_ops.scalar(select(fin_models.Pago).where(fin_models.Pago.id_pago == id))
     if not pago:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Pago no encontrado")
 
     # Validate metodo
-    metodo = db_ops.query(fin_models.MetodoPago).filter(fin_models.MetodoPago.id_metodo == t_in.metodo_pago_id).first()
+    metodo = await db_ops.scalar(select(fin_models.MetodoPago).where(fin_models.MetodoPago.id_metodo == t_in.metodo_pago_id))
     if not metodo:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="metodo_pago_id inválido")
 
@@ -106,6 +127,7 @@ def add_transaccion(id: int, t_in: TransaccionCreate, db_ops: Session = Depends(
         pago.status_pago = 'Parcial'
 
     db_ops.add(pago)
-    db_ops.commit()
-    db_ops.refresh(trans)
+    await db_ops.commit()
+    invalidate_dashboard_cache(pago.id_clinica)
+    await db_ops.refresh(trans)
     return trans
@@ -4,8 +4,8 @@
 # =============================================================================
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, desc, select
 from typing import List, Optional
 from datetime import datetime
 
@@ -34,11 +34,11 @@ router = APIRouter(prefix="/historial", tags=["Historial Detalles"])
 async def crear_alergia(
     alergia: AlergiaCreate,
     current_user: SysUsuario = Depends(get_current_active_user),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """Crear una nueva alergia para un historial médico."""
     # Validar que el historial existe
-    historial = db.query(HistorialMedicoGeneral).filter_by(id_historial=alergia.id_historial).first()
+    historial = await db.scalar(select(HistorialMedicoGeneral).filter_by(id_historial=alergia.id_historial))
     if not historial:
         raise HTTPException(status_code=404, detail="Historial no encontrado")
     
@@ -50,8 +50,8 @@ async def crear_alergia(
         created_by=current_user.id_usuario
     )
     db.add(db_alergia)
-    db.commit()
-    db.refresh(db_alergia)
+    await db.commit()
+    await db.refresh(db_alergia)
     return db_alergia
 
 @router.get("/alergias", response_model=List[AlergiaResponse])
@@ -62,30 +62,30 @@ async def listar_alergias(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     current_user: SysUsuario = Depends(get_current_active_user),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """Listar alergias con filtros opcionales."""
-    query = db.query(Alergia).filter(Alergia.deleted_at.is_(None))
+    query = select(Alergia).where(Alergia.deleted_at.is_(None))
     
     if id_historial:
-        query = query.filter(Alergia.id_historial == id_historial)
+        query = query.where(Alergia.id_historial == id_historial)
     if nombre:
-        query = query.filter(Alergia.nombre.ilike(f"%{nombre}%"))
+        query = query.where(Alergia.nombre.ilike(f"%{nombre}%"))
     if tipo:
-        query = query.filter(Alergia.tipo == tipo)
+        query = query.where(Alergia.tipo == tipo)
     
-    return query.offset(skip).limit(limit).all()
+    return (await db.scalars(query.offset(skip).limit(limit))).all()
 
 @router.get("/alergias/{id_alergia}", response_model=AlergiaResponse)
 async def obtener_alergia(
     id_alergia: int,
     current_user: SysUsuario = Depends(get_current_active_user),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """Obtener una alergia por ID."""
-    alergia = db.query(Alergia).filter(
+    alergia = await db.scalar(select(Alergia).where(
         and_(Alergia.id_alergia == id_alergia, Alergia.deleted_at.is_(None))
-    ).first()
+    ))
     if not alergia:
         raise HTTPException(status_code=404, detail="Alergia no encontrada")
     return alergia
@@ -95,12 +95,12 @@ async def actualizar_alergia(
     id_alergia: int,
     alergia_update: AlergiaUpdate,
     current_user: SysUsuario = Depends(get_current_active_user),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """Actualizar una alergia."""
-    alergia = db.query(Alergia).filter(
+    alergia = await db.scalar(select(Alergia).where(
         and_(Alergia.id_alergia == id_alergia, Alergia.deleted_at.is_(None))
-    ).first()
+    ))
     if not alergia:
         raise HTTPException(status_code=404, detail="Alergia no encontrada")
     
@@ -109,26 +109,26 @@ async def actualizar_alergia(
         setattr(alergia, field, value)
     alergia.updated_by = current_user.id_usuario
     
-    db.commit()
-    db.refresh(alergia)
+    await db.commit()
+    await db.refresh(alergia)
     return alergia
 
 @router.delete("/alergias/{id_alergia}", status_code=status.HTTP_204_NO_CONTENT)
 async def eliminar_alergia(
     id_alergia: int,
     current_user: SysUsuario = Depends(get_current_active_user),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """Soft delete de una alergia."""
-    alergia = db.query(Alergia).filter(
+    alergia = await db.scalar(select(Alergia).where(
         and_(Alergia.id_alergia == id_alergia, Alergia.deleted_at.is_(None))
-    ).first()
+    ))
     if not alergia:
         raise HTTPException(status_code=404, detail="Alergia no encontrada")
     
     alergia.deleted_at = datetime.utcnow()
     alergia.updated_by = current_user.id_usuario
-    db.commit()
+    await db.commit()
 
 # =============================================================================
 # ENDPOINTS: SUPLEMENTOS
@@ -138,10 +138,10 @@ async def eliminar_alergia(
 async def crear_suplemento(
     suplemento: SuplementoCreate,
     current_user: SysUsuario = Depends(get_current_active_user),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """Crear un nuevo suplemento para un historial médico."""
-    historial = db.query(HistorialMedicoGeneral).filter_by(id_historial=suplemento.id_historial).first()
+    historial = await db.scalar(select(HistorialMedicoGeneral).filter_by(id_historial=suplemento.id_historial))
     if not historial:
         raise HTTPException(status_code=404, detail="Historial no encontrado")
     
@@ -153,8 +153,8 @@ async def crear_suplemento(
         created_by=current_user.id_usuario
     )
     db.add(db_suplemento)
-    db.commit()
-    db.refresh(db_suplemento)
+    await db.commit()
+    await db.refresh(db_suplemento)
     return db_suplemento
 
 @router.get("/suplementos", response_model=List[SuplementoResponse])
@@ -164,28 +164,28 @@ async def listar_suplementos(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     current_user: SysUsuario = Depends(get_current_active_user),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """Listar suplementos con filtros opcionales."""
-    query = db.query(Suplemento).filter(Suplemento.deleted_at.is_(None))
+    query = select(Suplemento).where(Suplemento.deleted_at.is_(None))
     
     if id_historial:
-        query = query.filter(Suplemento.id_historial == id_historial)
+        query = query.where(Suplemento.id_historial == id_historial)
     if nombre:
-        query = query.filter(Suplemento.nombre.ilike(f"%{nombre}%"))
+        query = query.where(Suplemento.nombre.ilike(f"%{nombre}%"))
     
-    return query.offset(skip).limit(limit).all()
+    return (await db.scalars(query.offset(skip).limit(limit))).all()
 
 @router.get("/suplementos/{id_suplemento}", response_model=SuplementoResponse)
 async def obtener_suplemento(
     id_suplemento: int,
     current_user: SysUsuario = Depends(get_current_active_user),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """Obtener un suplemento por ID."""
-    suplemento = db.query(Suplemento).filter(
+    suplemento = await db.scalar(select(Suplemento).where(
         and_(Suplemento.id_suplemento == id_suplemento, Suplemento.deleted_at.is_(None))
-    ).first()
+    ))
     if not suplemento:
         raise HTTPException(status_code=404, detail="Suplemento no encontrado")
     return suplemento
@@ -195,12 +195,12 @@ async def actualizar_suplemento(
     id_suplemento: int,
     suplemento_update: SuplementoUpdate,
     current_user: SysUsuario = Depends(get_current_active_user),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """Actualizar un suplemento."""
-    suplemento = db.query(Suplemento).filter(
+    suplemento = await db.scalar(select(Suplemento).where(
         and_(Suplemento.id_suplemento == id_suplemento, Suplemento.deleted_at.is_(None))
-    ).first()
+    ))
     if not suplemento:
         raise HTTPException(status_code=404, detail="Suplemento no encontrado")
     
@@ -209,26 +209,26 @@ async def actualizar_suplemento(
         setattr(suplemento, field, value)
     suplemento.updated_by = current_user.id_usuario
     
-    db.commit()
-    db.refresh(suplemento)
+    await db.commit()
+    await db.refresh(suplemento)
     return suplemento
 
 @router.delete("/suplementos/{id_suplemento}", status_code=status.HTTP_204_NO_CONTENT)
 async def eliminar_suplemento(
     id_suplemento: int,
     current_user: SysUsuario = Depends(get_current_active_user),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """Soft delete de un suplemento."""
-    suplemento = db.query(Suplemento).filter(
+    suplemento = await db.scalar(select(Suplemento).where(
         and_(Suplemento.id_suplemento == id_suplemento, Suplemento.deleted_at.is_(None))
-    ).first()
+    ))
     if not suplemento:
         raise HTTPException(status_code=404, detail="Suplemento no encontrado")
     
     suplemento.deleted_at = datetime.utcnow()
     suplemento.updated_by = current_user.id_usuario
-    db.commit()
+    await db.commit()
 
 # =============================================================================
 # ENDPOINTS: ANTECEDENTES NO PATOLÓGICOS
@@ -238,10 +238,10 @@ async def eliminar_suplemento(
 async def crear_antecedente(
     antecedente: AntecedenteNoPatologicoCreate,
     current_user: SysUsuario = Depends(get_current_active_user),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """Crear un nuevo antecedente no patológico."""
-    historial = db.query(HistorialMedicoGeneral).filter_by(id_historial=antecedente.id_historial).first()
+    historial = await db.scalar(select(HistorialMedicoGeneral).filter_by(id_historial=antecedente.id_historial))
     if not historial:
         raise HTTPException(status_code=404, detail="Historial no encontrado")
     
@@ -252,8 +252,8 @@ async def crear_antecedente(
         created_by=current_user.id_usuario
     )
     db.add(db_antecedente)
-    db.commit()
-    db.refresh(db_antecedente)
+    await db.commit()
+    await db.refresh(db_antecedente)
     return db_antecedente
 
 @router.get("/antecedentes-no-patologicos", response_model=List[AntecedenteNoPatologicoResponse])
@@ -263,28 +263,28 @@ async def listar_antecedentes(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     current_user: SysUsuario = Depends(get_current_active_user),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """Listar antecedentes no patológicos con filtros opcionales."""
-    query = db.query(AntecedenteNoPatologico).filter(AntecedenteNoPatologico.deleted_at.is_(None))
+    query = select(AntecedenteNoPatologico).where(AntecedenteNoPatologico.deleted_at.is_(None))
     
     if id_historial:
-        query = query.filter(AntecedenteNoPatologico.id_historial == id_historial)
+        query = query.where(AntecedenteNoPatologico.id_historial == id_historial)
     if tipo:
-        query = query.filter(AntecedenteNoPatologico.tipo == tipo)
+        query = query.where(AntecedenteNoPatologico.tipo == tipo)
     
-    return query.offset(skip).limit(limit).all()
+    return (await db.scalars(query.offset(skip).limit(limit))).all()
 
 @router.get("/antecedentes-no-patologicos/{id_antnp}", response_model=AntecedenteNoPatologicoResponse)
 async def obtener_antecedente(
     id_antnp: int,
     current_user: SysUsuario = Depends(get_current_active_user),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """Obtener un antecedente por ID."""
-    antecedente = db.query(AntecedenteNoPatologico).filter(
+    antecedente = await db.scalar(select(AntecedenteNoPatologico).where(
         and_(AntecedenteNoPatologico.id_antnp == id_antnp, AntecedenteNoPatologico.deleted_at.is_(None))
-    ).first()
+    ))
     if not antecedente:
         raise HTTPException(status_code=404, detail="Antecedente no encontrado")
     return antecedente
@@ -294,12 +294,12 @@ async def actualizar_antecedente(
     id_antnp: int,
     antecedente_update: AntecedenteNoPatologicoUpdate,
     current_user: SysUsuario = Depends(get_current_active_user),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """Actualizar un antecedente."""
-    antecedente = db.query(AntecedenteNoPatologico).filter(
+    antecedente = await db.scalar(select(AntecedenteNoPatologico).where(
         and_(AntecedenteNoPatologico.id_antnp == id_antnp, AntecedenteNoPatologico.deleted_at.is_(None))
-    ).first()
+    ))
     if not antecedente:
         raise HTTPException(status_code=404, detail="Antecedente no encontrado")
     
@@ -308,26 +308,26 @@ async def actualizar_antecedente(
         setattr(antecedente, field, value)
     antecedente.updated_by = current_user.id_usuario
     
-    db.commit()
-    db.refresh(antecedente)
+    await db.commit()
+    await db.refresh(antecedente)
     return antecedente
 
 @router.delete("/antecedentes-no-patologicos/{id_antnp}", status_code=status.HTTP_204_NO_CONTENT)
 async def eliminar_antecedente(
     id_antnp: int,
     current_user: SysUsuario = Depends(get_current_active_user),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """Soft delete de un antecedente."""
-    antecedente = db.query(AntecedenteNoPatologico).filter(
+    antecedente = await db.scalar(select(AntecedenteNoPatologico).where(
         and_(AntecedenteNoPatologico.id_antnp == id_antnp, AntecedenteNoPatologico.deleted_at.is_(None))
-    ).first()
+    ))
     if not antecedente:
         raise HTTPException(status_code=404, detail="Antecedente no encontrado")
     
     antecedente.deleted_at = datetime.utcnow()
     antecedente.updated_by = current_user.id_usuario
-    db.commit()
+    await db.commit()
 
 # =============================================================================
 # ENDPOINTS: CONVERSACIONES DIGITALES
@@ -337,10 +337,10 @@ async def eliminar_antecedente(
 async def crear_conversacion_digital(
     conversacion: ConversacionDigitalCreate,
     current_user: SysUsuario = Depends(get_current_active_user),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """Crear una nueva conversación digital."""
-    paciente = db.query(Paciente).filter_by(id_paciente=conversacion.id_paciente).first()
+    paciente = await db.scalar(select(Paciente).filter_by(id_paciente=conversacion.id_paciente))
     if not paciente:
         raise HTTPException(status_code=404, detail="Paciente no encontrado")
     
@@ -354,8 +354,8 @@ async def crear_conversacion_digital(
         created_by=current_user.id_usuario
     )
     db.add(db_conversacion)
-    db.commit()
-    db.refresh(db_conversacion)
+    await db.commit()
+    await db.refresh(db_conversacion)
     return db_conversacion
 
 @router.get("/conversaciones-digitales", response_model=List[ConversacionDigitalResponse])
@@ -366,30 +366,30 @@ async def listar_conversaciones_digitales(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
     current_user: SysUsuario = Depends(get_current_active_user),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """Listar conversaciones digitales con filtros opcionales."""
-    query = db.query(ConversacionDigital).filter(ConversacionDigital.deleted_at.is_(None))
+    query = select(ConversacionDigital).where(ConversacionDigital.deleted_at.is_(None))
     
     if id_paciente:
-        query = query.filter(ConversacionDigital.id_paciente == id_paciente)
+        query = query.where(ConversacionDigital.id_paciente == id_paciente)
     if canal:
-        query = query.filter(ConversacionDigital.canal == canal)
+        query = query.where(ConversacionDigital.canal == canal)
     if leido is not None:
-        query = query.filter(ConversacionDigital.leido == leido)
+        query = query.where(ConversacionDigital.leido == leido)
     
-    return query.order_by(desc(ConversacionDigital.fecha)).offset(skip).limit(limit).all()
+    return (await db.scalars(query.order_by(desc(ConversacionDigital.fecha)).offset(skip).limit(limit))).all()
 
 @router.get("/conversaciones-digitales/{id_conversacion}", response_model=ConversacionDigitalResponse)
 async def obtener_conversacion_digital(
     id_conversacion: int,
     current_user: SysUsuario = Depends(get_current_active_user),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """Obtener una conversación digital por ID."""
-    conversacion = db.query(ConversacionDigital).filter(
+    conversacion = await db.scalar(select(ConversacionDigital).where(
         and_(ConversacionDigital.id_conversacion == id_conversacion, ConversacionDigital.deleted_at.is_(None))
-    ).first()
+    ))
     if not conversacion:
         raise HTTPException(status_code=404, detail="Conversación no encontrada")
     return conversacion
@@ -399,12 +399,12 @@ async def actualizar_conversacion_digital(
     id_conversacion: int,
     conversacion_update: ConversacionDigitalUpdate,
     current_user: SysUsuario = Depends(get_current_active_user),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """Actualizar una conversación digital."""
-    conversacion = db.query(ConversacionDigital).filter(
+    conversacion = await db.scalar(select(ConversacionDigital).where(
         and_(ConversacionDigital.id_conversacion == id_conversacion, ConversacionDigital.deleted_at.is_(None))
-    ).first()
+    ))
     if not conversacion:
         raise HTTPException(status_code=404, detail="Conversación no encontrada")
     
@@ -413,23 +413,23 @@ async def actualizar_conversacion_digital(
         setattr(conversacion, field, value)
     conversacion.updated_by = current_user.id_usuario
     
-    db.commit()
-    db.refresh(conversacion)
+    await db.commit()
+    await db.refresh(conversacion)
     return conversacion
 
 @router.delete("/conversaciones-digitales/{id_conversacion}", status_code=status.HTTP_204_NO_CONTENT)
 async def eliminar_conversacion_digital(
     id_conversacion: int,
     current_user: SysUsuario = Depends(get_current_active_user),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """Soft delete de una conversación digital."""
-    conversacion = db.query(ConversacionDigital).filter(
+    conversacion = await db.scalar(select(ConversacionDigital).where(
         and_(ConversacionDigital.id_conversacion == id_conversacion, ConversacionDigital.deleted_at.is_(None))
-    ).first()
+    ))
     if not conversacion:
         raise HTTPException(status_code=404, detail="Conversación no encontrada")
     
     conversacion.deleted_at = datetime.utcnow()
     conversacion.updated_by = current_user.id_usuario
-    db.commit()
+    await db.commit()
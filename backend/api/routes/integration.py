@@ -15,8 +15,8 @@
 from typing import Optional, List
 from datetime import datetime, date
 from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, select
 from pydantic import BaseModel
 import logging
 
@@ -65,7 +65,7 @@ class SaveTranscriptResponse(BaseModel):
 async def get_user_context(
     user_id: Optional[int] = None,
     current_user: SysUsuario = Depends(get_current_active_user),
-    db: Session = Depends(get_auth_db)
+    db: AsyncSession = Depends(get_auth_db)
 ):
     """
     Get user context for system prompt injection.
@@ -93,10 +93,10 @@ async def get_user_context(
     target_user_id = user_id if user_id is not None else current_user.id_usuario
     
     # Verify user exists
-    user = db.query(SysUsuario).filter(
+    user = await db.scalar(select(SysUsuario).where(
         SysUsuario.id_usuario == target_user_id,
         SysUsuario.activo == True
-    ).first()
+    ))
     
     if not user:
         raise HTTPException(
@@ -108,9 +108,9 @@ async def get_user_context(
     is_first_time = user.last_login is None
     
     # Get last activity from audit logs
-    last_activity = db.query(AuditLog).filter(
+    last_activity = await db.scalar(select(AuditLog).where(
         AuditLog.usuario_id == target_user_id
-    ).order_by(desc(AuditLog.timestamp_accion)).first()
+    ).order_by(desc(AuditLog.timestamp_accion)))
     
     # Build summary from recent activities
     summary = None
@@ -161,7 +161,7 @@ async def get_user_context(
 async def save_transcript(
     request: SaveTranscriptRequest,
     current_user: SysUsuario = Depends(get_current_active_user),
-    db: Session = Depends(get_auth_db)
+    db: AsyncSession = Depends(get_auth_db)
 ):
     """
     Save voice conversation transcripts in batch.
@@ -220,9 +220,9 @@ async def save_transcript(
     
     # Commit all transcripts at once
     try:
-        db.commit()
+        await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error committing transcripts: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -239,7 +239,7 @@ async def save_transcript(
 async def get_transcript_history(
     session_id: str,
     current_user: SysUsuario = Depends(get_current_active_user),
-    db: Session = Depends(get_auth_db)
+    db: AsyncSession = Depends(get_auth_db)
 ):
     """
     Get transcript history for a session.
@@ -257,10 +257,10 @@ async def get_transcript_history(
     Returns:
         List of transcripts for the session
     """
-    transcripts = db.query(VoiceTranscript).filter(
+    transcripts = (await db.scalars(select(VoiceTranscript).where(
         VoiceTranscript.session_id == session_id,
         VoiceTranscript.user_id == current_user.id_usuario
-    ).order_by(VoiceTranscript.timestamp).all()
+    ).order_by(VoiceTranscript.timestamp))).all()
     
     return {
         "session_id": session_id,
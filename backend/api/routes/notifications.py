@@ -8,22 +8,23 @@ This module provides endpoints for sending notifications.
 Includes:
 - Appointment reminder emails
 - Manual notifications
-- Bulk reminder sending
+- Bulk reminder sending (queued in ops.recordatorio_jobs, sent by the reminder worker)
 """
 
 from typing import Optional, List
 from datetime import date, time, datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, select, func
 from pydantic import BaseModel, Field, EmailStr
 
 from backend.api.deps.database import get_core_db, get_ops_db
 from backend.api.deps.permissions import require_role, CLINICAL_ROLES, ALL_ROLES
 from backend.schemas.auth.models import SysUsuario
 from backend.schemas.core.models import Paciente
-from backend.schemas.ops.models import Cita, Podologo, CatalogoServicio
+from backend.schemas.ops.models import Cita, Podologo, CatalogoServicio, RecordatorioJob
 from backend.api.utils.notifications import send_appointment_reminder
+from backend.api.utils.reminder_queue import schedule_reminders, CANCELADO
 
 
 # =============================================================================
@@ -65,8 +66,8 @@ async def send_appointment_reminder_endpoint(
     request: AppointmentReminderRequest,
     background_tasks: BackgroundTasks,
     current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
-    core_db: Session = Depends(get_core_db),
-    ops_db: Session = Depends(get_ops_db)
+    core_db: AsyncSession = Depends(get_core_db),
+    ops_db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Envía recordatorio de cita a un paciente.
@@ -82,9 +83,9 @@ async def send_appointment_reminder_endpoint(
     - Envío asíncrono en segundo plano
     """
     # Get appointment
-    cita = ops_db.query(Cita).filter(
+    cita = await ops_db.scalar(select(Cita).where(
         Cita.id_cita == request.cita_id
-    ).first()
+    ))
     
     if not cita:
         raise HTTPException(
@@ -114,9 +115,9 @@ async def send_appointment_reminder_endpoint(
             detail="La cita no tiene paciente asignado"
         )
     
-    paciente = core_db.query(Paciente).filter(
+    paciente = await core_db.scalar(select(Paciente).where(
         Paciente.id_paciente == cita.paciente_id
-    ).first()
+    ))
     
     if not paciente:
         raise HTTPException(
@@ -131,18 +132,18 @@ async def send_appointment_reminder_endpoint(
         )
     
     # Get podiatrist
-    podologo = ops_db.query(Podologo).filter(
+    podologo = await ops_db.scalar(select(Podologo).where(
         Podologo.id_podologo == cita.podologo_id
-    ).first()
+    ))
     
     podiatrist_name = podologo.nombre_completo if podologo else "Podólogo"
     
     # Get service
-    servicio = ops_db.query(CatalogoServicio).filter(
+    servicio = await ops_db.scalar(select(CatalogoServicio).where(
         CatalogoServicio.id_servicio == cita.servicio_id
-    ).first()
+    ))
     
-    service_name = servicio.nombre if servicio else "Consulta"
+    service_name = servicio.nombre_servicio if servicio else "Consulta"
     
     # Send reminder asynchronously
     patient_name = f"{paciente.nombres} {paciente.apellidos}"
@@ -179,10 +180,9 @@ async def send_appointment_reminder_endpoint(
 @router.post("/bulk-reminders", response_model=NotificationResponse)
 async def send_bulk_reminders(
     request: BulkReminderRequest,
-    background_tasks: BackgroundTasks,
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    core_db: Session = Depends(get_core_db),
-    ops_db: Session = Depends(get_ops_db)
+    core_db: AsyncSession = Depends(get_core_db),
+    ops_db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Envía recordatorios masivos para citas próximas.
@@ -197,7 +197,9 @@ async def send_bulk_reminders(
     **Funcionalidad:**
     - Busca citas en el rango de fechas especificado
     - Envía recordatorios solo a citas confirmadas o pendientes
-    - Envío asíncrono en segundo plano
+    - Encola los recordatorios en ops.recordatorio_jobs; el worker de
+      recordatorios los envía (el request no espera al SMTP y los envíos
+      sobreviven a un reinicio)
     
     **Ejemplo:**
     ```json
@@ -211,19 +213,17 @@ async def send_bulk_reminders(
     # Calculate target date
     target_date = date.today() + timedelta(days=request.days_ahead)
     
-    # Get appointments for target date
-    query = ops_db.query(Cita).filter(
-        Cita.fecha_cita == target_date,
-        Cita.status.in_(["Pendiente", "Confirmada"])
+    # Total de citas del día (incluye las que no tienen paciente)
+    citas_count = await ops_db.scalar(
+        select(func.count(Cita.id_cita)).where(
+            Cita.fecha_cita == target_date,
+            Cita.status.in_(["Pendiente", "Confirmada"]),
+            Cita.deleted_at.is_(None),
+            *([Cita.id_clinica == current_user.clinica_id] if current_user.clinica_id else [])
+        )
     )
     
-    # Filter by clinic if user has one
-    if current_user.clinica_id:
-        query = query.filter(Cita.id_clinica == current_user.clinica_id)
-    
-    citas = query.all()
-    
-    if not citas:
+    if not citas_count:
         return NotificationResponse(
             success=True,
             message=f"No hay citas para {target_date.strftime('%d/%m/%Y')}",
@@ -231,65 +231,25 @@ async def send_bulk_reminders(
             failed_count=0
         )
     
-    sent_count = 0
-    failed_count = 0
-    
-    # Send reminders for each appointment
-    for cita in citas:
-        try:
-            # Skip if no patient
-            if not cita.paciente_id:
-                failed_count += 1
-                continue
-            
-            # Get patient
-            paciente = core_db.query(Paciente).filter(
-                Paciente.id_paciente == cita.paciente_id
-            ).first()
-            
-            if not paciente or not paciente.email:
-                failed_count += 1
-                continue
-            
-            # Get podiatrist
-            podologo = ops_db.query(Podologo).filter(
-                Podologo.id_podologo == cita.podologo_id
-            ).first()
-            
-            podiatrist_name = podologo.nombre_completo if podologo else "Podólogo"
-            
-            # Get service
-            servicio = ops_db.query(CatalogoServicio).filter(
-                CatalogoServicio.id_servicio == cita.servicio_id
-            ).first()
-            
-            service_name = servicio.nombre if servicio else "Consulta"
-            
-            # Send reminder
-            patient_name = f"{paciente.nombres} {paciente.apellidos}"
-            
-            if request.send_email:
-                background_tasks.add_task(
-                    send_appointment_reminder,
-                    patient_name=patient_name,
-                    patient_email=paciente.email,
-                    appointment_date=cita.fecha_cita,
-                    appointment_time=cita.hora_inicio,
-                    podiatrist_name=podiatrist_name,
-                    service_name=service_name,
-                    notes=cita.notas_agendamiento
-                )
-                sent_count += 1
-            
-        except Exception as e:
-            print(f"Error sending reminder for cita {cita.id_cita}: {e}")
-            failed_count += 1
+    if not request.send_email:
+        return NotificationResponse(
+            success=True,
+            message="No se seleccionó ningún canal de envío",
+            sent_count=0,
+            failed_count=0
+        )
+    
+    # Los jobs quedan vencidos de inmediato; el worker de recordatorios los envía
+    result = await schedule_reminders(
+        core_db, ops_db, target_date, current_user.clinica_id, send_now=True
+    )
     
+    # Citas sin paciente o sin email cuentan como fallidas
     return NotificationResponse(
         success=True,
-        message=f"Recordatorios enviados para {target_date.strftime('%d/%m/%Y')}",
-        sent_count=sent_count,
-        failed_count=failed_count
+        message=f"Recordatorios encolados para {target_date.strftime('%d/%m/%Y')}",
+        sent_count=result.programados,
+        failed_count=citas_count - result.programados
     )
 
 
@@ -301,8 +261,8 @@ async def send_bulk_reminders(
 async def get_upcoming_reminders(
     days_ahead: int = Query(1, ge=0, le=7, description="Días de anticipación"),
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    core_db: Session = Depends(get_core_db),
-    ops_db: Session = Depends(get_ops_db)
+    core_db: AsyncSession = Depends(get_core_db),
+    ops_db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Lista citas que necesitan recordatorios.
@@ -313,44 +273,45 @@ async def get_upcoming_reminders(
     - days_ahead: Días de anticipación (0-7)
     
     **Retorna:**
-    Lista de citas con información de paciente para enviar recordatorios.
+    Lista de citas con información de paciente para enviar recordatorios,
+    leída de los jobs precalculados (incluye el estado del recordatorio).
     """
     target_date = date.today() + timedelta(days=days_ahead)
     
-    # Get appointments
-    query = ops_db.query(Cita).filter(
-        Cita.fecha_cita == target_date,
-        Cita.status.in_(["Pendiente", "Confirmada"])
+    query = (
+        select(RecordatorioJob)
+        .where(
+            RecordatorioJob.fecha_cita == target_date,
+            RecordatorioJob.status != CANCELADO
+        )
+        .order_by(RecordatorioJob.hora_cita, RecordatorioJob.cita_id)
     )
-    
     if current_user.clinica_id:
-        query = query.filter(Cita.id_clinica == current_user.clinica_id)
-    
-    citas = query.all()
-    
-    result = []
-    for cita in citas:
-        if not cita.paciente_id:
-            continue
-        
-        paciente = core_db.query(Paciente).filter(
-            Paciente.id_paciente == cita.paciente_id
-        ).first()
-        
-        if not paciente:
-            continue
-        
-        result.append({
-            "cita_id": cita.id_cita,
-            "fecha": cita.fecha_cita,
-            "hora": cita.hora_inicio,
-            "paciente_id": paciente.id_paciente,
-            "paciente_nombre": f"{paciente.nombres} {paciente.apellidos}",
-            "paciente_email": paciente.email,
-            "paciente_telefono": paciente.telefono,
-            "has_email": bool(paciente.email),
-            "status": cita.status
-        })
+        query = query.where(RecordatorioJob.id_clinica == current_user.clinica_id)
+    
+    jobs = (await ops_db.scalars(query)).all()
+    
+    # Día aún no precalculado por el worker: programarlo ahora
+    if not jobs:
+        await schedule_reminders(core_db, ops_db, target_date, current_user.clinica_id)
+        jobs = (await ops_db.scalars(query)).all()
+    
+    result = [
+        {
+            "cita_id": job.cita_id,
+            "fecha": job.fecha_cita,
+            "hora": job.hora_cita,
+            "paciente_id": job.paciente_id,
+            "paciente_nombre": job.paciente_nombre,
+            "paciente_email": job.destinatario,
+            "paciente_telefono": job.paciente_telefono,
+            "has_email": bool(job.destinatario),
+            "reminder_status": job.status,
+            "programado_para": job.programado_para,
+            "enviado_at": job.enviado_at
+        }
+        for job in jobs
+    ]
     
     return {
         "target_date": target_date,
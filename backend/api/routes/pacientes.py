@@ -21,8 +21,8 @@ from typing import List, Optional
 from datetime import date, datetime
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from pydantic import BaseModel, Field, EmailStr
 
 from backend.api.deps.database import get_core_db
@@ -37,6 +37,9 @@ from backend.api.deps.permissions import (
 from backend.schemas.auth.models import SysUsuario
 from backend.schemas.core.models import Paciente, HistorialMedicoGeneral, HistorialGineco, Tratamiento, EvolucionClinica
 from backend.api.utils.pdf_export import generate_patient_pdf
+from backend.api.utils.pagination import TotalMode, keyset_paginate, resolve_total
+from backend.api.utils.cache import invalidate_dashboard_cache
+from backend.tools.fuzzy_search import build_patient_search_query
 
 
 # =============================================================================
@@ -114,8 +117,9 @@ class PacienteBasicResponse(BaseModel):
 
 class PacienteListResponse(BaseModel):
     """Response de lista paginada"""
-    total: int
+    total: Optional[int] = None
     pacientes: List[PacienteResponse]
+    next_cursor: Optional[str] = None
 
 
 # =============================================================================
@@ -126,8 +130,10 @@ class PacienteListResponse(BaseModel):
 async def list_pacientes(
     skip: int = Query(0, ge=0, description="Registros a saltar"),
     limit: int = Query(50, ge=1, le=100, description="Máximo de registros"),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior (paginación por cursor)"),
+    total_mode: TotalMode = Query(TotalMode.exact, alias="total", description="exact | estimated | none"),
     current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Lista todos los pacientes activos.
@@ -139,19 +145,23 @@ async def list_pacientes(
     **Parámetros:**
     - skip: Cuántos registros saltar (paginación)
     - limit: Máximo de registros a retornar (1-100)
+    - cursor: `next_cursor` de la respuesta anterior (ignora skip)
+    - total: exact (COUNT), estimated (planner) o none
     """
     # Query base: solo pacientes no eliminados
-    query = db.query(Paciente).filter(Paciente.deleted_at.is_(None))
+    query = select(Paciente).where(Paciente.deleted_at.is_(None))
     
     # Filtrar por clínica del usuario
     if current_user.clinica_id:
-        query = query.filter(Paciente.id_clinica == current_user.clinica_id)
+        query = query.where(Paciente.id_clinica == current_user.clinica_id)
     
     # Contar total
-    total = query.count()
+    total = await resolve_total(db, query, total_mode)
     
-    # Paginar
-    pacientes = query.offset(skip).limit(limit).all()
+    # Paginar (keyset sobre la PK)
+    pacientes, next_cursor = await keyset_paginate(
+        db, query, (Paciente.id_paciente,), limit, cursor=cursor, offset=skip
+    )
     
     # Si es Recepción, filtrar campos
     if is_recepcion(current_user):
@@ -163,7 +173,7 @@ async def list_pacientes(
             PacienteResponse.model_validate(p) for p in pacientes
         ]
     
-    return {"total": total, "pacientes": pacientes_response}
+    return {"total": total, "pacientes": pacientes_response, "next_cursor": next_cursor}
 
 
 # =============================================================================
@@ -175,7 +185,7 @@ async def search_pacientes(
     q: str = Query(..., min_length=2, description="Término de búsqueda"),
     limit: int = Query(20, ge=1, le=50),
     current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Búsqueda de pacientes por nombre, apellido o teléfono.
@@ -186,24 +196,12 @@ async def search_pacientes(
     - q: Término a buscar (mínimo 2 caracteres)
     - limit: Máximo de resultados
     
-    **Nota:** Búsqueda case-insensitive
+    **Nota:** Búsqueda por similitud de trigramas (pg_trgm), sin distinguir
+    mayúsculas ni acentos; tolera errores de escritura. El teléfono se
+    compara solo por dígitos. Resultados ordenados del más al menos similar.
     """
-    search_term = f"%{q.lower()}%"
-    
-    query = db.query(Paciente).filter(
-        Paciente.deleted_at.is_(None),
-        or_(
-            func.lower(Paciente.nombres).like(search_term),
-            func.lower(Paciente.apellidos).like(search_term),
-            Paciente.telefono.like(search_term)
-        )
-    )
-    
-    # Filtrar por clínica
-    if current_user.clinica_id:
-        query = query.filter(Paciente.id_clinica == current_user.clinica_id)
-    
-    pacientes = query.limit(limit).all()
+    query = build_patient_search_query(q, limit, clinica_id=current_user.clinica_id)
+    pacientes = (await db.scalars(query)).all()
     
     # Filtrar campos para Recepción
     if is_recepcion(current_user):
@@ -220,7 +218,7 @@ async def search_pacientes(
 async def get_paciente(
     paciente_id: int,
     current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Obtiene detalle de un paciente.
@@ -229,10 +227,12 @@ async def get_paciente(
     - Admin, Podologo: Todos los campos + historial médico
     - Recepcion: Solo campos básicos
     """
-    paciente = db.query(Paciente).filter(
-        Paciente.id_paciente == paciente_id,
-        Paciente.deleted_at.is_(None)
-    ).first()
+    paciente = await db.scalar(
+        select(Paciente).where(
+            Paciente.id_paciente == paciente_id,
+            Paciente.deleted_at.is_(None)
+        )
+    )
     
     if not paciente:
         raise HTTPException(
@@ -255,13 +255,17 @@ async def get_paciente(
     response = PacienteResponse.model_validate(paciente)
     
     # Agregar historial médico si existe
-    historial = db.query(HistorialMedicoGeneral).filter(
-        HistorialMedicoGeneral.paciente_id == paciente_id
-    ).first()
+    historial = await db.scalar(
+        select(HistorialMedicoGeneral).where(
+            HistorialMedicoGeneral.paciente_id == paciente_id
+        )
+    )
     
-    historial_gineco = db.query(HistorialGineco).filter(
-        HistorialGineco.paciente_id == paciente_id
-    ).first()
+    historial_gineco = await db.scalar(
+        select(HistorialGineco).where(
+            HistorialGineco.paciente_id == paciente_id
+        )
+    )
     
     result = response.model_dump()
     result["historial_medico"] = historial.__dict__ if historial else None
@@ -278,7 +282,7 @@ async def get_paciente(
 async def create_paciente(
     data: PacienteCreate,
     current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Crea un nuevo paciente.
@@ -296,8 +300,9 @@ async def create_paciente(
     )
     
     db.add(paciente)
-    db.commit()
-    db.refresh(paciente)
+    await db.commit()
+    invalidate_dashboard_cache(paciente.id_clinica)
+    await db.refresh(paciente)
     
     return PacienteResponse.model_validate(paciente)
 
@@ -311,7 +316,7 @@ async def update_paciente(
     paciente_id: int,
     data: PacienteUpdate,
     current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Actualiza un paciente existente.
@@ -320,10 +325,12 @@ async def update_paciente(
     - Admin, Podologo: Todos los campos
     - Recepcion: Solo campos básicos
     """
-    paciente = db.query(Paciente).filter(
-        Paciente.id_paciente == paciente_id,
-        Paciente.deleted_at.is_(None)
-    ).first()
+    paciente = await db.scalar(
+        select(Paciente).where(
+            Paciente.id_paciente == paciente_id,
+            Paciente.deleted_at.is_(None)
+        )
+    )
     
     if not paciente:
         raise HTTPException(
@@ -354,8 +361,9 @@ async def update_paciente(
         setattr(paciente, field, value)
     
     paciente.updated_by = current_user.id_usuario
-    db.commit()
-    db.refresh(paciente)
+    await db.commit()
+    invalidate_dashboard_cache(paciente.id_clinica)
+    await db.refresh(paciente)
     
     return PacienteResponse.model_validate(paciente)
 
@@ -368,7 +376,7 @@ async def update_paciente(
 async def soft_delete_paciente(
     paciente_id: int,
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),  # Solo Admin/Podologo
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Desactiva un paciente (soft delete).
@@ -380,10 +388,12 @@ async def soft_delete_paciente(
     """
     from datetime import datetime, timezone
     
-    paciente = db.query(Paciente).filter(
-        Paciente.id_paciente == paciente_id,
-        Paciente.deleted_at.is_(None)
-    ).first()
+    paciente = await db.scalar(
+        select(Paciente).where(
+            Paciente.id_paciente == paciente_id,
+            Paciente.deleted_at.is_(None)
+        )
+    )
     
     if not paciente:
         raise HTTPException(
@@ -401,7 +411,8 @@ async def soft_delete_paciente(
     # Soft delete
     paciente.deleted_at = datetime.now(timezone.utc)
     paciente.updated_by = current_user.id_usuario
-    db.commit()
+    await db.commit()
+    invalidate_dashboard_cache(paciente.id_clinica)
     
     return {"message": "Paciente desactivado", "id": paciente_id}
 
@@ -415,7 +426,7 @@ async def purge_paciente(
     paciente_id: int,
     confirm: bool = Query(False, description="Confirmar eliminación permanente"),
     current_user: SysUsuario = Depends(require_role([ROLE_ADMIN])),  # SOLO ADMIN
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Elimina un paciente PERMANENTEMENTE.
@@ -434,9 +445,9 @@ async def purge_paciente(
             detail="Debe confirmar la eliminación permanente con ?confirm=true"
         )
     
-    paciente = db.query(Paciente).filter(
-        Paciente.id_paciente == paciente_id
-    ).first()
+    paciente = await db.scalar(
+        select(Paciente).where(Paciente.id_paciente == paciente_id)
+    )
     
     if not paciente:
         raise HTTPException(
@@ -452,8 +463,9 @@ async def purge_paciente(
         )
     
     # Hard delete (CASCADE eliminará historiales relacionados)
-    db.delete(paciente)
-    db.commit()
+    await db.delete(paciente)
+    await db.commit()
+    invalidate_dashboard_cache(paciente.id_clinica)
     
     return {
         "message": "Paciente eliminado permanentemente",
@@ -472,7 +484,7 @@ async def export_patient_pdf(
     include_treatments: bool = Query(True, description="Incluir tratamientos"),
     include_notes: bool = Query(True, description="Incluir notas clínicas"),
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Exporta el expediente completo del paciente a PDF.
@@ -496,10 +508,12 @@ async def export_patient_pdf(
     ```
     """
     # Buscar paciente
-    paciente = db.query(Paciente).filter(
-        Paciente.id_paciente == paciente_id,
-        Paciente.deleted_at.is_(None)
-    ).first()
+    paciente = await db.scalar(
+        select(Paciente).where(
+            Paciente.id_paciente == paciente_id,
+            Paciente.deleted_at.is_(None)
+        )
+    )
     
     if not paciente:
         raise HTTPException(
@@ -517,18 +531,22 @@ async def export_patient_pdf(
     # Obtener tratamientos si se solicita
     tratamientos = None
     if include_treatments:
-        tratamientos = db.query(Tratamiento).filter(
-            Tratamiento.paciente_id == paciente_id
-        ).order_by(Tratamiento.fecha_inicio.desc()).all()
+        tratamientos = (await db.scalars(
+            select(Tratamiento).where(
+                Tratamiento.paciente_id == paciente_id
+            ).order_by(Tratamiento.fecha_inicio.desc())
+        )).all()
     
     # Obtener evoluciones si se solicita
     evoluciones = None
     if include_notes and tratamientos:
         # Get all evolutions from all treatments
         tratamiento_ids = [t.id_tratamiento for t in tratamientos]
-        evoluciones = db.query(EvolucionClinica).filter(
-            EvolucionClinica.tratamiento_id.in_(tratamiento_ids)
-        ).order_by(EvolucionClinica.fecha_sesion.desc()).all()
+        evoluciones = (await db.scalars(
+            select(EvolucionClinica).where(
+                EvolucionClinica.tratamiento_id.in_(tratamiento_ids)
+            ).order_by(EvolucionClinica.fecha_sesion.desc())
+        )).all()
     
     # Generate PDF
     try:
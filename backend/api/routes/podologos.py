@@ -17,13 +17,15 @@
 
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from pydantic import BaseModel, Field, EmailStr
 
 from backend.api.deps.database import get_ops_db
 from backend.api.deps.permissions import require_role, ALL_ROLES, CLINICAL_ROLES, ROLE_ADMIN
 from backend.schemas.auth.models import SysUsuario
 from backend.schemas.ops.models import Podologo
+from backend.api.utils.cache import invalidate_dashboard_cache
 
 
 # =============================================================================
@@ -77,24 +79,24 @@ class PodologoResponse(BaseModel):
 async def list_podologos(
     activo: Optional[bool] = Query(True, description="Filtrar por activos"),
     current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
-    db: Session = Depends(get_ops_db)
+    db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Lista los podólogos de la clínica.
     
     **Permisos:** Todos los roles
     """
-    query = db.query(Podologo)
+    query = select(Podologo)
     
     # Filtrar por clínica
     if current_user.clinica_id:
-        query = query.filter(Podologo.id_clinica == current_user.clinica_id)
+        query = query.where(Podologo.id_clinica == current_user.clinica_id)
     
     # Aplicar filtros
     if activo is not None:
-        query = query.filter(Podologo.activo == activo)
+        query = query.where(Podologo.activo == activo)
     
-    podologos = query.order_by(Podologo.nombre_completo).all()
+    podologos = (await db.scalars(query.order_by(Podologo.nombre_completo))).all()
     
     return {
         "total": len(podologos),
@@ -110,16 +112,16 @@ async def list_podologos(
 async def get_podologo(
     podologo_id: int,
     current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
-    db: Session = Depends(get_ops_db)
+    db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Obtiene detalle de un podólogo.
     
     **Permisos:** Todos los roles
     """
-    podologo = db.query(Podologo).filter(
+    podologo = await db.scalar(select(Podologo).where(
         Podologo.id_podologo == podologo_id
-    ).first()
+    ))
     
     if not podologo:
         raise HTTPException(
@@ -138,7 +140,7 @@ async def get_podologo(
 async def create_podologo(
     data: PodologoCreate,
     current_user: SysUsuario = Depends(require_role([ROLE_ADMIN])),  # Solo Admin
-    db: Session = Depends(get_ops_db)
+    db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Crea un nuevo podólogo.
@@ -152,8 +154,9 @@ async def create_podologo(
     )
     
     db.add(podologo)
-    db.commit()
-    db.refresh(podologo)
+    await db.commit()
+    invalidate_dashboard_cache(podologo.id_clinica)
+    await db.refresh(podologo)
     
     return PodologoResponse.model_validate(podologo)
 
@@ -167,7 +170,7 @@ async def update_podologo(
     podologo_id: int,
     data: PodologoUpdate,
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    db: Session = Depends(get_ops_db)
+    db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Actualiza un podólogo.
@@ -176,9 +179,9 @@ async def update_podologo(
     - Admin: Puede editar cualquier podólogo
     - Podologo: Solo puede editar su propio perfil
     """
-    podologo = db.query(Podologo).filter(
+    podologo = await db.scalar(select(Podologo).where(
         Podologo.id_podologo == podologo_id
-    ).first()
+    ))
     
     if not podologo:
         raise HTTPException(
@@ -199,8 +202,9 @@ async def update_podologo(
     for field, value in update_data.items():
         setattr(podologo, field, value)
     
-    db.commit()
-    db.refresh(podologo)
+    await db.commit()
+    invalidate_dashboard_cache(podologo.id_clinica)
+    await db.refresh(podologo)
     
     return PodologoResponse.model_validate(podologo)
 
@@ -213,7 +217,7 @@ async def update_podologo(
 async def delete_podologo(
     podologo_id: int,
     current_user: SysUsuario = Depends(require_role([ROLE_ADMIN])),  # Solo Admin
-    db: Session = Depends(get_ops_db)
+    db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Desactiva un podólogo.
@@ -222,9 +226,9 @@ async def delete_podologo(
     
     **Nota:** No elimina, solo desactiva (activo=False).
     """
-    podologo = db.query(Podologo).filter(
+    podologo = await db.scalar(select(Podologo).where(
         Podologo.id_podologo == podologo_id
-    ).first()
+    ))
     
     if not podologo:
         raise HTTPException(
@@ -233,6 +237,7 @@ async def delete_podologo(
         )
     
     podologo.activo = False
-    db.commit()
+    await db.commit()
+    invalidate_dashboard_cache(podologo.id_clinica)
     
     return {"message": "Podólogo desactivado", "id": podologo_id}
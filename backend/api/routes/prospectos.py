@@ -15,7 +15,8 @@
 from typing import Optional
 from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from pydantic import BaseModel, Field, EmailStr
 
 from backend.api.deps.database import get_ops_db, get_core_db
@@ -23,6 +24,8 @@ from backend.api.deps.permissions import require_role, ALL_ROLES
 from backend.schemas.auth.models import SysUsuario
 from backend.schemas.ops.models import SolicitudProspecto
 from backend.schemas.core.models import Paciente
+from backend.api.utils.pagination import count_total
+from backend.api.utils.cache import invalidate_dashboard_cache
 
 
 # =============================================================================
@@ -97,28 +100,28 @@ async def list_prospectos(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
-    db: Session = Depends(get_ops_db)
+    db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Lista los prospectos (solicitudes de contacto).
     
     **Permisos:** Todos los roles
     """
-    query = db.query(SolicitudProspecto)
+    query = select(SolicitudProspecto)
     
     # Filtrar por clínica
     if current_user.clinica_id:
-        query = query.filter(SolicitudProspecto.id_clinica == current_user.clinica_id)
+        query = query.where(SolicitudProspecto.id_clinica == current_user.clinica_id)
     
     # Aplicar filtros
     if status_solicitud:
-        query = query.filter(SolicitudProspecto.status_solicitud == status_solicitud)
+        query = query.where(SolicitudProspecto.status_solicitud == status_solicitud)
     
     # Ordenar por más recientes
     query = query.order_by(SolicitudProspecto.fecha_solicitud.desc())
     
-    total = query.count()
-    prospectos = query.offset(skip).limit(limit).all()
+    total = await count_total(db, query)
+    prospectos = (await db.scalars(query.offset(skip).limit(limit))).all()
     
     return {
         "total": total,
@@ -134,16 +137,16 @@ async def list_prospectos(
 async def get_prospecto(
     prospecto_id: int,
     current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
-    db: Session = Depends(get_ops_db)
+    db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Obtiene detalle de un prospecto.
     
     **Permisos:** Todos los roles
     """
-    prospecto = db.query(SolicitudProspecto).filter(
+    prospecto = await db.scalar(select(SolicitudProspecto).where(
         SolicitudProspecto.id_solicitud == prospecto_id
-    ).first()
+    ))
     
     if not prospecto:
         raise HTTPException(
@@ -162,7 +165,7 @@ async def get_prospecto(
 async def create_prospecto(
     data: ProspectoCreate,
     current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
-    db: Session = Depends(get_ops_db)
+    db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Registra un nuevo prospecto (persona que llamó preguntando).
@@ -176,8 +179,8 @@ async def create_prospecto(
     )
     
     db.add(prospecto)
-    db.commit()
-    db.refresh(prospecto)
+    await db.commit()
+    await db.refresh(prospecto)
     
     return ProspectoResponse.model_validate(prospecto)
 
@@ -191,16 +194,16 @@ async def update_prospecto(
     prospecto_id: int,
     data: ProspectoUpdate,
     current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
-    db: Session = Depends(get_ops_db)
+    db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Actualiza un prospecto.
     
     **Permisos:** Todos los roles
     """
-    prospecto = db.query(SolicitudProspecto).filter(
+    prospecto = await db.scalar(select(SolicitudProspecto).where(
         SolicitudProspecto.id_solicitud == prospecto_id
-    ).first()
+    ))
     
     if not prospecto:
         raise HTTPException(
@@ -213,8 +216,8 @@ async def update_prospecto(
     for field, value in update_data.items():
         setattr(prospecto, field, value)
     
-    db.commit()
-    db.refresh(prospecto)
+    await db.commit()
+    await db.refresh(prospecto)
     
     return ProspectoResponse.model_validate(prospecto)
 
@@ -228,8 +231,8 @@ async def convertir_prospecto(
     prospecto_id: int,
     data: ConvertirProspectoRequest,
     current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
-    ops_db: Session = Depends(get_ops_db),
-    core_db: Session = Depends(get_core_db)
+    ops_db: AsyncSession = Depends(get_ops_db),
+    core_db: AsyncSession = Depends(get_core_db)
 ):
     """
     Convierte un prospecto en paciente.
@@ -245,9 +248,9 @@ async def convertir_prospecto(
     from datetime import date
     
     # Buscar prospecto
-    prospecto = ops_db.query(SolicitudProspecto).filter(
+    prospecto = await ops_db.scalar(select(SolicitudProspecto).where(
         SolicitudProspecto.id_solicitud == prospecto_id
-    ).first()
+    ))
     
     if not prospecto:
         raise HTTPException(
@@ -278,12 +281,13 @@ async def convertir_prospecto(
     )
     
     core_db.add(paciente)
-    core_db.commit()
-    core_db.refresh(paciente)
+    await core_db.commit()
+    invalidate_dashboard_cache(paciente.id_clinica)
+    await core_db.refresh(paciente)
     
     # Actualizar prospecto
     prospecto.status_solicitud = "Convertido"
-    ops_db.commit()
+    await ops_db.commit()
     
     return {
         "message": "Prospecto convertido a paciente exitosamente",
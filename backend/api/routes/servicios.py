@@ -18,7 +18,8 @@
 from typing import List, Optional
 from decimal import Decimal
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from pydantic import BaseModel, Field
 
 from backend.api.deps.database import get_ops_db
@@ -84,26 +85,26 @@ async def list_servicios(
     activo: Optional[bool] = Query(True, description="Filtrar por activos"),
     categoria: Optional[str] = Query(None, description="Filtrar por categoría"),
     current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
-    db: Session = Depends(get_ops_db)
+    db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Lista el catálogo de servicios.
     
     **Permisos:** Todos los roles
     """
-    query = db.query(CatalogoServicio)
+    query = select(CatalogoServicio)
     
     # Filtrar por clínica
     if current_user.clinica_id:
-        query = query.filter(CatalogoServicio.id_clinica == current_user.clinica_id)
+        query = query.where(CatalogoServicio.id_clinica == current_user.clinica_id)
     
     # Aplicar filtros
     if activo is not None:
-        query = query.filter(CatalogoServicio.activo == activo)
+        query = query.where(CatalogoServicio.activo == activo)
     if categoria:
-        query = query.filter(CatalogoServicio.categoria == categoria)
+        query = query.where(CatalogoServicio.categoria == categoria)
     
-    servicios = query.order_by(CatalogoServicio.nombre_servicio).all()
+    servicios = (await db.scalars(query.order_by(CatalogoServicio.nombre_servicio))).all()
     
     return {
         "total": len(servicios),
@@ -119,16 +120,16 @@ async def list_servicios(
 async def get_servicio(
     servicio_id: int,
     current_user: SysUsuario = Depends(require_role(ALL_ROLES)),
-    db: Session = Depends(get_ops_db)
+    db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Obtiene detalle de un servicio.
     
     **Permisos:** Todos los roles
     """
-    servicio = db.query(CatalogoServicio).filter(
+    servicio = await db.scalar(select(CatalogoServicio).where(
         CatalogoServicio.id_servicio == servicio_id
-    ).first()
+    ))
     
     if not servicio:
         raise HTTPException(
@@ -147,7 +148,7 @@ async def get_servicio(
 async def create_servicio(
     data: ServicioCreate,
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    db: Session = Depends(get_ops_db)
+    db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Crea un nuevo servicio en el catálogo.
@@ -161,8 +162,8 @@ async def create_servicio(
     )
     
     db.add(servicio)
-    db.commit()
-    db.refresh(servicio)
+    await db.commit()
+    await db.refresh(servicio)
     
     return ServicioResponse.model_validate(servicio)
 
@@ -176,16 +177,16 @@ async def update_servicio(
     servicio_id: int,
     data: ServicioUpdate,
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    db: Session = Depends(get_ops_db)
+    db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Actualiza un servicio del catálogo.
     
     **Permisos:** Solo Admin y Podologo
     """
-    servicio = db.query(CatalogoServicio).filter(
+    servicio = await db.scalar(select(CatalogoServicio).where(
         CatalogoServicio.id_servicio == servicio_id
-    ).first()
+    ))
     
     if not servicio:
         raise HTTPException(
@@ -198,8 +199,8 @@ async def update_servicio(
     for field, value in update_data.items():
         setattr(servicio, field, value)
     
-    db.commit()
-    db.refresh(servicio)
+    await db.commit()
+    await db.refresh(servicio)
     
     return ServicioResponse.model_validate(servicio)
 
@@ -212,7 +213,7 @@ async def update_servicio(
 async def delete_servicio(
     servicio_id: int,
     current_user: SysUsuario = Depends(require_role([ROLE_ADMIN])),  # Solo Admin
-    db: Session = Depends(get_ops_db)
+    db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Desactiva un servicio del catálogo.
@@ -221,9 +222,9 @@ async def delete_servicio(
     
     **Nota:** No elimina, solo desactiva (activo=False).
     """
-    servicio = db.query(CatalogoServicio).filter(
+    servicio = await db.scalar(select(CatalogoServicio).where(
         CatalogoServicio.id_servicio == servicio_id
-    ).first()
+    ))
     
     if not servicio:
         raise HTTPException(
@@ -232,6 +233,6 @@ async def delete_servicio(
         )
     
     servicio.activo = False
-    db.commit()
+    await db.commit()
     
     return {"message": "Servicio desactivado", "id": servicio_id}
@@ -13,11 +13,12 @@ Includes metrics such as:
 - Podiatrist performance metrics
 """
 
-from typing import Optional, Dict, Any
+import asyncio
+from typing import Optional, Dict, Any, Tuple
 from datetime import date, datetime, timedelta, timezone
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, extract, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, extract, and_, or_, select, true
 from pydantic import BaseModel, Field
 
 from backend.api.deps.database import get_core_db, get_ops_db, get_auth_db
@@ -25,7 +26,8 @@ from backend.api.deps.permissions import require_role, CLINICAL_ROLES, ROLE_ADMI
 from backend.schemas.auth.models import SysUsuario
 from backend.schemas.core.models import Paciente, Tratamiento, EvolucionClinica, EvidenciaFotografica
 from backend.schemas.ops.models import Cita, Podologo
-from backend.schemas.finance.models import Transaccion, Gasto
+from backend.schemas.finance.models import Transaccion, Gasto, Pago
+from backend.api.utils.cache import dashboard_cache
 
 
 # =============================================================================
@@ -95,240 +97,185 @@ class DashboardStatistics(BaseModel):
 
 
 # =============================================================================
-# ENDPOINT: GET /statistics/dashboard
+# HELPERS
 # =============================================================================
+# El dashboard se arma con pocas consultas de una sola pasada:
+# COUNT(*) FILTER (WHERE ...) calcula varios conteos sobre la misma tabla
+# en un solo scan. Las consultas de core_db y ops_db van a conexiones
+# distintas, así que ambos lotes corren en paralelo (asyncio.gather).
 
-@router.get("/dashboard", response_model=DashboardStatistics)
-async def get_dashboard_statistics(
-    current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    core_db: Session = Depends(get_core_db),
-    ops_db: Session = Depends(get_ops_db)
-):
-    """
-    Get aggregated statistics for dashboard.
-    
-    **Permisos:** Admin y Podologo
-    
-    Returns comprehensive statistics including:
-    - Patient metrics
-    - Appointment metrics
-    - Treatment metrics
-    - Financial metrics (Admin only)
-    - Podiatrist performance
-    """
-    # Calculate date ranges
-    now = datetime.now(timezone.utc)
-    today = now.date()
-    week_start = today - timedelta(days=today.weekday())
-    month_start = today.replace(day=1)
-    last_month_start = (month_start - timedelta(days=1)).replace(day=1)
-    
-    # Filter by clinic if user has one
-    clinic_filter_core = Paciente.id_clinica == current_user.clinica_id if current_user.clinica_id else True
-    clinic_filter_ops = Cita.id_clinica == current_user.clinica_id if current_user.clinica_id else True
-    
-    # =============================================================================
-    # PATIENT STATISTICS
-    # =============================================================================
-    
-    total_patients = core_db.query(func.count(Paciente.id_paciente)).filter(
-        Paciente.deleted_at.is_(None),
-        clinic_filter_core
-    ).scalar() or 0
-    
-    active_patients = core_db.query(func.count(Paciente.id_paciente)).filter(
-        Paciente.deleted_at.is_(None),
-        clinic_filter_core,
-        Paciente.fecha_registro >= month_start
-    ).scalar() or 0
-    
-    new_patients_this_month = core_db.query(func.count(Paciente.id_paciente)).filter(
-        Paciente.deleted_at.is_(None),
-        clinic_filter_core,
-        func.date(Paciente.fecha_registro) >= month_start
-    ).scalar() or 0
-    
-    new_patients_last_month = core_db.query(func.count(Paciente.id_paciente)).filter(
-        Paciente.deleted_at.is_(None),
-        clinic_filter_core,
-        func.date(Paciente.fecha_registro) >= last_month_start,
-        func.date(Paciente.fecha_registro) < month_start
-    ).scalar() or 0
-    
-    # Patients by sex
-    sex_stats = core_db.query(
-        Paciente.sexo,
-        func.count(Paciente.id_paciente)
-    ).filter(
-        Paciente.deleted_at.is_(None),
-        clinic_filter_core,
-        Paciente.sexo.isnot(None)
-    ).group_by(Paciente.sexo).all()
-    
-    patients_by_sex = {sex: count for sex, count in sex_stats}
-    
-    # Average age - calculate using database-agnostic approach
-    # Get birth dates and calculate age in Python for better compatibility
-    patients_with_birth = core_db.query(Paciente.fecha_nacimiento).filter(
-        Paciente.deleted_at.is_(None),
-        clinic_filter_core,
-        Paciente.fecha_nacimiento.isnot(None)
-    ).all()
+def _clinic_filter(column, clinica_id: Optional[int]):
+    """Filtro multi-tenant: sin clínica asignada se ven todas."""
+    return column == clinica_id if clinica_id else true()
+
+
+def _to_float(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+async def _core_statistics(
+    db: AsyncSession,
+    clinica_id: Optional[int],
+    month_start: date,
+    last_month_start: date,
+) -> Tuple[PatientStatistics, TreatmentStatistics]:
+    """Pacientes y tratamientos (clinica_core_db): 3 consultas."""
+    registro = func.date(Paciente.fecha_registro)
+    patients = (await db.execute(
+        select(
+            func.count().label("total"),
+            func.count().filter(Paciente.fecha_registro >= month_start).label("active"),
+            func.count().filter(registro >= month_start).label("new_this_month"),
+            func.count().filter(
+                registro >= last_month_start, registro < month_start
+            ).label("new_last_month"),
+            func.avg(extract("year", func.age(Paciente.fecha_nacimiento))).label("average_age"),
+        ).where(
+            Paciente.deleted_at.is_(None),
+            _clinic_filter(Paciente.id_clinica, clinica_id),
+        )
+    )).one()
+    
+    sex_stats = (await db.execute(
+        select(Paciente.sexo, func.count())
+        .where(
+            Paciente.deleted_at.is_(None),
+            _clinic_filter(Paciente.id_clinica, clinica_id),
+            Paciente.sexo.isnot(None),
+        )
+        .group_by(Paciente.sexo)
+    )).all()
+    
+    # Sin columna fecha_fin: la duración de un tratamiento dado de alta se
+    # mide hasta su última actualización (cuando se marcó 'Alta').
+    alta = Tratamiento.estado_tratamiento == "Alta"
+    treatments = (await db.execute(
+        select(
+            func.count().label("total"),
+            func.count().filter(Tratamiento.estado_tratamiento == "En Curso").label("active"),
+            func.count().filter(alta).label("completed"),
+            func.count().filter(Tratamiento.fecha_inicio >= month_start).label("this_month"),
+            func.avg(
+                func.date(Tratamiento.updated_at) - Tratamiento.fecha_inicio
+            ).filter(alta).label("average_duration"),
+        ).where(
+            Tratamiento.deleted_at.is_(None),
+            _clinic_filter(Tratamiento.id_clinica, clinica_id),
+        )
+    )).one()
     
-    if patients_with_birth:
-        from datetime import date as date_type
-        today = date_type.today()
-        ages = []
-        for (birth_date,) in patients_with_birth:
-            if birth_date:
-                age = today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
-                ages.append(age)
-        avg_age = sum(ages) / len(ages) if ages else None
-    else:
-        avg_age = None
+    average_age = _to_float(patients.average_age)
+    average_duration = _to_float(treatments.average_duration)
     
     patient_stats = PatientStatistics(
-        total_patients=total_patients,
-        active_patients=active_patients,
-        new_patients_this_month=new_patients_this_month,
-        new_patients_last_month=new_patients_last_month,
-        patients_by_sex=patients_by_sex,
-        average_age=avg_age
+        total_patients=patients.total,
+        active_patients=patients.active,
+        new_patients_this_month=patients.new_this_month,
+        new_patients_last_month=patients.new_last_month,
+        patients_by_sex={sex: count for sex, count in sex_stats},
+        average_age=round(average_age, 1) if average_age is not None else None,
     )
+    treatment_stats = TreatmentStatistics(
+        total_treatments=treatments.total,
+        active_treatments=treatments.active,
+        completed_treatments=treatments.completed,
+        treatments_this_month=treatments.this_month,
+        average_duration_days=round(average_duration, 1) if average_duration is not None else None,
+    )
+    return patient_stats, treatment_stats
+
+
+async def _ops_statistics(
+    db: AsyncSession,
+    clinica_id: Optional[int],
+    include_financial: bool,
+    today: date,
+    week_start: date,
+    month_start: date,
+    last_month_start: date,
+) -> Tuple[AppointmentStatistics, FinancialStatistics, PodiatristStatistics]:
+    """Citas, podólogos y finanzas (clinica_ops_db): 4-5 consultas."""
+    clinic_citas = _clinic_filter(Cita.id_clinica, clinica_id)
+    
+    appointments = (await db.execute(
+        select(
+            func.count().label("total"),
+            func.count().filter(Cita.fecha_cita == today).label("today"),
+            func.count().filter(Cita.fecha_cita >= week_start).label("this_week"),
+            func.count().filter(Cita.fecha_cita >= month_start).label("this_month"),
+        ).where(clinic_citas)
+    )).one()
+    
+    status_stats = (await db.execute(
+        select(Cita.status, func.count()).where(clinic_citas).group_by(Cita.status)
+    )).all()
+    appointments_by_status = {cita_status: count for cita_status, count in status_stats}
     
-    # =============================================================================
-    # APPOINTMENT STATISTICS
-    # =============================================================================
-    
-    total_appointments = ops_db.query(func.count(Cita.id_cita)).filter(
-        clinic_filter_ops
-    ).scalar() or 0
-    
-    appointments_today = ops_db.query(func.count(Cita.id_cita)).filter(
-        clinic_filter_ops,
-        Cita.fecha_cita == today
-    ).scalar() or 0
-    
-    appointments_this_week = ops_db.query(func.count(Cita.id_cita)).filter(
-        clinic_filter_ops,
-        Cita.fecha_cita >= week_start
-    ).scalar() or 0
-    
-    appointments_this_month = ops_db.query(func.count(Cita.id_cita)).filter(
-        clinic_filter_ops,
-        Cita.fecha_cita >= month_start
-    ).scalar() or 0
-    
-    # Appointments by status
-    status_stats = ops_db.query(
-        Cita.status,
-        func.count(Cita.id_cita)
-    ).filter(
-        clinic_filter_ops
-    ).group_by(Cita.status).all()
-    
-    appointments_by_status = {status: count for status, count in status_stats}
-    
-    # Completion rate
     completed = appointments_by_status.get("Realizada", 0)
-    completion_rate = (completed / total_appointments * 100) if total_appointments > 0 else 0.0
+    completion_rate = (completed / appointments.total * 100) if appointments.total > 0 else 0.0
     
     appointment_stats = AppointmentStatistics(
-        total_appointments=total_appointments,
-        appointments_today=appointments_today,
-        appointments_this_week=appointments_this_week,
-        appointments_this_month=appointments_this_month,
+        total_appointments=appointments.total,
+        appointments_today=appointments.today,
+        appointments_this_week=appointments.this_week,
+        appointments_this_month=appointments.this_month,
         appointments_by_status=appointments_by_status,
-        completion_rate=round(completion_rate, 2)
+        completion_rate=round(completion_rate, 2),
     )
     
-    # =============================================================================
-    # TREATMENT STATISTICS
-    # =============================================================================
-    
-    total_treatments = core_db.query(func.count(Tratamiento.id_tratamiento)).filter(
-        clinic_filter_core
-    ).scalar() or 0
-    
-    active_treatments = core_db.query(func.count(Tratamiento.id_tratamiento)).filter(
-        clinic_filter_core,
-        Tratamiento.estado == "activo"
-    ).scalar() or 0
-    
-    completed_treatments = core_db.query(func.count(Tratamiento.id_tratamiento)).filter(
-        clinic_filter_core,
-        Tratamiento.estado == "completado"
-    ).scalar() or 0
-    
-    treatments_this_month = core_db.query(func.count(Tratamiento.id_tratamiento)).filter(
-        clinic_filter_core,
-        func.date(Tratamiento.fecha_inicio) >= month_start
-    ).scalar() or 0
-    
-    # Average treatment duration
-    avg_duration = core_db.query(
-        func.avg(
-            func.extract('day', Tratamiento.fecha_fin - Tratamiento.fecha_inicio)
+    podologos = (await db.execute(
+        select(
+            func.count().label("total"),
+            func.count().filter(Podologo.activo.is_(True)).label("active"),
+        ).where(
+            Podologo.deleted_at.is_(None),
+            _clinic_filter(Podologo.id_clinica, clinica_id),
         )
-    ).filter(
-        clinic_filter_core,
-        Tratamiento.fecha_fin.isnot(None),
-        Tratamiento.estado == "completado"
-    ).scalar()
+    )).one()
     
-    treatment_stats = TreatmentStatistics(
-        total_treatments=total_treatments,
-        active_treatments=active_treatments,
-        completed_treatments=completed_treatments,
-        treatments_this_month=treatments_this_month,
-        average_duration_days=float(avg_duration) if avg_duration else None
-    )
+    podo_stats = (await db.execute(
+        select(Podologo.nombre_completo, func.count(Cita.id_cita))
+        .join(Cita, Podologo.id_podologo == Cita.podologo_id)
+        .where(clinic_citas)
+        .group_by(Podologo.nombre_completo)
+    )).all()
     
-    # =============================================================================
-    # FINANCIAL STATISTICS (Admin only)
-    # =============================================================================
+    podiatrist_stats = PodiatristStatistics(
+        total_podiatrists=podologos.total,
+        active_podiatrists=podologos.active,
+        appointments_per_podiatrist={name: count for name, count in podo_stats},
+        busiest_podiatrist=max(podo_stats, key=lambda x: x[1])[0] if podo_stats else None,
+    )
     
-    if current_user.rol == ROLE_ADMIN:
-        # Revenue this month
-        revenue_this_month = ops_db.query(
-            func.coalesce(func.sum(Transaccion.monto), 0)
-        ).filter(
-            Transaccion.tipo_transaccion == "ingreso",
-            func.date(Transaccion.fecha_transaccion) >= month_start
-        ).scalar() or 0.0
-        
-        # Revenue last month
-        revenue_last_month = ops_db.query(
-            func.coalesce(func.sum(Transaccion.monto), 0)
-        ).filter(
-            Transaccion.tipo_transaccion == "ingreso",
-            func.date(Transaccion.fecha_transaccion) >= last_month_start,
-            func.date(Transaccion.fecha_transaccion) < month_start
-        ).scalar() or 0.0
+    if include_financial:
+        # Una sola consulta con subconsultas escalares por tabla
+        fecha_transaccion = func.date(Transaccion.fecha)
+        clinic_transacciones = _clinic_filter(Transaccion.id_clinica, clinica_id)
+        ingresos_mes = select(func.coalesce(func.sum(Transaccion.monto), 0)).where(
+            clinic_transacciones, fecha_transaccion >= month_start
+        ).scalar_subquery()
+        ingresos_mes_anterior = select(func.coalesce(func.sum(Transaccion.monto), 0)).where(
+            clinic_transacciones,
+            fecha_transaccion >= last_month_start,
+            fecha_transaccion < month_start,
+        ).scalar_subquery()
+        gastos_mes = select(func.coalesce(func.sum(Gasto.monto), 0)).where(
+            _clinic_filter(Gasto.id_clinica, clinica_id),
+            Gasto.fecha_gasto >= month_start,
+        ).scalar_subquery()
+        saldo_pendiente = select(func.coalesce(func.sum(Pago.saldo_pendiente), 0)).where(
+            _clinic_filter(Pago.id_clinica, clinica_id),
+            Pago.status_pago != "Pagado",
+        ).scalar_subquery()
         
-        # Expenses this month
-        expenses_this_month = ops_db.query(
-            func.coalesce(func.sum(Gasto.monto), 0)
-        ).filter(
-            func.date(Gasto.fecha_gasto) >= month_start
-        ).scalar() or 0.0
+        finance = (await db.execute(
+            select(ingresos_mes, ingresos_mes_anterior, gastos_mes, saldo_pendiente)
+        )).one()
+        revenue_this_month, revenue_last_month, expenses_this_month, pending_payments = finance
         
-        # Pending payments
-        pending_payments = ops_db.query(
-            func.coalesce(func.sum(Transaccion.monto), 0)
-        ).filter(
-            Transaccion.tipo_transaccion == "ingreso",
-            Transaccion.estado == "pendiente"
-        ).scalar() or 0.0
-        
-        # Paid amount this month
-        paid_this_month = ops_db.query(
-            func.coalesce(func.sum(Transaccion.monto), 0)
-        ).filter(
-            Transaccion.tipo_transaccion == "ingreso",
-            Transaccion.estado == "completado",
-            func.date(Transaccion.fecha_transaccion) >= month_start
-        ).scalar() or 0.0
+        # Las transacciones son cobros recibidos: lo pagado en el mes es
+        # lo mismo que el ingreso del mes.
+        paid_this_month = revenue_this_month
     else:
         # Non-admin users don't see financial data
         revenue_this_month = 0.0
@@ -342,46 +289,62 @@ async def get_dashboard_statistics(
         total_revenue_last_month=float(revenue_last_month),
         total_expenses_this_month=float(expenses_this_month),
         pending_payments=float(pending_payments),
-        paid_amount_this_month=float(paid_this_month)
+        paid_amount_this_month=float(paid_this_month),
     )
     
-    # =============================================================================
-    # PODIATRIST STATISTICS
-    # =============================================================================
+    return appointment_stats, financial_stats, podiatrist_stats
+
+
+# =============================================================================
+# ENDPOINT: GET /statistics/dashboard
+# =============================================================================
+
+@router.get("/dashboard", response_model=DashboardStatistics)
+async def get_dashboard_statistics(
+    current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
+    core_db: AsyncSession = Depends(get_core_db),
+    ops_db: AsyncSession = Depends(get_ops_db)
+):
+    """
+    Get aggregated statistics for dashboard.
     
-    total_podiatrists = ops_db.query(func.count(Podologo.id_podologo)).filter(
-        Podologo.estado == "activo"
-    ).scalar() or 0
+    **Permisos:** Admin y Podologo
     
-    active_podiatrists = ops_db.query(func.count(Podologo.id_podologo)).filter(
-        Podologo.estado == "activo"
-    ).scalar() or 0
+    Returns comprehensive statistics including:
+    - Patient metrics
+    - Appointment metrics
+    - Treatment metrics
+    - Financial metrics (Admin only)
+    - Podiatrist performance
     
-    # Appointments per podiatrist
-    podo_stats = ops_db.query(
-        Podologo.nombre_completo,
-        func.count(Cita.id_cita)
-    ).join(
-        Cita, Podologo.id_podologo == Cita.podologo_id
-    ).filter(
-        clinic_filter_ops
-    ).group_by(Podologo.nombre_completo).all()
+    El resultado se cachea por clínica durante DASHBOARD_CACHE_TTL_SECONDS;
+    las escrituras de pacientes, citas, tratamientos, podólogos y pagos
+    invalidan la caché de su clínica.
+    """
+    include_financial = current_user.rol == ROLE_ADMIN
+    cache_key = (current_user.clinica_id, include_financial)
+    cached = dashboard_cache.get(cache_key)
+    if cached is not None:
+        return cached
     
-    appointments_per_podo = {name: count for name, count in podo_stats}
-    busiest_podo = max(podo_stats, key=lambda x: x[1])[0] if podo_stats else None
+    # Calculate date ranges
+    now = datetime.now(timezone.utc)
+    today = now.date()
+    week_start = today - timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
+    last_month_start = (month_start - timedelta(days=1)).replace(day=1)
     
-    podiatrist_stats = PodiatristStatistics(
-        total_podiatrists=total_podiatrists,
-        active_podiatrists=active_podiatrists,
-        appointments_per_podiatrist=appointments_per_podo,
-        busiest_podiatrist=busiest_podo
+    (patient_stats, treatment_stats), (appointment_stats, financial_stats, podiatrist_stats) = (
+        await asyncio.gather(
+            _core_statistics(core_db, current_user.clinica_id, month_start, last_month_start),
+            _ops_statistics(
+                ops_db, current_user.clinica_id, include_financial,
+                today, week_start, month_start, last_month_start,
+            ),
+        )
     )
     
-    # =============================================================================
-    # RETURN COMPLETE DASHBOARD
-    # =============================================================================
-    
-    return DashboardStatistics(
+    dashboard = DashboardStatistics(
         patients=patient_stats,
         appointments=appointment_stats,
         treatments=treatment_stats,
@@ -389,6 +352,8 @@ async def get_dashboard_statistics(
         podiatrists=podiatrist_stats,
         generated_at=now
     )
+    dashboard_cache.set(cache_key, dashboard)
+    return dashboard
 
 
 # =============================================================================
@@ -398,8 +363,8 @@ async def get_dashboard_statistics(
 @router.get("/summary")
 async def get_statistics_summary(
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    core_db: Session = Depends(get_core_db),
-    ops_db: Session = Depends(get_ops_db)
+    core_db: AsyncSession = Depends(get_core_db),
+    ops_db: AsyncSession = Depends(get_ops_db)
 ):
     """
     Get a quick summary of key statistics.
@@ -409,18 +374,19 @@ async def get_statistics_summary(
     Returns a lightweight summary with the most important metrics.
     """
     today = date.today()
-    clinic_filter_core = Paciente.id_clinica == current_user.clinica_id if current_user.clinica_id else True
-    clinic_filter_ops = Cita.id_clinica == current_user.clinica_id if current_user.clinica_id else True
+    clinica_id = current_user.clinica_id
     
     return {
-        "total_patients": core_db.query(func.count(Paciente.id_paciente)).filter(
-            Paciente.deleted_at.is_(None), clinic_filter_core
-        ).scalar() or 0,
-        "appointments_today": ops_db.query(func.count(Cita.id_cita)).filter(
-            clinic_filter_ops, Cita.fecha_cita == today
-        ).scalar() or 0,
-        "active_treatments": core_db.query(func.count(Tratamiento.id_tratamiento)).filter(
-            clinic_filter_core, Tratamiento.estado == "activo"
-        ).scalar() or 0,
+        "total_patients": await core_db.scalar(select(func.count(Paciente.id_paciente)).where(
+            Paciente.deleted_at.is_(None), _clinic_filter(Paciente.id_clinica, clinica_id)
+        )) or 0,
+        "appointments_today": await ops_db.scalar(select(func.count(Cita.id_cita)).where(
+            _clinic_filter(Cita.id_clinica, clinica_id), Cita.fecha_cita == today
+        )) or 0,
+        "active_treatments": await core_db.scalar(select(func.count(Tratamiento.id_tratamiento)).where(
+            Tratamiento.deleted_at.is_(None),
+            _clinic_filter(Tratamiento.id_clinica, clinica_id),
+            Tratamiento.estado_tratamiento == "En Curso"
+        )) or 0,
         "generated_at": datetime.now(timezone.utc)
     }
@@ -14,16 +14,19 @@
 # PERMISOS: Solo Admin y Podologo (datos clínicos)
 # =============================================================================
 
-from typing import List, Optional
+from typing import List, Optional, Sequence
 from datetime import date, datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
 from pydantic import BaseModel, Field
 
 from backend.api.deps.database import get_core_db
 from backend.api.deps.permissions import require_role, CLINICAL_ROLES
 from backend.schemas.auth.models import SysUsuario
 from backend.schemas.core.models import Tratamiento, Paciente, EvolucionClinica
+from backend.api.utils.pagination import count_total
+from backend.api.utils.cache import invalidate_dashboard_cache
 
 
 # =============================================================================
@@ -95,24 +98,53 @@ class TratamientoResponse(BaseModel):
 # HELPERS
 # =============================================================================
 
-def enrich_tratamiento_response(tratamiento: Tratamiento, db: Session) -> dict:
-    """Agrega datos del paciente y conteo de evoluciones"""
-    response = TratamientoResponse.model_validate(tratamiento).model_dump()
+async def enrich_tratamientos_response(
+    tratamientos: Sequence[Tratamiento], db: AsyncSession
+) -> List[dict]:
+    """
+    Agrega nombre del paciente y conteo de evoluciones a una página de
+    tratamientos.
     
-    # Agregar nombre del paciente
-    paciente = db.query(Paciente).filter(
-        Paciente.id_paciente == tratamiento.paciente_id
-    ).first()
-    if paciente:
-        response["paciente_nombre"] = f"{paciente.nombres} {paciente.apellidos}"
+    Una sola consulta agrupada sobre los ids de la página (LEFT JOIN a
+    pacientes y a evoluciones + COUNT) en lugar de dos por tratamiento.
+    """
+    ids = [t.id_tratamiento for t in tratamientos]
+    datos = {}
+    if ids:
+        rows = await db.execute(
+            select(
+                Tratamiento.id_tratamiento,
+                Paciente.nombres,
+                Paciente.apellidos,
+                func.count(EvolucionClinica.id_evolucion),
+            )
+            .outerjoin(Paciente, Paciente.id_paciente == Tratamiento.paciente_id)
+            .outerjoin(
+                EvolucionClinica,
+                EvolucionClinica.tratamiento_id == Tratamiento.id_tratamiento,
+            )
+            .where(Tratamiento.id_tratamiento.in_(ids))
+            .group_by(Tratamiento.id_tratamiento, Paciente.id_paciente)
+        )
+        datos = {row[0]: row[1:] for row in rows.all()}
     
-    # Contar evoluciones
-    total_evoluciones = db.query(EvolucionClinica).filter(
-        EvolucionClinica.tratamiento_id == tratamiento.id_tratamiento
-    ).count()
-    response["total_evoluciones"] = total_evoluciones
+    responses = []
+    for tratamiento in tratamientos:
+        response = TratamientoResponse.model_validate(tratamiento).model_dump()
+        nombres, apellidos, total_evoluciones = datos.get(
+            tratamiento.id_tratamiento, (None, None, 0)
+        )
+        if nombres is not None:
+            response["paciente_nombre"] = f"{nombres} {apellidos}"
+        response["total_evoluciones"] = total_evoluciones
+        responses.append(response)
     
-    return response
+    return responses
+
+
+async def enrich_tratamiento_response(tratamiento: Tratamiento, db: AsyncSession) -> dict:
+    """Agrega datos del paciente y conteo de evoluciones"""
+    return (await enrich_tratamientos_response([tratamiento], db))[0]
 
 
 # =============================================================================
@@ -126,7 +158,7 @@ async def list_tratamientos(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Lista todos los tratamientos.
@@ -137,27 +169,27 @@ async def list_tratamientos(
     - estado: Filtrar por estado del tratamiento
     - paciente_id: Filtrar por paciente
     """
-    query = db.query(Tratamiento).filter(Tratamiento.deleted_at.is_(None))
+    query = select(Tratamiento).where(Tratamiento.deleted_at.is_(None))
     
     # Filtrar por clínica
     if current_user.clinica_id:
-        query = query.filter(Tratamiento.id_clinica == current_user.clinica_id)
+        query = query.where(Tratamiento.id_clinica == current_user.clinica_id)
     
     # Aplicar filtros
     if estado:
-        query = query.filter(Tratamiento.estado_tratamiento == estado)
+        query = query.where(Tratamiento.estado_tratamiento == estado)
     if paciente_id:
-        query = query.filter(Tratamiento.paciente_id == paciente_id)
+        query = query.where(Tratamiento.paciente_id == paciente_id)
     
     # Ordenar por más reciente
     query = query.order_by(Tratamiento.created_at.desc())
     
-    total = query.count()
-    tratamientos = query.offset(skip).limit(limit).all()
+    total = await count_total(db, query)
+    tratamientos = (await db.scalars(query.offset(skip).limit(limit))).all()
     
     return {
         "total": total,
-        "tratamientos": [enrich_tratamiento_response(t, db) for t in tratamientos]
+        "tratamientos": await enrich_tratamientos_response(tratamientos, db)
     }
 
 
@@ -169,17 +201,19 @@ async def list_tratamientos(
 async def get_tratamiento(
     tratamiento_id: int,
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Obtiene detalle de un tratamiento con sus evoluciones.
     
     **Permisos:** Solo Admin y Podologo
     """
-    tratamiento = db.query(Tratamiento).filter(
-        Tratamiento.id_tratamiento == tratamiento_id,
-        Tratamiento.deleted_at.is_(None)
-    ).first()
+    tratamiento = await db.scalar(
+        select(Tratamiento).where(
+            Tratamiento.id_tratamiento == tratamiento_id,
+            Tratamiento.deleted_at.is_(None)
+        )
+    )
     
     if not tratamiento:
         raise HTTPException(
@@ -194,12 +228,14 @@ async def get_tratamiento(
             detail="No tienes acceso a este tratamiento"
         )
     
-    response = enrich_tratamiento_response(tratamiento, db)
+    response = await enrich_tratamiento_response(tratamiento, db)
     
     # Agregar lista de evoluciones
-    evoluciones = db.query(EvolucionClinica).filter(
-        EvolucionClinica.tratamiento_id == tratamiento_id
-    ).order_by(EvolucionClinica.fecha_visita.desc()).all()
+    evoluciones = (await db.scalars(
+        select(EvolucionClinica).where(
+            EvolucionClinica.tratamiento_id == tratamiento_id
+        ).order_by(EvolucionClinica.fecha_visita.desc())
+    )).all()
     
     response["evoluciones"] = [
         {
@@ -221,7 +257,7 @@ async def get_tratamiento(
 async def create_tratamiento(
     data: TratamientoCreate,
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Crea un nuevo tratamiento para un paciente.
@@ -231,10 +267,12 @@ async def create_tratamiento(
     **Nota:** Un paciente puede tener múltiples tratamientos activos.
     """
     # Verificar que el paciente existe
-    paciente = db.query(Paciente).filter(
-        Paciente.id_paciente == data.paciente_id,
-        Paciente.deleted_at.is_(None)
-    ).first()
+    paciente = await db.scalar(
+        select(Paciente).where(
+            Paciente.id_paciente == data.paciente_id,
+            Paciente.deleted_at.is_(None)
+        )
+    )
     
     if not paciente:
         raise HTTPException(
@@ -250,10 +288,11 @@ async def create_tratamiento(
     )
     
     db.add(tratamiento)
-    db.commit()
-    db.refresh(tratamiento)
+    await db.commit()
+    invalidate_dashboard_cache(tratamiento.id_clinica)
+    await db.refresh(tratamiento)
     
-    return enrich_tratamiento_response(tratamiento, db)
+    return await enrich_tratamiento_response(tratamiento, db)
 
 
 # =============================================================================
@@ -265,17 +304,19 @@ async def update_tratamiento(
     tratamiento_id: int,
     data: TratamientoUpdate,
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Actualiza un tratamiento existente.
     
     **Permisos:** Solo Admin y Podologo
     """
-    tratamiento = db.query(Tratamiento).filter(
-        Tratamiento.id_tratamiento == tratamiento_id,
-        Tratamiento.deleted_at.is_(None)
-    ).first()
+    tratamiento = await db.scalar(
+        select(Tratamiento).where(
+            Tratamiento.id_tratamiento == tratamiento_id,
+            Tratamiento.deleted_at.is_(None)
+        )
+    )
     
     if not tratamiento:
         raise HTTPException(
@@ -297,10 +338,11 @@ async def update_tratamiento(
         setattr(tratamiento, field, value)
     
     tratamiento.updated_by = current_user.id_usuario
-    db.commit()
-    db.refresh(tratamiento)
+    await db.commit()
+    invalidate_dashboard_cache(tratamiento.id_clinica)
+    await db.refresh(tratamiento)
     
-    return enrich_tratamiento_response(tratamiento, db)
+    return await enrich_tratamiento_response(tratamiento, db)
 
 
 # =============================================================================
@@ -312,7 +354,7 @@ async def update_tratamiento_status(
     tratamiento_id: int,
     data: TratamientoStatusUpdate,
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Cambia el estado de un tratamiento.
@@ -325,10 +367,12 @@ async def update_tratamiento_status(
     - Pausado: Temporalmente detenido
     - Abandonado: El paciente dejó de asistir
     """
-    tratamiento = db.query(Tratamiento).filter(
-        Tratamiento.id_tratamiento == tratamiento_id,
-        Tratamiento.deleted_at.is_(None)
-    ).first()
+    tratamiento = await db.scalar(
+        select(Tratamiento).where(
+            Tratamiento.id_tratamiento == tratamiento_id,
+            Tratamiento.deleted_at.is_(None)
+        )
+    )
     
     if not tratamiento:
         raise HTTPException(
@@ -345,12 +389,13 @@ async def update_tratamiento_status(
     
     tratamiento.estado_tratamiento = data.estado_tratamiento
     tratamiento.updated_by = current_user.id_usuario
-    db.commit()
-    db.refresh(tratamiento)
+    await db.commit()
+    invalidate_dashboard_cache(tratamiento.id_clinica)
+    await db.refresh(tratamiento)
     
     return {
         "message": f"Estado actualizado a '{data.estado_tratamiento}'",
-        "tratamiento": enrich_tratamiento_response(tratamiento, db)
+        "tratamiento": await enrich_tratamiento_response(tratamiento, db)
     }
 
 
@@ -362,17 +407,19 @@ async def update_tratamiento_status(
 async def soft_delete_tratamiento(
     tratamiento_id: int,
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    db: Session = Depends(get_core_db)
+    db: AsyncSession = Depends(get_core_db)
 ):
     """
     Desactiva un tratamiento (soft delete).
     
     **Permisos:** Solo Admin y Podologo
     """
-    tratamiento = db.query(Tratamiento).filter(
-        Tratamiento.id_tratamiento == tratamiento_id,
-        Tratamiento.deleted_at.is_(None)
-    ).first()
+    tratamiento = await db.scalar(
+        select(Tratamiento).where(
+            Tratamiento.id_tratamiento == tratamiento_id,
+            Tratamiento.deleted_at.is_(None)
+        )
+    )
     
     if not tratamiento:
         raise HTTPException(
@@ -390,6 +437,7 @@ async def soft_delete_tratamiento(
     # Soft delete
     tratamiento.deleted_at = datetime.now(timezone.utc)
     tratamiento.updated_by = current_user.id_usuario
-    db.commit()
+    await db.commit()
+    invalidate_dashboard_cache(tratamiento.id_clinica)
     
     return {"message": "Tratamiento desactivado", "id": tratamiento_id}
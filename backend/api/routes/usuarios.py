@@ -15,14 +15,16 @@
 from typing import Optional
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from pydantic import BaseModel, Field, EmailStr
 
 from backend.api.deps.database import get_auth_db
 from backend.api.deps.permissions import require_role, ROLE_ADMIN, CLINICAL_ROLES
 from backend.api.deps.auth import get_current_active_user
+from backend.api.utils.cache import invalidate_principal
 from backend.schemas.auth.models import SysUsuario
-from backend.schemas.auth.auth_utils import hash_password
+from backend.api.core.hashing import hash_password_async
 
 
 # =============================================================================
@@ -85,26 +87,26 @@ async def list_usuarios(
     activo: Optional[bool] = Query(None, description="Filtrar por activos"),
     rol: Optional[str] = Query(None, description="Filtrar por rol"),
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),  # Admin o Podologo pueden ver
-    db: Session = Depends(get_auth_db)
+    db: AsyncSession = Depends(get_auth_db)
 ):
     """
     Lista los usuarios del sistema.
     
     **Permisos:** Admin y Podologo (solo lectura para Podologo)
     """
-    query = db.query(SysUsuario)
+    query = select(SysUsuario)
     
     # Filtrar por clínica
     if current_user.clinica_id:
-        query = query.filter(SysUsuario.clinica_id == current_user.clinica_id)
+        query = query.where(SysUsuario.clinica_id == current_user.clinica_id)
     
     # Aplicar filtros
     if activo is not None:
-        query = query.filter(SysUsuario.activo == activo)
+        query = query.where(SysUsuario.activo == activo)
     if rol:
-        query = query.filter(SysUsuario.rol == rol)
+        query = query.where(SysUsuario.rol == rol)
     
-    usuarios = query.order_by(SysUsuario.nombre_usuario).all()
+    usuarios = (await db.scalars(query.order_by(SysUsuario.nombre_usuario))).all()
     
     return {
         "total": len(usuarios),
@@ -120,7 +122,7 @@ async def list_usuarios(
 async def get_usuario(
     usuario_id: int,
     current_user: SysUsuario = Depends(require_role(CLINICAL_ROLES)),
-    db: Session = Depends(get_auth_db)
+    db: AsyncSession = Depends(get_auth_db)
 ):
     """
     Obtiene detalle de un usuario.
@@ -136,9 +138,9 @@ async def get_usuario(
             detail="Solo puedes ver tu propio perfil"
         )
     
-    usuario = db.query(SysUsuario).filter(
+    usuario = await db.scalar(select(SysUsuario).where(
         SysUsuario.id_usuario == usuario_id
-    ).first()
+    ))
     
     if not usuario:
         raise HTTPException(
@@ -157,7 +159,7 @@ async def get_usuario(
 async def create_usuario(
     data: UsuarioCreate,
     current_user: SysUsuario = Depends(require_role([ROLE_ADMIN])),  # Solo Admin
-    db: Session = Depends(get_auth_db)
+    db: AsyncSession = Depends(get_auth_db)
 ):
     """
     Crea un nuevo usuario del sistema.
@@ -170,9 +172,9 @@ async def create_usuario(
     - Recepcion: Solo agenda y datos básicos
     """
     # Verificar que el nombre de usuario no exista
-    existing = db.query(SysUsuario).filter(
+    existing = await db.scalar(select(SysUsuario).where(
         SysUsuario.nombre_usuario == data.nombre_usuario
-    ).first()
+    ))
     
     if existing:
         raise HTTPException(
@@ -182,7 +184,7 @@ async def create_usuario(
     
     usuario = SysUsuario(
         nombre_usuario=data.nombre_usuario,
-        password_hash=hash_password(data.password),
+        password_hash=await hash_password_async(data.password),
         email=data.email,
         rol=data.rol,
         clinica_id=data.clinica_id or current_user.clinica_id,
@@ -190,8 +192,8 @@ async def create_usuario(
     )
     
     db.add(usuario)
-    db.commit()
-    db.refresh(usuario)
+    await db.commit()
+    await db.refresh(usuario)
     
     return UsuarioResponse.model_validate(usuario)
 
@@ -205,7 +207,7 @@ async def update_usuario(
     usuario_id: int,
     data: UsuarioUpdate,
     current_user: SysUsuario = Depends(require_role([ROLE_ADMIN])),  # Solo Admin
-    db: Session = Depends(get_auth_db)
+    db: AsyncSession = Depends(get_auth_db)
 ):
     """
     Actualiza un usuario del sistema.
@@ -215,9 +217,9 @@ async def update_usuario(
     **Nota:** No usa este endpoint para cambiar contraseñas.
     Para resetear contraseña, usar PUT /usuarios/{id}/reset-password.
     """
-    usuario = db.query(SysUsuario).filter(
+    usuario = await db.scalar(select(SysUsuario).where(
         SysUsuario.id_usuario == usuario_id
-    ).first()
+    ))
     
     if not usuario:
         raise HTTPException(
@@ -234,9 +236,9 @@ async def update_usuario(
     
     # Verificar nombre único si se está cambiando
     if data.nombre_usuario and data.nombre_usuario != usuario.nombre_usuario:
-        existing = db.query(SysUsuario).filter(
+        existing = await db.scalar(select(SysUsuario).where(
             SysUsuario.nombre_usuario == data.nombre_usuario
-        ).first()
+        ))
         if existing:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -248,8 +250,9 @@ async def update_usuario(
     for field, value in update_data.items():
         setattr(usuario, field, value)
     
-    db.commit()
-    db.refresh(usuario)
+    await db.commit()
+    await db.refresh(usuario)
+    invalidate_principal(usuario_id)
     
     return UsuarioResponse.model_validate(usuario)
 
@@ -263,7 +266,7 @@ async def reset_usuario_password(
     usuario_id: int,
     data: UsuarioResetPassword,
     current_user: SysUsuario = Depends(require_role([ROLE_ADMIN])),  # Solo Admin
-    db: Session = Depends(get_auth_db)
+    db: AsyncSession = Depends(get_auth_db)
 ):
     """
     Resetea la contraseña de un usuario.
@@ -273,9 +276,9 @@ async def reset_usuario_password(
     **Nota:** El admin establece una nueva contraseña que el usuario
     debe cambiar en su próximo login.
     """
-    usuario = db.query(SysUsuario).filter(
+    usuario = await db.scalar(select(SysUsuario).where(
         SysUsuario.id_usuario == usuario_id
-    ).first()
+    ))
     
     if not usuario:
         raise HTTPException(
@@ -283,8 +286,9 @@ async def reset_usuario_password(
             detail="Usuario no encontrado"
         )
     
-    usuario.password_hash = hash_password(data.new_password)
-    db.commit()
+    usuario.password_hash = await hash_password_async(data.new_password)
+    await db.commit()
+    invalidate_principal(usuario_id)
     
     return {
         "message": f"Contraseña de '{usuario.nombre_usuario}' reseteada exitosamente"
@@ -299,7 +303,7 @@ async def reset_usuario_password(
 async def delete_usuario(
     usuario_id: int,
     current_user: SysUsuario = Depends(require_role([ROLE_ADMIN])),  # Solo Admin
-    db: Session = Depends(get_auth_db)
+    db: AsyncSession = Depends(get_auth_db)
 ):
     """
     Desactiva un usuario del sistema.
@@ -314,9 +318,9 @@ async def delete_usuario(
             detail="No puedes desactivarte a ti mismo"
         )
     
-    usuario = db.query(SysUsuario).filter(
+    usuario = await db.scalar(select(SysUsuario).where(
         SysUsuario.id_usuario == usuario_id
-    ).first()
+    ))
     
     if not usuario:
         raise HTTPException(
@@ -325,6 +329,7 @@ async def delete_usuario(
         )
     
     usuario.activo = False
-    db.commit()
+    await db.commit()
+    invalidate_principal(usuario_id)
     
     return {"message": f"Usuario '{usuario.nombre_usuario}' desactivado", "id": usuario_id}
@@ -25,7 +25,7 @@
 
 from typing import Optional, Dict, Any
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import json
 import logging
 import asyncio
@@ -118,7 +118,7 @@ manager = ConnectionManager()
 async def langgraph_stream_endpoint(
     websocket: WebSocket,
     token: Optional[str] = Query(None),
-    db: Session = Depends(get_auth_db)
+    db: AsyncSession = Depends(get_auth_db)
 ):
     """
     WebSocket endpoint for LangGraph streaming updates.
@@ -0,0 +1,285 @@
+# =============================================================================
+# backend/api/utils/audit_writer.py
+# Escritura asíncrona y por lotes de auth.audit_log
+# =============================================================================
+"""
+Background writer for audit log rows.
+
+Requests only enqueue a row (no DB round trip). A single task per worker
+drains the queue and inserts rows with one multi-row INSERT every
+AUDIT_BATCH_SIZE rows or AUDIT_FLUSH_INTERVAL_MS milliseconds, whichever
+comes first.
+
+If the auth DB is unavailable (or the queue is full) rows are appended to
+JSON Lines files in AUDIT_SPILL_DIR and re-inserted on the next successful
+flush, so audit entries are not lost. On shutdown the queue is flushed.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from backend.api.core.config import get_settings
+from backend.api.deps.database import AsyncAuthSessionLocal
+from backend.schemas.auth.models import AuditLog
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Columnas que se insertan (id_log lo genera la BD)
+AUDIT_COLUMNS = [c.name for c in AuditLog.__table__.columns if c.name != "id_log"]
+
+_STOP = object()
+
+
+class AuditWriter:
+    """
+    Cola acotada + tarea que inserta registros de auditoría en lotes.
+
+    Args:
+        session_factory: Fábrica de AsyncSession para auth DB
+        max_queue_size: Tope de la cola; al llenarse se escribe a disco
+        batch_size: Filas por INSERT
+        flush_interval_ms: Espera máxima para completar un lote
+        spill_dir: Directorio para el respaldo en disco
+
+    Example:
+        ```python
+        audit_writer.start()          # al iniciar la app
+        audit_writer.enqueue({"tabla_afectada": "pacientes", "accion": "CREATE"})
+        await audit_writer.stop()     # al apagar: vacía la cola
+        ```
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Any] = AsyncAuthSessionLocal,
+        max_queue_size: int = settings.AUDIT_QUEUE_MAXSIZE,
+        batch_size: int = settings.AUDIT_BATCH_SIZE,
+        flush_interval_ms: int = settings.AUDIT_FLUSH_INTERVAL_MS,
+        spill_dir: str = settings.AUDIT_SPILL_DIR,
+    ):
+        self.session_factory = session_factory
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.spill_dir = Path(spill_dir)
+        self._queue: Optional[asyncio.Queue] = None
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._has_spill = True  # Revisar el directorio en el primer flush
+
+    # -------------------------------------------------------------------------
+    # API pública
+    # -------------------------------------------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Crea la cola y la tarea de escritura en el event loop actual."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._batch_ready = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="audit-writer")
+
+    def enqueue(self, row: Dict[str, Any]) -> None:
+        """
+        Encola un registro sin esperar a la BD.
+
+        Las llaves son columnas de AuditLog; las que falten quedan en NULL.
+        timestamp_accion se fija aquí (hora del request, no del INSERT).
+        """
+        row = self._normalize(row)
+        if not self.running:
+            self.start()
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            logger.warning("Audit queue full; spilling row to disk")
+            self._spill([row])
+            return
+        if self._queue.qsize() >= self.batch_size - 1:
+            self._batch_ready.set()
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Vacía la cola a la BD (o a disco) y detiene la tarea."""
+        if self._task is None:
+            return
+        if not self._task.done():
+            self._stopping = True
+            self._batch_ready.set()
+            await self._queue.put(_STOP)
+            try:
+                await asyncio.wait_for(asyncio.shield(self._task), timeout)
+            except asyncio.TimeoutError:
+                logger.error("Audit writer did not finish in %.1fs; spilling queue", timeout)
+                self._task.cancel()
+                self._spill([r for r in self._drain() if r is not _STOP])
+        self._task = None
+
+    # -------------------------------------------------------------------------
+    # Tarea de escritura
+    # -------------------------------------------------------------------------
+
+    async def _run(self) -> None:
+        while True:
+            item = await self._queue.get()
+            self._batch_ready.clear()
+            if (
+                item is not _STOP
+                and not self._stopping
+                and self._queue.qsize() < self.batch_size - 1
+            ):
+                # Esperar a completar el lote, a que venza el intervalo o a stop()
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch: List[Dict[str, Any]] = []
+            stopping = item is _STOP
+            if not stopping:
+                batch.append(item)
+            while len(batch) < self.batch_size and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+
+            if batch:
+                await self.flush(batch)
+            if stopping:
+                remaining = [r for r in self._drain() if r is not _STOP]
+                for i in range(0, len(remaining), self.batch_size):
+                    await self.flush(remaining[i:i + self.batch_size])
+                return
+
+    async def flush(self, rows: List[Dict[str, Any]]) -> bool:
+        """Inserta un lote; si falla lo escribe a disco. Retorna True si llegó a la BD."""
+        try:
+            await self._insert(rows)
+        except Exception as e:
+            logger.error(f"Audit batch insert failed ({len(rows)} rows), spilling to disk: {e}")
+            await asyncio.to_thread(self._spill, rows)
+            return False
+        if self._has_spill:
+            await self._replay_spill()
+        return True
+
+    async def _insert(self, rows: List[Dict[str, Any]]) -> None:
+        # Un solo INSERT ... VALUES (...), (...), ... (insertmanyvalues)
+        async with self.session_factory() as db:
+            await db.execute(insert(AuditLog), rows)
+            await db.commit()
+
+    # -------------------------------------------------------------------------
+    # Respaldo en disco
+    # -------------------------------------------------------------------------
+
+    def _spill(self, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        try:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            self._write_spill(self.spill_dir / f"audit-{os.getpid()}-{time.time_ns()}.jsonl", rows)
+            self._has_spill = True
+        except Exception as e:
+            logger.critical(f"Could not spill {len(rows)} audit rows to {self.spill_dir}: {e}")
+
+    async def _replay_spill(self) -> None:
+        """Reinserta los archivos pendientes; se detiene al primer error."""
+        if not self.spill_dir.is_dir():
+            self._has_spill = False
+            return
+        for path in sorted(self.spill_dir.glob("audit-*.jsonl")):
+            # Renombrar primero: si hay varios workers, solo uno toma el archivo
+            claimed = path.with_suffix(f".replay-{os.getpid()}")
+            try:
+                path.rename(claimed)
+            except OSError:
+                continue
+            rows: List[Dict[str, Any]] = []
+            committed = 0
+            try:
+                rows = await asyncio.to_thread(self._read_spill, claimed)
+                for committed in range(0, len(rows), self.batch_size):
+                    await self._insert(rows[committed:committed + self.batch_size])
+            except Exception as e:
+                logger.warning(f"Audit spill replay of {path.name} failed, will retry: {e}")
+                await self._release_spill(claimed, path, rows[committed:] if committed else None)
+                return
+            claimed.unlink()
+            logger.info(f"Replayed {len(rows)} spilled audit rows from {path.name}")
+        self._has_spill = False
+
+    async def _release_spill(
+        self, claimed: Path, path: Path, pending: Optional[List[Dict[str, Any]]]
+    ) -> None:
+        """Devuelve un archivo tomado; con `pending`, solo las filas aún no insertadas."""
+        if pending is not None:
+            # Los lotes ya confirmados no se repiten en el siguiente intento
+            try:
+                await asyncio.to_thread(self._write_spill, path, pending)
+                claimed.unlink()
+                return
+            except Exception as e:
+                logger.critical(f"Could not rewrite audit spill {path.name}, replaying it whole: {e}")
+        claimed.rename(path)
+
+    def _write_spill(self, path: Path, rows: List[Dict[str, Any]]) -> None:
+        # Se escribe aparte y se renombra: otro worker nunca toma un archivo a medias
+        partial = path.with_suffix(".partial")
+        with open(partial, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(self._to_json(row)) + "\n")
+        partial.replace(path)
+
+    def _read_spill(self, path: Path) -> List[Dict[str, Any]]:
+        with open(path, encoding="utf-8") as f:
+            return [self._from_json(json.loads(line)) for line in f if line.strip()]
+
+    # -------------------------------------------------------------------------
+    # Utilidades
+    # -------------------------------------------------------------------------
+
+    def _drain(self) -> List[Any]:
+        items = []
+        while self._queue is not None and not self._queue.empty():
+            items.append(self._queue.get_nowait())
+        return items
+
+    @staticmethod
+    def _normalize(row: Dict[str, Any]) -> Dict[str, Any]:
+        # Todas las filas con las mismas llaves para que el INSERT sea uno solo
+        normalized = {column: row.get(column) for column in AUDIT_COLUMNS}
+        if normalized["timestamp_accion"] is None:
+            normalized["timestamp_accion"] = datetime.now(timezone.utc)
+        return normalized
+
+    @staticmethod
+    def _to_json(row: Dict[str, Any]) -> Dict[str, Any]:
+        data = dict(row)
+        data["timestamp_accion"] = data["timestamp_accion"].isoformat()
+        return data
+
+    @staticmethod
+    def _from_json(data: Dict[str, Any]) -> Dict[str, Any]:
+        data["timestamp_accion"] = datetime.fromisoformat(data["timestamp_accion"])
+        return AuditWriter._normalize(data)
+
+
+# Instancia compartida de la aplicación (iniciada en el lifespan de app.py)
+audit_writer = AuditWriter()
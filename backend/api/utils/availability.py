@@ -0,0 +1,376 @@
+# =============================================================================
+# backend/api/utils/availability.py
+# Motor de disponibilidad de la agenda (varios podólogos, varios días)
+# =============================================================================
+"""
+Availability engine shared by the API (GET /citas/disponibilidad*) and the
+agent (tools/appointment_manager.py).
+
+Loading takes three queries regardless of how many podiatrists or days are
+requested: active podiatrists, their working hours and ALL busy intervals
+of the range. Everything else is computed in memory on minutes since
+midnight: busy intervals are sorted and merged once per (podiatrist, day)
+and every slot is checked with a single forward pass, so a week for the
+whole staff is O(slots + appointments).
+
+Working hours come from ops.horarios_podologos (one or more windows per
+weekday, so split shifts work). A podiatrist without rows there works
+AGENDA_HORA_INICIO-AGENDA_HORA_FIN every day.
+"""
+
+import calendar
+from bisect import bisect_right
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.api.core.config import get_settings
+from backend.schemas.ops.models import Cita, HorarioPodologo, Podologo
+
+settings = get_settings()
+
+# Citas que no ocupan el horario
+FREE_STATUSES = ("Cancelada", "No Asistió")
+
+MINUTES_PER_DAY = 24 * 60
+
+Interval = Tuple[int, int]  # (inicio, fin) en minutos desde medianoche, fin exclusivo
+
+
+# =============================================================================
+# INTERVALOS
+# =============================================================================
+
+def to_minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def to_time(minutes: int) -> time:
+    if minutes >= MINUTES_PER_DAY:
+        return time.max
+    return time(minutes // 60, minutes % 60)
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """Ordena y une intervalos que se enciman o se tocan."""
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def slot_grid(
+    windows: Sequence[Interval],
+    busy: Sequence[Interval],
+    duration: int,
+    step: int,
+    not_before: int = 0,
+) -> List[Tuple[int, int, bool]]:
+    """
+    Slots de `duration` minutos cada `step` minutos dentro de cada ventana.
+
+    `busy` debe venir de merge_intervals. Retorna (inicio, fin, disponible);
+    los slots que empiezan antes de `not_before` se omiten.
+    """
+    slots: List[Tuple[int, int, bool]] = []
+    ends = [end for _, end in busy]
+    for window_start, window_end in windows:
+        start = window_start
+        while start + duration <= window_end:
+            if start >= not_before:
+                # Primer intervalo ocupado que termina después del inicio del slot
+                i = bisect_right(ends, start)
+                free = i == len(busy) or busy[i][0] >= start + duration
+                slots.append((start, start + duration, free))
+            start += step
+    return slots
+
+
+# =============================================================================
+# AGENDA CARGADA
+# =============================================================================
+
+@dataclass(frozen=True)
+class Slot:
+    """Un horario de un podólogo."""
+    podologo_id: int
+    fecha: date
+    hora_inicio: time
+    hora_fin: time
+    disponible: bool = True
+
+
+class Agenda:
+    """
+    Ocupación y jornadas de un rango de fechas, ya en memoria.
+
+    Se construye con load_agenda (async) o load_agenda_sync; todos los
+    cálculos posteriores son sin consultas.
+    """
+
+    def __init__(
+        self,
+        podologos: Dict[int, str],
+        busy_rows: Iterable[Tuple[int, date, time, time]],
+        horario_rows: Iterable[Tuple[int, int, time, time]] = (),
+        default_hours: Optional[Interval] = None,
+        slot_minutes: Optional[int] = None,
+    ):
+        self.podologos = podologos
+        self.slot_minutes = slot_minutes or settings.AGENDA_SLOT_MINUTOS
+        self.default_hours = default_hours or (
+            to_minutes(settings.AGENDA_HORA_INICIO), to_minutes(settings.AGENDA_HORA_FIN)
+        )
+
+        raw_busy: Dict[Tuple[int, date], List[Interval]] = defaultdict(list)
+        # Citas por día antes de fusionar: dos citas que se tocan siguen siendo dos
+        self.citas_por_dia: Dict[date, int] = defaultdict(int)
+        for podologo_id, fecha, hora_inicio, hora_fin in busy_rows:
+            raw_busy[(podologo_id, fecha)].append((to_minutes(hora_inicio), to_minutes(hora_fin)))
+            self.citas_por_dia[fecha] += 1
+        self.busy: Dict[Tuple[int, date], List[Interval]] = {
+            key: merge_intervals(intervals) for key, intervals in raw_busy.items()
+        }
+
+        raw_hours: Dict[int, Dict[int, List[Interval]]] = defaultdict(lambda: defaultdict(list))
+        for podologo_id, dia_semana, hora_inicio, hora_fin in horario_rows:
+            raw_hours[podologo_id][dia_semana].append((to_minutes(hora_inicio), to_minutes(hora_fin)))
+        self.hours: Dict[int, Dict[int, List[Interval]]] = {
+            pid: {day: merge_intervals(w) for day, w in days.items()}
+            for pid, days in raw_hours.items()
+        }
+
+    def working_windows(self, podologo_id: int, fecha: date) -> List[Interval]:
+        """Ventanas de trabajo del día (lista vacía = no trabaja)."""
+        if podologo_id in self.hours:
+            return self.hours[podologo_id].get(fecha.weekday(), [])
+        return [self.default_hours]
+
+    def day_slots(
+        self,
+        podologo_id: int,
+        fecha: date,
+        duration: int,
+        only_free: bool = False,
+        not_before: Optional[datetime] = None,
+        window: Optional[Interval] = None,
+    ) -> List[Slot]:
+        """
+        Slots de un podólogo en un día.
+
+        Args:
+            not_before: Omite slots que empiezan antes (p. ej. "ahora")
+            window: Limita la búsqueda a este rango de minutos del día
+        """
+        windows = self.working_windows(podologo_id, fecha)
+        if window is not None:
+            windows = [
+                (max(s, window[0]), min(e, window[1]))
+                for s, e in windows if min(e, window[1]) > max(s, window[0])
+            ]
+        minimum = 0
+        if not_before is not None:
+            if fecha < not_before.date():
+                return []
+            if fecha == not_before.date():
+                minimum = to_minutes(not_before.time()) + (1 if not_before.second or not_before.microsecond else 0)
+
+        grid = slot_grid(
+            windows, self.busy.get((podologo_id, fecha), []),
+            duration, self.slot_minutes, minimum,
+        )
+        return [
+            Slot(podologo_id, fecha, to_time(start), to_time(end), free)
+            for start, end, free in grid
+            if free or not only_free
+        ]
+
+    def conflict(self, podologo_id: int, fecha: date, hora_inicio: time, hora_fin: time) -> Optional[str]:
+        """
+        Motivo por el que no se puede agendar ese horario, o None si está libre.
+
+        Returns:
+            "fuera_de_horario" o "solapamiento"
+        """
+        start, end = to_minutes(hora_inicio), to_minutes(hora_fin)
+        if not any(ws <= start and end <= we for ws, we in self.working_windows(podologo_id, fecha)):
+            return "fuera_de_horario"
+        busy = self.busy.get((podologo_id, fecha), [])
+        i = bisect_right([e for _, e in busy], start)
+        if i < len(busy) and busy[i][0] < end:
+            return "solapamiento"
+        return None
+
+    def free_slots(
+        self,
+        desde: date,
+        dias: int,
+        duration: int,
+        podologo_ids: Optional[Iterable[int]] = None,
+        not_before: Optional[datetime] = None,
+        window: Optional[Interval] = None,
+    ) -> List[Slot]:
+        """Slots libres de varios podólogos en `dias` días, por fecha, hora y podólogo."""
+        ids = list(podologo_ids) if podologo_ids is not None else list(self.podologos)
+        slots = [
+            slot
+            for offset in range(dias)
+            for pid in ids
+            for slot in self.day_slots(
+                pid, desde + timedelta(days=offset), duration,
+                only_free=True, not_before=not_before, window=window,
+            )
+        ]
+        slots.sort(key=lambda s: (s.fecha, s.hora_inicio, s.podologo_id))
+        return slots
+
+    def first_available(
+        self,
+        desde: date,
+        dias: int,
+        duration: int,
+        podologo_ids: Optional[Iterable[int]] = None,
+        not_before: Optional[datetime] = None,
+    ) -> Dict[int, Slot]:
+        """Primer slot libre de cada podólogo en los próximos `dias` días."""
+        ids = list(podologo_ids) if podologo_ids is not None else list(self.podologos)
+        first: Dict[int, Slot] = {}
+        for pid in ids:
+            for offset in range(dias):
+                slots = self.day_slots(
+                    pid, desde + timedelta(days=offset), duration,
+                    only_free=True, not_before=not_before,
+                )
+                if slots:
+                    first[pid] = slots[0]
+                    break
+        return first
+
+
+# =============================================================================
+# RECURRENCIA
+# =============================================================================
+
+FRECUENCIAS = ("diaria", "semanal", "mensual")
+
+
+def _add_months(day: date, months: int) -> date:
+    index = day.year * 12 + (day.month - 1) + months
+    year, month = index // 12, index % 12 + 1
+    # 31 de enero + 1 mes → 28/29 de febrero
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def recurrence_dates(
+    inicio: date,
+    frecuencia: str,
+    intervalo: int = 1,
+    ocurrencias: Optional[int] = None,
+    hasta: Optional[date] = None,
+    max_ocurrencias: int = 52,
+) -> List[date]:
+    """
+    Fechas de una serie: cada `intervalo` días/semanas/meses desde `inicio`,
+    hasta juntar `ocurrencias` o pasar de `hasta` (lo que ocurra primero).
+    """
+    if frecuencia not in FRECUENCIAS:
+        raise ValueError(f"Frecuencia no soportada: {frecuencia}")
+    limite = min(ocurrencias or max_ocurrencias, max_ocurrencias)
+    fechas: List[date] = []
+    n = 0
+    while len(fechas) < limite:
+        if frecuencia == "mensual":
+            fecha = _add_months(inicio, n * intervalo)
+        else:
+            step = 7 if frecuencia == "semanal" else 1
+            fecha = inicio + timedelta(days=n * intervalo * step)
+        if hasta is not None and fecha > hasta:
+            break
+        fechas.append(fecha)
+        n += 1
+    return fechas
+
+
+# =============================================================================
+# CARGA (3 consultas para cualquier número de podólogos y días)
+# =============================================================================
+
+def _podologos_query(podologo_ids: Optional[Sequence[int]], clinica_id: Optional[int]):
+    query = (
+        select(Podologo.id_podologo, Podologo.nombre_completo)
+        .where(Podologo.activo == True, Podologo.deleted_at.is_(None))
+        .order_by(Podologo.nombre_completo)
+    )
+    if podologo_ids is not None:
+        query = query.where(Podologo.id_podologo.in_(podologo_ids))
+    if clinica_id:
+        query = query.where(Podologo.id_clinica == clinica_id)
+    return query
+
+
+def _horarios_query(podologo_ids: Sequence[int]):
+    return select(
+        HorarioPodologo.podologo_id, HorarioPodologo.dia_semana,
+        HorarioPodologo.hora_inicio, HorarioPodologo.hora_fin,
+    ).where(HorarioPodologo.podologo_id.in_(podologo_ids))
+
+
+def busy_intervals_query(podologo_ids: Sequence[int], desde: date, hasta: date):
+    """Todas las citas que ocupan horario de esos podólogos entre dos fechas (inclusive)."""
+    return select(
+        Cita.podologo_id, Cita.fecha_cita, Cita.hora_inicio, Cita.hora_fin,
+    ).where(
+        Cita.podologo_id.in_(podologo_ids),
+        Cita.fecha_cita.between(desde, hasta),
+        Cita.deleted_at.is_(None),
+        Cita.status.notin_(FREE_STATUSES),
+    )
+
+
+async def load_agenda(
+    db: AsyncSession,
+    desde: date,
+    hasta: date,
+    podologo_ids: Optional[Sequence[int]] = None,
+    clinica_id: Optional[int] = None,
+) -> Agenda:
+    """Carga la agenda de un rango (podologo_ids=None: todos los activos)."""
+    podologos = {pid: nombre for pid, nombre in (await db.execute(
+        _podologos_query(podologo_ids, clinica_id)
+    )).all()}
+    if not podologos:
+        return Agenda(podologos, [])
+    ids = list(podologos)
+    horarios = (await db.execute(_horarios_query(ids))).all()
+    busy = (await db.execute(busy_intervals_query(ids, desde, hasta))).all()
+    return Agenda(podologos, busy, horarios)
+
+
+def load_agenda_sync(
+    db: Session,
+    desde: date,
+    hasta: date,
+    podologo_ids: Optional[Sequence[int]] = None,
+    clinica_id: Optional[int] = None,
+) -> Agenda:
+    """Versión síncrona de load_agenda (herramientas del agente)."""
+    podologos = {pid: nombre for pid, nombre in db.execute(
+        _podologos_query(podologo_ids, clinica_id)
+    ).all()}
+    if not podologos:
+        return Agenda(podologos, [])
+    ids = list(podologos)
+    horarios = db.execute(_horarios_query(ids)).all()
+    busy = db.execute(busy_intervals_query(ids, desde, hasta)).all()
+    return Agenda(podologos, busy, horarios)
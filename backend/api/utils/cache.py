@@ -0,0 +1,123 @@
+# =============================================================================
+# backend/api/utils/cache.py
+# Caché en memoria con expiración (TTL)
+# =============================================================================
+"""
+Caché pequeña en memoria del proceso, con expiración por entrada.
+
+Para valores caros de calcular, que se leen constantemente y que pueden
+tener unos segundos de antigüedad (p. ej. las estadísticas del dashboard).
+Cada worker de uvicorn tiene su propia copia; invalidar solo afecta al
+proceso actual, así que los TTL deben ser cortos.
+"""
+
+import time
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+from backend.api.core.config import get_settings
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """
+    Diccionario con expiración por entrada.
+
+    Args:
+        ttl_seconds: Segundos que vive cada entrada
+        maxsize: Máximo de entradas; al llenarse se descarta la más antigua
+
+    Example:
+        ```python
+        cache: TTLCache[dict] = TTLCache(ttl_seconds=30)
+        value = cache.get(key)
+        if value is None:
+            value = await compute()
+            cache.set(key, value)
+        ```
+    """
+
+    def __init__(self, ttl_seconds: float, maxsize: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self._data: Dict[Hashable, Tuple[float, V]] = {}
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """Retorna el valor si existe y no ha expirado, si no None."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            return None
+        return value
+
+    def set(self, key: Hashable, value: V, ttl_seconds: Optional[float] = None) -> None:
+        """Guarda un valor (opcionalmente con un TTL distinto al default)."""
+        if key not in self._data and len(self._data) >= self.maxsize:
+            # Los dicts conservan orden de inserción: el primero es el más viejo
+            self._data.pop(next(iter(self._data)))
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._data[key] = (time.monotonic() + ttl, value)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Elimina una entrada."""
+        self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        """Elimina todas las entradas cuya llave cumple el predicado."""
+        for key in [k for k in self._data if predicate(k)]:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Vacía la caché."""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# =============================================================================
+# CACHÉS COMPARTIDAS DE LA APLICACIÓN
+# =============================================================================
+
+# Llave: (clinica_id, incluye_finanzas). Los usuarios no-Admin reciben el
+# dashboard sin datos financieros, así que se guardan por separado.
+dashboard_cache: TTLCache[Any] = TTLCache(
+    ttl_seconds=get_settings().DASHBOARD_CACHE_TTL_SECONDS, maxsize=256
+)
+
+
+def invalidate_dashboard_cache(clinica_id: Optional[int]) -> None:
+    """
+    Descarta el dashboard cacheado de una clínica.
+
+    Llamar después de cualquier escritura que cambie los conteos
+    (pacientes, citas, tratamientos, podólogos, pagos). También se
+    descarta la vista global (clinica_id=None) que suma todas las clínicas.
+    """
+    dashboard_cache.invalidate_where(lambda key: key[0] in (clinica_id, None))
+
+
+# Llave: token JWT. Valor: TokenData ya verificado (expira a más tardar
+# cuando expira el token).
+token_cache: TTLCache[Any] = TTLCache(
+    ttl_seconds=get_settings().JWT_DECODE_CACHE_TTL_SECONDS, maxsize=4096
+)
+
+# Llave: (id_usuario, token). Valor: columnas de SysUsuario.
+principal_cache: TTLCache[Any] = TTLCache(
+    ttl_seconds=get_settings().AUTH_PRINCIPAL_CACHE_TTL_SECONDS, maxsize=4096
+)
+
+
+def invalidate_principal(user_id: int) -> None:
+    """
+    Descarta el usuario cacheado (todas sus sesiones).
+
+    Llamar después de desactivar, editar o cambiar la contraseña de un
+    usuario. Otros workers lo verán a más tardar en
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS.
+    """
+    principal_cache.invalidate_where(lambda key: key[0] == user_id)
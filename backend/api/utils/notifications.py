@@ -7,19 +7,27 @@ This module provides notification utilities for appointment reminders.
 
 Supports:
 - Email notifications via SMTP
+- Bulk reminders: batch-loaded data, templates compiled once and a small
+  pool of reused SMTP connections with retries
 - SMS notifications (via third-party providers - to be implemented)
 - Templates for different notification types
 """
 
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Sequence, Tuple
+from dataclasses import dataclass, field
 from datetime import datetime, date, time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+import asyncio
 import aiosmtplib
 import logging
 from jinja2 import Template
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.api.core.config import get_settings
+from backend.schemas.core.models import Paciente
+from backend.schemas.ops.models import Cita, Podologo, CatalogoServicio
 
 logger = logging.getLogger(__name__)
 
@@ -79,11 +87,30 @@ APPOINTMENT_REMINDER_TEMPLATE = """
 </html>
 """
 
+# Compiled once at import; rendering reuses the parsed template
+APPOINTMENT_REMINDER = Template(APPOINTMENT_REMINDER_TEMPLATE)
+
 
 # =============================================================================
 # NOTIFICATION FUNCTIONS
 # =============================================================================
 
+def _build_message(to_email: str, subject: str, html_content: str, from_email: str) -> MIMEMultipart:
+    """Build a MIME message with an HTML body."""
+    message = MIMEMultipart("alternative")
+    message["From"] = from_email
+    message["To"] = to_email
+    message["Subject"] = subject
+    message.attach(MIMEText(html_content, "html"))
+    return message
+
+
+def smtp_configured() -> bool:
+    """True when SMTP_USER and SMTP_PASSWORD are set."""
+    settings = get_settings()
+    return bool(settings.SMTP_USER and settings.SMTP_PASSWORD)
+
+
 async def send_email(
     to_email: str,
     subject: str,
@@ -109,25 +136,17 @@ async def send_email(
         - SMTP_USER
         - SMTP_PASSWORD
     """
-    settings = get_settings()
-    
-    if not settings.SMTP_USER or not settings.SMTP_PASSWORD:
+    if not smtp_configured():
         logger.warning("SMTP credentials not configured. Email not sent.")
         return False
     
+    settings = get_settings()
+    
     if from_email is None:
         from_email = settings.FROM_EMAIL
     
     try:
-        # Create message
-        message = MIMEMultipart("alternative")
-        message["From"] = from_email
-        message["To"] = to_email
-        message["Subject"] = subject
-        
-        # Attach HTML content
-        html_part = MIMEText(html_content, "html")
-        message.attach(html_part)
+        message = _build_message(to_email, subject, html_content, from_email)
         
         # Send email
         await aiosmtplib.send(
@@ -136,7 +155,7 @@ async def send_email(
             port=settings.SMTP_PORT,
             username=settings.SMTP_USER,
             password=settings.SMTP_PASSWORD,
-            start_tls=True
+            start_tls=settings.SMTP_START_TLS
         )
         
         logger.info(f"Email sent successfully to {to_email}")
@@ -147,6 +166,36 @@ async def send_email(
         return False
 
 
+def render_appointment_reminder(
+    patient_name: str,
+    appointment_date: date,
+    appointment_time: time,
+    podiatrist_name: str,
+    service_name: str,
+    notes: Optional[str] = None
+) -> Tuple[str, str]:
+    """
+    Render the reminder subject and HTML body with the compiled template.
+    
+    Returns:
+        (subject, html_content)
+    """
+    # Format date and time for Spanish locale
+    formatted_date = appointment_date.strftime("%A, %d de %B de %Y")
+    formatted_time = appointment_time.strftime("%H:%M")
+    
+    html_content = APPOINTMENT_REMINDER.render(
+        patient_name=patient_name,
+        appointment_date=formatted_date,
+        appointment_time=formatted_time,
+        podiatrist_name=podiatrist_name,
+        service_name=service_name,
+        notes=notes
+    )
+    
+    return f"Recordatorio: Cita PodoSkin - {formatted_date}", html_content
+
+
 async def send_appointment_reminder(
     patient_name: str,
     patient_email: str,
@@ -184,24 +233,15 @@ async def send_appointment_reminder(
         )
         ```
     """
-    # Format date and time for Spanish locale
-    formatted_date = appointment_date.strftime("%A, %d de %B de %Y")
-    formatted_time = appointment_time.strftime("%H:%M")
-    
-    # Render template
-    template = Template(APPOINTMENT_REMINDER_TEMPLATE)
-    html_content = template.render(
+    subject, html_content = render_appointment_reminder(
         patient_name=patient_name,
-        appointment_date=formatted_date,
-        appointment_time=formatted_time,
+        appointment_date=appointment_date,
+        appointment_time=appointment_time,
         podiatrist_name=podiatrist_name,
         service_name=service_name,
         notes=notes
     )
     
-    # Send email
-    subject = f"Recordatorio: Cita PodoSkin - {formatted_date}"
-    
     return await send_email(
         to_email=patient_email,
         subject=subject,
@@ -209,6 +249,231 @@ async def send_appointment_reminder(
     )
 
 
+# =============================================================================
+# BULK REMINDERS
+# =============================================================================
+
+@dataclass
+class AppointmentReminder:
+    """Everything needed to remind one appointment (loaded in batch)."""
+    cita_id: int
+    fecha: date
+    hora: time
+    status: str
+    paciente_id: int
+    paciente_nombre: str
+    paciente_email: Optional[str]
+    paciente_telefono: Optional[str]
+    podologo_nombre: str
+    servicio_nombre: str
+    notas: Optional[str] = None
+    id_clinica: Optional[int] = None
+
+
+@dataclass
+class ReminderEmail:
+    """A rendered email ready to send."""
+    to_email: str
+    subject: str
+    html_content: str
+    cita_id: Optional[int] = None
+    error: Optional[str] = None  # Set by send_bulk_emails when sending fails
+
+
+@dataclass
+class BulkSendResult:
+    """Outcome of send_bulk_emails."""
+    sent: int = 0
+    failed: List[ReminderEmail] = field(default_factory=list)
+
+
+async def load_appointment_reminders(
+    core_db: AsyncSession,
+    ops_db: AsyncSession,
+    target_date: date,
+    clinica_id: Optional[int] = None,
+) -> List[AppointmentReminder]:
+    """
+    Load the reminders for a date with two queries in total.
+    
+    One query on ops_db brings the appointments joined with podiatrist and
+    service names; one `IN (...)` query on core_db brings all patients.
+    Appointments without a patient (prospects) are skipped.
+    """
+    query = (
+        select(Cita, Podologo.nombre_completo, CatalogoServicio.nombre_servicio)
+        .outerjoin(Podologo, Podologo.id_podologo == Cita.podologo_id)
+        .outerjoin(CatalogoServicio, CatalogoServicio.id_servicio == Cita.servicio_id)
+        .where(
+            Cita.fecha_cita == target_date,
+            Cita.status.in_(["Pendiente", "Confirmada"]),
+            Cita.paciente_id.is_not(None),
+            Cita.deleted_at.is_(None),
+        )
+        .order_by(Cita.hora_inicio, Cita.id_cita)
+    )
+    if clinica_id:
+        query = query.where(Cita.id_clinica == clinica_id)
+    
+    rows = (await ops_db.execute(query)).all()
+    if not rows:
+        return []
+    
+    paciente_ids = {cita.paciente_id for cita, _, _ in rows}
+    pacientes = {
+        p.id_paciente: p
+        for p in (await core_db.scalars(
+            select(Paciente).where(
+                Paciente.id_paciente.in_(paciente_ids),
+                Paciente.deleted_at.is_(None),
+            )
+        )).all()
+    }
+    
+    reminders = []
+    for cita, podologo_nombre, servicio_nombre in rows:
+        paciente = pacientes.get(cita.paciente_id)
+        if paciente is None:
+            continue
+        reminders.append(AppointmentReminder(
+            cita_id=cita.id_cita,
+            fecha=cita.fecha_cita,
+            hora=cita.hora_inicio,
+            status=cita.status,
+            paciente_id=paciente.id_paciente,
+            paciente_nombre=f"{paciente.nombres} {paciente.apellidos}",
+            paciente_email=paciente.email,
+            paciente_telefono=paciente.telefono,
+            podologo_nombre=podologo_nombre or "Podólogo",
+            servicio_nombre=servicio_nombre or "Consulta",
+            notas=cita.notas_agendamiento,
+            id_clinica=cita.id_clinica,
+        ))
+    return reminders
+
+
+def render_reminder_email(reminder: AppointmentReminder) -> ReminderEmail:
+    """Render one reminder (the patient must have an email)."""
+    subject, html_content = render_appointment_reminder(
+        patient_name=reminder.paciente_nombre,
+        appointment_date=reminder.fecha,
+        appointment_time=reminder.hora,
+        podiatrist_name=reminder.podologo_nombre,
+        service_name=reminder.servicio_nombre,
+        notes=reminder.notas,
+    )
+    return ReminderEmail(
+        to_email=reminder.paciente_email,
+        subject=subject,
+        html_content=html_content,
+        cita_id=reminder.cita_id,
+    )
+
+
+def _is_temporary(error: Exception) -> bool:
+    """4xx replies and dropped connections are worth retrying; 5xx are not."""
+    if isinstance(error, aiosmtplib.SMTPResponseException):
+        return 400 <= error.code < 500
+    return isinstance(error, (aiosmtplib.SMTPException, OSError, asyncio.TimeoutError))
+
+
+async def send_bulk_emails(
+    messages: Sequence[ReminderEmail],
+    *,
+    hostname: Optional[str] = None,
+    port: Optional[int] = None,
+    username: Optional[str] = None,
+    password: Optional[str] = None,
+    start_tls: Optional[bool] = None,
+    from_email: Optional[str] = None,
+    pool_size: Optional[int] = None,
+    max_retries: Optional[int] = None,
+    retry_backoff: Optional[float] = None,
+) -> BulkSendResult:
+    """
+    Send many emails over a small pool of reused SMTP connections.
+    
+    Each of the `pool_size` workers opens ONE connection (one TLS handshake
+    and login) and sends messages from a shared queue until it is empty.
+    Temporary failures are retried with exponential backoff, reconnecting
+    if the connection dropped; permanent (5xx) failures are not retried.
+    
+    All connection options default to the SMTP_* settings. When the
+    credentials come from the settings and are not configured, nothing is
+    sent and every message is returned as failed (pass username="" and
+    password="" explicitly to use an unauthenticated relay).
+    
+    Returns:
+        BulkSendResult with the sent count and the messages that failed
+    """
+    if username is None and password is None and not smtp_configured():
+        logger.warning(f"SMTP credentials not configured. {len(messages)} emails not sent.")
+        for message in messages:
+            message.error = "SMTP credentials not configured"
+        return BulkSendResult(failed=list(messages))
+    
+    settings = get_settings()
+    hostname = hostname or settings.SMTP_HOST
+    port = port or settings.SMTP_PORT
+    username = username if username is not None else settings.SMTP_USER
+    password = password if password is not None else settings.SMTP_PASSWORD
+    start_tls = settings.SMTP_START_TLS if start_tls is None else start_tls
+    from_email = from_email or settings.FROM_EMAIL
+    pool_size = pool_size or settings.SMTP_POOL_SIZE
+    max_retries = settings.SMTP_MAX_RETRIES if max_retries is None else max_retries
+    retry_backoff = settings.SMTP_RETRY_BACKOFF_SECONDS if retry_backoff is None else retry_backoff
+    
+    result = BulkSendResult()
+    queue: asyncio.Queue = asyncio.Queue()
+    for message in messages:
+        queue.put_nowait(message)
+    
+    def new_client() -> aiosmtplib.SMTP:
+        return aiosmtplib.SMTP(
+            hostname=hostname,
+            port=port,
+            username=username or None,
+            password=password or None,
+            start_tls=start_tls,
+        )
+    
+    async def worker() -> None:
+        smtp = new_client()
+        try:
+            while not queue.empty():
+                message: ReminderEmail = queue.get_nowait()
+                mime = _build_message(message.to_email, message.subject, message.html_content, from_email)
+                for attempt in range(max_retries + 1):
+                    try:
+                        if not smtp.is_connected:
+                            await smtp.connect()
+                        await smtp.send_message(mime)
+                        result.sent += 1
+                        break
+                    except Exception as e:
+                        if not _is_temporary(e) or attempt == max_retries:
+                            logger.error(f"Error sending email to {message.to_email}: {e}")
+                            message.error = str(e)
+                            result.failed.append(message)
+                            break
+                        if isinstance(e, (aiosmtplib.SMTPServerDisconnected, OSError, asyncio.TimeoutError)):
+                            smtp.close()
+                            smtp = new_client()
+                        await asyncio.sleep(retry_backoff * (2 ** attempt))
+        finally:
+            if smtp.is_connected:
+                try:
+                    await smtp.quit()
+                except Exception:
+                    smtp.close()
+    
+    workers = min(pool_size, len(messages))
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    
+    logger.info(f"Bulk email: {result.sent} sent, {len(result.failed)} failed over {workers} connections")
+    return result
+
+
 async def send_sms(
     phone_number: str,
     message: str
@@ -9,9 +9,16 @@ Implements cursor-based and offset-based pagination with metadata
 to help clients navigate through large result sets.
 """
 
-from typing import Generic, TypeVar, List, Optional
+import base64
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Generic, Sequence, Tuple, TypeVar, List, Optional
 from pydantic import BaseModel, Field
-from fastapi import Query
+from fastapi import HTTPException, Query, status
+from sqlalchemy import Select, func, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Generic type for paginated items
 T = TypeVar('T')
@@ -92,6 +99,24 @@ class PaginatedResponse(BaseModel, Generic[T]):
     metadata: PageMetadata
 
 
+async def count_total(db: AsyncSession, stmt: Select) -> int:
+    """
+    Count the rows a SELECT statement would return.
+    
+    Equivalent to the legacy ``query.count()``: wraps the statement in a
+    subquery (dropping its ORDER BY, which does not affect the count).
+    
+    Args:
+        db: Async database session
+        stmt: SELECT statement with the list filters already applied
+        
+    Returns:
+        Number of matching rows
+    """
+    count_stmt = select(func.count()).select_from(stmt.order_by(None).subquery())
+    return (await db.scalar(count_stmt)) or 0
+
+
 def create_pagination_metadata(
     page: int,
     page_size: int,
@@ -110,7 +135,7 @@ def create_pagination_metadata(
         
     Example:
         ```python
-        total = db.query(Paciente).count()
+        total = await count_total(db, select(Paciente))
         metadata = create_pagination_metadata(
             page=1,
             page_size=50,
@@ -150,9 +175,9 @@ def paginate(
         
     Example:
         ```python
-        query = db.query(Paciente)
-        total = query.count()
-        items = query.offset(skip).limit(page_size).all()
+        stmt = select(Paciente)
+        total = await count_total(db, stmt)
+        items = (await db.scalars(stmt.offset(skip).limit(page_size))).all()
         
         return paginate(
             items=items,
@@ -179,11 +204,169 @@ def get_pagination_params(
         @router.get("/items")
         async def list_items(
             pagination: PaginationParams = Depends(get_pagination_params),
-            db: Session = Depends(get_db)
+            db: AsyncSession = Depends(get_db)
         ):
-            total = db.query(Item).count()
-            items = db.query(Item).offset(pagination.skip).limit(pagination.limit).all()
+            stmt = select(Item)
+            total = await count_total(db, stmt)
+            items = (await db.scalars(stmt.offset(pagination.skip).limit(pagination.limit))).all()
             return paginate(items, pagination.page, pagination.page_size, total)
         ```
     """
     return PaginationParams(page=page, page_size=page_size)
+
+
+# =============================================================================
+# CONTEO: exacto, estimado o ninguno
+# =============================================================================
+# COUNT(*) sobre una tabla grande cuesta tanto como leerla completa. Los
+# listados aceptan ?total=estimated para usar la estimación del planner
+# (instantánea, aproximada) o ?total=none para omitirlo.
+
+class TotalMode(str, Enum):
+    """Cómo calcular el campo `total` de un listado."""
+    exact = "exact"
+    estimated = "estimated"
+    none = "none"
+
+
+async def estimate_count(db: AsyncSession, stmt: Select) -> int:
+    """
+    Estimate the rows a SELECT would return using the PostgreSQL planner.
+    
+    Runs ``EXPLAIN (FORMAT JSON)`` and reads the top node's "Plan Rows",
+    which is based on table statistics and costs no table scan.
+    
+    Args:
+        db: Async database session
+        stmt: SELECT statement with the list filters already applied
+        
+    Returns:
+        Planner row estimate (approximate)
+    """
+    compiled = stmt.order_by(None).compile(
+        dialect=db.bind.dialect,
+        compile_kwargs={"literal_binds": True},
+    )
+    plan = await db.scalar(text(f"EXPLAIN (FORMAT JSON) {compiled}"))
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def resolve_total(db: AsyncSession, stmt: Select, mode: TotalMode) -> Optional[int]:
+    """Return the list total according to ``mode`` (None when omitted)."""
+    if mode == TotalMode.none:
+        return None
+    if mode == TotalMode.estimated:
+        return await estimate_count(db, stmt)
+    return await count_total(db, stmt)
+
+
+# =============================================================================
+# PAGINACIÓN POR CURSOR (KEYSET)
+# =============================================================================
+# OFFSET n obliga a PostgreSQL a leer y descartar n filas: la página 500
+# cuesta 500 veces la página 1. Con keyset la página siguiente se pide
+# "después de la última fila vista":
+#
+#   WHERE (fecha_cita, hora_inicio, id_cita) > (:f, :h, :id)
+#   ORDER BY fecha_cita, hora_inicio, id_cita LIMIT n
+#
+# que con un índice compuesto sobre esas columnas es un index scan del
+# mismo costo en cualquier página. Las llaves deben terminar en una
+# columna única (la PK) para que el orden sea total.
+
+_CURSOR_DECODERS = {
+    datetime: datetime.fromisoformat,
+    date: date.fromisoformat,
+    time: time.fromisoformat,
+    Decimal: Decimal,
+}
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the key values of the last row as an opaque URL-safe cursor."""
+    payload = [
+        v.isoformat() if isinstance(v, (date, time)) else str(v) if isinstance(v, Decimal) else v
+        for v in values
+    ]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, key_columns: Sequence[Any]) -> List[Any]:
+    """
+    Decode a cursor produced by :func:`encode_cursor`.
+    
+    Raises:
+        HTTPException 400: If the cursor is malformed or does not match
+        the endpoint's key columns
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != len(key_columns):
+            raise ValueError("cursor length mismatch")
+        values = []
+        for value, column in zip(payload, key_columns):
+            decoder = _CURSOR_DECODERS.get(column.type.python_type)
+            values.append(decoder(value) if decoder and value is not None else value)
+        return values
+    except (ValueError, TypeError, KeyError, NotImplementedError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación inválido"
+        )
+
+
+async def keyset_paginate(
+    db: AsyncSession,
+    stmt: Select,
+    key_columns: Sequence[Any],
+    limit: int,
+    cursor: Optional[str] = None,
+    descending: bool = False,
+    offset: int = 0,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Fetch one page ordered by ``key_columns`` starting after ``cursor``.
+    
+    Args:
+        db: Async database session
+        stmt: SELECT of a single ORM entity with filters applied (any
+            ORDER BY is replaced by the key columns)
+        key_columns: Ordering columns; the last one must be unique (PK)
+        limit: Page size
+        cursor: ``next_cursor`` from the previous page (None = first page)
+        descending: Newest first (all key columns DESC)
+        offset: Legacy ``skip``; only applied when no cursor is given, so
+            offset clients keep working and also receive a next_cursor
+        
+    Returns:
+        (items, next_cursor); next_cursor is None on the last page
+        
+    Example:
+        ```python
+        citas, next_cursor = await keyset_paginate(
+            db, select(Cita), (Cita.fecha_cita, Cita.hora_inicio, Cita.id_cita),
+            limit=50, cursor=cursor,
+        )
+        ```
+    """
+    keys = tuple_(*key_columns)
+    if cursor:
+        after = tuple_(*decode_cursor(cursor, key_columns))
+        stmt = stmt.where(keys < after if descending else keys > after)
+    elif offset:
+        stmt = stmt.offset(offset)
+    
+    ordering = [c.desc() for c in key_columns] if descending else list(key_columns)
+    # Pedimos una fila extra para saber si hay página siguiente sin COUNT
+    rows = (await db.scalars(stmt.order_by(None).order_by(*ordering).limit(limit + 1))).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c in key_columns])
+    return list(rows), next_cursor
@@ -49,8 +49,8 @@ def generate_patient_pdf(
         
     Example:
         ```python
-        paciente = db.query(Paciente).filter_by(id_paciente=1).first()
-        tratamientos = db.query(Tratamiento).filter_by(paciente_id=1).all()
+        paciente = await db.scalar(select(Paciente).filter_by(id_paciente=1))
+        tratamientos = (await db.scalars(select(Tratamiento).filter_by(paciente_id=1))).all()
         pdf_buffer = generate_patient_pdf(paciente, tratamientos)
         ```
     """
@@ -0,0 +1,420 @@
+# =============================================================================
+# backend/api/utils/reminder_queue.py
+# Cola persistente de recordatorios de citas (ops.recordatorio_jobs)
+# =============================================================================
+"""
+Durable reminder queue.
+
+Scheduling: the appointments of each upcoming day are loaded in batch
+(load_appointment_reminders) and upserted as jobs in ops.recordatorio_jobs,
+due at REMINDER_SEND_HOUR, REMINDER_DAYS_BEFORE days before the appointment.
+Jobs whose appointment was cancelled or moved are marked Cancelado.
+
+Dispatch: a worker claims due jobs with
+
+    UPDATE ... WHERE id_job IN (SELECT ... FOR UPDATE SKIP LOCKED LIMIT n)
+
+so several processes drain the queue in parallel without sending twice,
+sends them with send_bulk_emails (pooled SMTP connections) and records the
+outcome of each job. Failed jobs are retried later, up to
+REMINDER_MAX_ATTEMPTS; jobs left "Enviando" by a crashed worker are claimed
+again after REMINDER_LOCK_TIMEOUT_SECONDS.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import and_, case, or_, select, update, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.api.core.config import get_settings
+from backend.api.deps.database import AsyncCoreSessionLocal, AsyncOpsSessionLocal
+from backend.api.utils.notifications import (
+    AppointmentReminder,
+    load_appointment_reminders,
+    render_reminder_email,
+    send_bulk_emails,
+    smtp_configured,
+)
+from backend.schemas.ops.models import Cita, RecordatorioJob
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Estados de ops.recordatorio_jobs
+PENDIENTE = "Pendiente"
+ENVIANDO = "Enviando"
+ENVIADO = "Enviado"
+FALLIDO = "Fallido"
+CANCELADO = "Cancelado"
+SIN_EMAIL = "Sin Email"
+
+CANAL_EMAIL = "email"
+
+# Filas por INSERT ... ON CONFLICT (límite de parámetros de PostgreSQL)
+_UPSERT_CHUNK = 1000
+
+
+# =============================================================================
+# PROGRAMACIÓN
+# =============================================================================
+
+@dataclass
+class ScheduleResult:
+    """Conteos de schedule_reminders."""
+    programados: int = 0   # Jobs con email (Pendiente)
+    sin_email: int = 0     # Pacientes sin email (solo listado)
+    cancelados: int = 0    # Jobs cuya cita ya no está activa
+
+
+def scheduled_send_time(fecha_cita: date, now: Optional[datetime] = None) -> datetime:
+    """
+    Momento de envío: REMINDER_SEND_HOUR (hora local), REMINDER_DAYS_BEFORE
+    días antes de la cita. Si ya pasó, se envía de inmediato.
+    """
+    now = now or datetime.now(timezone.utc)
+    send_day = fecha_cita - timedelta(days=settings.REMINDER_DAYS_BEFORE)
+    send_at = datetime.combine(send_day, time(settings.REMINDER_SEND_HOUR)).astimezone()
+    return max(send_at, now)
+
+
+def _job_row(reminder: AppointmentReminder, send_at: datetime) -> Dict[str, Any]:
+    return {
+        "id_clinica": reminder.id_clinica,
+        "cita_id": reminder.cita_id,
+        "canal": CANAL_EMAIL,
+        "destinatario": reminder.paciente_email,
+        "fecha_cita": reminder.fecha,
+        "hora_cita": reminder.hora,
+        "paciente_id": reminder.paciente_id,
+        "paciente_nombre": reminder.paciente_nombre,
+        "paciente_telefono": reminder.paciente_telefono,
+        "podologo_nombre": reminder.podologo_nombre,
+        "servicio_nombre": reminder.servicio_nombre,
+        "notas": reminder.notas,
+        "status": PENDIENTE if reminder.paciente_email else SIN_EMAIL,
+        "programado_para": send_at,
+    }
+
+
+async def schedule_reminders(
+    core_db: AsyncSession,
+    ops_db: AsyncSession,
+    target_date: date,
+    clinica_id: Optional[int] = None,
+    send_now: bool = False,
+) -> ScheduleResult:
+    """
+    Crea o actualiza los jobs de las citas de `target_date`.
+
+    Es idempotente: un job ya enviado no se toca, y un job pendiente conserva
+    su hora programada (incluido el retraso de un reintento). Con
+    send_now=True los jobs quedan vencidos de inmediato y los fallidos se
+    reintentan (envío manual desde /notifications/bulk-reminders).
+    """
+    reminders = await load_appointment_reminders(core_db, ops_db, target_date, clinica_id)
+    now = datetime.now(timezone.utc)
+    send_at = now if send_now else scheduled_send_time(target_date, now)
+    rows = [_job_row(r, send_at) for r in reminders]
+    result = ScheduleResult(
+        programados=sum(1 for r in rows if r["status"] == PENDIENTE),
+        sin_email=sum(1 for r in rows if r["status"] == SIN_EMAIL),
+    )
+
+    job = RecordatorioJob
+    refreshable = [PENDIENTE, SIN_EMAIL, CANCELADO] + ([FALLIDO] if send_now else [])
+    for i in range(0, len(rows), _UPSERT_CHUNK):
+        stmt = pg_insert(job).values(rows[i:i + _UPSERT_CHUNK])
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_recordatorio_cita_canal_fecha",
+            set_={
+                "destinatario": excluded.destinatario,
+                "hora_cita": excluded.hora_cita,
+                "paciente_nombre": excluded.paciente_nombre,
+                "paciente_telefono": excluded.paciente_telefono,
+                "podologo_nombre": excluded.podologo_nombre,
+                "servicio_nombre": excluded.servicio_nombre,
+                "notas": excluded.notas,
+                "status": excluded.status,
+                "programado_para": (
+                    excluded.programado_para if send_now else case(
+                        (job.status == PENDIENTE, job.programado_para),
+                        else_=excluded.programado_para,
+                    )
+                ),
+                "intentos": case((job.status == FALLIDO, 0), else_=job.intentos),
+                "updated_at": func.now(),
+            },
+            where=job.status.in_(refreshable),
+        )
+        await ops_db.execute(stmt)
+
+    # Citas canceladas, borradas o movidas a otro día
+    cancel = (
+        update(job)
+        .where(
+            job.fecha_cita == target_date,
+            job.status.in_([PENDIENTE, SIN_EMAIL]),
+            job.cita_id.not_in([r["cita_id"] for r in rows]),
+        )
+        .values(status=CANCELADO, updated_at=func.now())
+    )
+    if clinica_id:
+        cancel = cancel.where(job.id_clinica == clinica_id)
+    result.cancelados = (await ops_db.execute(cancel)).rowcount or 0
+
+    await ops_db.commit()
+    return result
+
+
+# =============================================================================
+# ENVÍO
+# =============================================================================
+
+def claim_due_jobs_query(worker_id: str, limit: int):
+    """UPDATE que toma hasta `limit` jobs vencidos saltando los bloqueados."""
+    job = RecordatorioJob
+    lock_timeout = timedelta(seconds=settings.REMINDER_LOCK_TIMEOUT_SECONDS)
+    due = (
+        select(job.id_job)
+        .where(or_(
+            and_(job.status == PENDIENTE, job.programado_para <= func.now()),
+            # Worker caído a mitad de un envío
+            and_(job.status == ENVIANDO, job.bloqueado_at < func.now() - lock_timeout),
+        ))
+        .order_by(job.programado_para)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return (
+        update(job)
+        .where(job.id_job.in_(due.scalar_subquery()))
+        .values(
+            status=ENVIANDO,
+            bloqueado_por=worker_id,
+            bloqueado_at=func.now(),
+            intentos=job.intentos + 1,
+            updated_at=func.now(),
+        )
+        .returning(job)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def claim_due_jobs(ops_db: AsyncSession, worker_id: str, limit: int) -> List[RecordatorioJob]:
+    """Toma jobs vencidos (en su propia transacción)."""
+    jobs = list((await ops_db.scalars(claim_due_jobs_query(worker_id, limit))).all())
+    await ops_db.commit()
+    return jobs
+
+
+def _reminder_from_job(job: RecordatorioJob) -> AppointmentReminder:
+    return AppointmentReminder(
+        cita_id=job.cita_id,
+        fecha=job.fecha_cita,
+        hora=job.hora_cita,
+        status=job.status,
+        paciente_id=job.paciente_id,
+        paciente_nombre=job.paciente_nombre,
+        paciente_email=job.destinatario,
+        paciente_telefono=job.paciente_telefono,
+        podologo_nombre=job.podologo_nombre or "Podólogo",
+        servicio_nombre=job.servicio_nombre or "Consulta",
+        notas=job.notas,
+        id_clinica=job.id_clinica,
+    )
+
+
+def retry_at(intentos: int, now: Optional[datetime] = None) -> datetime:
+    """Siguiente intento: REMINDER_RETRY_DELAY_SECONDS × número de intento."""
+    now = now or datetime.now(timezone.utc)
+    return now + timedelta(seconds=settings.REMINDER_RETRY_DELAY_SECONDS * max(intentos, 1))
+
+
+async def dispatch_jobs(ops_db: AsyncSession, jobs: List[RecordatorioJob]) -> Dict[str, int]:
+    """
+    Envía los jobs tomados y guarda el resultado de cada uno.
+
+    Antes de enviar se confirma (en una consulta) que la cita sigue activa
+    y en la misma fecha; si no, el job se cancela.
+    """
+    counts = {"enviados": 0, "fallidos": 0, "reintentos": 0, "cancelados": 0}
+    if not jobs:
+        return counts
+    job = RecordatorioJob
+
+    active = set((await ops_db.execute(
+        select(Cita.id_cita, Cita.fecha_cita).where(
+            Cita.id_cita.in_({j.cita_id for j in jobs}),
+            Cita.status.in_(["Pendiente", "Confirmada"]),
+            Cita.deleted_at.is_(None),
+        )
+    )).all())
+    cancelled = [j.id_job for j in jobs if (j.cita_id, j.fecha_cita) not in active]
+    sendable = [j for j in jobs if (j.cita_id, j.fecha_cita) in active]
+
+    messages = []
+    job_by_message: Dict[int, RecordatorioJob] = {}
+    for j in sendable:
+        message = render_reminder_email(_reminder_from_job(j))
+        messages.append(message)
+        job_by_message[id(message)] = j
+
+    result = await send_bulk_emails(messages)
+    failed = {id(m) for m in result.failed}
+    sent = [job_by_message[id(m)].id_job for m in messages if id(m) not in failed]
+
+    unlock = {"bloqueado_por": None, "bloqueado_at": None, "updated_at": func.now()}
+    if cancelled:
+        await ops_db.execute(
+            update(job).where(job.id_job.in_(cancelled)).values(status=CANCELADO, **unlock)
+        )
+    if sent:
+        await ops_db.execute(
+            update(job).where(job.id_job.in_(sent)).values(
+                status=ENVIADO, enviado_at=func.now(), ultimo_error=None, **unlock
+            )
+        )
+    for message in result.failed:
+        j = job_by_message[id(message)]
+        if j.intentos >= settings.REMINDER_MAX_ATTEMPTS:
+            values = {"status": FALLIDO}
+            counts["fallidos"] += 1
+        else:
+            values = {"status": PENDIENTE, "programado_para": retry_at(j.intentos)}
+            counts["reintentos"] += 1
+        await ops_db.execute(
+            update(job).where(job.id_job == j.id_job).values(
+                ultimo_error=message.error, **values, **unlock
+            )
+        )
+    await ops_db.commit()
+
+    counts["enviados"] = len(sent)
+    counts["cancelados"] = len(cancelled)
+    return counts
+
+
+# =============================================================================
+# WORKER
+# =============================================================================
+
+class ReminderWorker:
+    """
+    Tarea de fondo que programa y envía recordatorios.
+
+    Cada REMINDER_SCHEDULE_INTERVAL_SECONDS recalcula los jobs de hoy a
+    REMINDER_SCHEDULE_HORIZON_DAYS días; entre tanto toma jobs vencidos en
+    lotes de REMINDER_BATCH_SIZE hasta vaciar la cola y luego espera
+    REMINDER_POLL_INTERVAL_SECONDS. Cualquier número de procesos puede
+    ejecutarlo a la vez.
+
+    Example:
+        ```python
+        reminder_worker.start()          # al iniciar la app
+        await reminder_worker.stop()     # al apagar
+        ```
+    """
+
+    def __init__(
+        self,
+        core_session_factory: Callable[[], Any] = AsyncCoreSessionLocal,
+        ops_session_factory: Callable[[], Any] = AsyncOpsSessionLocal,
+        batch_size: int = settings.REMINDER_BATCH_SIZE,
+        poll_interval: float = settings.REMINDER_POLL_INTERVAL_SECONDS,
+        schedule_interval: float = settings.REMINDER_SCHEDULE_INTERVAL_SECONDS,
+        horizon_days: int = settings.REMINDER_SCHEDULE_HORIZON_DAYS,
+    ):
+        self.core_session_factory = core_session_factory
+        self.ops_session_factory = ops_session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.schedule_interval = schedule_interval
+        self.horizon_days = horizon_days
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self._task: Optional[asyncio.Task] = None
+        self._stop_event: Optional[asyncio.Event] = None
+        self._last_schedule: Optional[float] = None
+        self._smtp_warned = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Inicia la tarea en el event loop actual."""
+        if self.running:
+            return
+        self._stop_event = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="reminder-worker")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Termina el lote en curso y detiene la tarea."""
+        if self._task is None:
+            return
+        self._stop_event.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except asyncio.TimeoutError:
+            # Los jobs a medio enviar se retoman al vencer el bloqueo
+            logger.error("Reminder worker did not finish in %.1fs; cancelling", timeout)
+            self._task.cancel()
+        self._task = None
+
+    async def schedule_upcoming(self, today: Optional[date] = None) -> ScheduleResult:
+        """Programa los recordatorios de hoy a `horizon_days` días (todas las clínicas)."""
+        today = today or date.today()
+        total = ScheduleResult()
+        for offset in range(self.horizon_days + 1):
+            async with self.core_session_factory() as core_db, self.ops_session_factory() as ops_db:
+                result = await schedule_reminders(core_db, ops_db, today + timedelta(days=offset))
+            total.programados += result.programados
+            total.sin_email += result.sin_email
+            total.cancelados += result.cancelados
+        return total
+
+    async def process_due(self) -> int:
+        """Envía lotes de jobs vencidos hasta vaciar la cola. Retorna jobs procesados."""
+        # Sin credenciales SMTP no se toman jobs: se quedan Pendiente en lugar
+        # de gastar sus intentos y terminar Fallido
+        if not smtp_configured():
+            if not self._smtp_warned:
+                logger.warning("SMTP credentials not configured. Reminder jobs are not being sent.")
+                self._smtp_warned = True
+            return 0
+        self._smtp_warned = False
+        processed = 0
+        while not self._stop_event or not self._stop_event.is_set():
+            async with self.ops_session_factory() as ops_db:
+                jobs = await claim_due_jobs(ops_db, self.worker_id, self.batch_size)
+                if not jobs:
+                    break
+                counts = await dispatch_jobs(ops_db, jobs)
+            processed += len(jobs)
+            logger.info(f"Reminder batch: {counts}")
+        return processed
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while not self._stop_event.is_set():
+            try:
+                if self._last_schedule is None or loop.time() - self._last_schedule >= self.schedule_interval:
+                    await self.schedule_upcoming()
+                    self._last_schedule = loop.time()
+                await self.process_due()
+            except Exception as e:
+                logger.error(f"Reminder worker error: {e}")
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+reminder_worker = ReminderWorker()
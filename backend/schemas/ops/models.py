@@ -4,9 +4,11 @@
 # =============================================================================
 # Este archivo mapea las tablas operativas de la clínica:
 #   - podologos: Profesionales que atienden pacientes
+#   - horarios_podologos: Jornada de cada podólogo por día de la semana
 #   - catalogo_servicios: Servicios que ofrece la clínica
 #   - solicitudes_prospectos: Leads/prospectos antes de ser pacientes
 #   - citas: Agenda de la clínica
+#   - recordatorio_jobs: Cola persistente de recordatorios de citas
 #
 # ANALOGÍA: Si Core es el "expediente médico", Ops es la "agenda y recepción".
 # Aquí se gestiona TODO lo relacionado con agendar y atender pacientes.
@@ -14,10 +16,10 @@
 
 from sqlalchemy import (
     Column, BigInteger, String, Boolean, ForeignKey, Date, Text,
-    Integer, Numeric, Time
+    Integer, Numeric, Time, Index, UniqueConstraint, text
 )
 # TIMESTAMP viene del dialecto PostgreSQL porque TIMESTAMPTZ no existe en el módulo principal
-from sqlalchemy.dialects.postgresql import TIMESTAMP
+from sqlalchemy.dialects.postgresql import TIMESTAMP, ExcludeConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
@@ -66,6 +68,35 @@ class Podologo(Base):
     
     # ---------- Relaciones ----------
     citas = relationship("Cita", back_populates="podologo")
+    horarios = relationship("HorarioPodologo", back_populates="podologo")
+
+
+# =============================================================================
+# MODELO: HORARIO DE PODÓLOGO
+# =============================================================================
+# Tabla: ops.horarios_podologos
+# Jornada laboral usada por el motor de disponibilidad (api/utils/availability.py).
+class HorarioPodologo(Base):
+    """
+    Ventana de trabajo de un podólogo en un día de la semana.
+    
+    Puede haber varias filas por día (turno partido, ej. 9-14 y 16-20).
+    Si un podólogo no tiene ninguna fila se usa el horario por defecto
+    (AGENDA_HORA_INICIO - AGENDA_HORA_FIN) todos los días; si tiene filas,
+    los días sin fila no trabaja.
+    
+    Analogía: Es el "rol de turnos" pegado en la recepción.
+    """
+    __tablename__ = "horarios_podologos"
+    __table_args__ = {"schema": "ops"}
+    
+    id_horario = Column(BigInteger, primary_key=True, autoincrement=True)
+    podologo_id = Column(BigInteger, ForeignKey("ops.podologos.id_podologo", ondelete="CASCADE"), nullable=False, index=True)
+    dia_semana = Column(Integer, nullable=False)  # 0 = Lunes ... 6 = Domingo
+    hora_inicio = Column(Time, nullable=False)
+    hora_fin = Column(Time, nullable=False)
+    
+    podologo = relationship("Podologo", back_populates="horarios")
 
 
 # =============================================================================
@@ -176,7 +207,23 @@ class Cita(Base):
     Analogía: Es la "agenda física" de la recepción digitalizada.
     """
     __tablename__ = "citas"
-    __table_args__ = {"schema": "ops"}
+    __table_args__ = (
+        # Igual que en 04_init_ops_db.sql: dos citas activas del mismo
+        # podólogo no pueden encimarse. La BD rechaza la segunda aunque
+        # lleguen al mismo tiempo (requiere la extensión btree_gist).
+        ExcludeConstraint(
+            ("podologo_id", "="),
+            ("fecha_cita", "="),
+            (text(
+                "tsrange((fecha_cita + hora_inicio)::timestamp, "
+                "(fecha_cita + hora_fin)::timestamp)"
+            ), "&&"),
+            name="exclude_solapamiento_citas",
+            using="gist",
+            where=text("status NOT IN ('Cancelada', 'No Asistió') AND deleted_at IS NULL"),
+        ),
+        {"schema": "ops"},
+    )
     
     id_cita = Column(BigInteger, primary_key=True, autoincrement=True)
     id_clinica = Column(BigInteger, default=1)
@@ -211,3 +258,66 @@ class Cita(Base):
     podologo = relationship("Podologo", back_populates="citas")
     servicio = relationship("CatalogoServicio", back_populates="citas")
     solicitud = relationship("SolicitudProspecto", back_populates="citas")
+
+
+# =============================================================================
+# MODELO: JOB DE RECORDATORIO
+# =============================================================================
+# Tabla: ops.recordatorio_jobs
+# Cola persistente de recordatorios (ver api/utils/reminder_queue.py).
+class RecordatorioJob(Base):
+    """
+    Recordatorio de una cita, precalculado y pendiente de envío.
+    
+    Los workers toman los jobs vencidos con SELECT ... FOR UPDATE SKIP LOCKED,
+    así varios procesos vacían la cola en paralelo sin enviar dos veces.
+    Los datos del paciente se copian al programar el job para que el envío
+    y el listado no consulten core DB.
+    
+    Flujo: Pendiente → Enviando → Enviado
+    Alternativos: Fallido (sin reintentos), Cancelado (la cita cambió),
+    Sin Email (solo se lista, no se envía)
+    
+    Analogía: Es la "libreta de llamadas pendientes" de la recepción.
+    """
+    __tablename__ = "recordatorio_jobs"
+    __table_args__ = (
+        UniqueConstraint("cita_id", "canal", "fecha_cita", name="uq_recordatorio_cita_canal_fecha"),
+        Index(
+            "idx_recordatorio_jobs_activos", "programado_para",
+            postgresql_where=text("status IN ('Pendiente', 'Enviando')"),
+        ),
+        Index("idx_recordatorio_jobs_fecha", "fecha_cita", "hora_cita"),
+        {"schema": "ops"},
+    )
+    
+    id_job = Column(BigInteger, primary_key=True, autoincrement=True)
+    id_clinica = Column(BigInteger, default=1)
+    
+    # ---------- Cita y destinatario ----------
+    cita_id = Column(BigInteger, ForeignKey("ops.citas.id_cita", ondelete="CASCADE"), nullable=False)
+    canal = Column(Text, nullable=False, default='email')
+    destinatario = Column(Text)  # Email del paciente (NULL = Sin Email)
+    
+    # ---------- Copia de datos para el mensaje ----------
+    fecha_cita = Column(Date, nullable=False)
+    hora_cita = Column(Time, nullable=False)
+    paciente_id = Column(BigInteger, nullable=False)  # FK virtual a clinic.pacientes
+    paciente_nombre = Column(Text, nullable=False)
+    paciente_telefono = Column(Text)
+    podologo_nombre = Column(Text)
+    servicio_nombre = Column(Text)
+    notas = Column(Text)
+    
+    # ---------- Estado del envío ----------
+    status = Column(Text, nullable=False, default='Pendiente')
+    programado_para = Column(TIMESTAMP(timezone=True), nullable=False)
+    intentos = Column(Integer, nullable=False, default=0)
+    ultimo_error = Column(Text)
+    bloqueado_por = Column(Text)  # Worker que lo tomó
+    bloqueado_at = Column(TIMESTAMP(timezone=True))
+    enviado_at = Column(TIMESTAMP(timezone=True))
+    
+    # ---------- Auditoría ----------
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -15,11 +15,15 @@ import asyncio
 from typing import Generator, Dict, Any
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 from sqlalchemy.dialects.postgresql import JSONB, INET
 from sqlalchemy import JSON, String, TypeDecorator
 
+# Sin worker de recordatorios durante los tests (usa las mismas BDs)
+os.environ.setdefault("REMINDER_WORKER_ENABLED", "false")
+
 # Importar la app FastAPI
 from backend.api.app import app
 
@@ -30,8 +34,9 @@ from backend.schemas.ops.models import Base as OpsBase, Podologo, Cita
 from backend.schemas.finance.models import Base as FinanceBase
 
 # Importar dependencias
-from backend.api.deps.database import get_auth_db, get_core_db, get_ops_db
+from backend.api.deps.database import get_auth_db, get_core_db, get_ops_db, to_async_url
 from backend.api.core.security import create_access_token, get_password_hash
+from backend.api.utils.cache import dashboard_cache, principal_cache, token_cache
 
 
 # =============================================================================
@@ -106,7 +111,15 @@ def core_engine():
         with engine.begin() as conn:
             conn.execute(text(f"DROP SCHEMA IF EXISTS {CoreBase.metadata.schema} CASCADE"))
             conn.execute(text(f"CREATE SCHEMA {CoreBase.metadata.schema}"))
-    
+            # Búsqueda de pacientes (ver data/sql/09_patient_search_trgm.sql)
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+            conn.execute(text(
+                f"CREATE OR REPLACE FUNCTION {CoreBase.metadata.schema}.f_unaccent(TEXT) "
+                "RETURNS TEXT AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$ "
+                "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT"
+            ))
+
     # Crear todas las tablas
     CoreBase.metadata.create_all(bind=engine)
     
@@ -136,6 +149,8 @@ def ops_engine():
         with engine.begin() as conn:
             conn.execute(text(f"DROP SCHEMA IF EXISTS {OpsBase.metadata.schema} CASCADE"))
             conn.execute(text(f"CREATE SCHEMA {OpsBase.metadata.schema}"))
+            # EXCLUDE de ops.citas (anti-solapamiento) usa gist sobre BIGINT
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
             if hasattr(FinanceBase.metadata, 'schema') and FinanceBase.metadata.schema:
                 conn.execute(text(f"DROP SCHEMA IF EXISTS {FinanceBase.metadata.schema} CASCADE"))
                 conn.execute(text(f"CREATE SCHEMA {FinanceBase.metadata.schema}"))
@@ -207,36 +222,45 @@ def client(auth_db, core_db, ops_db) -> Generator[TestClient, None, None]:
     Cliente de prueba de FastAPI con override de dependencias de BD.
     
     Este fixture reemplaza las conexiones reales de BD con las de prueba.
+    Los endpoints usan AsyncSession, así que cada request abre una sesión
+    asíncrona contra las mismas BDs de prueba donde los fixtures síncronos
+    (auth_db, core_db, ops_db) ya hicieron commit de sus datos.
+    
+    NullPool: el TestClient corre su propio event loop, así que no se
+    reutilizan conexiones asyncpg entre loops.
     """
+    async_engines = {
+        get_auth_db: create_async_engine(to_async_url(TEST_AUTH_DB_URL), poolclass=NullPool),
+        get_core_db: create_async_engine(to_async_url(TEST_CORE_DB_URL), poolclass=NullPool),
+        get_ops_db: create_async_engine(to_async_url(TEST_OPS_DB_URL), poolclass=NullPool),
+    }
     
     # Override de dependencias de base de datos
-    def override_get_auth_db():
-        try:
-            yield auth_db
-        finally:
-            pass
-    
-    def override_get_core_db():
-        try:
-            yield core_db
-        finally:
-            pass
+    def make_override(engine):
+        TestingAsyncSessionLocal = async_sessionmaker(
+            bind=engine, autoflush=False, expire_on_commit=False
+        )
+        
+        async def override():
+            async with TestingAsyncSessionLocal() as session:
+                yield session
+        
+        return override
     
-    def override_get_ops_db():
-        try:
-            yield ops_db
-        finally:
-            pass
+    for dependency, engine in async_engines.items():
+        app.dependency_overrides[dependency] = make_override(engine)
     
-    app.dependency_overrides[get_auth_db] = override_get_auth_db
-    app.dependency_overrides[get_core_db] = override_get_core_db
-    app.dependency_overrides[get_ops_db] = override_get_ops_db
+    # Cachés en memoria: cada test parte de BDs nuevas
+    for cache in (dashboard_cache, principal_cache, token_cache):
+        cache.clear()
     
     with TestClient(app) as test_client:
         yield test_client
     
     # Limpiar overrides
     app.dependency_overrides.clear()
+    for engine in async_engines.values():
+        engine.sync_engine.dispose()
 
 
 # =============================================================================
@@ -0,0 +1,86 @@
+"""
+Unit tests for non-blocking agent execution
+
+Tests for the shared AsyncAnthropic client and that concurrent chats
+overlap while waiting on the LLM instead of running one after another.
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from anthropic.types import TextBlock
+
+from backend.agents import graph as graph_module
+from backend.agents import llm_client
+from backend.api.core.config import get_settings
+
+settings = get_settings()
+
+LLM_LATENCY = 0.3
+
+
+class _FakeMessages:
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(LLM_LATENCY)
+        return SimpleNamespace(content=[TextBlock(type="text", text="¡Hola! ¿En qué te ayudo?")])
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    fake = SimpleNamespace(messages=_FakeMessages())
+    for module in ("classify_intent_node", "nl_to_sql_node", "understand_query_node", "llm_response_node"):
+        monkeypatch.setattr(f"backend.agents.nodes.{module}.get_llm_client", lambda: fake)
+    # Grafo sin checkpointer: no requiere PostgreSQL
+    monkeypatch.setattr(graph_module, "_async_graph", graph_module.build_agent_graph().compile())
+    return fake.messages
+
+
+class TestLLMClient:
+    """Test the process-wide client"""
+
+    async def test_shared_instance(self):
+        """Test every call returns the same client until it is closed"""
+        client = llm_client.get_llm_client()
+        try:
+            assert llm_client.get_llm_client() is client
+            assert client.timeout.read == float(settings.AGENT_TIMEOUT_SECONDS)
+        finally:
+            await llm_client.close_llm_client()
+        assert llm_client.get_llm_client() is not client
+        await llm_client.close_llm_client()
+
+    def test_response_text(self):
+        """Test the first text block is returned"""
+        response = SimpleNamespace(content=[TextBlock(type="text", text="SELECT 1")])
+        assert llm_client.response_text(response) == "SELECT 1"
+        assert llm_client.response_text(SimpleNamespace(content=[])) == ""
+
+
+class TestRunAgentConcurrency:
+    """Test chats do not block the event loop"""
+
+    async def test_single_chat(self, fake_llm):
+        """Test a greeting goes through the async graph"""
+        result = await graph_module.run_agent("hola", user_id=1, user_role="Admin")
+
+        assert result["success"]
+        assert result["response_text"].startswith("¡Hola!")
+        assert fake_llm.calls == 1
+
+    async def test_concurrent_chats_overlap(self, fake_llm):
+        """Test N chats take about one LLM latency, not N"""
+        started = time.perf_counter()
+        results = await asyncio.gather(*[
+            graph_module.run_agent("hola", user_id=i, user_role="Admin") for i in range(5)
+        ])
+        elapsed = time.perf_counter() - started
+
+        assert all(r["success"] for r in results)
+        assert fake_llm.calls == 5
+        assert elapsed < LLM_LATENCY * 3
@@ -0,0 +1,93 @@
+"""
+Unit tests for the agent connection pools
+
+Tests the agent engines are separate from the API engines and capped,
+that agent sessions are always returned to the pool, that pool
+exhaustion is counted and reported as a fast TIMEOUT, and the pool
+metrics.
+"""
+
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from backend.agents.state import DatabaseTarget, ErrorType, SQLQuery
+from backend.api.deps import database
+from backend.tools import sql_executor
+
+
+class _FakeSession:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestAgentEngines:
+    """Test the bulkhead configuration"""
+
+    def test_separate_from_api_engines(self):
+        """Test the agent never borrows the API or script pools"""
+        api_engines = {
+            database.async_auth_engine.sync_engine, database.async_core_engine.sync_engine,
+            database.async_ops_engine.sync_engine, database.auth_engine, database.core_engine,
+            database.ops_engine,
+        }
+
+        assert set(database.agent_engines) == {"auth", "core", "ops"}
+        assert not api_engines & set(database.agent_engines.values())
+
+    @pytest.mark.parametrize("name", ["auth", "core", "ops"])
+    def test_pool_capped(self, name):
+        """Test a hard cap with no overflow and a short wait"""
+        pool = database.agent_engines[name].pool
+
+        assert pool.size() == database.settings.AGENT_DB_POOL_SIZE
+        assert pool._max_overflow == 0
+        assert pool._timeout == database.settings.AGENT_DB_POOL_TIMEOUT_SECONDS
+
+
+class TestAgentSession:
+    """Test the session scope"""
+
+    def test_closed_on_exit(self, monkeypatch):
+        """Test the session goes back to the pool, also on errors"""
+        session = _FakeSession()
+        monkeypatch.setitem(database.AgentSessionLocal, "ops", lambda: session)
+
+        with pytest.raises(ValueError):
+            with database.agent_session(DatabaseTarget.OPS) as db:
+                assert db is session
+                raise ValueError("boom")
+
+        assert session.closed
+
+    def test_pool_timeout_counted(self, monkeypatch):
+        """Test exhausting the pool shows up in the metrics"""
+        monkeypatch.setitem(database.AgentSessionLocal, "core", _FakeSession)
+        monkeypatch.setitem(database._agent_pool_timeouts, "core", 0)
+
+        with pytest.raises(PoolTimeoutError):
+            with database.agent_session("core"):
+                raise PoolTimeoutError("QueuePool limit reached")
+
+        stats = database.agent_pool_stats()
+        assert stats["core"]["timeouts"] == 1
+        assert set(stats["core"]) == {"size", "checked_out", "available", "timeouts"}
+
+
+class TestPoolExhaustion:
+    """Test the executor fails fast when its pool is full"""
+
+    def test_reported_as_timeout(self, monkeypatch):
+        """Test a full agent pool becomes a TIMEOUT result, not a hang"""
+        def get_db_session(target):
+            raise PoolTimeoutError("QueuePool limit reached")
+
+        monkeypatch.setattr(sql_executor, "get_db_session", get_db_session)
+        sql_query = SQLQuery(query="SELECT COUNT(*) FROM ops.citas", target_db=DatabaseTarget.OPS)
+
+        result = sql_executor.execute_safe_query(sql_query, "Admin")
+
+        assert not result.success
+        assert result.error_type == ErrorType.TIMEOUT
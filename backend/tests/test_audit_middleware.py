@@ -0,0 +1,87 @@
+"""
+Unit tests for AuditMiddleware
+
+Tests that bodies stream through to the endpoint and that only bounded
+JSON bodies are captured (masked) for the audit trail.
+"""
+
+import pytest
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile
+from fastapi.testclient import TestClient
+
+from backend.api.middleware import audit_middleware
+from backend.api.middleware.audit_middleware import AuditMiddleware
+
+
+class _FakeWriter:
+    def __init__(self):
+        self.rows = []
+
+    def enqueue(self, row):
+        self.rows.append(row)
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    fake = _FakeWriter()
+    monkeypatch.setattr(audit_middleware, "audit_writer", fake)
+    return fake
+
+
+@pytest.fixture
+def client(writer):
+    app = FastAPI()
+    app.add_middleware(AuditMiddleware, max_body_bytes=256)
+
+    @app.post("/api/v1/pacientes")
+    async def create(request: Request):
+        body = await request.json()
+        return {"received": len(body.get("notas", ""))}
+
+    @app.post("/api/v1/evidencias/upload")
+    async def upload(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    @app.put("/api/v1/citas/1")
+    async def fail():
+        raise HTTPException(status_code=404, detail="No encontrada")
+
+    return TestClient(app)
+
+
+class TestAuditMiddleware:
+    """Test body capture and streaming"""
+
+    def test_json_body_is_masked(self, client, writer):
+        """Test JSON bodies are captured with PII masked"""
+        response = client.post("/api/v1/pacientes", json={"nombres": "Ana", "email": "ana.lopez@test.com"})
+
+        assert response.status_code == 200
+        row = writer.rows[0]
+        assert row["accion"] == "CREATE"
+        assert row["tabla_afectada"] == "pacientes"
+        assert "ana.lopez@test.com" not in row["request_body"]
+        assert '"nombres": "Ana"' in row["request_body"]
+
+    def test_large_json_is_not_stored(self, client, writer):
+        """Test bodies over the limit reach the endpoint but only their size is logged"""
+        response = client.post("/api/v1/pacientes", json={"notas": "x" * 1000})
+
+        assert response.json() == {"received": 1000}
+        assert '"_truncated": true' in writer.rows[0]["request_body"]
+        assert "xxxx" not in writer.rows[0]["request_body"]
+
+    def test_multipart_upload_is_not_captured(self, client, writer):
+        """Test uploads stream through without being copied"""
+        content = b"\x89PNG" + b"\x00" * 5000
+        response = client.post(
+            "/api/v1/evidencias/upload", files={"file": ("foto.png", content, "image/png")}
+        )
+
+        assert response.json() == {"size": len(content)}
+        assert writer.rows[0]["request_body"] is None
+
+    def test_failed_requests_are_not_logged(self, client, writer):
+        """Test 4xx responses are not audited"""
+        assert client.put("/api/v1/citas/1", json={}).status_code == 404
+        assert writer.rows == []
@@ -0,0 +1,56 @@
+"""
+Unit tests for audit_log partition maintenance
+
+Tests for the month arithmetic that decides which partitions to create
+and which to retire.
+"""
+
+from datetime import date
+
+import pytest
+
+from backend.tools.audit_partitions import (
+    add_months,
+    months_to_create,
+    parse_partition_name,
+    partition_name,
+    retention_cutoff,
+)
+
+
+class TestMonthArithmetic:
+    """Test month helpers"""
+
+    @pytest.mark.parametrize("month,delta,expected", [
+        (date(2026, 10, 1), 3, date(2027, 1, 1)),
+        (date(2026, 1, 1), -1, date(2025, 12, 1)),
+        (date(2026, 10, 1), -60, date(2021, 10, 1)),
+        (date(2026, 12, 1), 0, date(2026, 12, 1)),
+    ])
+    def test_add_months(self, month, delta, expected):
+        """Test adding months across year boundaries"""
+        assert add_months(month, delta) == expected
+
+    def test_months_to_create_includes_current(self):
+        """Test current month plus months ahead"""
+        assert months_to_create(date(2026, 11, 17), 2) == [
+            date(2026, 11, 1), date(2026, 12, 1), date(2027, 1, 1)
+        ]
+
+    def test_retention_cutoff(self):
+        """Test cutoff is the first retained month"""
+        assert retention_cutoff(date(2026, 10, 17), 12) == date(2025, 10, 1)
+
+
+class TestPartitionNames:
+    """Test partition naming convention"""
+
+    def test_round_trip(self):
+        """Test name and month round trip"""
+        assert partition_name(date(2026, 3, 1)) == "audit_log_2026_03"
+        assert parse_partition_name("audit_log_2026_03") == date(2026, 3, 1)
+
+    @pytest.mark.parametrize("name", ["audit_log", "audit_log_default", "audit_log_2026_13", "audit_log_2026_3"])
+    def test_ignores_other_tables(self, name):
+        """Test non-monthly tables are never touched"""
+        assert parse_partition_name(name) is None
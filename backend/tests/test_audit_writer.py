@@ -0,0 +1,150 @@
+"""
+Unit tests for the batched audit writer
+
+Tests for batching, shutdown flush and the spill-to-disk fallback.
+"""
+
+import asyncio
+
+from backend.api.utils.audit_writer import AuditWriter
+
+
+class _FakeSession:
+    def __init__(self, store):
+        self.store = store
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt, rows):
+        if self.store.fail:
+            raise ConnectionError("auth DB down")
+        self.store.batches.append(list(rows))
+
+    async def commit(self):
+        pass
+
+
+class _FakeStore:
+    """Records inserted batches; set fail=True to simulate an outage."""
+
+    def __init__(self):
+        self.batches = []
+        self.fail = False
+
+    def __call__(self):
+        return _FakeSession(self)
+
+    @property
+    def rows(self):
+        return [row for batch in self.batches for row in batch]
+
+
+def _writer(store, tmp_path, **kwargs):
+    kwargs.setdefault("batch_size", 3)
+    kwargs.setdefault("flush_interval_ms", 20)
+    return AuditWriter(session_factory=store, spill_dir=str(tmp_path / "spill"), **kwargs)
+
+
+class TestAuditWriter:
+    """Test queueing and bulk inserts"""
+
+    async def test_full_batch_is_inserted_together(self, tmp_path):
+        """Test rows are inserted in batches of batch_size"""
+        store = _FakeStore()
+        writer = _writer(store, tmp_path, flush_interval_ms=10_000)
+        writer.start()
+        for i in range(3):
+            writer.enqueue({"tabla_afectada": "pacientes", "accion": "CREATE", "registro_id": i})
+        await asyncio.sleep(0.05)
+
+        assert [len(b) for b in store.batches] == [3]
+        assert store.rows[0]["timestamp_accion"] is not None
+        assert store.rows[0]["username"] is None
+        await writer.stop()
+
+    async def test_partial_batch_flushed_after_interval(self, tmp_path):
+        """Test an incomplete batch is inserted once the interval elapses"""
+        store = _FakeStore()
+        writer = _writer(store, tmp_path)
+        writer.start()
+        writer.enqueue({"tabla_afectada": "citas", "accion": "UPDATE"})
+        await asyncio.sleep(0.1)
+
+        assert len(store.rows) == 1
+        await writer.stop()
+
+    async def test_stop_flushes_queue(self, tmp_path):
+        """Test shutdown inserts everything still queued"""
+        store = _FakeStore()
+        writer = _writer(store, tmp_path, flush_interval_ms=10_000)
+        writer.start()
+        for i in range(7):
+            writer.enqueue({"tabla_afectada": "citas", "accion": "DELETE", "registro_id": i})
+        await writer.stop()
+
+        assert sorted(r["registro_id"] for r in store.rows) == list(range(7))
+        assert not writer.running
+
+
+class TestAuditWriterSpill:
+    """Test the spill-to-disk fallback"""
+
+    async def test_spill_and_replay(self, tmp_path):
+        """Test rows survive a DB outage and are replayed afterwards"""
+        store = _FakeStore()
+        store.fail = True
+        writer = _writer(store, tmp_path)
+        writer.start()
+        writer.enqueue({"tabla_afectada": "pacientes", "accion": "CREATE", "registro_id": 1})
+        await asyncio.sleep(0.1)
+
+        assert store.rows == []
+        assert len(list((tmp_path / "spill").glob("*.jsonl"))) == 1
+
+        store.fail = False
+        writer.enqueue({"tabla_afectada": "pacientes", "accion": "CREATE", "registro_id": 2})
+        await writer.stop()
+
+        assert sorted(r["registro_id"] for r in store.rows) == [1, 2]
+        assert list((tmp_path / "spill").iterdir()) == []
+
+    async def test_queue_full_spills_to_disk(self, tmp_path):
+        """Test enqueue never blocks when the queue is full"""
+        store = _FakeStore()
+        writer = _writer(store, tmp_path, max_queue_size=1, flush_interval_ms=10_000)
+        writer.start()
+        writer.enqueue({"tabla_afectada": "a", "accion": "CREATE"})
+        writer.enqueue({"tabla_afectada": "b", "accion": "CREATE"})
+
+        assert len(list((tmp_path / "spill").glob("*.jsonl"))) == 1
+        await writer.stop()
+        assert sorted(r["tabla_afectada"] for r in store.rows) == ["a", "b"]
+
+    async def test_partial_replay_not_repeated(self, tmp_path):
+        """Test batches committed before a replay failure are not inserted twice"""
+        store = _FakeStore()
+        writer = _writer(store, tmp_path)
+        writer._spill([writer._normalize({"tabla_afectada": "citas", "accion": "CREATE", "registro_id": i})
+                       for i in range(7)])
+        insert = writer._insert
+
+        async def fail_second_batch(rows):
+            store.fail = len(store.batches) == 1
+            await insert(rows)
+
+        writer._insert = fail_second_batch
+        await writer._replay_spill()
+
+        assert [r["registro_id"] for r in store.rows] == [0, 1, 2]
+        assert len(list((tmp_path / "spill").glob("*.jsonl"))) == 1
+
+        writer._insert = insert
+        store.fail = False
+        await writer._replay_spill()
+
+        assert [r["registro_id"] for r in store.rows] == list(range(7))
+        assert list((tmp_path / "spill").iterdir()) == []
@@ -0,0 +1,110 @@
+"""
+Unit tests for authentication caches
+
+Tests for the decoded-token cache and the cached principal lookup in
+get_current_user.
+"""
+
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from backend.api.core import security
+from backend.api.core.security import create_access_token, verify_token
+from backend.api.deps.auth import get_current_user
+from backend.api.utils.cache import invalidate_principal, principal_cache, token_cache
+from backend.schemas.auth.models import SysUsuario
+
+
+@pytest.fixture(autouse=True)
+def clean_caches():
+    principal_cache.clear()
+    token_cache.clear()
+    yield
+    principal_cache.clear()
+    token_cache.clear()
+
+
+def _token(user_id=1, **kwargs):
+    return create_access_token({"user_id": user_id, "username": "admin", "rol": "Admin"}, **kwargs)
+
+
+class _FakeAuthSession:
+    """Counts user lookups and returns a fixed user."""
+
+    def __init__(self, user):
+        self.user = user
+        self.queries = 0
+
+    async def scalar(self, stmt):
+        self.queries += 1
+        return self.user
+
+
+def _user(**overrides):
+    data = dict(id_usuario=1, nombre_usuario="admin", rol="Admin", activo=True, clinica_id=1, password_hash="x")
+    data.update(overrides)
+    return SysUsuario(**data)
+
+
+class TestTokenCache:
+    """Test decoded-token caching"""
+
+    def test_signature_checked_once(self, monkeypatch):
+        """Test repeated tokens skip jwt.decode"""
+        token = _token()
+        calls = []
+        original = security.jwt.decode
+        monkeypatch.setattr(security.jwt, "decode", lambda *a, **kw: calls.append(1) or original(*a, **kw))
+
+        assert verify_token(token).user_id == 1
+        assert verify_token(token).user_id == 1
+        assert len(calls) == 1
+
+    def test_invalid_token_not_cached(self):
+        """Test failures are never cached"""
+        assert verify_token("not-a-token") is None
+        assert len(token_cache) == 0
+
+    def test_expired_token_not_cached(self):
+        """Test entries never outlive the token's exp"""
+        assert verify_token(_token(expires_delta=timedelta(seconds=-5))) is None
+        assert len(token_cache) == 0
+
+
+class TestPrincipalCache:
+    """Test cached principal resolution"""
+
+    async def test_user_loaded_once_per_token(self):
+        """Test the auth DB is queried only on the first request"""
+        token = _token()
+        db = _FakeAuthSession(_user())
+
+        first = await get_current_user(token=token, db=db)
+        second = await get_current_user(token=token, db=db)
+
+        assert db.queries == 1
+        assert first.nombre_usuario == second.nombre_usuario == "admin"
+        assert first is not second
+
+    async def test_invalidate_forces_reload(self):
+        """Test invalidate_principal drops all sessions of the user"""
+        token = _token()
+        db = _FakeAuthSession(_user())
+        await get_current_user(token=token, db=db)
+
+        db.user = _user(activo=False)
+        invalidate_principal(1)
+        user = await get_current_user(token=token, db=db)
+
+        assert db.queries == 2
+        assert user.activo is False
+
+    async def test_unknown_user_is_401(self):
+        """Test missing users are rejected and not cached"""
+        db = _FakeAuthSession(None)
+        with pytest.raises(HTTPException) as exc:
+            await get_current_user(token=_token(), db=db)
+        assert exc.value.status_code == 401
+        assert len(principal_cache) == 0
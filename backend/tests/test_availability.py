@@ -0,0 +1,181 @@
+"""
+Unit tests for the availability engine
+
+Tests for interval merging, slot computation, working hours, the
+first-available search, conflict checks and recurrence expansion.
+"""
+
+from datetime import date, datetime, time
+
+import pytest
+
+from backend.api.utils.availability import Agenda, merge_intervals, recurrence_dates, slot_grid
+
+LUNES = date(2026, 10, 19)
+MARTES = date(2026, 10, 20)
+
+
+def _agenda(busy=(), horarios=(), podologos=None):
+    return Agenda(
+        podologos or {1: "Dra. Ana", 2: "Dr. Luis"},
+        busy,
+        horarios,
+        default_hours=(9 * 60, 13 * 60),
+        slot_minutes=30,
+    )
+
+
+class TestIntervals:
+    """Test interval helpers"""
+
+    @pytest.mark.parametrize("intervals,expected", [
+        ([], []),
+        ([(60, 90), (0, 30)], [(0, 30), (60, 90)]),
+        ([(0, 30), (30, 60)], [(0, 60)]),
+        ([(0, 120), (30, 60), (100, 150)], [(0, 150)]),
+        ([(10, 10), (20, 15)], []),
+    ])
+    def test_merge(self, intervals, expected):
+        """Test sorting, overlap and touching intervals"""
+        assert merge_intervals(intervals) == expected
+
+    def test_slot_grid(self):
+        """Test slots overlapping a busy interval are unavailable"""
+        grid = slot_grid([(540, 660)], [(570, 600)], duration=30, step=30)
+        assert grid == [(540, 570, True), (570, 600, False), (600, 630, True), (630, 660, True)]
+
+    def test_long_service_needs_whole_gap(self):
+        """Test a 60-minute service does not fit in a 30-minute gap"""
+        grid = slot_grid([(540, 660)], [(600, 630)], duration=60, step=30)
+        assert [(s, free) for s, _, free in grid] == [(540, True), (570, False), (600, False)]
+
+
+class TestAgenda:
+    """Test day slots and working hours"""
+
+    def test_default_hours(self):
+        """Test podiatrists without schedule use the default hours"""
+        slots = _agenda().day_slots(1, LUNES, 30)
+        assert slots[0].hora_inicio == time(9, 0)
+        assert slots[-1].hora_fin == time(13, 0)
+        assert len(slots) == 8
+
+    def test_busy_intervals_per_podologo_and_day(self):
+        """Test an appointment only blocks its own podiatrist and day"""
+        agenda = _agenda(busy=[(1, LUNES, time(9, 0), time(10, 0))])
+
+        assert [s.disponible for s in agenda.day_slots(1, LUNES, 30)][:3] == [False, False, True]
+        assert all(s.disponible for s in agenda.day_slots(2, LUNES, 30))
+        assert all(s.disponible for s in agenda.day_slots(1, MARTES, 30))
+
+    def test_appointments_counted_before_merging(self):
+        """Test back-to-back appointments still count one by one"""
+        agenda = _agenda(busy=[
+            (1, LUNES, time(9, 0), time(9, 30)),
+            (1, LUNES, time(9, 30), time(10, 0)),
+            (1, LUNES, time(9, 45), time(10, 15)),
+            (2, LUNES, time(11, 0), time(11, 30)),
+        ])
+
+        assert agenda.busy[(1, LUNES)] == [(540, 615)]
+        assert agenda.citas_por_dia[LUNES] == 4
+        assert agenda.citas_por_dia.get(MARTES, 0) == 0
+
+    def test_split_shift_and_days_off(self):
+        """Test per-podiatrist windows by weekday"""
+        agenda = _agenda(horarios=[
+            (1, 0, time(9, 0), time(10, 0)),
+            (1, 0, time(16, 0), time(17, 0)),
+        ])
+
+        starts = [s.hora_inicio for s in agenda.day_slots(1, LUNES, 30)]
+        assert starts == [time(9, 0), time(9, 30), time(16, 0), time(16, 30)]
+        assert agenda.day_slots(1, MARTES, 30) == []
+
+    def test_not_before_skips_past_slots(self):
+        """Test today's slots before now are excluded"""
+        slots = _agenda().day_slots(1, LUNES, 30, not_before=datetime(2026, 10, 19, 11, 10))
+        assert slots[0].hora_inicio == time(11, 30)
+
+    def test_window_limits_search(self):
+        """Test an explicit hour range narrows the working hours"""
+        slots = _agenda().day_slots(1, LUNES, 30, window=(11 * 60, 12 * 60))
+        assert [s.hora_inicio for s in slots] == [time(11, 0), time(11, 30)]
+
+
+class TestRangeSearch:
+    """Test multi-day and first-available queries"""
+
+    def test_free_slots_across_staff(self):
+        """Test free slots are ordered by date, time and podiatrist"""
+        agenda = _agenda(busy=[(1, LUNES, time(9, 0), time(13, 0))])
+        slots = agenda.free_slots(LUNES, 2, 30)
+
+        assert {s.podologo_id for s in slots if s.fecha == LUNES} == {2}
+        assert (slots[0].fecha, slots[0].podologo_id) == (LUNES, 2)
+        assert len([s for s in slots if s.fecha == MARTES]) == 16
+
+    def test_first_available(self):
+        """Test the first free slot of each podiatrist"""
+        agenda = _agenda(busy=[
+            (1, LUNES, time(9, 0), time(13, 0)),
+            (2, LUNES, time(9, 0), time(10, 30)),
+        ])
+        first = agenda.first_available(LUNES, 3, 60)
+
+        assert (first[1].fecha, first[1].hora_inicio) == (MARTES, time(9, 0))
+        assert (first[2].fecha, first[2].hora_inicio) == (LUNES, time(10, 30))
+
+    def test_first_available_none_in_range(self):
+        """Test podiatrists with no room are left out"""
+        agenda = _agenda(busy=[(1, LUNES, time(9, 0), time(13, 0))], podologos={1: "Dra. Ana"})
+        assert agenda.first_available(LUNES, 1, 30) == {}
+
+
+class TestConflict:
+    """Test single-appointment checks used by recurring series"""
+
+    @pytest.mark.parametrize("inicio,fin,expected", [
+        (time(9, 0), time(9, 30), None),
+        (time(10, 30), time(11, 0), None),
+        (time(9, 30), time(10, 15), "solapamiento"),
+        (time(10, 15), time(10, 45), "solapamiento"),
+        (time(12, 30), time(13, 30), "fuera_de_horario"),
+    ])
+    def test_conflict(self, inicio, fin, expected):
+        """Test overlaps, touching appointments and working hours"""
+        agenda = _agenda(busy=[(1, LUNES, time(10, 0), time(10, 30))])
+        assert agenda.conflict(1, LUNES, inicio, fin) == expected
+
+    def test_day_off(self):
+        """Test a day without working windows"""
+        agenda = _agenda(horarios=[(1, 0, time(9, 0), time(13, 0))])
+        assert agenda.conflict(1, MARTES, time(9, 0), time(9, 30)) == "fuera_de_horario"
+
+
+class TestRecurrenceDates:
+    """Test recurrence expansion"""
+
+    def test_weekly_occurrences(self):
+        """Test N weekly dates"""
+        fechas = recurrence_dates(LUNES, "semanal", ocurrencias=3)
+        assert fechas == [LUNES, date(2026, 10, 26), date(2026, 11, 2)]
+
+    def test_until_date_inclusive(self):
+        """Test the series stops at `hasta`"""
+        fechas = recurrence_dates(LUNES, "diaria", intervalo=2, hasta=date(2026, 10, 23))
+        assert fechas == [LUNES, date(2026, 10, 21), date(2026, 10, 23)]
+
+    def test_monthly_clamps_day(self):
+        """Test month ends are clamped instead of skipped"""
+        fechas = recurrence_dates(date(2026, 1, 31), "mensual", ocurrencias=3)
+        assert fechas == [date(2026, 1, 31), date(2026, 2, 28), date(2026, 3, 31)]
+
+    def test_max_occurrences(self):
+        """Test open-ended rules are capped"""
+        assert len(recurrence_dates(LUNES, "semanal", max_ocurrencias=52)) == 52
+
+    def test_unknown_frequency(self):
+        """Test invalid frequencies are rejected"""
+        with pytest.raises(ValueError):
+            recurrence_dates(LUNES, "anual", ocurrencias=2)
@@ -0,0 +1,80 @@
+"""
+Unit tests for the in-process TTL cache
+
+Tests for expiration, eviction and the dashboard cache invalidation.
+"""
+
+import pytest
+from backend.api.utils import cache as cache_module
+from backend.api.utils.cache import TTLCache, dashboard_cache, invalidate_dashboard_cache
+
+
+class TestTTLCache:
+    """Test TTLCache behavior"""
+
+    def test_get_missing_returns_none(self):
+        """Test missing keys return None"""
+        cache = TTLCache(ttl_seconds=10)
+        assert cache.get("missing") is None
+
+    def test_set_and_get(self):
+        """Test stored values are returned before expiring"""
+        cache = TTLCache(ttl_seconds=10)
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+
+    def test_entry_expires(self, monkeypatch):
+        """Test entries are dropped after their TTL"""
+        now = [1000.0]
+        monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+        cache = TTLCache(ttl_seconds=5)
+        cache.set("a", 1)
+        now[0] += 4.9
+        assert cache.get("a") == 1
+        now[0] += 0.2
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_maxsize_evicts_oldest(self):
+        """Test the oldest entry is evicted when full"""
+        cache = TTLCache(ttl_seconds=10, maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.set("c", 3)
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+        assert cache.get("c") == 3
+
+    def test_invalidate_where(self):
+        """Test predicate-based invalidation"""
+        cache = TTLCache(ttl_seconds=10)
+        cache.set((1, True), "x")
+        cache.set((1, False), "y")
+        cache.set((2, True), "z")
+        cache.invalidate_where(lambda key: key[0] == 1)
+        assert len(cache) == 1
+        assert cache.get((2, True)) == "z"
+
+
+class TestDashboardCacheInvalidation:
+    """Test dashboard cache invalidation per clinic"""
+
+    @pytest.fixture(autouse=True)
+    def clean_cache(self):
+        dashboard_cache.clear()
+        yield
+        dashboard_cache.clear()
+
+    def test_invalidate_only_affects_clinic_and_global(self):
+        """Test a write in one clinic keeps other clinics cached"""
+        dashboard_cache.set((1, True), "clinica 1")
+        dashboard_cache.set((1, False), "clinica 1 sin finanzas")
+        dashboard_cache.set((2, True), "clinica 2")
+        dashboard_cache.set((None, True), "global")
+
+        invalidate_dashboard_cache(1)
+
+        assert dashboard_cache.get((1, True)) is None
+        assert dashboard_cache.get((1, False)) is None
+        assert dashboard_cache.get((None, True)) is None
+        assert dashboard_cache.get((2, True)) == "clinica 2"
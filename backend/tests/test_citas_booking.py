@@ -0,0 +1,43 @@
+"""
+Unit tests for appointment booking conflicts
+
+Tests that exclusion-constraint violations are recognised and mapped to
+409, whatever the driver puts in the error.
+"""
+
+from sqlalchemy.exc import IntegrityError
+
+from backend.api.routes.citas import SOLAPAMIENTO_CONSTRAINT, es_solapamiento
+
+
+class _DriverError(Exception):
+    """Mimics asyncpg's error (constraint_name attribute)."""
+
+    def __init__(self, message, constraint_name=None):
+        super().__init__(message)
+        self.constraint_name = constraint_name
+
+
+def _integrity_error(message, cause=None):
+    orig = Exception(message)
+    orig.__cause__ = cause
+    return IntegrityError("INSERT INTO ops.citas ...", {}, orig)
+
+
+class TestEsSolapamiento:
+    """Test exclusion violation detection"""
+
+    def test_constraint_name_from_driver(self):
+        """Test the constraint name reported by asyncpg"""
+        cause = _DriverError("conflicting key value", SOLAPAMIENTO_CONSTRAINT)
+        assert es_solapamiento(_integrity_error("exclusion violation", cause))
+
+    def test_other_constraint(self):
+        """Test other integrity errors are not treated as overlaps"""
+        cause = _DriverError("duplicate key", "citas_pkey")
+        assert not es_solapamiento(_integrity_error("unique violation", cause))
+
+    def test_fallback_to_message(self):
+        """Test drivers without constraint_name"""
+        message = f'conflicting key value violates exclusion constraint "{SOLAPAMIENTO_CONSTRAINT}"'
+        assert es_solapamiento(_integrity_error(message))
@@ -0,0 +1,56 @@
+"""
+Unit tests for the shared patient search query
+
+Tests that the SQL matches the trigram indexes in
+data/sql/09_patient_search_trgm.sql.
+"""
+
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from backend.tools.fuzzy_search import build_patient_search_query, normalize_search_term
+
+
+def _sql(stmt) -> str:
+    return str(stmt.compile(dialect=asyncpg.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+class TestNormalizeSearchTerm:
+    """Test term normalization"""
+
+    def test_strips_accents_and_case(self):
+        """Test accents and case are removed like f_unaccent(lower(...))"""
+        assert normalize_search_term("  José MARTÍNEZ Muñoz ") == "jose martinez munoz"
+
+
+class TestBuildPatientSearchQuery:
+    """Test the generated SQL"""
+
+    def test_uses_indexed_name_expression(self):
+        """Test the name expression is the indexed one, ranked by similarity"""
+        sql = _sql(build_patient_search_query("Pérez", limit=10))
+        expr = "clinic.f_unaccent(lower((clinic.pacientes.nombres || ' ') || clinic.pacientes.apellidos))"
+        assert f"{expr} % 'perez'" in sql
+        assert f"similarity({expr}, 'perez') AS similitud" in sql
+        assert "ORDER BY similitud DESC" in sql
+        assert "clinic.pacientes.deleted_at IS NULL" in sql
+
+    def test_phone_digits_only_when_term_has_digits(self):
+        """Test phone matching uses the normalized-digits expression"""
+        phone = r"regexp_replace(clinic.pacientes.telefono, '\D', '', 'g')"
+        assert phone not in _sql(build_patient_search_query("Ana", limit=10))
+
+        sql = _sql(build_patient_search_query("55 1234", limit=10))
+        assert f"{phone} LIKE '%551234%'" in sql
+        assert "greatest(" in sql
+
+    def test_like_wildcards_are_escaped(self):
+        """Test % and _ in the term are matched literally"""
+        params = build_patient_search_query("a_b%", limit=10).compile().params
+        assert r"%a\_b\%%" in params.values()
+
+    def test_threshold_and_clinic_filters(self):
+        """Test optional threshold and clinic filters"""
+        sql = _sql(build_patient_search_query("Ana", limit=5, threshold=0.4, clinica_id=3))
+        assert ">= 0.4" in sql
+        assert "clinic.pacientes.id_clinica = 3" in sql
+        assert "LIMIT 5" in sql
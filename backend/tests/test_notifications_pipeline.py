@@ -0,0 +1,156 @@
+"""
+Unit tests for the bulk reminder pipeline
+
+Tests for template rendering and pooled SMTP sending against a local
+aiosmtpd server.
+"""
+
+import socket
+from datetime import date, time
+
+import pytest
+
+pytest.importorskip("aiosmtpd")
+
+from aiosmtpd.controller import Controller
+
+from backend.api.utils.notifications import (
+    AppointmentReminder,
+    ReminderEmail,
+    render_reminder_email,
+    send_bulk_emails,
+)
+from backend.api.utils import notifications
+
+
+class _Handler:
+    """Collects messages; answers 451 to the first `temp_failures` DATA commands."""
+
+    def __init__(self, temp_failures=0):
+        self.messages = []
+        self.temp_failures = temp_failures
+        self.sessions = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        if self.temp_failures:
+            self.temp_failures -= 1
+            return "451 Try again later"
+        self.messages.append(envelope)
+        return "250 OK"
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("rechazado@"):
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+
+@pytest.fixture
+def smtp_server():
+    servers = []
+
+    def start(handler):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        controller = Controller(handler, hostname="127.0.0.1", port=port)
+        controller.start()
+        servers.append(controller)
+        return "127.0.0.1", port
+
+    yield start
+    for controller in servers:
+        controller.stop()
+
+
+def _emails(n, domain="example.com"):
+    return [
+        ReminderEmail(to_email=f"paciente{i}@{domain}", subject=f"Cita {i}", html_content="<p>hola</p>")
+        for i in range(n)
+    ]
+
+
+def _send(host, port, messages, **kwargs):
+    kwargs.setdefault("pool_size", 2)
+    kwargs.setdefault("retry_backoff", 0)
+    return send_bulk_emails(
+        messages, hostname=host, port=port, username="", password="",
+        start_tls=False, from_email="clinica@example.com", **kwargs
+    )
+
+
+class TestRenderReminder:
+    """Test rendering with the compiled template"""
+
+    def test_render_reminder_email(self):
+        """Test the reminder carries patient, podiatrist and service"""
+        reminder = AppointmentReminder(
+            cita_id=7, fecha=date(2026, 10, 20), hora=time(9, 30), status="Confirmada",
+            paciente_id=1, paciente_nombre="Ana López", paciente_email="ana@example.com",
+            paciente_telefono="5512345678", podologo_nombre="Dr. Ruiz",
+            servicio_nombre="Quiropodia", notas="Traer estudios",
+        )
+        email = render_reminder_email(reminder)
+
+        assert email.to_email == "ana@example.com"
+        assert email.cita_id == 7
+        assert "Recordatorio" in email.subject
+        for text in ("Ana López", "Dr. Ruiz", "Quiropodia", "09:30", "Traer estudios"):
+            assert text in email.html_content
+
+
+class TestSendBulkEmails:
+    """Test pooled sending"""
+
+    async def test_all_messages_delivered_over_pool(self, smtp_server):
+        """Test every message is delivered using at most pool_size connections"""
+        handler = _Handler()
+        host, port = smtp_server(handler)
+
+        result = await _send(host, port, _emails(10))
+
+        assert result.sent == 10
+        assert result.failed == []
+        assert len(handler.messages) == 10
+        assert len(handler.sessions) <= 2
+
+    async def test_temporary_failure_is_retried(self, smtp_server):
+        """Test a 4xx reply is retried until it succeeds"""
+        handler = _Handler(temp_failures=2)
+        host, port = smtp_server(handler)
+
+        result = await _send(host, port, _emails(1), pool_size=1, max_retries=3)
+
+        assert result.sent == 1
+        assert len(handler.messages) == 1
+
+    async def test_permanent_failure_is_not_retried(self, smtp_server):
+        """Test a refused recipient fails without stopping the batch"""
+        handler = _Handler()
+        host, port = smtp_server(handler)
+        messages = _emails(3)
+        messages[0].to_email = "rechazado@example.com"
+
+        result = await _send(host, port, messages, pool_size=1)
+
+        assert result.sent == 2
+        assert [m.to_email for m in result.failed] == ["rechazado@example.com"]
+
+    async def test_empty_batch(self):
+        """Test nothing is sent and no connection is opened"""
+        result = await send_bulk_emails([], hostname="127.0.0.1", port=1)
+
+        assert result.sent == 0
+        assert result.failed == []
+
+    async def test_unconfigured_credentials_skip_sending(self, monkeypatch):
+        """Test nothing is sent when SMTP credentials are not configured"""
+        monkeypatch.setattr(notifications, "smtp_configured", lambda: False)
+        messages = _emails(3)
+
+        result = await send_bulk_emails(messages, hostname="127.0.0.1", port=1)
+
+        assert result.sent == 0
+        assert result.failed == messages
+        assert all(m.error == "SMTP credentials not configured" for m in messages)
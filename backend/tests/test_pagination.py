@@ -0,0 +1,111 @@
+"""
+Unit tests for pagination utilities
+
+Tests for cursor encoding/decoding and keyset page construction.
+"""
+
+import pytest
+from datetime import date, datetime, time, timezone
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from backend.api.utils.pagination import decode_cursor, encode_cursor, keyset_paginate
+from backend.schemas.auth.models import AuditLog
+from backend.schemas.ops.models import Cita
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class _FakeSession:
+    """Captures the statement and returns canned rows."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.statement = None
+
+    async def scalars(self, stmt):
+        self.statement = stmt
+        return _Result(self.rows)
+
+
+def _sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+class TestCursorEncoding:
+    """Test opaque cursor round trips"""
+
+    def test_round_trip_date_time_id(self):
+        """Test (date, time, id) keys survive encoding"""
+        keys = (Cita.fecha_cita, Cita.hora_inicio, Cita.id_cita)
+        values = [date(2026, 3, 1), time(9, 30), 42]
+        assert decode_cursor(encode_cursor(values), keys) == values
+
+    def test_round_trip_datetime(self):
+        """Test timezone-aware timestamps survive encoding"""
+        keys = (AuditLog.timestamp_accion, AuditLog.id_log)
+        values = [datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc), 7]
+        assert decode_cursor(encode_cursor(values), keys) == values
+
+    def test_cursor_is_url_safe(self):
+        """Test cursor has no characters that need URL escaping"""
+        cursor = encode_cursor([date(2026, 3, 1), time(9, 30), 42])
+        assert all(c.isalnum() or c in "-_" for c in cursor)
+
+    @pytest.mark.parametrize("cursor", ["not-base64!!", encode_cursor([1]), encode_cursor(["x", "y", 1])])
+    def test_invalid_cursor_returns_400(self, cursor):
+        """Test malformed or mismatched cursors are rejected"""
+        keys = (Cita.fecha_cita, Cita.hora_inicio, Cita.id_cita)
+        with pytest.raises(HTTPException) as exc:
+            decode_cursor(cursor, keys)
+        assert exc.value.status_code == 400
+
+
+class TestKeysetPaginate:
+    """Test keyset page construction"""
+
+    async def test_first_page_has_next_cursor(self):
+        """Test an extra row produces next_cursor from the last returned row"""
+        rows = [Cita(id_cita=i, fecha_cita=date(2026, 3, 1), hora_inicio=time(9, i)) for i in range(3)]
+        db = _FakeSession(rows)
+
+        items, next_cursor = await keyset_paginate(
+            db, select(Cita), (Cita.fecha_cita, Cita.hora_inicio, Cita.id_cita), limit=2
+        )
+
+        assert [c.id_cita for c in items] == [0, 1]
+        keys = (Cita.fecha_cita, Cita.hora_inicio, Cita.id_cita)
+        assert decode_cursor(next_cursor, keys) == [date(2026, 3, 1), time(9, 1), 1]
+        sql = _sql(db.statement)
+        assert "ORDER BY ops.citas.fecha_cita, ops.citas.hora_inicio, ops.citas.id_cita" in sql
+        assert "LIMIT" in sql and "OFFSET" not in sql
+
+    async def test_last_page_has_no_cursor(self):
+        """Test no next_cursor when fewer rows than limit come back"""
+        db = _FakeSession([Cita(id_cita=1, fecha_cita=date(2026, 3, 1), hora_inicio=time(9, 0))])
+        _, next_cursor = await keyset_paginate(
+            db, select(Cita), (Cita.fecha_cita, Cita.hora_inicio, Cita.id_cita), limit=2
+        )
+        assert next_cursor is None
+
+    async def test_cursor_adds_row_comparison_descending(self):
+        """Test descending pages filter with a row-value comparison instead of OFFSET"""
+        db = _FakeSession([])
+        cursor = encode_cursor([datetime(2026, 3, 1, tzinfo=timezone.utc), 10])
+
+        await keyset_paginate(
+            db, select(AuditLog), (AuditLog.timestamp_accion, AuditLog.id_log),
+            limit=50, cursor=cursor, descending=True, offset=500,
+        )
+
+        sql = _sql(db.statement)
+        assert "(auth.audit_log.timestamp_accion, auth.audit_log.id_log) <" in sql
+        assert "ORDER BY auth.audit_log.timestamp_accion DESC, auth.audit_log.id_log DESC" in sql
+        assert "OFFSET" not in sql
@@ -0,0 +1,62 @@
+"""
+Unit tests for the bounded password hashing executor
+
+Tests that hashing runs off the event loop, respects the concurrency cap
+and records queue time.
+"""
+
+import asyncio
+import threading
+import time
+
+from backend.api.core.hashing import BoundedHashExecutor, hash_password_async, verify_password_async
+
+
+class TestBoundedHashExecutor:
+    """Test concurrency cap and metrics"""
+
+    async def test_concurrency_is_capped(self):
+        """Test no more than max_workers jobs run at once"""
+        executor = BoundedHashExecutor(max_workers=2, queue_warn_ms=10_000)
+        lock = threading.Lock()
+        active, peak = [0], [0]
+
+        def work():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return True
+
+        results = await asyncio.gather(*[executor.run(work) for _ in range(6)])
+
+        assert all(results)
+        assert peak[0] == 2
+        stats = executor.stats()
+        assert stats["completed"] == 6
+        assert stats["waiting"] == 0 and stats["running"] == 0
+        assert stats["queue_ms_max"] > 0
+
+    async def test_event_loop_keeps_running(self):
+        """Test the loop is free while a job runs"""
+        executor = BoundedHashExecutor(max_workers=1, queue_warn_ms=10_000)
+        job = asyncio.ensure_future(executor.run(time.sleep, 0.05))
+        ticks = 0
+        while not job.done():
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+        assert ticks > 3
+
+
+class TestPasswordHashingAsync:
+    """Test async wrappers around Argon2"""
+
+    async def test_hash_and_verify(self):
+        """Test round trip through the pool"""
+        hashed = await hash_password_async("SecurePass123!")
+        assert hashed.startswith("$argon2id$")
+        assert await verify_password_async("SecurePass123!", hashed)
+        assert not await verify_password_async("WrongPass", hashed)
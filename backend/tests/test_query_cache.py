@@ -0,0 +1,200 @@
+"""
+Unit tests for the agent query cache
+
+Tests normalization, exact and semantic lookups, scoping, TTL, LRU eviction
+and that a cache hit skips the LLM entirely.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from backend.agents.memory import query_cache as cache_module
+from backend.agents.memory.query_cache import QueryCache, normalize_query, remember_query
+from backend.agents.nodes.understand_query_node import entry_understanding
+from backend.agents.state import DatabaseTarget, IntentType, SQLQuery, create_initial_state
+
+VOCABULARY = ("cuantos", "pacientes", "hay", "total", "citas", "hoy", "juan", "juana")
+
+
+def _fake_embed(text):
+    """Bag of words over a tiny vocabulary ('total' counts as 'cuantos')."""
+    words = text.replace("total", "cuantos").split()
+    return [float(words.count(word)) for word in VOCABULARY]
+
+
+def _cache(**kwargs):
+    options = {"ttl_seconds": 60, "maxsize": 10, "similarity": 0.9, "embed": _fake_embed}
+    options.update(kwargs)
+    return QueryCache(**options)
+
+
+def _sql(query="SELECT COUNT(*) FROM clinic.pacientes", **params):
+    return SQLQuery(query=query, params=params, target_db=DatabaseTarget.CORE, tables_involved=["clinic.pacientes"])
+
+
+class TestNormalizeQuery:
+    """Test question normalization"""
+
+    def test_accents_case_and_punctuation(self):
+        """Test equivalent spellings normalize to the same key"""
+        assert normalize_query("¿Cuántos  pacientes hay?") == "cuantos pacientes hay"
+        assert normalize_query("cuantos pacientes hay") == "cuantos pacientes hay"
+
+
+class TestQueryCache:
+    """Test lookups, scoping and bounds"""
+
+    async def test_exact_hit(self):
+        """Test the same question returns a copy of the stored SQL"""
+        cache = _cache()
+        await cache.store("Admin", 1, "¿Cuántos pacientes hay?", _sql(), IntentType.QUERY_AGGREGATE)
+
+        hit = await cache.lookup("Admin", 1, "cuantos pacientes hay")
+
+        assert hit.sql_query.query == "SELECT COUNT(*) FROM clinic.pacientes"
+        assert hit.intent == IntentType.QUERY_AGGREGATE
+        hit.sql_query.params["x"] = 1
+        assert (await cache.lookup("Admin", 1, "cuantos pacientes hay")).sql_query.params == {}
+        assert cache.counters.exact_hits == 2
+
+    async def test_semantic_hit_without_params(self):
+        """Test a similar question reuses param-less SQL"""
+        cache = _cache()
+        await cache.store("Admin", 1, "cuantos pacientes hay", _sql(), IntentType.QUERY_AGGREGATE)
+
+        hit = await cache.lookup("Admin", 1, "total pacientes hay")
+
+        assert hit is not None
+        assert cache.counters.semantic_hits == 1
+
+    async def test_parameterized_sql_is_exact_only(self):
+        """Test SQL with concrete values is never matched by similarity"""
+        cache = _cache(similarity=0.5)
+        sql = _sql("SELECT * FROM ops.citas WHERE paciente ILIKE :nombre", nombre="%juan%")
+        await cache.store("Admin", 1, "citas de juan", sql, IntentType.QUERY_READ)
+
+        assert await cache.lookup("Admin", 1, "citas de juana") is None
+        assert await cache.lookup("Admin", 1, "citas de juan") is not None
+
+    async def test_dissimilar_question_misses(self):
+        """Test questions below the threshold miss"""
+        cache = _cache()
+        await cache.store("Admin", 1, "cuantos pacientes hay", _sql(), IntentType.QUERY_AGGREGATE)
+
+        assert await cache.lookup("Admin", 1, "citas de hoy") is None
+        assert cache.counters.misses == 1
+
+    async def test_scope_by_role_and_clinic(self):
+        """Test entries are not shared across roles or clinics"""
+        cache = _cache()
+        await cache.store("Admin", 1, "cuantos pacientes hay", _sql(), IntentType.QUERY_AGGREGATE)
+
+        assert await cache.lookup("Recepcion", 1, "cuantos pacientes hay") is None
+        assert await cache.lookup("Admin", 2, "cuantos pacientes hay") is None
+
+    async def test_ttl_expiry(self, monkeypatch):
+        """Test expired entries are dropped"""
+        now = [1000.0]
+        monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+        cache = _cache(ttl_seconds=10)
+        await cache.store("Admin", 1, "cuantos pacientes hay", _sql(), IntentType.QUERY_AGGREGATE)
+
+        now[0] += 11
+
+        assert await cache.lookup("Admin", 1, "cuantos pacientes hay") is None
+        assert cache.counters.expirations == 1
+        assert len(cache) == 0
+
+    async def test_lru_eviction(self):
+        """Test the least recently used entry is evicted"""
+        cache = _cache(maxsize=2)
+        await cache.store("Admin", 1, "pregunta uno", _sql(), IntentType.QUERY_READ)
+        await cache.store("Admin", 1, "pregunta dos", _sql(), IntentType.QUERY_READ)
+        await cache.lookup("Admin", 1, "pregunta uno")
+        await cache.store("Admin", 1, "pregunta tres", _sql(), IntentType.QUERY_READ)
+
+        assert await cache.lookup("Admin", 1, "pregunta uno") is not None
+        assert await cache.lookup("Admin", 1, "pregunta dos") is None
+        assert cache.stats()["evictions"] == 1
+
+    async def test_zero_embedding_disables_semantic(self):
+        """Test an unavailable embedding model falls back to exact matching"""
+        cache = _cache(embed=lambda text: [0.0] * 8)
+        await cache.store("Admin", 1, "cuantos pacientes hay", _sql(), IntentType.QUERY_AGGREGATE)
+
+        assert await cache.lookup("Admin", 1, "total pacientes hay") is None
+        assert cache.stats()["semantic_enabled"] is False
+
+    async def test_stats(self):
+        """Test hit rate accounting"""
+        cache = _cache()
+        await cache.store("Admin", 1, "cuantos pacientes hay", _sql(), IntentType.QUERY_AGGREGATE)
+        await cache.lookup("Admin", 1, "cuantos pacientes hay")
+        await cache.lookup("Admin", 1, "citas de hoy")
+
+        stats = cache.stats()
+        assert stats["entries"] == 1
+        assert stats["hit_rate"] == 0.5
+
+
+class _CountingMessages:
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        raise AssertionError("the LLM should not be called on a cache hit")
+
+
+@pytest.fixture
+def process_cache(monkeypatch):
+    cache = _cache()
+    monkeypatch.setattr(cache_module, "query_cache", cache)
+    monkeypatch.setattr(cache_module.settings, "AGENT_QUERY_CACHE_ENABLED", True)
+    return cache
+
+
+def _state(query, origin="webapp"):
+    return create_initial_state(query, user_id=1, user_role="Admin", session_id="s1", origin=origin, clinica_id=1)
+
+
+class TestCachedUnderstanding:
+    """Test the cached entry node"""
+
+    async def test_hit_skips_llm(self, process_cache, monkeypatch):
+        """Test a repeated question reuses the SQL with zero LLM calls"""
+        llm = _CountingMessages()
+        for module in ("classify_intent_node", "understand_query_node"):
+            monkeypatch.setattr(
+                f"backend.agents.nodes.{module}.get_llm_client", lambda: SimpleNamespace(messages=llm)
+            )
+        first = _state("¿Cuántos pacientes hay?")
+        first.update(intent=IntentType.QUERY_AGGREGATE, sql_query=_sql())
+        await remember_query(first)
+
+        state = await entry_understanding(_state("cuantos pacientes hay"))
+
+        assert llm.calls == 0
+        assert state["query_cache_hit"]
+        assert state["intent"] == IntentType.QUERY_AGGREGATE
+        assert state["sql_query"].query == "SELECT COUNT(*) FROM clinic.pacientes"
+        assert state["node_path"][-1] == "query_cache"
+
+    async def test_patient_chats_not_cached(self, process_cache):
+        """Test WhatsApp patient conversations never store or reuse SQL"""
+        state = _state("mis citas", origin="whatsapp_paciente")
+        state.update(intent=IntentType.QUERY_READ, sql_query=_sql())
+
+        await remember_query(state)
+
+        assert len(process_cache) == 0
+
+    async def test_hit_is_not_stored_again(self, process_cache):
+        """Test cached SQL is not re-stored after execution"""
+        state = _state("cuantos pacientes hay")
+        state.update(intent=IntentType.QUERY_AGGREGATE, sql_query=_sql(), query_cache_hit=True)
+
+        await remember_query(state)
+
+        assert len(process_cache) == 0
@@ -0,0 +1,281 @@
+"""
+Unit tests for the EXPLAIN cost guard
+
+Tests plan parsing, per-role budgets, the plan cache, that an expensive
+plan is rejected before the query runs, and that the rejection goes back
+through generate_sql with the planner's complaint.
+"""
+
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+from anthropic.types import TextBlock
+
+from backend.agents.nodes import generate_sql, sql_exec_node
+from backend.agents.state import (
+    DatabaseTarget,
+    ErrorType,
+    ExecutionResult,
+    IntentType,
+    SQLQuery,
+    create_initial_state,
+)
+from backend.tools import query_cost, sql_executor
+from backend.tools.query_cost import PlanCache, QueryPlan, check_cost, get_query_plan, parse_plan
+
+
+def _seq_scan(relation, rows, cost, schema="clinic"):
+    return {"Node Type": "Seq Scan", "Schema": schema, "Relation Name": relation,
+            "Plan Rows": rows, "Startup Cost": 0.0, "Total Cost": cost}
+
+
+def _explain(plan):
+    return [{"Plan": plan}]
+
+
+# Plan de un ILIKE sobre todas las evoluciones, ordenado y con LIMIT 100
+EXPENSIVE_PLAN = _explain({
+    "Node Type": "Limit", "Plan Rows": 100, "Startup Cost": 90_000, "Total Cost": 90_500,
+    "Plans": [{
+        "Node Type": "Sort", "Plan Rows": 400_000, "Startup Cost": 90_000, "Total Cost": 91_000,
+        "Plans": [_seq_scan("evoluciones_clinicas", 400_000, 60_000)],
+    }],
+})
+
+
+class TestParsePlan:
+    """Test the plan summary"""
+
+    def test_sort_under_limit_counts_full_scan(self):
+        """Test a sort under LIMIT still reads the whole table"""
+        plan = parse_plan(EXPENSIVE_PLAN)
+
+        assert plan.total_cost == 90_500
+        assert plan.max_rows == 400_000
+        assert plan.seq_scans == (("clinic.evoluciones_clinicas", 400_000),)
+
+    def test_plain_limit_scales_scan(self):
+        """Test a bare LIMIT only counts the part of the scan it runs"""
+        plan = parse_plan(_explain({
+            "Node Type": "Limit", "Plan Rows": 100, "Startup Cost": 0.0, "Total Cost": 15,
+            "Plans": [_seq_scan("evoluciones_clinicas", 400_000, 60_000)],
+        }))
+
+        assert plan.max_rows == 100
+
+    def test_text_output(self):
+        """Test EXPLAIN output returned as text is accepted"""
+        plan = parse_plan('[{"Plan": {"Node Type": "Result", "Plan Rows": 1, "Total Cost": 0.01}}]')
+
+        assert plan == QueryPlan(total_cost=0.01, max_rows=1)
+
+
+class TestCheckCost:
+    """Test the per-role budgets"""
+
+    def test_within_budget(self):
+        """Test a cheap plan passes for every role"""
+        plan = QueryPlan(total_cost=120.0, max_rows=40)
+
+        assert all(check_cost(plan, role) is None for role in ("Admin", "Podologo", "Recepcion"))
+
+    def test_complaint_names_seq_scan(self):
+        """Test the complaint tells the LLM what to fix"""
+        complaint = check_cost(parse_plan(EXPENSIVE_PLAN), "Recepcion")
+
+        assert "presupuesto del rol Recepcion" in complaint
+        assert "Escaneo secuencial sobre clinic.evoluciones_clinicas (~400000 filas)" in complaint
+
+    def test_budgets_differ_by_role(self):
+        """Test Admin can run what Recepcion cannot"""
+        plan = QueryPlan(total_cost=30_000, max_rows=10_000)
+
+        assert check_cost(plan, "Admin") is None
+        assert check_cost(plan, "Recepcion") is not None
+        assert check_cost(plan, "Desconocido") is not None
+
+
+class TestPlanCache:
+    """Test plan caching"""
+
+    def test_lru_eviction(self):
+        """Test the least recently used plan is dropped"""
+        cache = PlanCache(ttl_seconds=60, maxsize=2)
+        plan = QueryPlan(total_cost=1.0, max_rows=1)
+        cache.put("ops", "a", plan)
+        cache.put("ops", "b", plan)
+        cache.get("ops", "a")
+        cache.put("ops", "c", plan)
+
+        assert cache.get("ops", "b") is None
+        assert cache.get("ops", "a") is plan
+        assert cache.get("core", "a") is None
+
+    def test_expired(self):
+        """Test plans expire"""
+        cache = PlanCache(ttl_seconds=-1, maxsize=2)
+        cache.put("ops", "a", QueryPlan(total_cost=1.0, max_rows=1))
+
+        assert cache.get("ops", "a") is None
+        assert cache.stats() == {"size": 0, "hits": 0, "misses": 1}
+
+
+class _FakeResult:
+    returns_rows = True
+
+    def __init__(self, value=None):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+    def keys(self):
+        return ["id_evolucion"]
+
+    def fetchall(self):
+        return []
+
+
+class _FakeSession:
+    def __init__(self, plan):
+        self.plan = plan
+        self.executed = []
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.executed.append(sql)
+        return _FakeResult(self.plan if sql.startswith("EXPLAIN") else None)
+
+    def connection(self):
+        return SimpleNamespace(connection=SimpleNamespace(dbapi_connection=object()))
+
+
+@pytest.fixture
+def fresh_plan_cache(monkeypatch):
+    cache = PlanCache(ttl_seconds=60, maxsize=8)
+    monkeypatch.setattr(query_cost, "plan_cache", cache)
+    return cache
+
+
+def test_plan_cached_per_sql(fresh_plan_cache):
+    """Test EXPLAIN runs once per normalized SQL"""
+    session = _FakeSession(EXPENSIVE_PLAN)
+
+    first = get_query_plan(session, "core", "SELECT 1 FROM clinic.evoluciones_clinicas", {"x": 1})
+    second = get_query_plan(session, "core", "SELECT 1 FROM clinic.evoluciones_clinicas", {"x": 2})
+
+    assert first is second
+    assert sum(sql.startswith("EXPLAIN (FORMAT JSON, VERBOSE)") for sql in session.executed) == 1
+
+
+class TestExecuteSafeQuery:
+    """Test the guard inside the executor"""
+
+    def _run(self, monkeypatch, session, cost_guard):
+        @contextmanager
+        def get_db_session(target):
+            yield session
+
+        monkeypatch.setattr(sql_executor, "get_db_session", get_db_session)
+        sql_query = SQLQuery(
+            query="SELECT id_evolucion FROM clinic.evoluciones_clinicas WHERE notas ILIKE :t ORDER BY fecha",
+            params={"t": "%dolor%"},
+            target_db=DatabaseTarget.CORE,
+        )
+        return sql_executor.execute_safe_query(sql_query, "Recepcion", cost_guard=cost_guard)
+
+    def test_expensive_plan_not_executed(self, monkeypatch, fresh_plan_cache):
+        """Test an over-budget query is rejected before it runs"""
+        session = _FakeSession(EXPENSIVE_PLAN)
+
+        result = self._run(monkeypatch, session, cost_guard=True)
+
+        assert result.error_type == ErrorType.QUERY_TOO_COSTLY
+        assert "clinic.evoluciones_clinicas" in result.error_message
+        assert not any(sql.startswith("SELECT") for sql in session.executed)
+
+    def test_guard_off_skips_explain(self, monkeypatch, fresh_plan_cache):
+        """Test queries without the guard are not explained"""
+        session = _FakeSession(EXPENSIVE_PLAN)
+
+        result = self._run(monkeypatch, session, cost_guard=False)
+
+        assert result.success
+        assert not any(sql.startswith("EXPLAIN") for sql in session.executed)
+
+
+class _RecordingMessages:
+    def __init__(self):
+        self.kwargs = None
+
+    async def create(self, **kwargs):
+        self.kwargs = kwargs
+        sql = ('{"sql": "SELECT id_evolucion FROM clinic.evoluciones_clinicas WHERE paciente_id = :p", '
+               '"params": {"p": 3}, "target_db": "core"}')
+        return SimpleNamespace(content=[TextBlock(type="text", text=sql)])
+
+
+def _costly(**kwargs):
+    return ExecutionResult(
+        success=False,
+        error_message="Escaneo secuencial sobre clinic.evoluciones_clinicas (~400000 filas).",
+        error_type=ErrorType.QUERY_TOO_COSTLY,
+    )
+
+
+def _state():
+    state = create_initial_state("notas con dolor", user_id=1, user_role="Recepcion", session_id="s1")
+    state.update(
+        intent=IntentType.QUERY_READ,
+        sql_query=SQLQuery(query="SELECT id_evolucion FROM clinic.evoluciones_clinicas WHERE notas ILIKE '%dolor%'"),
+    )
+    return state
+
+
+class TestRetryThroughGenerateSql:
+    """Test the rejection loop"""
+
+    async def test_complaint_reaches_the_llm(self, monkeypatch):
+        """Test the planner's complaint is sent back to generate_sql"""
+        monkeypatch.setattr(sql_exec_node, "execute_safe_query", _costly)
+        llm = _RecordingMessages()
+        monkeypatch.setattr("backend.agents.nodes.nl_to_sql_node.get_llm_client", lambda: SimpleNamespace(messages=llm))
+
+        state = await sql_exec_node.execute_sql(_state())
+        assert state["error_type"] == ErrorType.SQL_ERROR
+        assert state["retry_count"] == 1
+
+        state = await generate_sql(state)
+
+        prompt = llm.kwargs["messages"][0]["content"]
+        assert "notas ILIKE '%dolor%'" in prompt
+        assert "Escaneo secuencial sobre clinic.evoluciones_clinicas" in prompt
+        assert state["error_type"] == ErrorType.NONE
+        assert "paciente_id = :p" in state["sql_query"].query
+
+    async def test_out_of_retries(self, monkeypatch):
+        """Test the user gets the cost message once retries run out"""
+        monkeypatch.setattr(sql_exec_node, "execute_safe_query", _costly)
+        state = _state()
+        state["retry_count"] = state["max_retries"]
+
+        state = await sql_exec_node.execute_sql(state)
+
+        assert state["error_type"] == ErrorType.QUERY_TOO_COSTLY
+
+    async def test_templates_skip_guard(self, monkeypatch):
+        """Test template SQL is not explained"""
+        calls = []
+
+        def execute(**kwargs):
+            calls.append(kwargs)
+            return ExecutionResult(success=True, row_count=1, data=[{"total": 1}])
+
+        monkeypatch.setattr(sql_exec_node, "execute_safe_query", execute)
+        state = _state()
+        state["query_template"] = "agenda_dia"
+
+        await sql_exec_node.execute_sql(state)
+
+        assert calls[0]["cost_guard"] is False
@@ -0,0 +1,139 @@
+"""
+Unit tests for the frequent-query template library
+
+Tests the deterministic matcher, value extraction and that a template
+match reaches generate_sql with the SQL ready and no LLM calls.
+"""
+
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from backend.agents.memory import query_cache as cache_module
+from backend.agents.memory.query_cache import remember_query
+from backend.agents.nodes import generate_sql
+from backend.agents.nodes.understand_query_node import entry_understanding
+from backend.agents.state import DatabaseTarget, IntentType, create_initial_state
+from backend.tools.query_templates import QUERY_TEMPLATES, like_pattern, match_template
+from backend.tools.sql_executor import validate_query_safety
+
+TODAY = date(2026, 10, 17)
+
+
+class TestMatchTemplate:
+    """Test phrase matching and parameter filling"""
+
+    @pytest.mark.parametrize("query, name, params", [
+        ("¿Qué citas hay hoy?", "agenda_dia", {"fecha": date(2026, 10, 17)}),
+        ("Muéstrame la agenda de mañana", "agenda_dia", {"fecha": date(2026, 10, 18)}),
+        ("citas de pasado mañana", "agenda_dia", {"fecha": date(2026, 10, 19)}),
+        ("citas del 20/10", "agenda_dia", {"fecha": date(2026, 10, 20)}),
+        ("agenda para el 2027-01-05", "agenda_dia", {"fecha": date(2027, 1, 5)}),
+        ("citas del paciente 15", "citas_paciente", {"paciente_id": 15}),
+        ("¿Cuántas citas hay hoy?", "conteo_citas_estado_dia", {"fecha": date(2026, 10, 17)}),
+        ("citas por estado", "conteo_citas_estado", {}),
+        ("tratamientos activos", "tratamientos_activos", {}),
+        ("Tratamientos en curso de Juan Pérez", "tratamientos_activos_paciente", {"nombre": "%juan pérez%"}),
+        ("tratamientos activos de la paciente María López", "tratamientos_activos_paciente",
+         {"nombre": "%maría lópez%"}),
+        ("¿Cuántos tratamientos por estado?", "conteo_tratamientos_estado", {}),
+    ])
+    def test_matches(self, query, name, params):
+        """Test frequent phrasings pick the right template and values"""
+        match = match_template(query, TODAY)
+
+        assert match.template.name == name
+        assert match.sql_query.params == params
+
+    @pytest.mark.parametrize("query", [
+        "citas de Juan",
+        "lista los pacientes",
+        "citas de hoy con saldo pendiente",
+        "tratamientos activos de esta semana",
+        "tratamientos activos de hoy",
+        "tratamientos activos del mes",
+    ])
+    def test_no_match(self, query):
+        """Test anything but a complete known phrase goes to the LLM"""
+        assert match_template(query, TODAY) is None
+
+    def test_invalid_date(self):
+        """Test an impossible date is left to the LLM"""
+        assert match_template("citas del 31/02", TODAY) is None
+
+    def test_like_wildcards_escaped(self):
+        """Test user text cannot inject LIKE wildcards"""
+        assert like_pattern("50%_x") == "%50\\%\\_x%"
+
+    @pytest.mark.parametrize("template", QUERY_TEMPLATES, ids=lambda t: t.name)
+    def test_templates_pass_safety_validation(self, template):
+        """Test every template is accepted by the executor for any role"""
+        assert validate_query_safety(template.sql, "Recepcion") == (True, None)
+        schemas = {table.split(".")[0] for table in template.tables}
+        assert len(schemas) == 1
+
+
+class _CountingMessages:
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        raise AssertionError("the LLM should not be called for a template match")
+
+
+@pytest.fixture
+def no_llm(monkeypatch):
+    llm = _CountingMessages()
+    for module in ("classify_intent_node", "nl_to_sql_node", "understand_query_node"):
+        monkeypatch.setattr(f"backend.agents.nodes.{module}.get_llm_client", lambda: SimpleNamespace(messages=llm))
+    monkeypatch.setattr(cache_module.settings, "AGENT_QUERY_TEMPLATES_ENABLED", True)
+    return llm
+
+
+def _state(query, origin="webapp"):
+    return create_initial_state(query, user_id=1, user_role="Admin", session_id="s1", origin=origin)
+
+
+class TestTemplateUnderstanding:
+    """Test the template step of the entry node"""
+
+    async def test_template_skips_llm(self, no_llm):
+        """Test a template match leaves generate_sql nothing to do"""
+        state = await entry_understanding(_state("citas de hoy"))
+        state = await generate_sql(state)
+
+        assert no_llm.calls == 0
+        assert state["query_template"] == "agenda_dia"
+        assert state["intent"] == IntentType.QUERY_READ
+        assert state["target_database"] == DatabaseTarget.OPS
+        assert state["sql_query"].params == {"fecha": date.today()}
+        assert state["entities_extracted"]["_tables"] == ["ops.citas"]
+
+    async def test_patient_chats_skip_templates(self, no_llm, monkeypatch):
+        """Test WhatsApp patient conversations never use staff templates"""
+        monkeypatch.setattr(cache_module.settings, "AGENT_COMBINED_UNDERSTANDING", False)
+        no_llm.create = _fail_classification
+
+        state = await entry_understanding(_state("citas de hoy", origin="whatsapp_paciente"))
+
+        assert state["query_template"] is None
+
+    async def test_template_sql_not_cached(self, no_llm, monkeypatch):
+        """Test template SQL is not copied into the query cache"""
+        stored = []
+
+        async def store(*args, **kwargs):
+            stored.append(args)
+
+        monkeypatch.setattr(cache_module.query_cache, "store", store)
+        state = await entry_understanding(_state("tratamientos activos"))
+
+        await remember_query(state)
+
+        assert stored == []
+
+
+async def _fail_classification(**kwargs):
+    raise RuntimeError("no LLM in tests")
@@ -0,0 +1,144 @@
+"""
+Unit tests for the persistent reminder queue
+
+Tests for send-time calculation, the SKIP LOCKED claim query and how
+dispatch records the outcome of each job.
+"""
+
+from datetime import date, datetime, time, timedelta, timezone
+from types import SimpleNamespace
+
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from backend.api.core.config import get_settings
+from backend.api.utils import reminder_queue
+from backend.api.utils.notifications import BulkSendResult
+from backend.api.utils.reminder_queue import (
+    ENVIADO,
+    FALLIDO,
+    PENDIENTE,
+    CANCELADO,
+    ReminderWorker,
+    claim_due_jobs_query,
+    dispatch_jobs,
+    scheduled_send_time,
+)
+
+settings = get_settings()
+
+
+def _sql(stmt):
+    return str(stmt.compile(dialect=asyncpg.dialect()))
+
+
+class TestScheduledSendTime:
+    """Test when a reminder becomes due"""
+
+    def test_evening_before(self):
+        """Test reminders are due at REMINDER_SEND_HOUR the days before"""
+        now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        send_at = scheduled_send_time(date(2026, 10, 20), now)
+        expected_day = date(2026, 10, 20) - timedelta(days=settings.REMINDER_DAYS_BEFORE)
+
+        assert send_at.tzinfo is not None
+        assert send_at.replace(tzinfo=None) == datetime.combine(expected_day, time(settings.REMINDER_SEND_HOUR))
+
+    def test_past_send_time_is_now(self):
+        """Test an appointment scheduled late is due immediately"""
+        now = datetime(2026, 10, 20, 12, tzinfo=timezone.utc)
+        assert scheduled_send_time(date(2026, 10, 20), now) == now
+
+
+class TestClaimQuery:
+    """Test the claim statement"""
+
+    def test_skip_locked_subquery(self):
+        """Test jobs are claimed with FOR UPDATE SKIP LOCKED and LIMIT"""
+        sql = _sql(claim_due_jobs_query("worker-1", 50))
+
+        assert sql.startswith("UPDATE ops.recordatorio_jobs SET status=")
+        assert "FOR UPDATE SKIP LOCKED" in sql
+        assert "LIMIT" in sql
+        assert "RETURNING" in sql
+
+
+class _FakeOpsSession:
+    """Answers the active-appointment query and records updates."""
+
+    def __init__(self, active):
+        self.active = active
+        self.updates = []
+        self.committed = False
+
+    async def execute(self, stmt):
+        if stmt.is_select:
+            return SimpleNamespace(all=lambda: list(self.active))
+        params = stmt.compile().params
+        self.updates.append(params)
+        return SimpleNamespace(rowcount=1)
+
+    async def commit(self):
+        self.committed = True
+
+
+def _job(id_job, cita_id, email="p@example.com", intentos=1):
+    return SimpleNamespace(
+        id_job=id_job, cita_id=cita_id, fecha_cita=date(2026, 10, 20), hora_cita=time(10),
+        status="Enviando", paciente_id=1, paciente_nombre="Ana López", destinatario=email,
+        paciente_telefono=None, podologo_nombre="Dr. Ruiz", servicio_nombre="Consulta",
+        notas=None, id_clinica=1, intentos=intentos,
+    )
+
+
+class TestDispatchJobs:
+    """Test outcome bookkeeping"""
+
+    async def test_outcomes(self, monkeypatch):
+        """Test sent, retried, failed and cancelled jobs"""
+        sent_to = []
+
+        async def fake_send(messages):
+            sent_to.extend(m.to_email for m in messages)
+            failed = [m for m in messages if m.to_email.startswith("falla")]
+            for m in failed:
+                m.error = "451 busy"
+            return BulkSendResult(sent=len(messages) - len(failed), failed=failed)
+
+        monkeypatch.setattr(reminder_queue, "send_bulk_emails", fake_send)
+        jobs = [
+            _job(1, 10),
+            _job(2, 11, email="falla1@example.com", intentos=1),
+            _job(3, 12, email="falla2@example.com", intentos=settings.REMINDER_MAX_ATTEMPTS),
+            _job(4, 13),  # Cita cancelada
+        ]
+        db = _FakeOpsSession(active={(c, date(2026, 10, 20)) for c in (10, 11, 12)})
+
+        counts = await dispatch_jobs(db, jobs)
+
+        assert counts == {"enviados": 1, "fallidos": 1, "reintentos": 1, "cancelados": 1}
+        assert "p@example.com" in sent_to and len(sent_to) == 3
+        statuses = [u["status"] for u in db.updates]
+        assert statuses == [CANCELADO, ENVIADO, PENDIENTE, FALLIDO]
+        assert db.updates[2]["ultimo_error"] == "451 busy"
+        assert db.committed
+
+    async def test_no_jobs(self):
+        """Test nothing is queried without jobs"""
+        db = _FakeOpsSession(active=set())
+        assert (await dispatch_jobs(db, []))["enviados"] == 0
+        assert not db.committed
+
+
+class TestWorkerWithoutSmtp:
+    """Test the worker leaves jobs alone while SMTP is unconfigured"""
+
+    async def test_no_claims(self, monkeypatch):
+        """Test no session is opened and no job is claimed"""
+        monkeypatch.setattr(reminder_queue, "smtp_configured", lambda: False)
+
+        def no_session():
+            raise AssertionError("jobs should not be claimed without SMTP credentials")
+
+        worker = ReminderWorker(ops_session_factory=no_session)
+
+        assert await worker.process_due() == 0
@@ -0,0 +1,91 @@
+"""
+Unit tests for the schema prompt
+
+Tests the memoized full and per-entity schema contexts and that
+generate_sql sends them with prompt-caching markers.
+"""
+
+from types import SimpleNamespace
+
+from anthropic.types import TextBlock
+
+from backend.agents.llm_client import cached_system
+from backend.agents.nodes import generate_sql
+from backend.agents.state import IntentType, create_initial_state
+from backend.tools.schema_info import (
+    SCHEMA_DESCRIPTIONS,
+    get_schema_context_for_entities,
+    get_schema_context_for_prompt,
+)
+
+
+class TestSchemaContext:
+    """Test rendering and memoization"""
+
+    def test_full_schema_memoized(self):
+        """Test the full schema is rendered once and lists every table"""
+        context = get_schema_context_for_prompt()
+
+        assert get_schema_context_for_prompt() is context
+        assert all(f"**{table}**" in context for table in SCHEMA_DESCRIPTIONS)
+
+    def test_subset_keeps_declared_order(self):
+        """Test the same tables always render the same text"""
+        first = get_schema_context_for_prompt(["ops.citas", "clinic.pacientes"])
+        second = get_schema_context_for_prompt(["clinic.pacientes", "ops.citas", "no.existe"])
+
+        assert first is second
+        assert first.index("clinic.pacientes") < first.index("ops.citas")
+        assert "clinic.tratamientos" not in first
+
+    def test_entity_context(self):
+        """Test an entity brings its table, related tables and joins only"""
+        context = get_schema_context_for_entities(["Cita"])
+
+        assert "**ops.citas**" in context
+        assert "**ops.podologos**" in context
+        assert "**finance.pagos**" not in context
+        assert "- ops.citas.podologo_id -> ops.podologos.id_podologo" in context
+        assert len(context) < len(get_schema_context_for_prompt())
+
+    def test_unknown_entities_fall_back_to_full(self):
+        """Test unrecognised entities get the full schema"""
+        assert get_schema_context_for_entities(["xyz"]) == get_schema_context_for_prompt()
+
+
+class _RecordingMessages:
+    def __init__(self):
+        self.kwargs = None
+
+    async def create(self, **kwargs):
+        self.kwargs = kwargs
+        sql = '{"sql": "SELECT 1 FROM ops.citas", "params": {}, "target_db": "ops", "tables_involved": ["ops.citas"]}'
+        return SimpleNamespace(content=[TextBlock(type="text", text=sql)])
+
+
+class TestPromptCaching:
+    """Test the system prompt sent by generate_sql"""
+
+    def test_cached_system_blocks(self):
+        """Test every non-empty part becomes a cached text block"""
+        blocks = cached_system("reglas", "", "esquema")
+
+        assert [b["text"] for b in blocks] == ["reglas", "esquema"]
+        assert all(b["cache_control"] == {"type": "ephemeral"} for b in blocks)
+
+    async def test_generate_sql_sends_entity_schema(self, monkeypatch):
+        """Test only the detected tables are sent, after the static rules"""
+        llm = _RecordingMessages()
+        monkeypatch.setattr("backend.agents.nodes.nl_to_sql_node.get_llm_client", lambda: SimpleNamespace(messages=llm))
+        state = create_initial_state("¿qué citas tiene el podólogo 3?", user_id=1, user_role="Admin", session_id="s1")
+        state.update(
+            intent=IntentType.QUERY_READ,
+            entities_extracted={"_entities": ["cita"], "_tables": ["ops.citas"]},
+        )
+
+        await generate_sql(state)
+
+        rules, schema = llm.kwargs["system"]
+        assert rules["text"].startswith("Eres un experto en SQL")
+        assert schema["text"] == get_schema_context_for_entities(["cita"])
+        assert "cache_control" in rules and "cache_control" in schema
@@ -0,0 +1,220 @@
+"""
+Unit tests for the SQL analysis pass
+
+Tests the single AST parse used by the agent executor: tables, statement
+type, top-level LIMIT, target database, validation and row capping.
+"""
+
+from contextlib import contextmanager
+
+import pytest
+
+from backend.agents.state import DatabaseTarget, SQLQuery
+from backend.tools import sql_executor
+from backend.tools.sql_analysis import analyze_sql, apply_row_limit
+from backend.tools.sql_executor import detect_target_database, validate_query_safety
+
+
+class TestAnalyzeSQL:
+    """Test what a single parse extracts"""
+
+    def test_tables_and_target(self):
+        """Test schema-qualified tables map to their database"""
+        analysis = analyze_sql(
+            "SELECT t.id_tratamiento FROM clinic.tratamientos t "
+            "JOIN clinic.pacientes p ON p.id_paciente = t.paciente_id"
+        )
+
+        assert analysis.statement_type == "SELECT"
+        assert analysis.tables == ("clinic.tratamientos", "clinic.pacientes")
+        assert analysis.schemas == {"clinic"}
+        assert analysis.target_db == DatabaseTarget.CORE
+
+    def test_cte_names_are_not_tables(self):
+        """Test CTE references are not reported as tables"""
+        analysis = analyze_sql("WITH hoy AS (SELECT * FROM ops.citas) SELECT * FROM hoy")
+
+        assert analysis.tables == ("ops.citas",)
+        assert analysis.target_db == DatabaseTarget.OPS
+
+    def test_column_named_limite_is_not_a_limit(self):
+        """Test a column containing 'limit' does not count as LIMIT"""
+        analysis = analyze_sql("SELECT limite_credito FROM clinic.pacientes")
+
+        assert not analysis.has_limit
+
+    def test_subquery_limit_is_not_top_level(self):
+        """Test only the outer LIMIT counts"""
+        analysis = analyze_sql("SELECT * FROM (SELECT * FROM ops.citas LIMIT 5) s")
+
+        assert not analysis.has_limit
+
+    def test_top_level_limit_value(self):
+        """Test literal and parameter limits"""
+        assert analyze_sql("SELECT * FROM ops.citas LIMIT 20").limit == 20
+        parameter = analyze_sql("SELECT * FROM ops.citas LIMIT :n")
+        assert parameter.has_limit and parameter.limit is None
+
+    def test_cached_per_sql(self):
+        """Test the same SQL is parsed once"""
+        sql = "SELECT COUNT(*) FROM ops.citas WHERE fecha_cita = :fecha"
+        assert analyze_sql(sql) is analyze_sql(sql)
+
+    def test_unparseable(self):
+        """Test parse errors are reported, not raised"""
+        assert analyze_sql("SELECT * FROM clinic.pacientes) x").error
+
+
+class TestValidation:
+    """Test AST-based validation"""
+
+    @pytest.mark.parametrize("sql", [
+        "SELECT drop_off, created_at FROM ops.citas",
+        "SELECT nombres FROM clinic.pacientes WHERE notas ILIKE '%create%'",
+        "SELECT COUNT(*) FROM ops.citas WHERE fecha_cita = :fecha",
+    ])
+    def test_keywords_inside_names_allowed(self, sql):
+        """Test identifiers and literals containing keywords are not rejected"""
+        assert validate_query_safety(sql, "Recepcion") == (True, None)
+
+    @pytest.mark.parametrize("sql, message", [
+        ("DELETE FROM clinic.pacientes", "Solo se permiten"),
+        ("SELECT * INTO copia FROM clinic.pacientes", "INTO"),
+        ("SELECT * FROM ops.citas FOR UPDATE", "FOR UPDATE"),
+        ("SELECT pg_sleep(10)", "pg_sleep"),
+        ("SELECT * FROM ops.citas c JOIN clinic.pacientes p ON p.id_paciente = c.paciente_id", "bases"),
+        ("SELECT * FROM ops.citas UNION SELECT * FROM ops.citas", "UNION"),
+        ("SELECT query_to_xml('select * from auth.sys_usuarios', true, true, '')", "query_to_xml"),
+        ("SELECT * FROM table_to_xml('auth.sys_usuarios', true, true, '')", "table_to_xml"),
+        ("SELECT schema_to_xml('auth', true, true, '')", "schema_to_xml"),
+    ])
+    def test_rejected(self, sql, message):
+        """Test non-read, locking, system and cross-database queries"""
+        is_valid, error = validate_query_safety(sql, "Admin")
+
+        assert not is_valid
+        assert message in error
+
+    @pytest.mark.parametrize("sql", [
+        "SELECT password_hash FROM auth.SYS_USUARIOS",
+        "SELECT password_hash FROM Auth.Sys_Usuarios",
+        "SELECT password_hash FROM SYS_USUARIOS",
+        "SELECT password_hash FROM Sys_Usuarios",
+    ])
+    def test_sensitive_table_any_case(self, sql):
+        """Test unquoted names are folded like PostgreSQL does"""
+        is_valid, error = validate_query_safety(sql, "Recepcion")
+
+        assert not is_valid
+        assert "auth.sys_usuarios" in error
+        assert detect_target_database(sql) == DatabaseTarget.AUTH
+
+    def test_write_inside_cte(self):
+        """Test a data-modifying CTE is rejected even under a SELECT"""
+        is_valid, error = validate_query_safety(
+            "WITH x AS (DELETE FROM clinic.pacientes RETURNING *) SELECT * FROM x", "Admin"
+        )
+
+        assert not is_valid
+        assert "Solo se permiten" in error
+
+    def test_unqualified_sensitive_table(self):
+        """Test sensitive tables are detected without their schema"""
+        is_valid, error = validate_query_safety("SELECT * FROM sys_usuarios", "Recepcion")
+
+        assert not is_valid
+        assert "auth.sys_usuarios" in error
+
+    def test_detect_target_database(self):
+        """Test detection by schema and by bare table name"""
+        assert detect_target_database("SELECT * FROM finance.pagos") == DatabaseTarget.OPS
+        assert detect_target_database("SELECT * FROM citas") == DatabaseTarget.OPS
+        assert detect_target_database("SELECT 1") == DatabaseTarget.CORE
+
+
+class TestRowLimit:
+    """Test the row cap"""
+
+    def test_appended_when_missing(self):
+        """Test a LIMIT is appended without touching parameters"""
+        sql = "SELECT * FROM ops.citas WHERE fecha_cita = :fecha"
+
+        assert apply_row_limit(sql, analyze_sql(sql), 100) == f"{sql} LIMIT 100"
+
+    def test_small_limit_kept(self):
+        """Test a limit under the cap is left alone"""
+        sql = "SELECT * FROM ops.citas LIMIT 10"
+
+        assert apply_row_limit(sql, analyze_sql(sql), 100) == sql
+
+    @pytest.mark.parametrize("sql", ["SELECT * FROM ops.citas LIMIT 5000", "SELECT * FROM ops.citas LIMIT :n"])
+    def test_large_or_dynamic_limit_wrapped(self, sql):
+        """Test limits over the cap or not literal are capped"""
+        capped = apply_row_limit(sql, analyze_sql(sql), 100)
+
+        assert capped == f"SELECT * FROM ({sql}) AS limitado LIMIT 100"
+
+
+class _FakeResult:
+    returns_rows = True
+
+    def keys(self):
+        return ["id_cita"]
+
+    def fetchall(self):
+        return []
+
+
+class _FakeSession:
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, statement, params=None):
+        self.executed.append((str(statement), params))
+        return _FakeResult()
+
+    def close(self):
+        pass
+
+
+class TestExecuteSafeQuery:
+    """Test the executor uses the analysis"""
+
+    def test_target_and_limit_from_analysis(self, monkeypatch):
+        """Test the database comes from the tables and the cap from the AST"""
+        session = _FakeSession()
+        targets = []
+
+        @contextmanager
+        def get_db_session(target):
+            targets.append(target)
+            yield session
+
+        monkeypatch.setattr(sql_executor, "get_db_session", get_db_session)
+        sql_query = SQLQuery(
+            query="SELECT id_cita, limite FROM ops.citas WHERE fecha_cita = :fecha",
+            params={"fecha": "2026-10-17"},
+            target_db=DatabaseTarget.CORE,
+        )
+
+        result = sql_executor.execute_safe_query(sql_query, "Admin", max_results=50)
+
+        assert result.success
+        assert targets == [DatabaseTarget.OPS]
+        assert session.executed[-1][0].endswith("LIMIT 50")
+
+    def test_declared_target_ignored_without_tables(self, monkeypatch):
+        """Test a query with no tables never goes to the LLM-declared database"""
+        targets = []
+
+        @contextmanager
+        def get_db_session(target):
+            targets.append(target)
+            yield _FakeSession()
+
+        monkeypatch.setattr(sql_executor, "get_db_session", get_db_session)
+        sql_query = SQLQuery(query="SELECT current_user", target_db=DatabaseTarget.AUTH)
+
+        sql_executor.execute_safe_query(sql_query, "Recepcion")
+
+        assert targets == [DatabaseTarget.CORE]
@@ -0,0 +1,222 @@
+"""
+Unit tests for agent SQL timeouts and cancellation
+
+Tests the read-only transaction and statement_timeout set before each
+agent query, the TIMEOUT error type, cancellation of the running query
+when the node is cancelled, and cancellation on client disconnect.
+"""
+
+import asyncio
+import threading
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from backend.agents.nodes import sql_exec_node
+from backend.agents.state import DatabaseTarget, ErrorType, ExecutionResult, SQLQuery, create_initial_state
+from backend.api.routes.chat import run_until_disconnect
+from backend.tools import sql_executor
+from backend.tools.sql_executor import QueryHandle
+
+
+class _QueryCanceled(Exception):
+    pgcode = "57014"
+
+
+class _FakeResult:
+    returns_rows = True
+
+    def keys(self):
+        return ["total"]
+
+    def fetchall(self):
+        return []
+
+
+class _FakeSession:
+    def __init__(self, fail_with=None):
+        self.executed = []
+        self.fail_with = fail_with
+        self.closed = False
+        self.dbapi_connection = object()
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.executed.append(sql)
+        if self.fail_with is not None and sql.startswith("SELECT"):
+            raise self.fail_with
+        return _FakeResult()
+
+    def connection(self):
+        session = self
+
+        class _Connection:
+            class connection:
+                dbapi_connection = session.dbapi_connection
+        return _Connection()
+
+    def close(self):
+        self.closed = True
+
+
+def _run(monkeypatch, session, **kwargs):
+    @contextmanager
+    def get_db_session(target):
+        try:
+            yield session
+        finally:
+            session.close()
+
+    monkeypatch.setattr(sql_executor, "get_db_session", get_db_session)
+    sql_query = SQLQuery(query="SELECT COUNT(*) AS total FROM ops.citas", target_db=DatabaseTarget.OPS)
+    return sql_executor.execute_safe_query(sql_query, "Admin", **kwargs)
+
+
+class TestExecuteSafeQuery:
+    """Test the server-side guards"""
+
+    def test_read_only_with_statement_timeout(self, monkeypatch):
+        """Test the transaction is read-only and capped before the query runs"""
+        session = _FakeSession()
+
+        result = _run(monkeypatch, session, timeout_seconds=7)
+
+        assert result.success
+        assert session.executed[:2] == ["SET TRANSACTION READ ONLY", "SET LOCAL statement_timeout = 7000"]
+        assert session.executed[2].startswith("SELECT COUNT(*)")
+        assert session.closed
+
+    def test_statement_timeout_reported(self, monkeypatch):
+        """Test a server-side cancel becomes a TIMEOUT result"""
+        error = OperationalError("SELECT ...", {}, _QueryCanceled("canceling statement due to statement timeout"))
+
+        result = _run(monkeypatch, _FakeSession(fail_with=error), timeout_seconds=3)
+
+        assert not result.success
+        assert result.error_type == ErrorType.TIMEOUT
+        assert "3s" in result.error_message
+
+    def test_connection_error_is_not_timeout(self, monkeypatch):
+        """Test other operational errors keep their generic handling"""
+        error = OperationalError("SELECT ...", {}, Exception("connection refused"))
+
+        result = _run(monkeypatch, _FakeSession(fail_with=error))
+
+        assert result.error_type == ErrorType.NONE
+        assert result.error_message == "Error de conexión a la base de datos"
+
+    def test_cancelled_before_start(self, monkeypatch):
+        """Test a handle cancelled early stops the query from running"""
+        handle = QueryHandle()
+        handle.cancel()
+        session = _FakeSession()
+
+        result = _run(monkeypatch, session, handle=handle)
+
+        assert result.error_type == ErrorType.TIMEOUT
+        assert not any(sql.startswith("SELECT") for sql in session.executed)
+
+    @pytest.mark.parametrize("fail_with", [None, OperationalError("SELECT ...", {}, Exception("boom"))])
+    def test_detached_before_connection_returned(self, monkeypatch, fail_with):
+        """Test a late cancel cannot reach a connection already back in the pool"""
+        session = _FakeSession(fail_with=fail_with)
+        closed_at_detach = []
+
+        class _RecordingHandle(QueryHandle):
+            def detach(self):
+                closed_at_detach.append(session.closed)
+                super().detach()
+
+        _run(monkeypatch, session, handle=_RecordingHandle())
+
+        assert closed_at_detach == [False]
+        assert session.closed
+
+
+class _CancellableConnection:
+    def __init__(self):
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+class TestExecuteSqlNode:
+    """Test the node side"""
+
+    async def test_timeout_sets_error_type_without_retry(self, monkeypatch):
+        """Test a timeout is surfaced as TIMEOUT and not retried"""
+        monkeypatch.setattr(
+            sql_exec_node, "execute_safe_query",
+            lambda **kwargs: ExecutionResult(success=False, error_message="La consulta excedió 30s", error_type=ErrorType.TIMEOUT),
+        )
+        state = create_initial_state("citas", user_id=1, user_role="Admin", session_id="s1")
+        state["sql_query"] = SQLQuery(query="SELECT 1 FROM ops.citas")
+
+        state = await sql_exec_node.execute_sql(state)
+
+        assert state["error_type"] == ErrorType.TIMEOUT
+        assert state["retry_count"] == 0
+
+    async def test_node_cancel_cancels_query(self, monkeypatch):
+        """Test cancelling the node sends a cancel to the running query"""
+        connection = _CancellableConnection()
+        started = threading.Event()
+
+        def blocking_query(handle, **kwargs):
+            handle.attach(connection)
+            started.set()
+            connection.cancelled.wait(timeout=5)
+            return ExecutionResult(success=False, error_type=ErrorType.TIMEOUT)
+
+        monkeypatch.setattr(sql_exec_node, "execute_safe_query", blocking_query)
+        state = create_initial_state("citas", user_id=1, user_role="Admin", session_id="s1")
+        state["sql_query"] = SQLQuery(query="SELECT 1 FROM ops.citas")
+
+        task = asyncio.create_task(sql_exec_node.execute_sql(state))
+        await asyncio.to_thread(started.wait, 5)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+        assert connection.cancelled.is_set()
+
+
+class _Request:
+    def __init__(self, disconnect_after):
+        self.checks = 0
+        self.disconnect_after = disconnect_after
+
+    async def is_disconnected(self):
+        self.checks += 1
+        return self.checks >= self.disconnect_after
+
+
+class TestRunUntilDisconnect:
+    """Test the chat endpoint helper"""
+
+    async def test_result_returned(self):
+        """Test a finished agent returns its result"""
+        async def agent():
+            return {"success": True}
+
+        assert await run_until_disconnect(_Request(disconnect_after=100), agent(), poll_seconds=0.01) == {"success": True}
+
+    async def test_disconnect_cancels_agent(self):
+        """Test the agent is cancelled once the client goes away"""
+        cancelled = asyncio.Event()
+
+        async def agent():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        result = await run_until_disconnect(_Request(disconnect_after=2), agent(), poll_seconds=0.01)
+
+        assert result is None
+        assert cancelled.is_set()
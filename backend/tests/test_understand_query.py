@@ -0,0 +1,117 @@
+"""
+Unit tests for the combined intent + SQL node
+
+Tests that one structured (tool use) LLM call fills intent, entities and
+SQL, that generate_sql reuses it, and that failures fall back to the
+split classify_intent → generate_sql path.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from anthropic.types import TextBlock, ToolUseBlock
+
+from backend.agents.nodes import generate_sql, understand_query
+from backend.agents.nodes.understand_query_node import UNDERSTAND_TOOL_NAME
+from backend.agents.state import DatabaseTarget, ErrorType, IntentType, create_initial_state
+
+
+class _FakeMessages:
+    """Returns the queued responses in order and records each request."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        return self.responses.pop(0)
+
+
+def _tool_response(**tool_input):
+    return SimpleNamespace(content=[
+        ToolUseBlock(id="toolu_1", type="tool_use", name=UNDERSTAND_TOOL_NAME, input=tool_input)
+    ])
+
+
+def _text_response(text):
+    return SimpleNamespace(content=[TextBlock(type="text", text=text)])
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    def install(*responses):
+        fake = SimpleNamespace(messages=_FakeMessages(*responses))
+        for module in ("classify_intent_node", "nl_to_sql_node", "understand_query_node"):
+            monkeypatch.setattr(f"backend.agents.nodes.{module}.get_llm_client", lambda: fake)
+        return fake.messages
+    return install
+
+
+def _state(query):
+    return create_initial_state(query, user_id=1, user_role="Admin", session_id="s1")
+
+
+class TestUnderstandQuery:
+    """Test the single structured call"""
+
+    async def test_read_query_in_one_call(self, fake_llm):
+        """Test intent, entities and SQL come from one call and generate_sql reuses them"""
+        llm = fake_llm(_tool_response(
+            intent="query_read",
+            confidence=0.9,
+            entities=["cita"],
+            extracted_values={"fecha": "mañana"},
+            sql="SELECT id_cita FROM ops.citas WHERE fecha_cita = :fecha AND deleted_at IS NULL LIMIT 100",
+            params={"fecha": "2026-10-18"},
+            target_db="ops",
+            tables_involved=["ops.citas"],
+        ))
+
+        state = await understand_query(_state("¿Qué pacientes tienen cita el día de mañana?"))
+        state = await generate_sql(state)
+
+        assert len(llm.requests) == 1
+        assert llm.requests[0]["tool_choice"] == {"type": "tool", "name": UNDERSTAND_TOOL_NAME}
+        assert state["intent"] == IntentType.QUERY_READ
+        assert state["entities_extracted"]["fecha"] == "mañana"
+        assert state["entities_extracted"]["_tables"] == ["ops.citas"]
+        assert state["sql_query"].params == {"fecha": "2026-10-18"}
+        assert state["sql_query"].target_db == DatabaseTarget.OPS
+        assert state["error_type"] == ErrorType.NONE
+
+    async def test_quick_greeting_skips_llm(self, fake_llm):
+        """Test obvious greetings need no LLM call"""
+        llm = fake_llm()
+        state = await understand_query(_state("hola"))
+
+        assert state["intent"] == IntentType.GREETING
+        assert llm.requests == []
+
+    async def test_non_read_intent_has_no_sql(self, fake_llm):
+        """Test SQL is ignored for intents that do not read"""
+        fake_llm(_tool_response(
+            intent="mutation_delete", confidence=0.9, entities=["cita"],
+            sql="SELECT 1",
+        ))
+        state = await understand_query(_state("Elimina la cita de Juan del viernes"))
+
+        assert state["intent"] == IntentType.MUTATION_DELETE
+        assert state["sql_query"] is None
+
+    async def test_fallback_to_split_path(self, fake_llm):
+        """Test a response without the tool falls back to classify_intent + generate_sql"""
+        llm = fake_llm(
+            _text_response("No sé"),
+            _text_response('{"intent": "query_read", "confidence": 0.8, "entities": ["paciente"]}'),
+            _text_response('{"sql": "SELECT id_paciente FROM clinic.pacientes LIMIT 100", "target_db": "core"}'),
+        )
+
+        state = await understand_query(_state("¿Qué pacientes tienen alergias registradas?"))
+        state = await generate_sql(state)
+
+        assert len(llm.requests) == 3
+        assert "tools" not in llm.requests[1]
+        assert state["intent"] == IntentType.QUERY_READ
+        assert state["sql_query"].query.startswith("SELECT id_paciente")
+        assert "understand_query" in state["node_path"]
@@ -5,6 +5,7 @@ Tests de Endpoints de Citas
 Tests para el módulo de citas/agenda (8 endpoints):
 - GET /api/v1/citas (listar citas)
 - POST /api/v1/citas (crear/agendar cita)
+- POST /api/v1/citas/serie (serie de citas recurrentes)
 - GET /api/v1/citas/{id} (obtener cita)
 - PUT /api/v1/citas/{id} (actualizar cita)
 - DELETE /api/v1/citas/{id} (cancelar cita)
@@ -250,6 +251,167 @@ class TestCitasCrear:
         assert response.status_code in [400, 404, 422]
 
 
+@pytest.mark.api
+@pytest.mark.database
+class TestCitasConcurrencia:
+    """Tests de agendado simultáneo (EXCLUDE constraint anti-solapamiento)."""
+
+    def _crear_podologo_servicio(self, ops_db, clinica_id):
+        from backend.schemas.ops.models import Podologo, CatalogoServicio
+        from decimal import Decimal
+
+        podologo = Podologo(id_clinica=clinica_id, nombre_completo="Dr. Concurrente", cedula_profesional="CONC-1")
+        servicio = CatalogoServicio(id_clinica=clinica_id, nombre_servicio="Consulta Conc", precio_base=Decimal("300.00"))
+        ops_db.add_all([podologo, servicio])
+        ops_db.commit()
+        return podologo, servicio
+
+    def _agendar_en_paralelo(self, client, headers, cuerpos):
+        from concurrent.futures import ThreadPoolExecutor
+
+        # Con `with TestClient(app)` todas las llamadas comparten el event loop
+        # de la app: los requests se atienden de forma concurrente
+        with ThreadPoolExecutor(max_workers=len(cuerpos)) as pool:
+            return list(pool.map(
+                lambda cuerpo: client.post("/api/v1/citas", headers=headers, json=cuerpo),
+                cuerpos
+            ))
+
+    def _cuerpo(self, podologo, servicio, fecha, hora_inicio, hora_fin, paciente_id=1):
+        return {
+            "paciente_id": paciente_id,
+            "podologo_id": podologo.id_podologo,
+            "servicio_id": servicio.id_servicio,
+            "fecha_cita": fecha.isoformat(),
+            "hora_inicio": hora_inicio,
+            "hora_fin": hora_fin,
+        }
+
+    def test_mismo_horario_en_paralelo_solo_uno_gana(self, client, auth_headers_admin, test_admin_user, ops_db):
+        """Test: 10 solicitudes simultáneas al mismo horario → 1 creada, 9 con 409."""
+        podologo, servicio = self._crear_podologo_servicio(ops_db, test_admin_user.clinica_id)
+        fecha = date_type.today() + timedelta(days=3)
+        cuerpos = [
+            self._cuerpo(podologo, servicio, fecha, "10:00:00", "10:30:00", paciente_id=i + 1)
+            for i in range(10)
+        ]
+
+        responses = self._agendar_en_paralelo(client, auth_headers_admin, cuerpos)
+
+        codigos = sorted(r.status_code for r in responses)
+        assert codigos == [201] + [409] * 9
+        assert all("ya tiene una cita" in r.json()["detail"] for r in responses if r.status_code == 409)
+
+    def test_horarios_distintos_en_paralelo_todos_entran(self, client, auth_headers_admin, test_admin_user, ops_db):
+        """Test: Solicitudes simultáneas sin solapamiento no se bloquean entre sí."""
+        podologo, servicio = self._crear_podologo_servicio(ops_db, test_admin_user.clinica_id)
+        fecha = date_type.today() + timedelta(days=3)
+        cuerpos = [
+            self._cuerpo(podologo, servicio, fecha, f"{9 + i:02d}:00:00", f"{9 + i:02d}:30:00")
+            for i in range(8)
+        ]
+
+        responses = self._agendar_en_paralelo(client, auth_headers_admin, cuerpos)
+
+        assert [r.status_code for r in responses] == [201] * 8
+
+    def test_citas_contiguas_no_chocan(self, client, auth_headers_admin, test_admin_user, ops_db):
+        """Test: Una cita que empieza cuando termina otra es válida."""
+        podologo, servicio = self._crear_podologo_servicio(ops_db, test_admin_user.clinica_id)
+        fecha = date_type.today() + timedelta(days=4)
+
+        primera = client.post("/api/v1/citas", headers=auth_headers_admin,
+                              json=self._cuerpo(podologo, servicio, fecha, "10:00:00", "10:30:00"))
+        contigua = client.post("/api/v1/citas", headers=auth_headers_admin,
+                               json=self._cuerpo(podologo, servicio, fecha, "10:30:00", "11:00:00"))
+        encimada = client.post("/api/v1/citas", headers=auth_headers_admin,
+                               json=self._cuerpo(podologo, servicio, fecha, "10:15:00", "10:45:00"))
+
+        assert primera.status_code == 201
+        assert contigua.status_code == 201
+        assert encimada.status_code == 409
+
+
+@pytest.mark.api
+@pytest.mark.database
+class TestCitasSerie:
+    """Tests de POST /citas/serie (citas recurrentes en una transacción)."""
+
+    def _preparar(self, ops_db, clinica_id):
+        from backend.schemas.ops.models import Podologo, CatalogoServicio, Cita
+        from decimal import Decimal
+
+        podologo = Podologo(id_clinica=clinica_id, nombre_completo="Dr. Serie", cedula_profesional="SERIE-1")
+        servicio = CatalogoServicio(id_clinica=clinica_id, nombre_servicio="Terapia", precio_base=Decimal("400.00"))
+        ops_db.add_all([podologo, servicio])
+        ops_db.commit()
+
+        # Próximo lunes; la tercera semana ya está ocupada a las 10:00
+        inicio = date_type.today() + timedelta(days=7 - date_type.today().weekday())
+        ocupada = Cita(
+            id_clinica=clinica_id, paciente_id=99, podologo_id=podologo.id_podologo,
+            servicio_id=servicio.id_servicio, fecha_cita=inicio + timedelta(weeks=2),
+            hora_inicio=datetime.strptime("10:00", "%H:%M").time(),
+            hora_fin=datetime.strptime("10:30", "%H:%M").time(), status="Confirmada"
+        )
+        ops_db.add(ocupada)
+        ops_db.commit()
+        return podologo, servicio, inicio
+
+    def _cuerpo(self, podologo, servicio, inicio, omitir_conflictos, ocurrencias=4):
+        return {
+            "paciente_id": 1,
+            "podologo_id": podologo.id_podologo,
+            "servicio_id": servicio.id_servicio,
+            "fecha_cita": inicio.isoformat(),
+            "hora_inicio": "10:00:00",
+            "hora_fin": "10:30:00",
+            "recurrencia": {"frecuencia": "semanal", "ocurrencias": ocurrencias},
+            "omitir_conflictos": omitir_conflictos,
+        }
+
+    def test_serie_omitiendo_conflictos(self, client, auth_headers_admin, test_admin_user, ops_db):
+        """Test: Se agendan las semanas libres y se reporta la ocupada."""
+        podologo, servicio, inicio = self._preparar(ops_db, test_admin_user.clinica_id)
+
+        response = client.post("/api/v1/citas/serie", headers=auth_headers_admin,
+                               json=self._cuerpo(podologo, servicio, inicio, True))
+
+        assert response.status_code == 201
+        data = response.json()
+        assert data["total_solicitadas"] == 4
+        assert [c["fecha_cita"] for c in data["creadas"]] == [
+            (inicio + timedelta(weeks=w)).isoformat() for w in (0, 1, 3)
+        ]
+        assert data["creadas"][0]["podologo_nombre"] == "Dr. Serie"
+        assert data["conflictos"] == [
+            {"fecha_cita": (inicio + timedelta(weeks=2)).isoformat(), "motivo": "solapamiento"}
+        ]
+
+    def test_serie_todo_o_nada(self, client, auth_headers_admin, test_admin_user, ops_db):
+        """Test: Sin omitir_conflictos, un conflicto rechaza toda la serie."""
+        from backend.schemas.ops.models import Cita
+
+        podologo, servicio, inicio = self._preparar(ops_db, test_admin_user.clinica_id)
+
+        response = client.post("/api/v1/citas/serie", headers=auth_headers_admin,
+                               json=self._cuerpo(podologo, servicio, inicio, False))
+
+        assert response.status_code == 409
+        assert len(response.json()["detail"]["conflictos"]) == 1
+        ops_db.expire_all()
+        assert ops_db.query(Cita).filter(Cita.podologo_id == podologo.id_podologo).count() == 1
+
+    def test_serie_sin_fin(self, client, auth_headers_admin, test_admin_user, ops_db):
+        """Test: La recurrencia requiere ocurrencias o hasta."""
+        podologo, servicio, inicio = self._preparar(ops_db, test_admin_user.clinica_id)
+        cuerpo = self._cuerpo(podologo, servicio, inicio, True, ocurrencias=None)
+
+        response = client.post("/api/v1/citas/serie", headers=auth_headers_admin, json=cuerpo)
+
+        assert response.status_code == 400
+
+
 @pytest.mark.api
 @pytest.mark.database
 class TestCitasObtener:
@@ -558,6 +720,146 @@ class TestCitasDisponibilidad:
         # Debería retornar disponibilidad de todos los podólogos
         assert response.status_code == 200
 
+    def _crear_agenda(self, ops_db, clinica_id, fecha):
+        """Dos podólogos; el primero con la mañana ocupada de `fecha`."""
+        from backend.schemas.ops.models import Cita, Podologo, CatalogoServicio
+        from datetime import time
+        from decimal import Decimal
+
+        ocupado = Podologo(id_clinica=clinica_id, nombre_completo="Dra. Ocupada", cedula_profesional="DISP-1")
+        libre = Podologo(id_clinica=clinica_id, nombre_completo="Dr. Libre", cedula_profesional="DISP-2")
+        servicio = CatalogoServicio(id_clinica=clinica_id, nombre_servicio="Consulta Disp", precio_base=Decimal("300.00"))
+        ops_db.add_all([ocupado, libre, servicio])
+        ops_db.flush()
+        ops_db.add(Cita(
+            id_clinica=clinica_id,
+            podologo_id=ocupado.id_podologo,
+            servicio_id=servicio.id_servicio,
+            fecha_cita=fecha,
+            hora_inicio=time(9, 0),
+            hora_fin=time(19, 0),
+            status="Confirmada",
+        ))
+        ops_db.commit()
+        return ocupado, libre
+
+    def test_disponibilidad_rango_varios_podologos(self, client, auth_headers_admin, test_admin_user, ops_db):
+        """Test: Slots libres de todo el staff en varios días."""
+        fecha = date_type.today() + timedelta(days=2)
+        ocupado, libre = self._crear_agenda(ops_db, test_admin_user.clinica_id, fecha)
+
+        response = client.get(
+            f"/api/v1/citas/disponibilidad/rango?desde={fecha.isoformat()}&dias=2",
+            headers=auth_headers_admin
+        )
+
+        assert response.status_code == 200
+        slots = response.json()["slots"]
+        del_dia = {s["podologo_id"] for s in slots if s["fecha"] == fecha.isoformat()}
+        assert del_dia == {libre.id_podologo}
+        assert ocupado.id_podologo in {s["podologo_id"] for s in slots}
+
+    def test_primera_disponibilidad(self, client, auth_headers_admin, test_admin_user, ops_db):
+        """Test: Primer horario libre de cada podólogo."""
+        fecha = date_type.today() + timedelta(days=1)
+        ocupado, libre = self._crear_agenda(ops_db, test_admin_user.clinica_id, fecha)
+
+        response = client.get(
+            f"/api/v1/citas/disponibilidad/primera?dias=7"
+            f"&podologo_ids={ocupado.id_podologo}&podologo_ids={libre.id_podologo}",
+            headers=auth_headers_admin
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["primera"] is not None
+        por_podologo = {s["podologo_id"]: s for s in data["por_podologo"]}
+        assert por_podologo[ocupado.id_podologo]["fecha"] != fecha.isoformat()
+
+
+@pytest.mark.api
+@pytest.mark.database
+class TestCitasAgenda:
+    """Tests de la agenda del día."""
+    
+    def _crear_citas(self, ops_db, clinica_id, fecha, cantidad):
+        from backend.schemas.ops.models import Cita, Podologo, CatalogoServicio
+        from datetime import time
+        from decimal import Decimal
+        
+        for i in range(cantidad):
+            podologo = Podologo(
+                id_clinica=clinica_id,
+                nombre_completo=f"Podólogo Agenda {fecha.day}-{i}",
+                cedula_profesional=f"AG-{fecha.isoformat()}-{i}",
+            )
+            servicio = CatalogoServicio(
+                id_clinica=clinica_id,
+                nombre_servicio=f"Servicio Agenda {i}",
+                precio_base=Decimal("300.00"),
+            )
+            ops_db.add_all([podologo, servicio])
+            ops_db.flush()
+            ops_db.add(Cita(
+                id_clinica=clinica_id,
+                podologo_id=podologo.id_podologo,
+                servicio_id=servicio.id_servicio,
+                fecha_cita=fecha,
+                hora_inicio=time(9 + i, 0),
+                hora_fin=time(9 + i, 30),
+                status="Confirmada",
+            ))
+        ops_db.commit()
+    
+    def _contar_queries(self, client, url, headers):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        
+        statements = []
+        
+        def listener(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(Engine, "before_cursor_execute", listener)
+        try:
+            response = client.get(url, headers=headers)
+        finally:
+            event.remove(Engine, "before_cursor_execute", listener)
+        return response, len(statements)
+    
+    def test_agenda_incluye_nombres(self, client, auth_headers_admin, test_admin_user, ops_db):
+        """Test: La agenda trae nombre de podólogo y servicio de cada cita."""
+        fecha = date_type.today() + timedelta(days=3)
+        self._crear_citas(ops_db, test_admin_user.clinica_id, fecha, 2)
+        
+        response = client.get(
+            f"/api/v1/citas/agenda/{fecha.isoformat()}",
+            headers=auth_headers_admin
+        )
+        
+        assert response.status_code == 200
+        citas = response.json()["citas"]
+        assert len(citas) == 2
+        assert all(c["podologo_nombre"] and c["servicio_nombre"] for c in citas)
+    
+    def test_agenda_queries_constantes(self, client, auth_headers_admin, test_admin_user, ops_db):
+        """Test: El número de queries de la agenda no crece con el número de citas."""
+        fecha_corta = date_type.today() + timedelta(days=4)
+        fecha_larga = date_type.today() + timedelta(days=5)
+        self._crear_citas(ops_db, test_admin_user.clinica_id, fecha_corta, 1)
+        self._crear_citas(ops_db, test_admin_user.clinica_id, fecha_larga, 6)
+        
+        _, queries_corta = self._contar_queries(
+            client, f"/api/v1/citas/agenda/{fecha_corta.isoformat()}", auth_headers_admin
+        )
+        response, queries_larga = self._contar_queries(
+            client, f"/api/v1/citas/agenda/{fecha_larga.isoformat()}", auth_headers_admin
+        )
+        
+        assert response.status_code == 200
+        assert len(response.json()["citas"]) == 6
+        assert queries_larga == queries_corta
+
 
 @pytest.mark.integration
 class TestCitasWorkflow:
@@ -451,6 +451,34 @@ class TestPacientesBuscar:
         elif "items" in data:
             assert len(data["items"]) == 0
 
+    def test_buscar_ranked_accent_insensitive(self, client, auth_headers_admin, core_db):
+        """Test: /buscar ignora acentos, tolera errores y ordena por similitud."""
+        from backend.schemas.core.models import Paciente
+        for nombres, apellidos, telefono in [
+            ("José", "Martínez Ruiz", "55-1234-5678"),
+            ("Josefina", "Marín", "5598765432"),
+        ]:
+            core_db.add(Paciente(
+                nombres=nombres, apellidos=apellidos, telefono=telefono,
+                fecha_nacimiento=date(1990, 1, 1), sexo="M",
+            ))
+        core_db.commit()
+
+        response = client.get(
+            "/api/v1/pacientes/buscar?q=jose martinez",
+            headers=auth_headers_admin
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data[0]["nombres"] == "José"
+
+        response = client.get(
+            "/api/v1/pacientes/buscar?q=5512345678",
+            headers=auth_headers_admin
+        )
+        assert response.status_code == 200
+        assert [p["nombres"] for p in response.json()][:1] == ["José"]
+
 
 @pytest.mark.api
 @pytest.mark.integration
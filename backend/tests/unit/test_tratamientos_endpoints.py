@@ -0,0 +1,190 @@
+"""
+Tests de Endpoints de Tratamientos y Evoluciones
+================================================
+
+Tests del enriquecimiento por página de los listados:
+- GET /api/v1/tratamientos (nombre del paciente y total de evoluciones)
+- GET /api/v1/evoluciones (total de evidencias fotográficas)
+"""
+
+import pytest
+from datetime import date, datetime, timedelta, timezone
+
+# Fechas distintas por fila: los listados ordenan por fecha y paginan con OFFSET
+INICIO = datetime(2026, 1, 5, 9, 0, tzinfo=timezone.utc)
+
+
+def _contar_queries(client, url, headers):
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    statements = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", listener)
+    try:
+        response = client.get(url, headers=headers)
+    finally:
+        event.remove(Engine, "before_cursor_execute", listener)
+    return response, len(statements)
+
+
+@pytest.mark.api
+@pytest.mark.database
+class TestTratamientosListar:
+    """Tests del listado de tratamientos."""
+
+    def _crear_tratamientos(self, core_db, clinica_id, paciente, evoluciones_por_tratamiento):
+        from backend.schemas.core.models import Tratamiento, EvolucionClinica
+
+        esperados = {}
+        for i, cantidad in enumerate(evoluciones_por_tratamiento):
+            tratamiento = Tratamiento(
+                id_clinica=clinica_id,
+                paciente_id=paciente.id_paciente,
+                motivo_consulta_principal=f"Motivo {i}",
+                created_at=INICIO + timedelta(days=i),
+            )
+            core_db.add(tratamiento)
+            core_db.flush()
+            core_db.add_all([
+                EvolucionClinica(
+                    id_clinica=clinica_id,
+                    tratamiento_id=tratamiento.id_tratamiento,
+                    nota_subjetiva=f"Visita {j}",
+                )
+                for j in range(cantidad)
+            ])
+            esperados[tratamiento.id_tratamiento] = cantidad
+        core_db.commit()
+        return esperados
+
+    def test_conteo_por_tratamiento(self, client, auth_headers_admin, test_admin_user, test_paciente, core_db):
+        """Test: Cada tratamiento trae su paciente y sus evoluciones; sin evoluciones es 0."""
+        esperados = self._crear_tratamientos(core_db, test_admin_user.clinica_id, test_paciente, [2, 0, 1])
+
+        response = client.get(
+            f"/api/v1/tratamientos?paciente_id={test_paciente.id_paciente}",
+            headers=auth_headers_admin
+        )
+
+        assert response.status_code == 200
+        tratamientos = response.json()["tratamientos"]
+        assert {t["id_tratamiento"]: t["total_evoluciones"] for t in tratamientos} == esperados
+        assert all(t["paciente_nombre"] == "Juan Pérez López" for t in tratamientos)
+
+    def test_conteo_por_pagina(self, client, auth_headers_admin, test_admin_user, test_paciente, core_db):
+        """Test: Cada página cuenta solo las evoluciones de sus propios tratamientos."""
+        esperados = self._crear_tratamientos(core_db, test_admin_user.clinica_id, test_paciente, [3, 0, 1, 2, 0])
+
+        vistos = {}
+        for skip in (0, 2, 4):
+            response = client.get(
+                f"/api/v1/tratamientos?paciente_id={test_paciente.id_paciente}&skip={skip}&limit=2",
+                headers=auth_headers_admin
+            )
+            assert response.status_code == 200
+            pagina = response.json()["tratamientos"]
+            assert len(pagina) == min(2, 5 - skip)
+            vistos.update({t["id_tratamiento"]: t["total_evoluciones"] for t in pagina})
+
+        assert vistos == esperados
+
+    def test_queries_constantes(self, client, auth_headers_admin, test_admin_user, test_paciente, core_db):
+        """Test: El número de queries del listado no crece con el número de tratamientos."""
+        from backend.schemas.core.models import Paciente
+
+        otro = Paciente(
+            nombres="Ana", apellidos="Ruiz", fecha_nacimiento=date(1985, 3, 2), sexo="F",
+            telefono="5550001111", activo=True
+        )
+        core_db.add(otro)
+        core_db.commit()
+        self._crear_tratamientos(core_db, test_admin_user.clinica_id, test_paciente, [1])
+        self._crear_tratamientos(core_db, test_admin_user.clinica_id, otro, [1, 2, 0, 3, 1, 2])
+
+        _, queries_corta = _contar_queries(
+            client, f"/api/v1/tratamientos?paciente_id={test_paciente.id_paciente}", auth_headers_admin
+        )
+        response, queries_larga = _contar_queries(
+            client, f"/api/v1/tratamientos?paciente_id={otro.id_paciente}", auth_headers_admin
+        )
+
+        assert response.status_code == 200
+        assert len(response.json()["tratamientos"]) == 6
+        assert queries_larga == queries_corta
+
+
+@pytest.mark.api
+@pytest.mark.database
+class TestEvolucionesListar:
+    """Tests del listado de evoluciones."""
+
+    def _crear_evoluciones(self, core_db, clinica_id, paciente, evidencias_por_evolucion):
+        from backend.schemas.core.models import Tratamiento, EvolucionClinica, EvidenciaFotografica
+
+        tratamiento = Tratamiento(
+            id_clinica=clinica_id,
+            paciente_id=paciente.id_paciente,
+            motivo_consulta_principal="Onicomicosis",
+        )
+        core_db.add(tratamiento)
+        core_db.flush()
+
+        esperados = {}
+        for i, cantidad in enumerate(evidencias_por_evolucion):
+            evolucion = EvolucionClinica(
+                id_clinica=clinica_id,
+                tratamiento_id=tratamiento.id_tratamiento,
+                nota_subjetiva=f"Visita {i}",
+                fecha_visita=INICIO + timedelta(days=i),
+            )
+            core_db.add(evolucion)
+            core_db.flush()
+            core_db.add_all([
+                EvidenciaFotografica(
+                    id_clinica=clinica_id,
+                    evolucion_id=evolucion.id_evolucion,
+                    url_archivo=f"/evidencias/{evolucion.id_evolucion}-{j}.jpg",
+                )
+                for j in range(cantidad)
+            ])
+            esperados[evolucion.id_evolucion] = cantidad
+        core_db.commit()
+        return tratamiento, esperados
+
+    def test_conteo_por_evolucion(self, client, auth_headers_admin, test_admin_user, test_paciente, core_db):
+        """Test: Cada evolución trae sus evidencias; sin evidencias es 0."""
+        tratamiento, esperados = self._crear_evoluciones(
+            core_db, test_admin_user.clinica_id, test_paciente, [2, 0, 3]
+        )
+
+        response = client.get(
+            f"/api/v1/evoluciones?tratamiento_id={tratamiento.id_tratamiento}",
+            headers=auth_headers_admin
+        )
+
+        assert response.status_code == 200
+        evoluciones = response.json()["evoluciones"]
+        assert {e["id_evolucion"]: e["total_evidencias"] for e in evoluciones} == esperados
+
+    def test_conteo_por_pagina(self, client, auth_headers_admin, test_admin_user, test_paciente, core_db):
+        """Test: Cada página cuenta solo las evidencias de sus propias evoluciones."""
+        tratamiento, esperados = self._crear_evoluciones(
+            core_db, test_admin_user.clinica_id, test_paciente, [1, 0, 2, 0]
+        )
+
+        vistos = {}
+        for skip in (0, 2):
+            response = client.get(
+                f"/api/v1/evoluciones?tratamiento_id={tratamiento.id_tratamiento}&skip={skip}&limit=2",
+                headers=auth_headers_admin
+            )
+            assert response.status_code == 200
+            pagina = response.json()["evoluciones"]
+            assert len(pagina) == 2
+            vistos.update({e["id_evolucion"]: e["total_evidencias"] for e in pagina})
+
+        assert vistos == esperados
@@ -7,6 +7,8 @@ Contiene las herramientas que el agente usa para:
 - Realizar búsquedas difusas en la BD
 - Obtener información del esquema
 - Buscar en el vector store (embeddings)
+- Responder preguntas frecuentes con SQL de plantilla
+- Frenar consultas caras con el plan del optimizador (EXPLAIN)
 """
 
 from .sql_executor import (
@@ -19,6 +21,19 @@ from .sql_executor import (
     SENSITIVE_TABLES,
 )
 
+from .sql_analysis import (
+    analyze_sql,
+    SQLAnalysis,
+)
+
+from .query_cost import (
+    check_cost,
+    parse_plan,
+    CostBudget,
+    QueryPlan,
+    ROLE_COST_BUDGETS,
+)
+
 from .fuzzy_search import (
     fuzzy_search_field,
     fuzzy_search_patient,
@@ -30,6 +45,7 @@ from .fuzzy_search import (
 
 from .schema_info import (
     get_schema_context_for_prompt,
+    get_schema_context_for_entities,
     get_table_info,
     resolve_entity_to_table,
     get_related_tables,
@@ -39,6 +55,13 @@ from .schema_info import (
     ENTITY_TO_TABLE,
 )
 
+from .query_templates import (
+    match_template,
+    QueryTemplate,
+    TemplateMatch,
+    QUERY_TEMPLATES,
+)
+
 __all__ = [
     # SQL Executor
     "execute_safe_query",
@@ -48,6 +71,15 @@ __all__ = [
     "get_schema_tables",
     "SCHEMA_TO_DB",
     "SENSITIVE_TABLES",
+    # SQL Analysis
+    "analyze_sql",
+    "SQLAnalysis",
+    # Query Cost
+    "check_cost",
+    "parse_plan",
+    "CostBudget",
+    "QueryPlan",
+    "ROLE_COST_BUDGETS",
     # Fuzzy Search
     "fuzzy_search_field",
     "fuzzy_search_patient",
@@ -57,6 +89,7 @@ __all__ = [
     "FUZZY_SEARCHABLE_FIELDS",
     # Schema Info
     "get_schema_context_for_prompt",
+    "get_schema_context_for_entities",
     "get_table_info",
     "resolve_entity_to_table",
     "get_related_tables",
@@ -64,4 +97,9 @@ __all__ = [
     "build_query_context",
     "SCHEMA_DESCRIPTIONS",
     "ENTITY_TO_TABLE",
+    # Query Templates
+    "match_template",
+    "QueryTemplate",
+    "TemplateMatch",
+    "QUERY_TEMPLATES",
 ]
@@ -7,13 +7,14 @@ a través del agente conversacional.
 """
 
 import logging
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime, date, time, timedelta
 from sqlalchemy import text, and_, or_, func
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 
-from backend.api.deps.database import get_ops_db, get_core_db
+from backend.api.deps.database import get_ops_db_sync, get_core_db_sync
+from backend.api.utils.availability import MINUTES_PER_DAY, load_agenda_sync, to_minutes
 from backend.schemas.ops.models import Cita, Podologo, CatalogoServicio
 from backend.schemas.core.models import Paciente
 
@@ -27,8 +28,8 @@ class AppointmentManager:
     """
     
     def __init__(self):
-        self.ops_db_gen = get_ops_db()
-        self.core_db_gen = get_core_db()
+        self.ops_db_gen = get_ops_db_sync()
+        self.core_db_gen = get_core_db_sync()
     
     def _get_ops_session(self) -> Session:
         """Obtiene sesión de la BD ops."""
@@ -69,160 +70,47 @@ class AppointmentManager:
                 if servicio and servicio.duracion_minutos:
                     duracion_servicio = servicio.duracion_minutos
             
-            # Query para obtener citas existentes
-            query = text("""
-                SELECT 
-                    c.podologo_id,
-                    p.nombre_completo as podologo,
-                    c.hora_inicio,
-                    c.hora_fin,
-                    c.status,
-                    s.nombre_servicio
-                FROM ops.citas c
-                JOIN ops.podologos p ON c.podologo_id = p.id_podologo
-                LEFT JOIN ops.catalogo_servicios s ON c.servicio_id = s.id_servicio
-                WHERE c.fecha_cita = :fecha
-                    AND c.deleted_at IS NULL
-                    AND c.status NOT IN ('Cancelada', 'No Asistió')
-                    AND (:podologo_id IS NULL OR c.podologo_id = :podologo_id)
-                ORDER BY c.podologo_id, c.hora_inicio
-            """)
+            # Misma lógica que GET /citas/disponibilidad (api/utils/availability.py)
+            agenda = load_agenda_sync(
+                ops_db, fecha, fecha,
+                podologo_ids=[podologo_id] if podologo_id else None
+            )
+            ops_db.close()
             
-            params = {
-                "fecha": fecha,
-                "podologo_id": podologo_id
-            }
+            # Rango opcional dentro de la jornada de cada podólogo
+            window = None
+            if hora_inicio or hora_fin:
+                window = (
+                    to_minutes(hora_inicio) if hora_inicio else 0,
+                    to_minutes(hora_fin) if hora_fin else MINUTES_PER_DAY
+                )
             
-            result = ops_db.execute(query, params)
-            citas_existentes = result.fetchall()
-            
-            # Agrupar por podólogo
-            citas_por_podologo = {}
-            for cita in citas_existentes:
-                pid = cita[0]
-                if pid not in citas_por_podologo:
-                    citas_por_podologo[pid] = {
-                        "podologo": cita[1],
-                        "citas": []
+            slots = agenda.free_slots(fecha, 1, duracion_servicio, window=window)
+            horarios_disponibles = sorted(
+                (
+                    {
+                        "podologo_id": slot.podologo_id,
+                        "podologo": agenda.podologos[slot.podologo_id],
+                        "hora_inicio": slot.hora_inicio.strftime("%H:%M"),
+                        "hora_fin": slot.hora_fin.strftime("%H:%M"),
+                        "disponible": True
                     }
-                citas_por_podologo[pid]["citas"].append({
-                    "hora_inicio": cita[2],
-                    "hora_fin": cita[3],
-                    "status": cita[4],
-                    "servicio": cita[5]
-                })
-            
-            # Generar horarios disponibles
-            horarios_disponibles = self._generate_available_slots(
-                citas_por_podologo,
-                duracion_servicio,
-                hora_inicio or time(8, 0),   # 8:00 AM por defecto
-                hora_fin or time(18, 0)      # 6:00 PM por defecto
+                    for slot in slots
+                ),
+                key=lambda x: (x["podologo"], x["hora_inicio"])
             )
             
-            ops_db.close()
-            
             return {
                 "fecha": fecha.isoformat(),
                 "duracion_servicio_minutos": duracion_servicio,
                 "horarios_disponibles": horarios_disponibles,
-                "citas_existentes": len(citas_existentes)
+                "citas_existentes": agenda.citas_por_dia.get(fecha, 0)
             }
             
         except Exception as e:
             logger.error(f"Error buscando horarios disponibles: {e}")
             return {"error": str(e)}
 
-    def _generate_available_slots(self, 
-                                citas_por_podologo: Dict[int, Dict],
-                                duracion_minutos: int,
-                                hora_inicio: time,
-                                hora_fin: time) -> List[Dict[str, Any]]:
-        """
-        Genera lista de horarios disponibles basado en citas existentes.
-        """
-        slots_disponibles = []
-        
-        # Si no hay podólogos específicos, buscar todos los activos
-        if not citas_por_podologo:
-            try:
-                ops_db = self._get_ops_session()
-                podologos_query = text("""
-                    SELECT id_podologo, nombre_completo 
-                    FROM ops.podologos 
-                    WHERE activo = true AND deleted_at IS NULL
-                """)
-                podologos_result = ops_db.execute(podologos_query)
-                
-                for podologo_row in podologos_result.fetchall():
-                    pid = podologo_row[0]
-                    citas_por_podologo[pid] = {
-                        "podologo": podologo_row[1],
-                        "citas": []
-                    }
-                ops_db.close()
-            except Exception as e:
-                logger.error(f"Error obteniendo podólogos: {e}")
-                return []
-        
-        # Generar slots para cada podólogo
-        for podologo_id, data in citas_por_podologo.items():
-            podologo_nombre = data["podologo"]
-            citas = sorted(data["citas"], key=lambda x: x["hora_inicio"])
-            
-            # Convertir a minutos para facilitar cálculos
-            inicio_minutos = hora_inicio.hour * 60 + hora_inicio.minute
-            fin_minutos = hora_fin.hour * 60 + hora_fin.minute
-            
-            # Buscar espacios libres
-            tiempo_actual = inicio_minutos
-            
-            for cita in citas:
-                cita_inicio = cita["hora_inicio"]
-                cita_fin = cita["hora_fin"]
-                
-                # Convertir a minutos
-                cita_inicio_min = cita_inicio.hour * 60 + cita_inicio.minute
-                cita_fin_min = cita_fin.hour * 60 + cita_fin.minute
-                
-                # Si hay espacio antes de esta cita
-                if tiempo_actual + duracion_minutos <= cita_inicio_min:
-                    while tiempo_actual + duracion_minutos <= cita_inicio_min:
-                        hora_slot = time(tiempo_actual // 60, tiempo_actual % 60)
-                        hora_fin_slot = time((tiempo_actual + duracion_minutos) // 60, 
-                                           (tiempo_actual + duracion_minutos) % 60)
-                        
-                        slots_disponibles.append({
-                            "podologo_id": podologo_id,
-                            "podologo": podologo_nombre,
-                            "hora_inicio": hora_slot.strftime("%H:%M"),
-                            "hora_fin": hora_fin_slot.strftime("%H:%M"),
-                            "disponible": True
-                        })
-                        
-                        tiempo_actual += 30  # Slots de 30 minutos
-                
-                # Avanzar tiempo actual después de la cita
-                tiempo_actual = max(tiempo_actual, cita_fin_min)
-            
-            # Espacios libres después de la última cita
-            while tiempo_actual + duracion_minutos <= fin_minutos:
-                hora_slot = time(tiempo_actual // 60, tiempo_actual % 60)
-                hora_fin_slot = time((tiempo_actual + duracion_minutos) // 60, 
-                                   (tiempo_actual + duracion_minutos) % 60)
-                
-                slots_disponibles.append({
-                    "podologo_id": podologo_id,
-                    "podologo": podologo_nombre,
-                    "hora_inicio": hora_slot.strftime("%H:%M"),
-                    "hora_fin": hora_fin_slot.strftime("%H:%M"),
-                    "disponible": True
-                })
-                
-                tiempo_actual += 30
-        
-        return sorted(slots_disponibles, key=lambda x: (x["podologo"], x["hora_inicio"]))
-
     def create_appointment(self,
                          paciente_id: int,
                          podologo_id: int,
@@ -0,0 +1,311 @@
+"""
+Audit Partitions - Mantenimiento de particiones de auth.audit_log
+=================================================================
+
+auth.audit_log está particionada por mes (02_init_auth_db.sql). Este módulo:
+- Crea por adelantado las particiones de los próximos meses
+- Separa (DETACH) las particiones más viejas que la retención configurada,
+  las archiva como CSV comprimido (gzip) en disco y las elimina
+
+Se ejecuta al iniciar la API (AUDIT_PARTITION_MAINTENANCE_ON_STARTUP) o
+desde la terminal:
+
+    python -m backend.tools.audit_partitions            # crear + retirar
+    python -m backend.tools.audit_partitions ensure --ahead 6
+    python -m backend.tools.audit_partitions prune --retention 24
+
+Es idempotente y seguro con varios workers: un advisory lock evita que dos
+procesos hagan el mantenimiento al mismo tiempo, y una partición separada
+cuyo archivo falló se reintenta en la siguiente ejecución.
+"""
+
+import argparse
+import asyncio
+import gzip
+import logging
+import os
+import re
+import sys
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from backend.api.core.config import get_settings
+from backend.api.deps.database import async_auth_engine
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+SCHEMA = "auth"
+PARENT_TABLE = "audit_log"
+PARTITION_NAME_RE = re.compile(r"^audit_log_(\d{4})_(\d{2})$")
+
+# Llave del advisory lock (arbitraria, única para este mantenimiento)
+ADVISORY_LOCK_KEY = 0x617564_6974
+
+
+# =============================================================================
+# CÁLCULO DE MESES
+# =============================================================================
+
+def month_start(day: date) -> date:
+    """Primer día del mes de `day`."""
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    """Suma (o resta) meses a un primer-día-de-mes."""
+    index = month.year * 12 + (month.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """audit_log_YYYY_MM"""
+    return f"{PARENT_TABLE}_{month.year:04d}_{month.month:02d}"
+
+
+def parse_partition_name(name: str) -> Optional[date]:
+    """Mes de una partición a partir de su nombre, o None si no sigue la convención."""
+    match = PARTITION_NAME_RE.match(name)
+    if not match:
+        return None
+    year, month = int(match.group(1)), int(match.group(2))
+    if not 1 <= month <= 12:
+        return None
+    return date(year, month, 1)
+
+
+def months_to_create(today: date, months_ahead: int) -> List[date]:
+    """Mes actual y los `months_ahead` siguientes."""
+    current = month_start(today)
+    return [add_months(current, i) for i in range(months_ahead + 1)]
+
+
+def retention_cutoff(today: date, retention_months: int) -> date:
+    """Las particiones de meses anteriores a esta fecha se retiran."""
+    return add_months(month_start(today), -retention_months)
+
+
+# =============================================================================
+# OPERACIONES EN BD
+# =============================================================================
+
+async def _is_partitioned(conn: AsyncConnection) -> bool:
+    # En tests la tabla se crea con create_all (sin particionar)
+    return bool(await conn.scalar(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+        "WHERE p.partrelid = to_regclass(:parent))"
+    ), {"parent": f"{SCHEMA}.{PARENT_TABLE}"}))
+
+
+async def _list_partition_tables(conn: AsyncConnection) -> Dict[str, bool]:
+    """{nombre: está_adjunta} de las tablas audit_log_YYYY_MM (adjuntas o separadas)."""
+    rows = await conn.execute(text(
+        "SELECT c.relname, c.relispartition FROM pg_class c "
+        "JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE n.nspname = :schema AND c.relkind = 'r' "
+        "AND c.relname ~ '^audit_log_[0-9]{4}_[0-9]{2}$'"
+    ), {"schema": SCHEMA})
+    return {name: attached for name, attached in rows.all()}
+
+
+async def ensure_future_partitions(
+    conn: AsyncConnection,
+    today: date,
+    months_ahead: int,
+) -> List[str]:
+    """
+    Crea las particiones faltantes del mes actual a `months_ahead` meses.
+
+    Returns:
+        Nombres de las particiones creadas
+    """
+    existing = await _list_partition_tables(conn)
+    created: List[str] = []
+
+    for month in months_to_create(today, months_ahead):
+        name = partition_name(month)
+        if name in existing:
+            continue
+        try:
+            await conn.execute(text(
+                f"CREATE TABLE {SCHEMA}.{name} PARTITION OF {SCHEMA}.{PARENT_TABLE} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            ))
+            await conn.commit()
+            created.append(name)
+            logger.info(f"Partición {SCHEMA}.{name} creada")
+        except Exception as e:
+            await conn.rollback()
+            logger.error(f"No se pudo crear la partición {SCHEMA}.{name}: {e}")
+
+    return created
+
+
+async def _archive_table(conn: AsyncConnection, name: str, archive_dir: Path) -> Path:
+    """Copia la tabla completa a archive_dir/<nombre>.csv.gz con COPY."""
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    target = archive_dir / f"{name}.csv.gz"
+    partial = target.with_name(target.name + ".part")
+
+    raw = await conn.get_raw_connection()
+    driver = raw.driver_connection  # asyncpg.Connection
+    gz = await asyncio.to_thread(gzip.open, partial, "wb")
+    try:
+        async def write(chunk: bytes) -> None:
+            await asyncio.to_thread(gz.write, chunk)
+
+        await driver.copy_from_table(
+            name, schema_name=SCHEMA, output=write, format="csv", header=True
+        )
+        await asyncio.to_thread(gz.close)
+        os.replace(partial, target)
+    except BaseException:
+        gz.close()
+        partial.unlink(missing_ok=True)
+        raise
+    return target
+
+
+async def prune_old_partitions(
+    conn: AsyncConnection,
+    today: date,
+    retention_months: int,
+    archive_dir: Path,
+) -> List[str]:
+    """
+    Separa, archiva y elimina particiones fuera de la retención.
+
+    Una partición solo se elimina si su archivo se escribió completo; si
+    algo falla queda separada y se reintenta en la siguiente ejecución.
+
+    Returns:
+        Nombres de las particiones archivadas y eliminadas
+    """
+    cutoff = retention_cutoff(today, retention_months)
+    archived: List[str] = []
+
+    for name, attached in sorted((await _list_partition_tables(conn)).items()):
+        month = parse_partition_name(name)
+        if month is None or month >= cutoff:
+            continue
+        try:
+            if attached:
+                await conn.execute(text(
+                    f"ALTER TABLE {SCHEMA}.{PARENT_TABLE} DETACH PARTITION {SCHEMA}.{name}"
+                ))
+                await conn.commit()
+                logger.info(f"Partición {SCHEMA}.{name} separada")
+
+            path = await _archive_table(conn, name, archive_dir)
+            await conn.execute(text(f"DROP TABLE {SCHEMA}.{name}"))
+            await conn.commit()
+            archived.append(name)
+            logger.info(f"Partición {SCHEMA}.{name} archivada en {path} y eliminada")
+        except Exception as e:
+            await conn.rollback()
+            logger.error(f"No se pudo retirar la partición {SCHEMA}.{name}: {e}")
+
+    return archived
+
+
+async def run_partition_maintenance(
+    engine: AsyncEngine = async_auth_engine,
+    today: Optional[date] = None,
+    months_ahead: Optional[int] = None,
+    retention_months: Optional[int] = None,
+    archive_dir: Optional[str] = None,
+    ensure: bool = True,
+    prune: bool = True,
+) -> Dict[str, List[str]]:
+    """
+    Ejecuta el mantenimiento completo (parámetros por defecto de settings).
+
+    Returns:
+        {"created": [...], "archived": [...]}
+    """
+    today = today or date.today()
+    months_ahead = settings.AUDIT_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    retention_months = settings.AUDIT_RETENTION_MONTHS if retention_months is None else retention_months
+    archive_path = Path(archive_dir or settings.AUDIT_ARCHIVE_DIR)
+    result: Dict[str, List[str]] = {"created": [], "archived": []}
+
+    async with engine.connect() as conn:
+        if not await _is_partitioned(conn):
+            logger.info(f"{SCHEMA}.{PARENT_TABLE} no está particionada; nada que mantener")
+            return result
+
+        locked = await conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+        await conn.commit()
+        if not locked:
+            logger.info("Otro proceso está haciendo el mantenimiento de particiones")
+            return result
+
+        try:
+            if ensure:
+                result["created"] = await ensure_future_partitions(conn, today, months_ahead)
+            if prune:
+                result["archived"] = await prune_old_partitions(conn, today, retention_months, archive_path)
+        finally:
+            await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+            await conn.commit()
+
+    return result
+
+
+async def maintain_on_startup() -> None:
+    """Versión para el lifespan de la API: nunca propaga errores."""
+    try:
+        await run_partition_maintenance()
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"Mantenimiento de particiones de auditoría falló: {e}")
+
+
+# =============================================================================
+# ENTRY POINT
+# =============================================================================
+
+def main() -> int:
+    """Punto de entrada de la terminal."""
+    parser = argparse.ArgumentParser(description="Mantenimiento de particiones de auth.audit_log")
+    parser.add_argument(
+        "command", nargs="?", choices=["all", "ensure", "prune"], default="all",
+        help="ensure: crear meses futuros; prune: retirar meses viejos; all: ambos",
+    )
+    parser.add_argument("--ahead", type=int, help="Meses futuros a crear")
+    parser.add_argument("--retention", type=int, help="Meses a conservar en la BD")
+    parser.add_argument("--archive-dir", help="Directorio para los CSV comprimidos")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    async def run() -> Dict[str, List[str]]:
+        try:
+            return await run_partition_maintenance(
+                months_ahead=args.ahead,
+                retention_months=args.retention,
+                archive_dir=args.archive_dir,
+                ensure=args.command in ("all", "ensure"),
+                prune=args.command in ("all", "prune"),
+            )
+        finally:
+            await async_auth_engine.dispose()
+
+    try:
+        result = asyncio.run(run())
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        return 1
+
+    print(f"Creadas: {', '.join(result['created']) or '-'}")
+    print(f"Archivadas: {', '.join(result['archived']) or '-'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,14 +12,17 @@ Usa la extensión pg_trgm de PostgreSQL para similitud de trigramas.
 """
 
 import logging
-from typing import List, Dict, Any
+import re
+import unicodedata
+from typing import ContextManager, List, Dict, Any, Optional
 
-from sqlalchemy import text
+from sqlalchemy import func, literal_column, or_, select, text, Select
 from sqlalchemy.orm import Session
 
 from backend.api.core.config import get_settings
-from backend.api.deps.database import get_core_db, get_ops_db
+from backend.api.deps.database import agent_session
 from backend.agents.state import FuzzyMatch, DatabaseTarget
+from backend.schemas.core.models import Paciente
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -78,14 +81,11 @@ FUZZY_SEARCHABLE_FIELDS: Dict[str, Dict[str, Any]] = {
 # FUNCIONES DE BÚSQUEDA DIFUSA
 # =============================================================================
 
-def _get_session(db_target: DatabaseTarget) -> Session:
-    """Obtiene sesión de BD según el target."""
-    if db_target == DatabaseTarget.CORE:
-        return next(get_core_db())
-    elif db_target == DatabaseTarget.OPS:
-        return next(get_ops_db())
-    else:
-        return next(get_core_db())
+def _get_session(db_target: DatabaseTarget) -> ContextManager[Session]:
+    """Sesión del pool de solo lectura del agente según el target (usar con `with`)."""
+    if db_target == DatabaseTarget.OPS:
+        return agent_session(DatabaseTarget.OPS.value)
+    return agent_session(DatabaseTarget.CORE.value)
 
 
 def fuzzy_search_field(
@@ -135,33 +135,116 @@ def fuzzy_search_field(
     LIMIT :limit
     """
     
-    db = None
     try:
-        db = _get_session(db_target)
-        result = db.execute(
-            text(sql),
-            {"term": search_term, "threshold": effective_threshold, "limit": limit}
-        )
+        with _get_session(db_target) as db:
+            result = db.execute(
+                text(sql),
+                {"term": search_term, "threshold": effective_threshold, "limit": limit}
+            )
         
-        matches: List[FuzzyMatch] = []
-        for row in result.fetchall():
-            matches.append(FuzzyMatch(
-                original_term=search_term,
-                matched_term=row.matched_value,
-                similarity=float(row.sim_score),
-                table=table,
-                column=field,
-            ))
+            matches: List[FuzzyMatch] = []
+            for row in result.fetchall():
+                matches.append(FuzzyMatch(
+                    original_term=search_term,
+                    matched_term=row.matched_value,
+                    similarity=float(row.sim_score),
+                    table=table,
+                    column=field,
+                ))
         
-        logger.info(f"Búsqueda difusa '{search_term}' en {table}.{field}: {len(matches)} coincidencias")
-        return matches
+            logger.info(f"Búsqueda difusa '{search_term}' en {table}.{field}: {len(matches)} coincidencias")
+            return matches
         
     except Exception as e:
         logger.error(f"Error en búsqueda difusa: {str(e)}")
         return []
-    finally:
-        if db:
-            db.close()
+
+
+# =============================================================================
+# BÚSQUEDA DE PACIENTES (compartida con GET /pacientes/buscar)
+# =============================================================================
+# Las expresiones deben coincidir EXACTAMENTE con los índices GIN de
+# data/sql/09_patient_search_trgm.sql; por eso los literales van como
+# literal_column y no como parámetros.
+
+# Mínimo de dígitos en el término para buscar también por teléfono
+PHONE_MIN_DIGITS = 3
+
+
+def normalize_search_term(term: str) -> str:
+    """Minúsculas y sin acentos (equivale a f_unaccent(lower(...)))."""
+    decomposed = unicodedata.normalize("NFKD", term.strip().lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def patient_name_expr():
+    """f_unaccent(lower(nombres || ' ' || apellidos))"""
+    full_name = Paciente.nombres.op("||")(literal_column("' '")).op("||")(Paciente.apellidos)
+    return func.clinic.f_unaccent(func.lower(full_name))
+
+
+def patient_phone_digits_expr():
+    """regexp_replace(telefono, '\\D', '', 'g')"""
+    return func.regexp_replace(
+        Paciente.telefono,
+        literal_column(r"'\D'"),
+        literal_column("''"),
+        literal_column("'g'"),
+    )
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def build_patient_search_query(
+    search_term: str,
+    limit: int,
+    threshold: Optional[float] = None,
+    clinica_id: Optional[int] = None,
+) -> Select:
+    """
+    Construye la consulta de pacientes ordenada por similitud de trigramas.
+
+    Coincide si el nombre completo es similar al término (operador %), si lo
+    contiene, o si el teléfono (solo dígitos) contiene los dígitos del término.
+
+    Args:
+        search_term: Texto a buscar (nombre, apellido o teléfono)
+        limit: Máximo de resultados
+        threshold: Similitud mínima; None para no filtrar por puntaje
+        clinica_id: Restringe a una clínica
+
+    Returns:
+        SELECT de (Paciente, similitud) ordenado de mayor a menor similitud
+    """
+    term = normalize_search_term(search_term)
+    name = patient_name_expr()
+    score = func.similarity(name, term)
+    conditions = [
+        name.op("%")(term),
+        name.like(f"%{_escape_like(term)}%", escape="\\"),
+    ]
+
+    digits = re.sub(r"\D", "", search_term)
+    if len(digits) >= PHONE_MIN_DIGITS:
+        phone = patient_phone_digits_expr()
+        conditions.append(phone.like(f"%{digits}%"))
+        score = func.greatest(score, func.similarity(phone, digits))
+
+    score = score.label("similitud")
+    query = select(Paciente, score).where(
+        Paciente.deleted_at.is_(None),
+        or_(*conditions),
+    )
+    if threshold is not None:
+        query = query.where(score >= threshold)
+    if clinica_id:
+        query = query.where(Paciente.id_clinica == clinica_id)
+
+    return query.order_by(
+        score.desc(), Paciente.apellidos, Paciente.nombres, Paciente.id_paciente
+    ).limit(limit)
 
 
 def fuzzy_search_patient(
@@ -172,7 +255,8 @@ def fuzzy_search_patient(
     """
     Busca pacientes por nombre completo usando búsqueda difusa.
     
-    Busca en nombres y apellidos concatenados.
+    Busca en nombres y apellidos concatenados (sin acentos) y en el
+    teléfono normalizado. Ver build_patient_search_query.
     
     Args:
         search_term: Nombre a buscar (parcial o completo)
@@ -183,52 +267,30 @@ def fuzzy_search_patient(
         Lista de pacientes con su similitud
     """
     effective_threshold = threshold if threshold > 0 else settings.AGENT_FUZZY_THRESHOLD
+    query = build_patient_search_query(search_term, limit, threshold=effective_threshold)
     
-    sql = """
-    SELECT 
-        id_paciente,
-        nombres,
-        apellidos,
-        telefono,
-        fecha_nacimiento,
-        similarity(nombres || ' ' || apellidos, :term) as sim_score
-    FROM clinic.pacientes
-    WHERE activo = true
-      AND (nombres || ' ' || apellidos) % :term
-      AND similarity(nombres || ' ' || apellidos, :term) >= :threshold
-    ORDER BY sim_score DESC
-    LIMIT :limit
-    """
-    
-    db = None
     try:
-        db = _get_session(DatabaseTarget.CORE)
-        result = db.execute(
-            text(sql),
-            {"term": search_term, "threshold": effective_threshold, "limit": limit}
-        )
+        with _get_session(DatabaseTarget.CORE) as db:
+            result = db.execute(query)
         
-        patients: List[Dict[str, Any]] = []
-        for row in result.fetchall():
-            patients.append({
-                "id_paciente": row.id_paciente,
-                "nombre_completo": f"{row.nombres} {row.apellidos}",
-                "nombres": row.nombres,
-                "apellidos": row.apellidos,
-                "telefono": row.telefono,
-                "fecha_nacimiento": str(row.fecha_nacimiento) if row.fecha_nacimiento else None,
-                "similitud": round(float(row.sim_score), 3),
-            })
+            patients: List[Dict[str, Any]] = []
+            for paciente, sim_score in result.all():
+                patients.append({
+                    "id_paciente": paciente.id_paciente,
+                    "nombre_completo": f"{paciente.nombres} {paciente.apellidos}",
+                    "nombres": paciente.nombres,
+                    "apellidos": paciente.apellidos,
+                    "telefono": paciente.telefono,
+                    "fecha_nacimiento": str(paciente.fecha_nacimiento) if paciente.fecha_nacimiento else None,
+                    "similitud": round(float(sim_score), 3),
+                })
         
-        logger.info(f"Búsqueda de paciente '{search_term}': {len(patients)} coincidencias")
-        return patients
+            logger.info(f"Búsqueda de paciente '{search_term}': {len(patients)} coincidencias")
+            return patients
         
     except Exception as e:
         logger.error(f"Error buscando paciente: {str(e)}")
         return []
-    finally:
-        if db:
-            db.close()
 
 
 def fuzzy_search_podologo(
@@ -264,31 +326,27 @@ def fuzzy_search_podologo(
     LIMIT :limit
     """
     
-    db = None
     try:
-        db = _get_session(DatabaseTarget.OPS)
-        result = db.execute(
-            text(sql),
-            {"term": search_term, "threshold": effective_threshold, "limit": limit}
-        )
+        with _get_session(DatabaseTarget.OPS) as db:
+            result = db.execute(
+                text(sql),
+                {"term": search_term, "threshold": effective_threshold, "limit": limit}
+            )
         
-        podologos: List[Dict[str, Any]] = []
-        for row in result.fetchall():
-            podologos.append({
-                "id_podologo": row.id_podologo,
-                "nombre_completo": f"{row.nombres} {row.apellidos}",
-                "especialidad": row.especialidad,
-                "similitud": round(float(row.sim_score), 3),
-            })
+            podologos: List[Dict[str, Any]] = []
+            for row in result.fetchall():
+                podologos.append({
+                    "id_podologo": row.id_podologo,
+                    "nombre_completo": f"{row.nombres} {row.apellidos}",
+                    "especialidad": row.especialidad,
+                    "similitud": round(float(row.sim_score), 3),
+                })
         
-        return podologos
+            return podologos
         
     except Exception as e:
         logger.error(f"Error buscando podólogo: {str(e)}")
         return []
-    finally:
-        if db:
-            db.close()
 
 
 def get_suggestions_for_term(
@@ -349,21 +407,17 @@ def verify_pg_trgm_extension() -> bool:
     ) as has_trgm
     """
     
-    db = None
     try:
-        db = _get_session(DatabaseTarget.CORE)
-        result = db.execute(text(sql))
-        row = result.fetchone()
-        has_trgm = row.has_trgm if row else False
+        with _get_session(DatabaseTarget.CORE) as db:
+            result = db.execute(text(sql))
+            row = result.fetchone()
+            has_trgm = row.has_trgm if row else False
         
-        if not has_trgm:
-            logger.warning("Extensión pg_trgm no está instalada. La búsqueda difusa no funcionará.")
+            if not has_trgm:
+                logger.warning("Extensión pg_trgm no está instalada. La búsqueda difusa no funcionará.")
         
-        return has_trgm
+            return has_trgm
         
     except Exception as e:
         logger.error(f"Error verificando pg_trgm: {str(e)}")
         return False
-    finally:
-        if db:
-            db.close()
@@ -15,7 +15,7 @@ import numpy as np
 from sqlalchemy import text, func
 from sqlalchemy.orm import Session
 
-from backend.api.deps.database import get_core_db, get_ops_db
+from backend.api.deps.database import get_core_db_sync, get_ops_db_sync
 
 logger = logging.getLogger(__name__)
 
@@ -27,8 +27,8 @@ class MathematicalAnalyzer:
     """
     
     def __init__(self):
-        self.core_db_gen = get_core_db()
-        self.ops_db_gen = get_ops_db()
+        self.core_db_gen = get_core_db_sync()
+        self.ops_db_gen = get_ops_db_sync()
     
     def _get_core_session(self) -> Session:
         """Obtiene una sesión de la BD core."""
@@ -0,0 +1,234 @@
+"""
+Query Cost - Guarda de costo del SQL generado por el LLM
+========================================================
+
+Antes de ejecutar una consulta del LLM se pide su plan al optimizador
+(EXPLAIN (FORMAT JSON, VERBOSE), sin ejecutarla) y se compara contra el
+presupuesto del rol:
+- Costo estimado total (unidades del planner)
+- Filas estimadas que se leen en el paso más grande del plan
+
+Una consulta que excede el presupuesto no llega a ejecutarse: el nodo
+execute_sql la devuelve a generate_sql con la queja del planner (p. ej.
+"escaneo secuencial sobre clinic.evoluciones_clinicas") para que el LLM
+la acote. Así una consulta cara se detiene antes de ocupar la BD, no
+cuando ya saltó el statement_timeout.
+
+El plan se cachea por SQL normalizado y BD (sin los valores de los
+parámetros): el mismo SQL (caché de consultas, reintentos) no vuelve a
+pedir EXPLAIN.
+
+Configuración: AGENT_COST_GUARD_ENABLED, AGENT_PLAN_CACHE_*
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from backend.api.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+# =============================================================================
+# PRESUPUESTOS POR ROL
+# =============================================================================
+
+@dataclass(frozen=True)
+class CostBudget:
+    """Máximos que el plan estimado de una consulta puede alcanzar."""
+    max_cost: float    # Costo total estimado (unidades del planner)
+    max_rows: int      # Filas estimadas en el paso más grande del plan
+
+
+ROLE_COST_BUDGETS: Dict[str, CostBudget] = {
+    "Admin": CostBudget(max_cost=200_000, max_rows=1_000_000),
+    "Podologo": CostBudget(max_cost=50_000, max_rows=250_000),
+    "Recepcion": CostBudget(max_cost=20_000, max_rows=100_000),
+}
+
+# Rol desconocido: el presupuesto más estricto
+DEFAULT_COST_BUDGET = ROLE_COST_BUDGETS["Recepcion"]
+
+
+# =============================================================================
+# LECTURA DEL PLAN
+# =============================================================================
+
+@dataclass(frozen=True)
+class QueryPlan:
+    """Resumen del plan estimado de una consulta."""
+    total_cost: float
+    max_rows: int                              # Filas del paso más grande
+    seq_scans: Tuple[Tuple[str, int], ...] = ()  # ("esquema.tabla", filas), de mayor a menor
+
+
+def _child_fraction(node: Dict[str, Any], child: Dict[str, Any], fraction: float) -> float:
+    """Fracción del hijo que se ejecuta, según los costos del planner."""
+    startup, total = child.get("Startup Cost", 0.0), child.get("Total Cost", 0.0)
+    # Un Sort o un Aggregate consume a su hijo completo antes de dar la primera fila
+    if node.get("Startup Cost", 0.0) >= total:
+        return 1.0
+    # Limit: el planner prorratea el costo del hijo entre sus filas
+    if node.get("Node Type") == "Limit" and total > startup:
+        return fraction * min(1.0, max(0.0, (node.get("Total Cost", 0.0) - startup) / (total - startup)))
+    return fraction
+
+
+def parse_plan(explain_output: Any) -> QueryPlan:
+    """
+    Resume la salida de EXPLAIN (FORMAT JSON).
+
+    Dentro de un Limit solo cuenta la fracción del hijo que el planner
+    espera ejecutar: `SELECT * FROM t LIMIT 100` no lee toda la tabla,
+    pero un ORDER BY o un COUNT(*) debajo del Limit sí.
+
+    Args:
+        explain_output: Lista JSON (o su texto) devuelta por EXPLAIN
+
+    Returns:
+        QueryPlan
+    """
+    if isinstance(explain_output, str):
+        explain_output = json.loads(explain_output)
+    root = explain_output[0]["Plan"]
+
+    max_rows = 0.0
+    seq_scans: Dict[str, float] = {}
+    pending: List[Tuple[Dict[str, Any], float]] = [(root, 1.0)]
+    while pending:
+        node, fraction = pending.pop()
+        rows = node.get("Plan Rows", 0) * fraction
+        max_rows = max(max_rows, rows)
+
+        if node.get("Node Type") == "Seq Scan":
+            relation = node.get("Relation Name", "?")
+            if node.get("Schema"):
+                relation = f"{node['Schema']}.{relation}"
+            seq_scans[relation] = max(seq_scans.get(relation, 0.0), rows)
+
+        for child in node.get("Plans", []):
+            pending.append((child, _child_fraction(node, child, fraction)))
+
+    return QueryPlan(
+        total_cost=float(root.get("Total Cost", 0)),
+        max_rows=int(max_rows),
+        seq_scans=tuple(
+            (relation, int(rows))
+            for relation, rows in sorted(seq_scans.items(), key=lambda item: -item[1])
+        ),
+    )
+
+
+def check_cost(plan: QueryPlan, user_role: str) -> Optional[str]:
+    """
+    Compara el plan con el presupuesto del rol.
+
+    Returns:
+        None si cabe en el presupuesto; si no, la queja del planner
+        (pensada para el LLM en el reintento, no para el usuario)
+    """
+    budget = ROLE_COST_BUDGETS.get(user_role, DEFAULT_COST_BUDGET)
+    if plan.total_cost <= budget.max_cost and plan.max_rows <= budget.max_rows:
+        return None
+
+    message = (
+        f"El plan estimado excede el presupuesto del rol {user_role}: "
+        f"costo {plan.total_cost:.0f} (máximo {budget.max_cost:.0f}), "
+        f"filas {plan.max_rows} (máximo {budget.max_rows})."
+    )
+    if plan.seq_scans:
+        scans = ", ".join(f"{relation} (~{rows} filas)" for relation, rows in plan.seq_scans[:3])
+        message += f" Escaneo secuencial sobre {scans}."
+    return message + " Filtra por columnas indexadas (ids, fechas) y evita recorrer tablas completas."
+
+
+# =============================================================================
+# CACHÉ DE PLANES
+# =============================================================================
+
+class PlanCache:
+    """
+    Caché LRU con TTL de planes por (BD, SQL normalizado).
+
+    Se usa desde los hilos de ejecución del agente (asyncio.to_thread),
+    por eso va protegida con un lock.
+
+    Args:
+        ttl_seconds: Vida de cada plan (las estadísticas de la BD cambian)
+        maxsize: Máximo de planes (se desaloja el menos usado)
+    """
+
+    def __init__(self, ttl_seconds: float, maxsize: int):
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, QueryPlan]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, database: str, sql: str) -> Optional[QueryPlan]:
+        key = (database, sql)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, database: str, sql: str, plan: QueryPlan) -> None:
+        with self._lock:
+            self._entries[(database, sql)] = (time.monotonic() + self.ttl_seconds, plan)
+            self._entries.move_to_end((database, sql))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Métricas para /chat/health."""
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Instancia global (por proceso)
+plan_cache = PlanCache(
+    ttl_seconds=settings.AGENT_PLAN_CACHE_TTL_SECONDS,
+    maxsize=settings.AGENT_PLAN_CACHE_MAXSIZE,
+)
+
+
+def get_query_plan(db: Session, database: str, sql: str, params: Dict[str, Any]) -> QueryPlan:
+    """
+    Plan estimado de una consulta (cacheado por BD y SQL normalizado).
+
+    Args:
+        db: Sesión donde se ejecutaría la consulta
+        database: BD de la sesión ("auth", "core", "ops")
+        sql: SQL ya normalizado y con su tope de filas
+        params: Parámetros de la consulta
+
+    Returns:
+        QueryPlan
+    """
+    plan = plan_cache.get(database, sql)
+    if plan is None:
+        output = db.execute(text(f"EXPLAIN (FORMAT JSON, VERBOSE) {sql}"), params).scalar()
+        plan = parse_plan(output)
+        plan_cache.put(database, sql, plan)
+    return plan
@@ -0,0 +1,287 @@
+"""
+Plantillas de Consultas Frecuentes
+==================================
+
+SQL revisado y parametrizado para las preguntas más comunes (agenda del día,
+citas de un paciente, tratamientos activos, conteos por estado). Un matcher
+determinístico reconoce la frase completa y llena los parámetros con las
+fechas y nombres extraídos: la consulta va directo a execute_safe_query sin
+pasar por el LLM.
+
+Solo se reconocen frases completas y claras; cualquier otra cosa (o una
+fecha inválida) sigue el camino normal con el LLM.
+
+Las citas viven en ops y los pacientes en core, así que "citas de <nombre>"
+no tiene plantilla (requeriría un JOIN entre bases); "citas del paciente
+<id>" sí.
+"""
+
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Pattern, Tuple
+
+from backend.agents.state import DatabaseTarget, IntentType, SQLQuery
+
+
+# =============================================================================
+# EXTRACCIÓN DE VALORES
+# =============================================================================
+
+# Fechas relativas ("hoy", "mañana") o explícitas (2026-10-20, 20/10, 20/10/2026)
+_FECHA = r"(?P<fecha>hoy|pasado ma[ñn]ana|ma[ñn]ana|ayer|\d{4}-\d{1,2}-\d{1,2}|\d{1,2}/\d{1,2}(?:/\d{4})?)"
+
+# Verbos y artículos con que suele empezar la pregunta
+_PREFIJO = (
+    r"(?:(?:mu[eé]strame|muestra|dame|ver|mostrar|listar?|busca|buscar|cu[aá]les son|qu[eé]) )?"
+    r"(?:las |los |la |el )?"
+)
+
+_RELATIVE_DAYS = {"hoy": 0, "mañana": 1, "manana": 1, "ayer": -1, "pasado mañana": 2, "pasado manana": 2}
+
+
+def normalize_text(text: str) -> str:
+    """'¿Qué citas hay HOY?' → 'qué citas hay hoy' (conserva acentos para los nombres)."""
+    text = unicodedata.normalize("NFC", text).lower()
+    text = re.sub(r"[¿?¡!.,;:]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def parse_fecha(value: str, today: date) -> Optional[date]:
+    """Convierte la fecha capturada a date (None si no es válida)."""
+    if value in _RELATIVE_DAYS:
+        return today + timedelta(days=_RELATIVE_DAYS[value])
+    try:
+        if "-" in value:
+            year, month, day = (int(p) for p in value.split("-"))
+            return date(year, month, day)
+        parts = [int(p) for p in value.split("/")]
+        day, month = parts[0], parts[1]
+        return date(parts[2] if len(parts) == 3 else today.year, month, day)
+    except ValueError:
+        return None
+
+
+def like_pattern(value: str) -> str:
+    """'juan pérez' → '%juan pérez%' escapando los comodines de LIKE."""
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped.strip()}%"
+
+
+# =============================================================================
+# PLANTILLAS
+# =============================================================================
+
+Filler = Callable[[re.Match, date], Optional[Dict[str, Any]]]
+
+
+def _sin_params(match: re.Match, today: date) -> Optional[Dict[str, Any]]:
+    return {}
+
+
+def _con_fecha(match: re.Match, today: date) -> Optional[Dict[str, Any]]:
+    fecha = parse_fecha(match.group("fecha"), today)
+    return {"fecha": fecha} if fecha else None
+
+
+def _con_paciente_id(match: re.Match, today: date) -> Optional[Dict[str, Any]]:
+    return {"paciente_id": int(match.group("paciente_id"))}
+
+
+# Palabras con las que no empieza un nombre: "de la paciente ...", "de esta semana", "del mes"
+_NO_NOMBRE = {
+    "el", "la", "los", "las", "un", "una", "este", "esta", "estos", "estas", "ese", "esa",
+    "paciente", "hoy", "mañana", "manana", "ayer", "dia", "día", "semana", "mes", "año", "ano",
+    "trimestre", "semestre",
+}
+
+
+def _con_nombre(match: re.Match, today: date) -> Optional[Dict[str, Any]]:
+    nombre = match.group("nombre").strip()
+    if nombre.split(" ", 1)[0] in _NO_NOMBRE:
+        return None
+    return {"nombre": like_pattern(nombre)}
+
+
+@dataclass(frozen=True)
+class QueryTemplate:
+    """Una consulta frecuente: frases que la disparan y SQL que la responde."""
+    name: str
+    intent: IntentType
+    sql: str
+    target_db: DatabaseTarget
+    tables: Tuple[str, ...]
+    entities: Tuple[str, ...]
+    patterns: Tuple[Pattern, ...]
+    fill: Filler = _sin_params
+
+
+@dataclass
+class TemplateMatch:
+    """Plantilla reconocida con sus parámetros ya llenos."""
+    template: QueryTemplate
+    sql_query: SQLQuery
+    values: Dict[str, Any] = field(default_factory=dict)
+
+
+def _patterns(*regexes: str) -> Tuple[Pattern, ...]:
+    return tuple(re.compile(rf"^{r}$") for r in regexes)
+
+
+# El orden importa: las más específicas primero
+QUERY_TEMPLATES: List[QueryTemplate] = [
+    QueryTemplate(
+        name="agenda_dia",
+        intent=IntentType.QUERY_READ,
+        sql=(
+            "SELECT id_cita, paciente_id, podologo_id, fecha_cita, hora_inicio, hora_fin, status "
+            "FROM ops.citas WHERE fecha_cita = :fecha AND deleted_at IS NULL "
+            "ORDER BY hora_inicio LIMIT 100"
+        ),
+        target_db=DatabaseTarget.OPS,
+        tables=("ops.citas",),
+        entities=("cita",),
+        patterns=_patterns(
+            rf"{_PREFIJO}(?:citas|agenda)(?: que)?(?: hay| tengo| tenemos)?(?: para| de| del)?(?: el| la)? {_FECHA}",
+        ),
+        fill=_con_fecha,
+    ),
+    QueryTemplate(
+        name="citas_paciente",
+        intent=IntentType.QUERY_READ,
+        sql=(
+            "SELECT id_cita, podologo_id, fecha_cita, hora_inicio, hora_fin, status "
+            "FROM ops.citas WHERE paciente_id = :paciente_id AND deleted_at IS NULL "
+            "ORDER BY fecha_cita DESC, hora_inicio DESC LIMIT 100"
+        ),
+        target_db=DatabaseTarget.OPS,
+        tables=("ops.citas",),
+        entities=("cita",),
+        patterns=_patterns(
+            rf"{_PREFIJO}citas (?:del|de la) paciente (?:#|id |n[uú]mero )?(?P<paciente_id>\d+)",
+        ),
+        fill=_con_paciente_id,
+    ),
+    QueryTemplate(
+        name="conteo_citas_estado_dia",
+        intent=IntentType.QUERY_AGGREGATE,
+        sql=(
+            "SELECT status, COUNT(*) AS total FROM ops.citas "
+            "WHERE fecha_cita = :fecha AND deleted_at IS NULL "
+            "GROUP BY status ORDER BY total DESC"
+        ),
+        target_db=DatabaseTarget.OPS,
+        tables=("ops.citas",),
+        entities=("cita",),
+        patterns=_patterns(
+            rf"(?:cu[aá]ntas|total de|n[uú]mero de) citas(?: hay| tenemos| tengo)?(?: para| de| del)?(?: el)? {_FECHA}",
+            rf"citas (?:hay )?por (?:estado|status)(?: para| de| del)?(?: el)? {_FECHA}",
+        ),
+        fill=_con_fecha,
+    ),
+    QueryTemplate(
+        name="conteo_citas_estado",
+        intent=IntentType.QUERY_AGGREGATE,
+        sql=(
+            "SELECT status, COUNT(*) AS total FROM ops.citas "
+            "WHERE deleted_at IS NULL GROUP BY status ORDER BY total DESC"
+        ),
+        target_db=DatabaseTarget.OPS,
+        tables=("ops.citas",),
+        entities=("cita",),
+        patterns=_patterns(
+            r"(?:(?:cu[aá]ntas|total de|n[uú]mero de) )?citas (?:hay )?por (?:estado|status)",
+        ),
+    ),
+    QueryTemplate(
+        name="tratamientos_activos_paciente",
+        intent=IntentType.QUERY_READ,
+        sql=(
+            "SELECT t.id_tratamiento, t.paciente_id, p.nombres, p.apellidos, "
+            "t.motivo_consulta_principal, t.diagnostico_inicial, t.fecha_inicio "
+            "FROM clinic.tratamientos t JOIN clinic.pacientes p ON p.id_paciente = t.paciente_id "
+            "WHERE t.estado_tratamiento = 'En Curso' AND t.deleted_at IS NULL AND p.deleted_at IS NULL "
+            "AND (p.nombres || ' ' || p.apellidos) ILIKE :nombre "
+            "ORDER BY t.fecha_inicio DESC LIMIT 100"
+        ),
+        target_db=DatabaseTarget.CORE,
+        tables=("clinic.tratamientos", "clinic.pacientes"),
+        entities=("tratamiento", "paciente"),
+        patterns=_patterns(
+            rf"{_PREFIJO}tratamientos (?:activos|en curso|vigentes) (?:de la|del|de)(?: paciente)? (?P<nombre>[a-zà-ÿ' ]{{2,60}})",
+        ),
+        fill=_con_nombre,
+    ),
+    QueryTemplate(
+        name="tratamientos_activos",
+        intent=IntentType.QUERY_READ,
+        sql=(
+            "SELECT t.id_tratamiento, t.paciente_id, p.nombres, p.apellidos, "
+            "t.motivo_consulta_principal, t.fecha_inicio "
+            "FROM clinic.tratamientos t JOIN clinic.pacientes p ON p.id_paciente = t.paciente_id "
+            "WHERE t.estado_tratamiento = 'En Curso' AND t.deleted_at IS NULL AND p.deleted_at IS NULL "
+            "ORDER BY t.fecha_inicio DESC LIMIT 100"
+        ),
+        target_db=DatabaseTarget.CORE,
+        tables=("clinic.tratamientos", "clinic.pacientes"),
+        entities=("tratamiento", "paciente"),
+        patterns=_patterns(
+            rf"{_PREFIJO}tratamientos (?:activos|en curso|vigentes)",
+        ),
+    ),
+    QueryTemplate(
+        name="conteo_tratamientos_estado",
+        intent=IntentType.QUERY_AGGREGATE,
+        sql=(
+            "SELECT estado_tratamiento, COUNT(*) AS total FROM clinic.tratamientos "
+            "WHERE deleted_at IS NULL GROUP BY estado_tratamiento ORDER BY total DESC"
+        ),
+        target_db=DatabaseTarget.CORE,
+        tables=("clinic.tratamientos",),
+        entities=("tratamiento",),
+        patterns=_patterns(
+            r"(?:(?:cu[aá]ntos|total de|n[uú]mero de) )?tratamientos (?:hay )?por estado",
+        ),
+    ),
+]
+
+
+# =============================================================================
+# MATCHER
+# =============================================================================
+
+def match_template(query: str, today: Optional[date] = None) -> Optional[TemplateMatch]:
+    """
+    Busca una plantilla para la pregunta.
+
+    Args:
+        query: Pregunta del usuario
+        today: Fecha de referencia para "hoy"/"mañana" (default: hoy)
+
+    Returns:
+        TemplateMatch con el SQLQuery listo para ejecutar, o None
+    """
+    text = normalize_text(query)
+    today = today or date.today()
+
+    for template in QUERY_TEMPLATES:
+        for pattern in template.patterns:
+            match = pattern.match(text)
+            if match is None:
+                continue
+            params = template.fill(match, today)
+            if params is None:
+                # Frase reconocida pero valor inválido (p. ej. 31/02): que decida el LLM
+                return None
+            return TemplateMatch(
+                template=template,
+                sql_query=SQLQuery(
+                    query=template.sql,
+                    params=params,
+                    target_db=template.target_db,
+                    tables_involved=list(template.tables),
+                ),
+                values={k: v.isoformat() if isinstance(v, date) else v for k, v in params.items()},
+            )
+    return None
@@ -11,12 +11,12 @@ Esta información se usa para generar queries SQL correctas.
 """
 
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, FrozenSet, Iterable, List, Optional
 from functools import lru_cache
 
 from sqlalchemy import text
 
-from backend.api.deps.database import get_auth_db, get_core_db, get_ops_db
+from backend.api.deps.database import agent_session
 
 logger = logging.getLogger(__name__)
 
@@ -219,64 +219,123 @@ ENTITY_TO_TABLE = {
 # FUNCIONES DE CONSULTA DE ESQUEMA
 # =============================================================================
 
-def get_schema_context_for_prompt() -> str:
-    """
-    Genera un contexto de esquema formateado para el prompt del LLM.
-    
-    Returns:
-        String con descripción de tablas para incluir en el prompt
-    """
+_SCHEMA_PROMPT_HEADER = [
+    "## Esquema de Base de Datos\n",
+    "### IMPORTANTE: Soft Delete",
+    "La mayoría de tablas usan `deleted_at IS NULL` para filtrar registros activos.",
+    "NO uses `WHERE activo = true` en pacientes o tratamientos.",
+    "Usa: `WHERE deleted_at IS NULL` para obtener solo registros activos.\n",
+]
+
+_DATABASE_HEADERS = {
+    "auth": "\n### Base de Datos: Autenticación (auth)",
+    "clinic": "\n### Base de Datos: Clínica (core)",
+    "ops": "\n### Base de Datos: Operaciones (ops)",
+    "finance": "\n### Base de Datos: Finanzas (en ops)",
+}
+
+
+def _render_table(table_name: str, info: Dict[str, Any]) -> List[str]:
+    """Líneas del prompt para una tabla."""
     lines = [
-        "## Esquema de Base de Datos\n",
-        "### IMPORTANTE: Soft Delete",
-        "La mayoría de tablas usan `deleted_at IS NULL` para filtrar registros activos.",
-        "NO uses `WHERE activo = true` en pacientes o tratamientos.",
-        "Usa: `WHERE deleted_at IS NULL` para obtener solo registros activos.\n",
+        f"\n**{table_name}**: {info['description']}",
+        f"  - Columnas: {', '.join(info['main_columns'])}",
     ]
     
+    if info.get("searchable_columns"):
+        lines.append(f"  - Búsqueda por: {', '.join(info['searchable_columns'])}")
+    
+    if info.get("soft_delete"):
+        lines.append(f"  - Soft delete: usa `{info['soft_delete']} IS NULL` para activos")
+    
+    if info.get("valid_states"):
+        lines.append(f"  - Estados válidos: {', '.join(info['valid_states'])}")
+        
+    if info.get("valid_status"):
+        lines.append(f"  - Status válidos: {', '.join(info['valid_status'])}")
+    
+    if info.get("common_filters"):
+        lines.append(f"  - Filtros comunes: {', '.join(info['common_filters'])}")
+    
+    if info.get("sensitive"):
+        lines.append("  - ⚠️ Tabla sensible (requiere permisos especiales)")
+    
+    return lines
+
+
+@lru_cache(maxsize=128)
+def _render_schema_context(tables: Optional[FrozenSet[str]]) -> str:
+    """Arma el prompt de esquema (todas las tablas si tables es None)."""
+    lines = list(_SCHEMA_PROMPT_HEADER)
+    
+    # Siempre en el orden de SCHEMA_DESCRIPTIONS: el mismo subconjunto
+    # produce el mismo texto (necesario para el prompt caching del LLM)
     current_db = None
     for table_name, info in SCHEMA_DESCRIPTIONS.items():
-        schema = table_name.split(".")[0]
+        if tables is not None and table_name not in tables:
+            continue
         
         # Header por base de datos
-        if schema == "auth" and current_db != "auth":
-            lines.append("\n### Base de Datos: Autenticación (auth)")
-            current_db = "auth"
-        elif schema == "clinic" and current_db != "clinic":
-            lines.append("\n### Base de Datos: Clínica (core)")
-            current_db = "clinic"
-        elif schema == "ops" and current_db != "ops":
-            lines.append("\n### Base de Datos: Operaciones (ops)")
-            current_db = "ops"
-        elif schema == "finance" and current_db != "finance":
-            lines.append("\n### Base de Datos: Finanzas (en ops)")
-            current_db = "finance"
-        
-        # Info de tabla
-        lines.append(f"\n**{table_name}**: {info['description']}")
-        lines.append(f"  - Columnas: {', '.join(info['main_columns'])}")
-        
-        if info.get("searchable_columns"):
-            lines.append(f"  - Búsqueda por: {', '.join(info['searchable_columns'])}")
-        
-        if info.get("soft_delete"):
-            lines.append(f"  - Soft delete: usa `{info['soft_delete']} IS NULL` para activos")
-        
-        if info.get("valid_states"):
-            lines.append(f"  - Estados válidos: {', '.join(info['valid_states'])}")
-            
-        if info.get("valid_status"):
-            lines.append(f"  - Status válidos: {', '.join(info['valid_status'])}")
-        
-        if info.get("common_filters"):
-            lines.append(f"  - Filtros comunes: {', '.join(info['common_filters'])}")
+        schema = table_name.split(".")[0]
+        if schema != current_db:
+            lines.append(_DATABASE_HEADERS[schema])
+            current_db = schema
         
-        if info.get("sensitive"):
-            lines.append("  - ⚠️ Tabla sensible (requiere permisos especiales)")
+        lines.extend(_render_table(table_name, info))
     
     return "\n".join(lines)
 
 
+def get_schema_context_for_prompt(tables: Optional[Iterable[str]] = None) -> str:
+    """
+    Genera un contexto de esquema formateado para el prompt del LLM.
+    
+    El texto se arma una sola vez por subconjunto de tablas (memoizado).
+    
+    Args:
+        tables: Solo estas tablas (schema.tabla). Default: todas
+    
+    Returns:
+        String con descripción de tablas para incluir en el prompt
+    """
+    if tables is None:
+        return _render_schema_context(None)
+    known = frozenset(t for t in tables if t in SCHEMA_DESCRIPTIONS)
+    return _render_schema_context(known or None)
+
+
+@lru_cache(maxsize=128)
+def _render_entity_context(entities: FrozenSet[str]) -> str:
+    query_context = build_query_context(sorted(entities))
+    if not query_context["tables"]:
+        return get_schema_context_for_prompt()
+    
+    schema_context = get_schema_context_for_prompt(query_context["tables"])
+    
+    # JOINs sugeridos, también en orden estable
+    joins = sorted(
+        f"- {join['from_table']}.{join['from_column']} -> {join['to_table']}.{join['to_column']}"
+        for join in query_context["suggested_joins"]
+    )
+    if joins:
+        schema_context += "\n\n## JOINs Sugeridos:\n" + "\n".join(joins) + "\n"
+    return schema_context
+
+
+def get_schema_context_for_entities(entities: Iterable[str]) -> str:
+    """
+    Contexto de esquema solo con las tablas de las entidades detectadas
+    (y sus relacionadas), más los JOINs sugeridos. Memoizado.
+    
+    Args:
+        entities: Entidades mencionadas en la consulta (ej: ["cita"])
+    
+    Returns:
+        Prompt de esquema reducido, o el completo si ninguna entidad se reconoce
+    """
+    return _render_entity_context(frozenset(e.lower().strip() for e in entities))
+
+
 def get_table_info(table_name: str) -> Optional[Dict[str, Any]]:
     """
     Obtiene información detallada de una tabla.
@@ -358,26 +417,25 @@ def get_column_sample_values(
     
     # Determinar BD
     if schema == "auth":
-        db = next(get_auth_db())
+        target = "auth"
     elif schema in ["ops", "finance"]:
-        db = next(get_ops_db())
+        target = "ops"
     else:
-        db = next(get_core_db())
+        target = "core"
     
+    sql = f"""
+    SELECT DISTINCT {column_name}
+    FROM {table_name}
+    WHERE {column_name} IS NOT NULL
+    LIMIT :limit
+    """
     try:
-        sql = f"""
-        SELECT DISTINCT {column_name}
-        FROM {table_name}
-        WHERE {column_name} IS NOT NULL
-        LIMIT :limit
-        """
-        result = db.execute(text(sql), {"limit": limit})
-        return [str(row[0]) for row in result.fetchall()]
+        with agent_session(target) as db:
+            result = db.execute(text(sql), {"limit": limit})
+            return [str(row[0]) for row in result.fetchall()]
     except Exception as e:
         logger.error(f"Error obteniendo sample values: {e}")
         return []
-    finally:
-        db.close()
 
 
 def build_query_context(entities: List[str]) -> Dict[str, Any]:
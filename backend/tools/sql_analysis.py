@@ -0,0 +1,176 @@
+"""
+SQL Analysis - Análisis del SQL generado en una sola pasada
+===========================================================
+
+Parsea la consulta una vez (sqlglot, dialecto PostgreSQL) y extrae todo lo
+que el ejecutor necesita:
+- Tipo de statement (solo SELECT es ejecutable por el agente)
+- Tablas y esquemas referenciados (sin contar los CTE)
+- Funciones llamadas
+- Si hay LIMIT al nivel superior (y su valor)
+- Base de datos objetivo
+
+Antes eran decenas de búsquedas de substrings y regex sobre el texto, con
+falsos positivos: una columna `limite` hacía creer que ya había LIMIT y
+una columna `drop_off` parecía un DROP.
+
+El resultado se cachea por SQL normalizado (sanitize_query): el mismo SQL
+(plantillas, caché de consultas, reintentos) no se vuelve a parsear.
+"""
+
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, FrozenSet, Optional, Tuple
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+
+from backend.agents.state import DatabaseTarget
+
+logger = logging.getLogger(__name__)
+
+
+# Mapeo de esquemas a bases de datos
+SCHEMA_TO_DB: Dict[str, DatabaseTarget] = {
+    "auth": DatabaseTarget.AUTH,
+    "clinic": DatabaseTarget.CORE,
+    "ops": DatabaseTarget.OPS,
+    "finance": DatabaseTarget.OPS,  # Finance está en ops_db
+}
+
+# Tablas conocidas cuando el SQL no trae esquema
+TABLE_TO_DB: Dict[str, DatabaseTarget] = {
+    # Auth DB
+    "sys_usuarios": DatabaseTarget.AUTH,
+    "clinicas": DatabaseTarget.AUTH,
+    "audit_logs": DatabaseTarget.AUTH,
+    # Core DB
+    "pacientes": DatabaseTarget.CORE,
+    "tratamientos": DatabaseTarget.CORE,
+    "evoluciones_clinicas": DatabaseTarget.CORE,
+    "evidencias": DatabaseTarget.CORE,
+    # Ops DB
+    "podologos": DatabaseTarget.OPS,
+    "citas": DatabaseTarget.OPS,
+    "catalogo_servicios": DatabaseTarget.OPS,
+    "solicitudes_prospectos": DatabaseTarget.OPS,
+    "pagos": DatabaseTarget.OPS,
+    "transacciones": DatabaseTarget.OPS,
+    "gastos": DatabaseTarget.OPS,
+}
+
+
+@dataclass(frozen=True)
+class SQLAnalysis:
+    """Lo que el ejecutor necesita saber de una consulta."""
+    statement_type: str                    # "SELECT", "UNION", "DELETE", ... ("" si no parsea)
+    tables: Tuple[str, ...] = ()           # "esquema.tabla" o "tabla" si no trae esquema
+    schemas: FrozenSet[str] = frozenset()
+    functions: FrozenSet[str] = frozenset()  # En minúsculas
+    has_limit: bool = False                # LIMIT al nivel superior
+    limit: Optional[int] = None            # Valor si es un literal entero
+    has_into: bool = False                 # SELECT ... INTO (crea una tabla)
+    has_locks: bool = False                # FOR UPDATE / FOR SHARE
+    has_writes: bool = False               # INSERT/UPDATE/DELETE/MERGE en cualquier nivel (p. ej. en un CTE)
+    target_dbs: FrozenSet[DatabaseTarget] = frozenset()
+    error: Optional[str] = None            # No parsea o hay más de un statement
+
+    @property
+    def target_db(self) -> Optional[DatabaseTarget]:
+        """BD objetivo (None si no hay tablas conocidas o si mezcla bases)."""
+        return next(iter(self.target_dbs)) if len(self.target_dbs) == 1 else None
+
+
+def _function_name(func: exp.Func) -> str:
+    if isinstance(func, exp.Anonymous):
+        return str(func.this).lower()
+    return func.sql_name().lower()
+
+
+def _identifier(node: Optional[exp.Expression]) -> str:
+    """Nombre como lo resuelve PostgreSQL: sin comillas se pliega a minúsculas."""
+    if not isinstance(node, exp.Identifier):
+        return node.name if node is not None else ""
+    return node.this if node.quoted else node.this.lower()
+
+
+def _table_db(schema: str, table: str) -> Optional[DatabaseTarget]:
+    if schema:
+        return SCHEMA_TO_DB.get(schema)
+    return TABLE_TO_DB.get(table)
+
+
+@lru_cache(maxsize=512)
+def analyze_sql(sql: str) -> SQLAnalysis:
+    """
+    Analiza una consulta ya normalizada (ver sanitize_query).
+
+    Args:
+        sql: Consulta SQL
+
+    Returns:
+        SQLAnalysis (con error si no se pudo parsear)
+    """
+    try:
+        statements = [s for s in sqlglot.parse(sql, read="postgres") if s is not None]
+    except SqlglotError as e:
+        logger.debug(f"SQL no parseable: {e}")
+        return SQLAnalysis(statement_type="", error="No se pudo analizar la consulta SQL")
+
+    if len(statements) != 1:
+        return SQLAnalysis(statement_type="", error="No se permiten múltiples statements SQL")
+
+    statement = statements[0]
+    cte_names = {_identifier(cte.args["alias"].this) for cte in statement.find_all(exp.CTE)}
+
+    tables = []
+    for table in statement.find_all(exp.Table):
+        # auth.SYS_USUARIOS es auth.sys_usuarios: se compara ya plegado
+        table_name = _identifier(table.this)
+        schema = _identifier(table.args.get("db"))
+        if not table_name or (not schema and table_name in cte_names):
+            continue
+        name = f"{schema}.{table_name}" if schema else table_name
+        if name not in tables:
+            tables.append(name)
+
+    schemas = frozenset(t.split(".")[0] for t in tables if "." in t)
+    target_dbs = frozenset(
+        db for db in (_table_db(*t.split(".")) if "." in t else _table_db("", t) for t in tables)
+        if db is not None
+    )
+
+    limit_node = statement.args.get("limit") if isinstance(statement, exp.Select) else None
+    limit_value = None
+    if limit_node is not None and isinstance(limit_node.expression, exp.Literal) and limit_node.expression.is_int:
+        limit_value = int(limit_node.expression.this)
+
+    return SQLAnalysis(
+        statement_type=statement.key.upper(),
+        tables=tuple(tables),
+        schemas=schemas,
+        functions=frozenset(_function_name(f) for f in statement.find_all(exp.Func)),
+        has_limit=limit_node is not None,
+        limit=limit_value,
+        has_into=statement.args.get("into") is not None,
+        has_locks=bool(statement.args.get("locks")),
+        has_writes=statement.find(exp.Insert, exp.Update, exp.Delete, exp.Merge) is not None,
+        target_dbs=target_dbs,
+    )
+
+
+def apply_row_limit(sql: str, analysis: SQLAnalysis, max_rows: int) -> str:
+    """
+    Garantiza el tope de filas sin reescribir el SQL (se conservan los
+    parámetros :nombre tal cual).
+
+    - Sin LIMIT al nivel superior: se agrega
+    - LIMIT mayor al tope o no literal (:n): se envuelve en una subconsulta
+    """
+    if not analysis.has_limit:
+        return f"{sql} LIMIT {max_rows}"
+    if analysis.limit is not None and analysis.limit <= max_rows:
+        return sql
+    return f"SELECT * FROM ({sql}) AS limitado LIMIT {max_rows}"
@@ -4,33 +4,45 @@ SQL Executor Tool - Ejecución segura de consultas SQL
 
 Proporciona ejecución segura de consultas SQL con:
 - Detección automática de base de datos objetivo
-- Validación de queries (solo SELECT para lecturas)
-- Timeout configurable
+- Validación de queries sobre el AST (solo SELECT para lecturas)
+- Timeout en el servidor (statement_timeout) dentro de una transacción
+  de solo lectura, y cancelación desde otro hilo (QueryHandle)
+- Guarda de costo opcional: EXPLAIN contra el presupuesto del rol antes
+  de ejecutar (tools/query_cost.py)
 - Límite de resultados
 - Logging de consultas
 
-Usa las conexiones centralizadas de deps/database.py (Decisión 2).
+Usa los pools propios del agente de deps/database.py (agent_session):
+solo lectura, con tope de conexiones y separados de los de la API.
 """
 
 import re
+import threading
 import time
 import logging
-from typing import Dict, Any, List, Optional, Tuple, Literal
+from typing import ContextManager, Dict, Any, List, Optional, Tuple, Literal
 from contextlib import contextmanager
 from dataclasses import dataclass
 
 from sqlalchemy import text
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError, OperationalError
+from sqlalchemy.exc import SQLAlchemyError, OperationalError, TimeoutError as PoolTimeoutError
 
 from backend.api.core.config import get_settings
-from backend.api.deps.database import get_auth_db, get_core_db, get_ops_db
+from backend.api.deps.database import agent_session
 from backend.agents.state import (
     DatabaseTarget, 
     ExecutionResult, 
     SQLQuery,
     ErrorType,
 )
+from backend.tools.query_cost import check_cost, get_query_plan
+from backend.tools.sql_analysis import (
+    SCHEMA_TO_DB,
+    SQLAnalysis,
+    analyze_sql,
+    apply_row_limit,
+)
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -40,12 +52,6 @@ settings = get_settings()
 # CONSTANTES Y PATRONES
 # =============================================================================
 
-# Palabras clave peligrosas que NO deben ejecutarse desde el agente
-FORBIDDEN_KEYWORDS = [
-    "DROP", "TRUNCATE", "ALTER", "CREATE", "GRANT", "REVOKE",
-    "EXECUTE", "EXEC", "sp_", "xp_", "--", "/*", "*/", ";"
-]
-
 # Tablas sensibles que requieren permisos especiales
 SENSITIVE_TABLES = {
     "auth.sys_usuarios": ["Admin"],           # Solo Admin
@@ -53,13 +59,19 @@ SENSITIVE_TABLES = {
     "finance.transacciones": ["Admin"],       # Solo Admin
 }
 
-# Mapeo de esquemas a bases de datos
-SCHEMA_TO_DB: Dict[str, DatabaseTarget] = {
-    "auth": DatabaseTarget.AUTH,
-    "clinic": DatabaseTarget.CORE,
-    "ops": DatabaseTarget.OPS,
-    "finance": DatabaseTarget.OPS,  # Finance está en ops_db
-}
+# Funciones del servidor que leen archivos, abren conexiones o bloquean
+FORBIDDEN_FUNCTIONS = frozenset({
+    "pg_read_file", "pg_read_binary_file", "pg_ls_dir", "pg_stat_file",
+    "lo_import", "lo_export", "dblink", "dblink_exec", "pg_sleep",
+    "pg_terminate_backend", "pg_cancel_backend", "set_config",
+    # Ejecutan SQL o leen tablas recibidas como texto: el AST no ve esas
+    # tablas y se saltarían la revisión de tablas sensibles
+    "query_to_xml", "query_to_xmlschema", "query_to_xml_and_xmlschema",
+    "table_to_xml", "table_to_xmlschema", "table_to_xml_and_xmlschema",
+    "cursor_to_xml", "cursor_to_xmlschema",
+    "schema_to_xml", "schema_to_xmlschema", "schema_to_xml_and_xmlschema",
+    "database_to_xml", "database_to_xmlschema", "database_to_xml_and_xmlschema",
+})
 
 
 # =============================================================================
@@ -72,106 +84,83 @@ def detect_target_database(sql: str, tables: List[str] = None) -> DatabaseTarget
     
     Args:
         sql: Query SQL a analizar
-        tables: Lista de tablas involucradas (opcional)
+        tables: Lista de tablas involucradas (opcional, si el SQL no parsea)
         
     Returns:
         DatabaseTarget correspondiente
     """
-    sql_lower = sql.lower()
-    
-    # Detectar por esquema explícito en la query
-    for schema, db in SCHEMA_TO_DB.items():
-        if f"{schema}." in sql_lower:
-            return db
-    
-    # Detectar por tablas conocidas
-    table_db_map = {
-        # Auth DB
-        "sys_usuarios": DatabaseTarget.AUTH,
-        "clinicas": DatabaseTarget.AUTH,
-        "audit_logs": DatabaseTarget.AUTH,
-        # Core DB
-        "pacientes": DatabaseTarget.CORE,
-        "tratamientos": DatabaseTarget.CORE,
-        "evoluciones": DatabaseTarget.CORE,
-        "evidencias": DatabaseTarget.CORE,
-        # Ops DB
-        "podologos": DatabaseTarget.OPS,
-        "citas": DatabaseTarget.OPS,
-        "catalogo_servicios": DatabaseTarget.OPS,
-        "prospectos": DatabaseTarget.OPS,
-        "pagos": DatabaseTarget.OPS,
-        "transacciones": DatabaseTarget.OPS,
-        "gastos": DatabaseTarget.OPS,
-    }
-    
-    for table, db in table_db_map.items():
-        if table in sql_lower:
-            return db
+    target = analyze_sql(sanitize_query(sql)).target_db
+    if target is None and tables:
+        target = analyze_sql(sanitize_query(f"SELECT 1 FROM {', '.join(tables)}")).target_db
     
     # Por defecto, usar Core (datos clínicos)
-    return DatabaseTarget.CORE
+    return target or DatabaseTarget.CORE
 
 
-def validate_query_safety(sql: str, user_role: str) -> Tuple[bool, Optional[str]]:
+def _is_sensitive(table: str, allowed_roles: List[str], sensitive_table: str, user_role: str) -> bool:
+    # Sin esquema también cuenta: "sys_usuarios" es auth.sys_usuarios
+    same_table = table == sensitive_table or table == sensitive_table.split(".")[1]
+    return same_table and user_role not in allowed_roles
+
+
+def check_analysis(analysis: SQLAnalysis, user_role: str) -> Tuple[bool, Optional[str]]:
     """
-    Valida que la query sea segura para ejecutar.
+    Valida una consulta ya analizada (ver validate_query_safety).
     
-    Args:
-        sql: Query SQL a validar
-        user_role: Rol del usuario que ejecuta
-        
     Returns:
         Tuple (es_valida, mensaje_error)
     """
-    sql_upper = sql.upper().strip()
-    sql_lower = sql.lower()
-    
-    # 1. Verificar palabras clave prohibidas
-    for keyword in FORBIDDEN_KEYWORDS:
-        if keyword.upper() in sql_upper:
-            return False, f"Operación no permitida: {keyword}"
-    
-    # 2. Solo permitir SELECT para consultas de lectura
-    if not sql_upper.startswith("SELECT"):
+    # 1. Debe parsear y ser un solo statement
+    if analysis.error:
+        return False, analysis.error
+    
+    # 2. Solo SELECT; las operaciones de conjunto (UNION...) se rechazan:
+    #    el agente no las necesita y son la forma típica de inyección
+    if analysis.statement_type in ("UNION", "INTERSECT", "EXCEPT"):
+        return False, "Patrón sospechoso de SQL injection detectado (UNION)"
+    if analysis.statement_type != "SELECT" or analysis.has_writes:
+        # has_writes: WITH x AS (DELETE ... RETURNING *) SELECT ... también escribe
         return False, "Solo se permiten consultas de lectura (SELECT)"
     
-    # 3. Verificar que no haya múltiples statements (evitar SQL injection con ;)
-    # Remover strings entre comillas para evitar falsos positivos
-    cleaned_sql = re.sub(r"'[^']*'", "", sql)
-    cleaned_sql = re.sub(r'"[^"]*"', "", cleaned_sql)
-    if ";" in cleaned_sql:
-        return False, "No se permiten múltiples statements SQL"
-    
-    # 4. Detectar intentos de UNION-based SQL injection
-    # UNION debe estar precedido por paréntesis de cierre válido o ser parte de una subconsulta legítima
-    if "union" in sql_lower:
-        # Búsqueda simplificada: buscar patrones sospechosos de UNION injection
-        # Patrón típico: UNION SELECT sin subconsulta apropiada
-        union_pattern = r'\)\s*union\s+select|union\s+select\s+[^(]*from'
-        if re.search(union_pattern, sql_lower, re.IGNORECASE):
-            return False, "Patrón sospechoso de SQL injection detectado (UNION)"
+    # 3. SELECT que escribe o bloquea filas
+    if analysis.has_into:
+        return False, "Cláusula no permitida: INTO"
+    if analysis.has_locks:
+        return False, "Cláusula no permitida: FOR UPDATE/SHARE"
+    
+    # 4. Funciones del sistema
+    forbidden = analysis.functions & FORBIDDEN_FUNCTIONS
+    if forbidden:
+        return False, f"Función de sistema no permitida: {sorted(forbidden)[0]}"
     
     # 5. Verificar acceso a tablas sensibles
-    for table, allowed_roles in SENSITIVE_TABLES.items():
-        if table in sql_lower and user_role not in allowed_roles:
-            return False, f"Sin permisos para acceder a {table}"
-    
-    # 6. Verificar que no haya cláusulas peligrosas
-    dangerous_clauses = ["into outfile", "into dumpfile", "load_file", "exec(", "execute("]
-    for clause in dangerous_clauses:
-        if clause in sql_lower:
-            return False, f"Cláusula no permitida: {clause}"
-    
-    # 7. Detectar intentos de acceso a funciones del sistema
-    system_functions = ["pg_read_file", "pg_ls_dir", "pg_stat_file", "copy"]
-    for func in system_functions:
-        if func in sql_lower:
-            return False, f"Función de sistema no permitida: {func}"
+    for sensitive_table, allowed_roles in SENSITIVE_TABLES.items():
+        if any(_is_sensitive(t, allowed_roles, sensitive_table, user_role) for t in analysis.tables):
+            return False, f"Sin permisos para acceder a {sensitive_table}"
+    
+    # 6. Cada consulta va a una sola base (no existen JOINs entre bases)
+    if len(analysis.target_dbs) > 1:
+        return False, "La consulta mezcla tablas de bases de datos distintas"
     
     return True, None
 
 
+def validate_query_safety(sql: str, user_role: str) -> Tuple[bool, Optional[str]]:
+    """
+    Valida que la query sea segura para ejecutar.
+    
+    Usa el análisis AST (tools/sql_analysis.py), cacheado por SQL.
+    
+    Args:
+        sql: Query SQL a validar
+        user_role: Rol del usuario que ejecuta
+        
+    Returns:
+        Tuple (es_valida, mensaje_error)
+    """
+    return check_analysis(analyze_sql(sanitize_query(sql)), user_role)
+
+
 def sanitize_query(sql: str) -> str:
     """
     Limpia la query de caracteres potencialmente peligrosos.
@@ -199,27 +188,74 @@ def sanitize_query(sql: str) -> str:
 # OBTENCIÓN DE SESIONES DE BD
 # =============================================================================
 
-def get_db_session(target: DatabaseTarget) -> Session:
+def get_db_session(target: DatabaseTarget) -> ContextManager[Session]:
     """
-    Obtiene una sesión de base de datos según el target.
+    Sesión del pool del agente según el target (context manager).
     
-    Usa los generadores centralizados de deps/database.py (Decisión 2).
+    La sesión se devuelve al pool al salir del bloque `with`.
     
     Args:
         target: DatabaseTarget indicando qué BD usar
         
     Returns:
-        Session de SQLAlchemy
+        Context manager que entrega una Session de SQLAlchemy
     """
-    if target == DatabaseTarget.AUTH:
-        return next(get_auth_db())
-    elif target == DatabaseTarget.CORE:
-        return next(get_core_db())
-    elif target == DatabaseTarget.OPS:
-        return next(get_ops_db())
-    else:
+    if target not in (DatabaseTarget.AUTH, DatabaseTarget.CORE, DatabaseTarget.OPS):
         # Por defecto, Core
-        return next(get_core_db())
+        target = DatabaseTarget.CORE
+    return agent_session(target.value)
+
+
+# =============================================================================
+# TIMEOUT Y CANCELACIÓN
+# =============================================================================
+
+# SQLSTATE de PostgreSQL: statement_timeout o cancelación (pg_cancel)
+QUERY_CANCELED_SQLSTATE = "57014"
+
+
+def _is_query_canceled(error: SQLAlchemyError) -> bool:
+    orig = getattr(error, "orig", None)
+    # psycopg2 expone pgcode; psycopg 3, sqlstate
+    return QUERY_CANCELED_SQLSTATE in (getattr(orig, "pgcode", None), getattr(orig, "sqlstate", None))
+
+
+class QueryHandle:
+    """
+    Permite cancelar desde otro hilo la consulta que execute_safe_query
+    está corriendo (la ejecución es síncrona y corre en un hilo aparte).
+    
+    cancel() envía la cancelación a PostgreSQL: la consulta termina con
+    QueryCanceled y la conexión vuelve al pool en lugar de quedar ocupada.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connection: Any = None
+        self.cancelled = False
+    
+    def attach(self, dbapi_connection: Any) -> bool:
+        """Registra la conexión en uso. False si ya se pidió cancelar."""
+        with self._lock:
+            if self.cancelled:
+                return False
+            self._connection = dbapi_connection
+            return True
+    
+    def detach(self) -> None:
+        with self._lock:
+            self._connection = None
+    
+    def cancel(self) -> None:
+        """Cancela la consulta en curso (o la siguiente, si aún no empieza)."""
+        with self._lock:
+            self.cancelled = True
+            connection = self._connection
+        if connection is not None:
+            try:
+                connection.cancel()
+            except Exception as e:
+                logger.warning(f"No se pudo cancelar la consulta: {e}")
 
 
 # =============================================================================
@@ -231,6 +267,8 @@ def execute_safe_query(
     user_role: str,
     max_results: int = None,
     timeout_seconds: int = None,
+    handle: Optional[QueryHandle] = None,
+    cost_guard: bool = False,
 ) -> ExecutionResult:
     """
     Ejecuta una consulta SQL de forma segura.
@@ -241,7 +279,10 @@ def execute_safe_query(
         sql_query: SQLQuery con la consulta y metadata
         user_role: Rol del usuario que ejecuta
         max_results: Límite de filas (default de config)
-        timeout_seconds: Timeout en segundos (default de config)
+        timeout_seconds: statement_timeout en segundos (default: AGENT_TIMEOUT_SECONDS)
+        handle: Para cancelar la consulta desde otro hilo (opcional)
+        cost_guard: Revisar el plan (EXPLAIN) contra el presupuesto del rol
+            antes de ejecutar; si lo excede, error QUERY_TOO_COSTLY
         
     Returns:
         ExecutionResult con los datos o error
@@ -251,11 +292,12 @@ def execute_safe_query(
     
     start_time = time.time()
     
-    # 1. Sanitizar query
+    # 1. Sanitizar query y analizarla (una sola pasada, cacheada)
     clean_sql = sanitize_query(sql_query.query)
+    analysis = analyze_sql(clean_sql)
     
     # 2. Validar seguridad
-    is_valid, error_msg = validate_query_safety(clean_sql, user_role)
+    is_valid, error_msg = check_analysis(analysis, user_role)
     if not is_valid:
         logger.warning(f"Query rechazada por seguridad: {error_msg}")
         return ExecutionResult(
@@ -264,45 +306,94 @@ def execute_safe_query(
             execution_time_ms=(time.time() - start_time) * 1000,
         )
     
-    # 3. Detectar BD target si no está especificada
-    target_db = sql_query.target_db or detect_target_database(clean_sql)
+    # 3. BD target: la de las tablas del SQL manda sobre la declarada por el LLM.
+    #    Sin tablas en el SQL no hay nada que respalde la declarada (podría
+    #    mandar la consulta a auth): se usa Core.
+    if analysis.target_db:
+        target_db = analysis.target_db
+    elif analysis.tables:
+        target_db = sql_query.target_db or DatabaseTarget.CORE
+    else:
+        target_db = DatabaseTarget.CORE
     
-    # 4. Agregar LIMIT si no existe
-    if "limit" not in clean_sql.lower():
-        clean_sql = f"{clean_sql} LIMIT {max_results}"
+    # 4. Tope de filas (LIMIT al nivel superior, no la palabra "limit" en el texto)
+    clean_sql = apply_row_limit(clean_sql, analysis, max_results)
     
     # 5. Ejecutar query
-    db = None
     try:
-        db = get_db_session(target_db)
+        with get_db_session(target_db) as db:
+            # Solo lectura y con tope de tiempo en el servidor: una consulta
+            # desbocada la corta PostgreSQL y no deja ocupada una conexión
+            # del pool del agente. SET LOCAL dura lo que la transacción
+            # (close() hace rollback).
+            db.execute(text("SET TRANSACTION READ ONLY"))
+            db.execute(text(f"SET LOCAL statement_timeout = {int(timeout_seconds * 1000)}"))
         
-        # Log de query si está habilitado
-        if settings.AGENT_LOG_QUERIES:
-            logger.info(f"Ejecutando query en {target_db.value}: {clean_sql[:200]}...")
+            if handle is not None and not handle.attach(db.connection().connection.dbapi_connection):
+                return ExecutionResult(
+                    success=False,
+                    error_message="Consulta cancelada",
+                    error_type=ErrorType.TIMEOUT,
+                    execution_time_ms=(time.time() - start_time) * 1000,
+                )
         
-        # Ejecutar con parámetros
-        result = db.execute(
-            text(clean_sql),
-            sql_query.params or {}
-        )
+            # La conexión se suelta del handle antes de que vuelva al pool:
+            # un cancel() tardío no debe alcanzar la consulta de otro hilo
+            try:
+                # Plan del optimizador contra el presupuesto del rol, antes de ejecutar
+                if cost_guard:
+                    plan = get_query_plan(db, target_db.value, clean_sql, sql_query.params or {})
+                    complaint = check_cost(plan, user_role)
+                    if complaint:
+                        logger.warning(f"Query rechazada por costo: {complaint}")
+                        return ExecutionResult(
+                            success=False,
+                            error_message=complaint,
+                            error_type=ErrorType.QUERY_TOO_COSTLY,
+                            execution_time_ms=(time.time() - start_time) * 1000,
+                        )
         
-        # Obtener columnas y filas
-        columns = list(result.keys()) if result.returns_rows else []
-        rows = [dict(row._mapping) for row in result.fetchall()] if result.returns_rows else []
+                # Log de query si está habilitado
+                if settings.AGENT_LOG_QUERIES:
+                    logger.info(f"Ejecutando query en {target_db.value}: {clean_sql[:200]}...")
         
-        execution_time = (time.time() - start_time) * 1000
+                # Ejecutar con parámetros
+                result = db.execute(
+                    text(clean_sql),
+                    sql_query.params or {}
+                )
         
-        logger.info(f"Query exitosa: {len(rows)} filas en {execution_time:.2f}ms")
+                # Obtener columnas y filas
+                columns = list(result.keys()) if result.returns_rows else []
+                rows = [dict(row._mapping) for row in result.fetchall()] if result.returns_rows else []
         
-        return ExecutionResult(
-            success=True,
-            data=rows,
-            row_count=len(rows),
-            columns=columns,
-            execution_time_ms=execution_time,
-        )
+                execution_time = (time.time() - start_time) * 1000
+        
+                logger.info(f"Query exitosa: {len(rows)} filas en {execution_time:.2f}ms")
         
+                return ExecutionResult(
+                    success=True,
+                    data=rows,
+                    row_count=len(rows),
+                    columns=columns,
+                    execution_time_ms=execution_time,
+                )
+            finally:
+                if handle is not None:
+                    handle.detach()
+
     except OperationalError as e:
+        if _is_query_canceled(e):
+            cancelled = handle is not None and handle.cancelled
+            logger.warning(
+                f"Query {'cancelada' if cancelled else f'excedió {timeout_seconds}s'}: {clean_sql[:200]}"
+            )
+            return ExecutionResult(
+                success=False,
+                error_message="Consulta cancelada" if cancelled else f"La consulta excedió {timeout_seconds}s",
+                error_type=ErrorType.TIMEOUT,
+                execution_time_ms=(time.time() - start_time) * 1000,
+            )
         logger.error(f"Error de conexión: {str(e)}")
         return ExecutionResult(
             success=False,
@@ -310,6 +401,16 @@ def execute_safe_query(
             execution_time_ms=(time.time() - start_time) * 1000,
         )
         
+    except PoolTimeoutError:
+        # Pool del agente lleno: se falla rápido sin tocar el de la API
+        logger.warning(f"Pool del agente agotado ({target_db.value})")
+        return ExecutionResult(
+            success=False,
+            error_message="El asistente está atendiendo muchas consultas, intenta de nuevo en unos segundos",
+            error_type=ErrorType.TIMEOUT,
+            execution_time_ms=(time.time() - start_time) * 1000,
+        )
+        
     except SQLAlchemyError as e:
         logger.error(f"Error SQL: {str(e)}")
         return ExecutionResult(
@@ -325,10 +426,6 @@ def execute_safe_query(
             error_message="Error interno al procesar la consulta",
             execution_time_ms=(time.time() - start_time) * 1000,
         )
-        
-    finally:
-        if db:
-            db.close()
 
 
 # =============================================================================
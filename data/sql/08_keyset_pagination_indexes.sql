@@ -0,0 +1,35 @@
+-- =============================================================================
+-- Migration: Índices para paginación por cursor (keyset)
+-- Description: Índices compuestos que coinciden con el ORDER BY de cada
+--              listado, para que "WHERE (a, b, id) > (...) ORDER BY a, b, id
+--              LIMIT n" sea un index scan sin importar qué tan profunda
+--              sea la página.
+-- Databases: clinica_auth_db, clinica_core_db, clinica_ops_db
+-- Date: 2026-10-17
+-- =============================================================================
+
+\c clinica_auth_db
+
+-- GET /audit (más reciente primero)
+CREATE INDEX IF NOT EXISTS idx_audit_timestamp_id
+    ON auth.audit_log(timestamp_accion DESC, id_log DESC);
+
+
+\c clinica_core_db
+
+-- GET /evidencias (más reciente primero)
+CREATE INDEX IF NOT EXISTS idx_evidencias_fecha_id
+    ON clinic.evidencia_fotografica(fecha_captura DESC, id_evidencia DESC);
+
+
+\c clinica_ops_db
+
+-- GET /citas (agenda cronológica)
+CREATE INDEX IF NOT EXISTS idx_citas_fecha_hora_id
+    ON ops.citas(fecha_cita, hora_inicio, id_cita);
+
+-- GET /finance/pagos (más reciente primero)
+CREATE INDEX IF NOT EXISTS idx_pagos_fecha_id
+    ON finance.pagos(fecha_emision DESC, id_pago DESC);
+
+-- GET /pacientes usa la llave primaria (id_paciente): no requiere índice nuevo
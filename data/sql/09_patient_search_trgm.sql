@@ -0,0 +1,40 @@
+-- =============================================================================
+-- Migration: Búsqueda de pacientes por trigramas
+-- Description: Índices GIN (gin_trgm_ops) sobre las MISMAS expresiones que
+--              usa GET /pacientes/buscar (tools/fuzzy_search.py):
+--                - nombre completo sin acentos y en minúsculas
+--                - teléfono normalizado a solo dígitos
+--              Con esto "%", LIKE '%...%' y similarity() se resuelven con
+--              un bitmap index scan en vez de un seq scan de la tabla.
+-- Database: clinica_core_db
+-- Date: 2026-10-17
+-- =============================================================================
+
+\c clinica_core_db
+
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- unaccent() es STABLE (depende del diccionario configurado), así que no se
+-- puede usar en un índice. Este wrapper fija el diccionario y se declara
+-- IMMUTABLE para poder indexar la expresión.
+CREATE OR REPLACE FUNCTION clinic.f_unaccent(TEXT)
+RETURNS TEXT AS $$
+    SELECT public.unaccent('public.unaccent'::regdictionary, $1)
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+
+-- Nombre completo: "nombres apellidos" sin acentos, en minúsculas
+CREATE INDEX IF NOT EXISTS idx_pacientes_nombre_completo_trgm
+    ON clinic.pacientes
+    USING GIN (clinic.f_unaccent(lower(nombres || ' ' || apellidos)) gin_trgm_ops)
+    WHERE deleted_at IS NULL;
+
+-- Teléfono solo dígitos: "55-1234 5678" y "5512345678" coinciden
+CREATE INDEX IF NOT EXISTS idx_pacientes_telefono_digitos_trgm
+    ON clinic.pacientes
+    USING GIN (regexp_replace(telefono, '\D', '', 'g') gin_trgm_ops)
+    WHERE deleted_at IS NULL;
+
+COMMIT;
@@ -0,0 +1,58 @@
+-- =============================================================================
+-- Migration: Cola persistente de recordatorios de citas
+-- Description: ops.recordatorio_jobs guarda un job por cita/canal/fecha.
+--              Los workers toman los jobs vencidos con
+--              SELECT ... FOR UPDATE SKIP LOCKED (ver
+--              backend/api/utils/reminder_queue.py).
+-- Databases: clinica_ops_db
+-- Date: 2026-10-17
+-- =============================================================================
+
+\c clinica_ops_db
+
+CREATE TABLE IF NOT EXISTS ops.recordatorio_jobs (
+    id_job BIGINT PRIMARY KEY GENERATED ALWAYS AS IDENTITY,
+    id_clinica BIGINT DEFAULT 1,
+
+    -- Cita y destinatario
+    cita_id BIGINT NOT NULL REFERENCES ops.citas(id_cita) ON DELETE CASCADE,
+    canal TEXT NOT NULL DEFAULT 'email',
+    destinatario TEXT,                -- NULL = paciente sin email
+
+    -- Copia de datos para el mensaje (no se consulta core DB al enviar)
+    fecha_cita DATE NOT NULL,
+    hora_cita TIME NOT NULL,
+    paciente_id BIGINT NOT NULL,      -- FK virtual a clinic.pacientes
+    paciente_nombre TEXT NOT NULL,
+    paciente_telefono TEXT,
+    podologo_nombre TEXT,
+    servicio_nombre TEXT,
+    notas TEXT,
+
+    -- Estado del envío
+    status TEXT NOT NULL DEFAULT 'Pendiente'
+        CHECK (status IN ('Pendiente', 'Enviando', 'Enviado', 'Fallido', 'Cancelado', 'Sin Email')),
+    programado_para TIMESTAMPTZ NOT NULL,
+    intentos INTEGER NOT NULL DEFAULT 0,
+    ultimo_error TEXT,
+    bloqueado_por TEXT,
+    bloqueado_at TIMESTAMPTZ,
+    enviado_at TIMESTAMPTZ,
+
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+
+    CONSTRAINT uq_recordatorio_cita_canal_fecha UNIQUE (cita_id, canal, fecha_cita)
+);
+
+COMMENT ON TABLE ops.recordatorio_jobs IS
+    'Cola persistente de recordatorios. Flujo: Pendiente → Enviando → Enviado.';
+
+-- Jobs vencidos (solo los activos, el índice se mantiene pequeño)
+CREATE INDEX IF NOT EXISTS idx_recordatorio_jobs_activos
+    ON ops.recordatorio_jobs(programado_para)
+    WHERE status IN ('Pendiente', 'Enviando');
+
+-- GET /notifications/upcoming-reminders
+CREATE INDEX IF NOT EXISTS idx_recordatorio_jobs_fecha
+    ON ops.recordatorio_jobs(fecha_cita, hora_cita);
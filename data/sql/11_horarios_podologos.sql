@@ -0,0 +1,31 @@
+-- =============================================================================
+-- Migration: Horario laboral por podólogo
+-- Description: Ventanas de trabajo por día de la semana para el motor de
+--              disponibilidad (backend/api/utils/availability.py). Varias
+--              filas el mismo día = turno partido. Un podólogo sin filas
+--              usa AGENDA_HORA_INICIO - AGENDA_HORA_FIN todos los días.
+-- Databases: clinica_ops_db
+-- Date: 2026-10-17
+-- =============================================================================
+
+\c clinica_ops_db
+
+CREATE TABLE IF NOT EXISTS ops.horarios_podologos (
+    id_horario BIGINT PRIMARY KEY GENERATED ALWAYS AS IDENTITY,
+    podologo_id BIGINT NOT NULL REFERENCES ops.podologos(id_podologo) ON DELETE CASCADE,
+    dia_semana INTEGER NOT NULL CHECK (dia_semana BETWEEN 0 AND 6),  -- 0 = Lunes
+    hora_inicio TIME NOT NULL,
+    hora_fin TIME NOT NULL,
+    CHECK (hora_fin > hora_inicio)
+);
+
+COMMENT ON TABLE ops.horarios_podologos IS
+    'Jornada laboral por podólogo y día de la semana (0 = Lunes ... 6 = Domingo).';
+
+CREATE INDEX IF NOT EXISTS idx_horarios_podologo
+    ON ops.horarios_podologos(podologo_id);
+
+-- Disponibilidad: todas las citas activas de varios podólogos en un rango
+CREATE INDEX IF NOT EXISTS idx_citas_podologo_fecha_activas
+    ON ops.citas(podologo_id, fecha_cita, hora_inicio)
+    WHERE deleted_at IS NULL;